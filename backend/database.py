@@ -1,8 +1,16 @@
+import inspect
 import os
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional
 
+import httpx
 from dotenv import load_dotenv
-from supabase import Client, create_client
+from fastapi import HTTPException
+from supabase import Client, ClientOptions, create_client
+
+# ClientOptions(httpx_client=...) only exists in recent supabase-py 2.x
+# releases; older ones still work, each sub-client with its own session.
+SHARED_HTTP_CLIENT_SUPPORTED = "httpx_client" in inspect.signature(ClientOptions).parameters
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -15,28 +23,192 @@ if not url or not key:
         "❌ As chaves SUPABASE_URL e SUPABASE_KEY não foram encontradas no .env"
     )
 
+
+class SupabaseClientRegistry:
+    """
+    Application-scoped Supabase clients (anon and service-role admin).
+
+    Routers used to call create_client() per request (uploads, profile
+    reads, every items/social endpoint) and WardrobeService built its own
+    admin client, each with a fresh HTTP session and TLS handshake. The
+    registry builds each client once, backed by a pooled keep-alive
+    httpx.Client shared by its PostgREST, Storage and Auth sub-clients.
+    Routers receive the admin client through the get_admin_client
+    dependency; main.py creates the clients at startup and closes their
+    connection pools at shutdown. On supabase-py releases without
+    ClientOptions.httpx_client the clients are still built once, but each
+    keeps the sessions supabase-py creates.
+
+    Environment Variables:
+    - SUPABASE_SERVICE_KEY: Service-role key of the admin client
+    - SUPABASE_HTTP_MAX_CONNECTIONS: Max open connections per client (default 20)
+    - SUPABASE_HTTP_MAX_KEEPALIVE: Max idle keep-alive connections (default 10)
+    - SUPABASE_HTTP_TIMEOUT: Request timeout in seconds (default 60)
+    """
+
+    DEFAULT_MAX_CONNECTIONS = 20
+    DEFAULT_MAX_KEEPALIVE = 10
+    DEFAULT_TIMEOUT = 60.0
+    KEEPALIVE_EXPIRY = 30.0
+
+    def __init__(
+        self,
+        supabase_url: str,
+        anon_key: str,
+        service_key: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the registry. Clients are created on first use.
+
+        Args:
+            supabase_url: Project URL (SUPABASE_URL)
+            anon_key: Public anon key (SUPABASE_KEY)
+            service_key: Service-role key (SUPABASE_SERVICE_KEY), optional
+            max_connections: Max open connections per client
+            max_keepalive_connections: Max idle keep-alive connections per client
+            timeout: Request timeout in seconds
+        """
+        self.url = supabase_url
+        self.anon_key = anon_key
+        self.service_key = service_key or None
+        self.max_connections = max_connections or int(
+            os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", self.DEFAULT_MAX_CONNECTIONS)
+        )
+        self.max_keepalive_connections = max_keepalive_connections or int(
+            os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", self.DEFAULT_MAX_KEEPALIVE)
+        )
+        self.timeout = timeout or float(
+            os.getenv("SUPABASE_HTTP_TIMEOUT", self.DEFAULT_TIMEOUT)
+        )
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Client] = {}
+        self._http_clients: Dict[str, httpx.Client] = {}
+
+    @property
+    def has_admin(self) -> bool:
+        return bool(self.service_key)
+
+    def anon(self) -> Client:
+        """Client with the anon key (sign up / login, token checks)."""
+        return self._get("anon", self.anon_key)
+
+    def admin(self) -> Client:
+        """
+        Client with the service-role key (bypasses RLS).
+
+        Raises:
+            RuntimeError: If SUPABASE_SERVICE_KEY is not configured
+        """
+        if not self.service_key:
+            raise RuntimeError("SUPABASE_SERVICE_KEY is not configured")
+        return self._get("admin", self.service_key)
+
+    def startup(self) -> None:
+        """Create the clients up front (FastAPI startup)."""
+        self.anon()
+        if self.has_admin:
+            self.admin()
+
+    def close(self) -> None:
+        """Close the pooled connections of every client (FastAPI shutdown)."""
+        with self._lock:
+            http_clients = list(self._http_clients.items())
+            self._http_clients.clear()
+            self._clients.clear()
+        for name, http_client in http_clients:
+            try:
+                http_client.close()
+            except Exception as exc:
+                print(f"[SupabaseClients] Error closing client {name}: {exc}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": sorted(self._clients),
+                "has_admin": self.has_admin,
+                "shared_http_client": SHARED_HTTP_CLIENT_SUPPORTED,
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+            }
+
+    def _get(self, name: str, api_key: str) -> Client:
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None and not SHARED_HTTP_CLIENT_SUPPORTED:
+                client = create_client(self.url, api_key)
+                self._clients[name] = client
+                print(f"[SupabaseClients] Created client name={name} shared_http_client=False")
+            elif client is None:
+                http_client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                    ),
+                )
+                client = create_client(
+                    self.url,
+                    api_key,
+                    options=ClientOptions(httpx_client=http_client),
+                )
+                self._http_clients[name] = http_client
+                self._clients[name] = client
+                print(f"[SupabaseClients] Created client name={name}")
+            return client
+
+
+supabase_clients = SupabaseClientRegistry(url, key, os.environ.get("SUPABASE_SERVICE_KEY"))
+
 # Inicializar Cliente Supabase
-supabase: Client = create_client(url, key)
+supabase: Client = supabase_clients.anon()
+
+
+def get_admin_client() -> Client:
+    """
+    Dependência FastAPI: cliente admin partilhado (service role).
+    """
+    if not supabase_clients.has_admin:
+        print("❌ ERRO: SUPABASE_SERVICE_KEY não encontrada no .env")
+        raise HTTPException(status_code=500, detail="Erro de configuração no servidor")
+    return supabase_clients.admin()
+
+
+# Importado depois de criar o cliente: o pacote services importa `supabase` daqui.
+from services.auth_token_verifier import auth_token_verifier  # noqa: E402
 
 
 # --- Helper de Autenticação (Partilhado) ---
 def get_user_from_token(token: str):
     """
     Verifica o token JWT e retorna o utilizador se for válido.
+
+    O token é verificado localmente (segredo/JWKS do projeto) e guardado em
+    cache até expirar; só em último caso é pedido ao Supabase Auth.
     """
     if not token:
         return None
     try:
         # Remove "Bearer " se existir
         clean_token = token.replace("Bearer ", "")
-        user_response = supabase.auth.get_user(clean_token)
-
-        # In newer supabase-py, it returns a UserResponse object.
-        # We need to access .user property.
-        if user_response and hasattr(user_response, "user"):
-            return user_response
-
-        return user_response
+        return auth_token_verifier.verify(clean_token, remote=_get_user_remote)
     except Exception as e:
         print(f"Auth Error: {e}")
         return None
+
+
+def _get_user_remote(clean_token: str):
+    user_response = supabase.auth.get_user(clean_token)
+
+    # In newer supabase-py, it returns a UserResponse object.
+    # We need to access .user property.
+    if user_response and hasattr(user_response, "user"):
+        return user_response
+
+    return user_response
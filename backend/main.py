@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer
+from database import supabase_clients
 from routers import ai_outfit, auth, items, outfits, social, storage, usage  # Import all routers
+from services.color_inference_worker import color_inference_worker
+from services.db_executor import db_executor
+from services.http_client_registry import http_client_registry
+from services.recommendation_jobs import recommendation_jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Startup: pools HTTP partilhados (LLaVA e imagens) ---
+    await http_client_registry.startup()
+    supabase_clients.startup()
+    recommendation_jobs.startup()
+    yield
+    # --- Shutdown: fechar ligações e parar workers em background ---
+    recommendation_jobs.shutdown()
+    await http_client_registry.aclose()
+    color_inference_worker.shutdown()
+    db_executor.shutdown()
+    supabase_clients.close()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 security = HTTPBearer()
 # Configuração CORS
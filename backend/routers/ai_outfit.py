@@ -3,6 +3,8 @@ AI Outfit Recommendation Routes
 
 FastAPI router for AI-powered outfit recommendation endpoints:
 - POST /ai-outfit/today
+- GET /ai-outfit/refinements/{token} (and /events, SSE)
+- POST /ai-outfit/jobs/{today,travel,travel-plan}, GET /ai-outfit/jobs/{job_id} (and /events, SSE)
 - POST /ai-outfit/travel
 - POST /ai-outfit/alternative
 
@@ -10,27 +12,47 @@ These endpoints use the VLM-based recommendation pipeline with fallback
 to rule-based recommendations if the VLM fails.
 """
 
+import json
 import os
 import re
 from datetime import datetime
+from typing import Optional
 
 from database import get_user_from_token
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from schemas.ai_outfit import (
     AIOutfitAlternativeRequest,
     AIOutfitAlternativeResponse,
     AIOutfitDailyRequest,
     AIOutfitDailyResponse,
+    AIOutfitJobResponse,
+    AIOutfitRefinementResponse,
     AIOutfitTravelRequest,
     AIOutfitTravelResponse,
     ClothingItemInfo,
     OutfitSuggestion,
 )
+from services.llava_stream import selection_stream_stats
+from services.recommendation_cache import recommendation_result_cache
+from services.recommendation_jobs import JobFailed, recommendation_jobs
 from services.recommendation_service import RecommendationService
+from services.refinement_registry import (
+    STATUS_FAILED,
+    STATUS_PENDING,
+    STATUS_READY,
+    refinement_registry,
+)
 from services.image_preprocessing_service import ImagePreprocessingService
 from services.candidate_outfit_service import CandidateOutfitService
+from services.http_client_registry import http_client_registry
+from services.thumbnail_cache import thumbnail_cache
+from services.vlm_config import get_vlm_config
+from services.vlm_scheduler import vlm_scheduler
 from services.vlm_service import LLaVAService, MockVLMService
+from services.vlm_structured import structured_output_stats
 
 router = APIRouter(prefix="/ai-outfit", tags=["ai-outfit"])
 security = HTTPBearer()
@@ -82,7 +104,9 @@ def create_vlm_service():
 
 vlm_service = create_vlm_service()
 recommendation_service = RecommendationService(vlm_service=vlm_service)
-image_preprocessing_service = ImagePreprocessingService()
+image_preprocessing_service = ImagePreprocessingService(
+    get_vlm_config().get_image_preprocessing_config()
+)
 candidate_outfit_service = CandidateOutfitService()
 
 TRAVEL_REUSE_WARNING_PT = (
@@ -187,13 +211,89 @@ def format_clothing_item(item: dict) -> ClothingItemInfo:
     )
 
 
+def build_daily_response(user_id: str, result: dict, weather_data: dict) -> AIOutfitDailyResponse:
+    """
+    Convert a successful daily recommendation result into the response schema.
+    """
+    outfit_data = result.get("outfit", {})
+    items = outfit_data.get("items", [])
+
+    formatted_items = [format_clothing_item(item) for item in items]
+
+    model_used = result.get("model_used", "unknown")
+
+    debug_payload = result.get("debug") if os.getenv("DEBUG_AI", "false").lower() == "true" else None
+
+    refinement = result.get("refinement")
+    if refinement:
+        token = refinement["token"]
+        refinement = {
+            **refinement,
+            "poll_url": f"/ai-outfit/refinements/{token}",
+            "events_url": f"/ai-outfit/refinements/{token}/events",
+        }
+
+    return AIOutfitDailyResponse(
+        success=True,
+        primary_outfit=OutfitSuggestion(
+            outfit_id=f"{user_id}_{int(datetime.now().timestamp())}",
+            items=formatted_items,
+            reasoning=outfit_data.get(
+                "reasoning",
+                result.get("reasoning", "AI-generated outfit recommendation"),
+            ),
+            weather_compatibility=result.get("weather_compatibility", {}),
+            style_score=0.8,
+            comfort_score=0.8,
+            versatility_score=0.7,
+        ),
+        alternative_outfits=None,
+        weather_summary=weather_data,
+        debug=debug_payload,
+        refinement=refinement,
+        generated_at=datetime.now(),
+        model_used=model_used,
+    )
+
+
+def build_refinement_response(user_id: str, snapshot: dict) -> AIOutfitRefinementResponse:
+    """
+    Convert a refinement registry snapshot into the response schema.
+    """
+    response = AIOutfitRefinementResponse(
+        token=snapshot["token"],
+        status=snapshot["status"],
+        error=snapshot.get("error"),
+    )
+    result = snapshot.get("result")
+    if snapshot["status"] == STATUS_READY and result:
+        if not result.get("success"):
+            response.status = STATUS_FAILED
+            response.error = result.get("error", "Refinement failed")
+            return response
+        context = snapshot.get("context") or {}
+        response.result = build_daily_response(user_id, result, context.get("weather") or {})
+        refined_ids = (result.get("debug") or {}).get("final_item_ids") or []
+        response.changed = list(refined_ids) != list(context.get("speculative_item_ids") or [])
+    return response
+
+
 @router.post("/today", response_model=AIOutfitDailyResponse)
 async def get_daily_outfit_recommendation(
     request: AIOutfitDailyRequest,
     user=Depends(get_authenticated_user),
 ):
-    user_id = user.user.id
+    return await run_daily_recommendation(user.user.id, request)
 
+
+async def run_daily_recommendation(
+    user_id: str,
+    request: AIOutfitDailyRequest,
+    on_progress=None,
+) -> AIOutfitDailyResponse:
+    """
+    Daily outfit for /today and /jobs/today (which passes a progress callback).
+    """
     try:
         weather_data_obj = request.weather_data
 
@@ -223,6 +323,8 @@ async def get_daily_outfit_recommendation(
             exclude_items=request.exclude_items,
             current_outfit_items=request.current_outfit_items,
             user_request=user_prompt,
+            latency_budget_seconds=request.latency_budget_seconds,
+            on_progress=on_progress,
         )
 
         if not result.get("success"):
@@ -235,35 +337,7 @@ async def get_daily_outfit_recommendation(
                 detail=result.get("error", "Recommendation failed"),
             )
 
-        outfit_data = result.get("outfit", {})
-        items = outfit_data.get("items", [])
-
-        formatted_items = [format_clothing_item(item) for item in items]
-
-        model_used = result.get("model_used", "unknown")
-
-        debug_payload = result.get("debug") if os.getenv("DEBUG_AI", "false").lower() == "true" else None
-
-        return AIOutfitDailyResponse(
-            success=True,
-            primary_outfit=OutfitSuggestion(
-                outfit_id=f"{user_id}_{int(datetime.now().timestamp())}",
-                items=formatted_items,
-                reasoning=outfit_data.get(
-                    "reasoning",
-                    result.get("reasoning", "AI-generated outfit recommendation"),
-                ),
-                weather_compatibility=result.get("weather_compatibility", {}),
-                style_score=0.8,
-                comfort_score=0.8,
-                versatility_score=0.7,
-            ),
-            alternative_outfits=None,
-            weather_summary=weather_data,
-            debug=debug_payload,
-            generated_at=datetime.now(),
-            model_used=model_used,
-        )
+        return build_daily_response(user_id, result, weather_data)
 
     except HTTPException:
         raise
@@ -272,6 +346,57 @@ async def get_daily_outfit_recommendation(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/refinements/{token}", response_model=AIOutfitRefinementResponse)
+async def get_outfit_refinement(
+    token: str,
+    wait_seconds: float = 0,
+    user=Depends(get_authenticated_user),
+):
+    """
+    LLaVA refinement of a daily outfit returned early (see `refinement` in /today).
+
+    `wait_seconds` (max 30) long-polls until the refinement finishes.
+    """
+    user_id = user.user.id
+    snapshot = await refinement_registry.wait(token, user_id, timeout=min(max(wait_seconds, 0), 30))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Refinement not found or expired")
+    return build_refinement_response(user_id, snapshot)
+
+
+@router.get("/refinements/{token}/events")
+async def stream_outfit_refinement(
+    token: str,
+    user=Depends(get_authenticated_user),
+):
+    """
+    Server-sent events for a refinement: keep-alive comments while pending,
+    then one `refinement` event with the final state.
+    """
+    user_id = user.user.id
+    if refinement_registry.status(token, user_id) is None:
+        raise HTTPException(status_code=404, detail="Refinement not found or expired")
+
+    async def events():
+        while True:
+            snapshot = await refinement_registry.wait(token, user_id, timeout=15)
+            if snapshot is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            if snapshot["status"] == STATUS_PENDING:
+                yield ": keep-alive\n\n"
+                continue
+            payload = build_refinement_response(user_id, snapshot).model_dump(mode="json")
+            yield f"event: refinement\ndata: {json.dumps(payload)}\n\n"
+            return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/debug/matcher")
 async def debug_ai_matcher(user=Depends(get_authenticated_user)):
     user_id = user.user.id
@@ -338,8 +463,17 @@ async def get_travel_outfit_recommendations(
     request: AIOutfitTravelRequest,
     user=Depends(get_authenticated_user),
 ):
-    user_id = user.user.id
+    return await run_travel_recommendation(user.user.id, request)
 
+
+async def run_travel_recommendation(
+    user_id: str,
+    request: AIOutfitTravelRequest,
+    on_progress=None,
+) -> AIOutfitTravelResponse:
+    """
+    Travel outfits for /travel and /jobs/travel (which passes a progress callback).
+    """
     try:
         result = await recommendation_service.recommend_travel_outfits(
             user_id=user_id,
@@ -349,6 +483,7 @@ async def get_travel_outfit_recommendations(
             luggage_limit=request.luggage_limit or 10,
             preferences=request.preferences,
             exclude_items=request.exclude_items,
+            on_progress=on_progress,
         )
 
         if not result.get("success"):
@@ -1011,7 +1146,14 @@ async def get_candidate_based_travel_plan(
     payload: dict = Body(...),
     user=Depends(get_authenticated_user),
 ):
-    user_id = user.user.id
+    return await run_travel_plan(user.user.id, payload)
+
+
+async def run_travel_plan(user_id: str, payload: dict, on_progress=None) -> dict:
+    """
+    Candidate-based plan for /travel-plan and /jobs/travel-plan (which passes a
+    progress callback: forecast_fetched, wardrobe_loaded, day_selected per day).
+    """
     destination = (payload.get("destination") or "").strip()
     preferences = dict(payload.get("preferences") or {})
     requested_style = (preferences.get("style") or payload.get("style") or "").strip()
@@ -1036,18 +1178,23 @@ async def get_candidate_based_travel_plan(
     print(f"[TravelPlanner] requested_style={requested_style}")
 
     provided_weather = payload.get("weather_by_day") or payload.get("weather_forecast")
+    forecast_source = "request"
     if isinstance(provided_weather, list) and provided_weather:
         forecast = provided_weather[:requested_days]
     else:
+        forecast_source = "weather_service"
         forecast = await recommendation_service.weather_service.get_weather_forecast(
             destination,
             num_days=requested_days,
         )
         if not forecast:
+            forecast_source = "default"
             forecast = [
                 {"temp": 18, "condition": "cloudy", "location": destination}
                 for _ in range(requested_days)
             ]
+    if on_progress is not None:
+        on_progress("forecast_fetched", {"days": len(forecast), "source": forecast_source})
 
     daily_outfits = []
     packing_by_id = {}
@@ -1070,6 +1217,8 @@ async def get_candidate_based_travel_plan(
         only_clean=False,
         exclude_item_ids=None,
     )
+    if on_progress is not None:
+        on_progress("wardrobe_loaded", {"items": len(wardrobe_items)})
     clean_ids_by_section = _clean_item_ids_by_section(wardrobe_items)
     any_reused = False
     model_used = "candidate_travel_plan"
@@ -1204,6 +1353,13 @@ async def get_candidate_based_travel_plan(
         previous_sections = selected_sections
         print(f"[TravelPlanner] day={day_index + 1} selected_sections={selected_sections}")
         print(f"[TravelPlanner] day={day_index + 1} selected_item_ids={selected_item_ids}")
+        if on_progress is not None:
+            on_progress("day_selected", {
+                "day": day_index + 1,
+                "days": requested_days,
+                "candidate_id": selected_candidate.get("candidate_id"),
+                "item_ids": selected_item_ids,
+            })
 
         daily_outfits.append({
             "day": day_index + 1,
@@ -1241,6 +1397,137 @@ async def get_candidate_based_travel_plan(
     }
 
 
+def build_job_response(job: dict) -> AIOutfitJobResponse:
+    """
+    Convert a job record into the response schema.
+    """
+    return AIOutfitJobResponse(
+        job_id=job["job_id"],
+        kind=job["kind"],
+        status=job["status"],
+        result=job.get("result"),
+        error=job.get("error"),
+        created_at=datetime.fromtimestamp(job["created_at"]),
+        updated_at=datetime.fromtimestamp(job["updated_at"]),
+        events_url=f"/ai-outfit/jobs/{job['job_id']}/events",
+    )
+
+
+def _http_job(call):
+    """Job runner around a route coroutine; HTTPException becomes a failed job."""
+    async def runner(report):
+        try:
+            return jsonable_encoder(await call(report))
+        except HTTPException as exc:
+            raise JobFailed(str(exc.detail), exc.status_code) from exc
+    return runner
+
+
+@router.post("/jobs/today", response_model=AIOutfitJobResponse, status_code=202)
+async def submit_daily_outfit_job(
+    request: AIOutfitDailyRequest,
+    user=Depends(get_authenticated_user),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Start a daily outfit job; progress and result stream from its events_url.
+    """
+    user_id = user.user.id
+    job = recommendation_jobs.submit(
+        user_id,
+        "today",
+        request.model_dump(mode="json", exclude_none=True),
+        _http_job(lambda report: run_daily_recommendation(user_id, request, on_progress=report)),
+        idempotency_key=idempotency_key,
+    )
+    return build_job_response(job)
+
+
+@router.post("/jobs/travel", response_model=AIOutfitJobResponse, status_code=202)
+async def submit_travel_outfit_job(
+    request: AIOutfitTravelRequest,
+    user=Depends(get_authenticated_user),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Start a /travel job; the result is the /travel response.
+    """
+    job = recommendation_jobs.submit(
+        user.user.id,
+        "travel",
+        request.model_dump(mode="json", exclude_none=True),
+        _http_job(lambda report: run_travel_recommendation(user.user.id, request, on_progress=report)),
+        idempotency_key=idempotency_key,
+    )
+    return build_job_response(job)
+
+
+@router.post("/jobs/travel-plan", response_model=AIOutfitJobResponse, status_code=202)
+async def submit_travel_plan_job(
+    payload: dict = Body(...),
+    user=Depends(get_authenticated_user),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Start a /travel-plan job; the result is the /travel-plan response.
+    """
+    job = recommendation_jobs.submit(
+        user.user.id,
+        "travel_plan",
+        payload,
+        _http_job(lambda report: run_travel_plan(user.user.id, payload, on_progress=report)),
+        idempotency_key=idempotency_key,
+    )
+    return build_job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=AIOutfitJobResponse)
+async def get_recommendation_job(
+    job_id: str,
+    user=Depends(get_authenticated_user),
+):
+    job = recommendation_jobs.get(job_id, user.user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return build_job_response(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_recommendation_job(
+    job_id: str,
+    after: int = 0,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    user=Depends(get_authenticated_user),
+):
+    """
+    Server-sent events of a job. Every event carries its sequence number as
+    `id`, so a reconnect with Last-Event-ID (or ?after=) resumes after it;
+    the stream ends after the `result` or `failed` event.
+    """
+    if recommendation_jobs.get(job_id, user.user.id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        after_seq = int(last_event_id) if last_event_id else after
+    except ValueError:
+        after_seq = after
+
+    async def events():
+        async for event in recommendation_jobs.stream(job_id, after_seq=after_seq):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield (
+                f"id: {event['seq']}\nevent: {event['event']}\n"
+                f"data: {json.dumps(event['data'], default=str)}\n\n"
+            )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/alternative", response_model=AIOutfitAlternativeResponse)
 async def get_alternative_outfit_recommendations(
     request: AIOutfitAlternativeRequest,
@@ -1341,6 +1628,19 @@ async def ai_recommendation_health_check():
                 "max_images_per_request"
             ),
         },
+        "http_pools": http_client_registry.get_stats(),
+        "thumbnail_cache": thumbnail_cache.get_stats(),
+        "recommendation_cache": recommendation_result_cache.get_stats(),
+        "recommendation_single_flight": recommendation_service.single_flight.get_stats(),
+        "vlm_scheduler": vlm_scheduler.get_stats(),
+        "llava_selection_stream": selection_stream_stats.get_stats(),
+        "candidate_prompt": recommendation_service.prompt_encoder.get_stats(),
+        "structured_output": {
+            "enabled": vlm_service.supports_structured_output(),
+            "calls": structured_output_stats.get_stats(),
+        },
+        "refinements": refinement_registry.get_stats(),
+        "jobs": recommendation_jobs.get_stats(),
         "note": "VLM pipeline with reliability validation and fallback",
         "timestamp": datetime.now().isoformat(),
     }
@@ -1,11 +1,10 @@
-import os
-
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import JSONResponse
-from supabase import create_client
+from supabase import Client
 
-from database import get_user_from_token, supabase
+from database import get_admin_client, get_user_from_token, supabase
 from schemas.auth import UserProfileUpdate, UserSignup
+from services.owner_profile_service import invalidate_owner_profile
 
 router = APIRouter()
 
@@ -33,21 +32,12 @@ def signup(user: UserSignup):
 # --- Rota de Atualizar Perfil ---
 # --- Rota de Obter Perfil ---
 @router.get("/profile")
-def get_profile(authorization: str = Header(None)):
+def get_profile(authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        # Configurar Admin para ler da BD (bypassing RLS)
-        service_key = os.environ.get("SUPABASE_SERVICE_KEY")
-        url = os.environ.get("SUPABASE_URL")
-
-        if not service_key:
-            raise HTTPException(status_code=500, detail="Erro de configuração")
-
-        admin_supabase = create_client(url, service_key)
-
         # Tenta ler da tabela 'profiles' (onde guardamos custom fields e URL da foto)
         # O user.user.id é o UUID do Supabase Auth
         res = admin_supabase.table("profiles").select("*").eq("user_id", user.user.id).execute()
@@ -77,21 +67,16 @@ def get_profile(authorization: str = Header(None)):
 
 # --- Rota de Atualizar Perfil ---
 @router.put("/profile")
-def update_profile(data: UserProfileUpdate, authorization: str = Header(None)):
+def update_profile(
+    data: UserProfileUpdate,
+    authorization: str = Header(None),
+    admin_supabase: Client = Depends(get_admin_client),
+):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        # Configurar Admin para escrever na BD (bypassing RLS se necessario)
-        service_key = os.environ.get("SUPABASE_SERVICE_KEY")
-        url = os.environ.get("SUPABASE_URL")
-
-        if not service_key:
-            raise HTTPException(status_code=500, detail="Erro de configuração: SERVICE_KEY em falta")
-
-        admin_supabase = create_client(url, service_key)
-
         # 1. Update na Tabela 'profiles' (Persistência Principal)
         profile_payload = {
             "user_id": user.user.id,
@@ -118,6 +103,8 @@ def update_profile(data: UserProfileUpdate, authorization: str = Header(None)):
             }
         )
 
+        invalidate_owner_profile(user.user.id)
+
         return {"success": True, "profile": profile_payload}
 
     except Exception as e:
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Header, HTTPException
-from database import get_user_from_token
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from typing import Optional
+from database import get_admin_client, get_user_from_token
 from schemas.clothing import ClothingItem
-from supabase import create_client
+from services.color_inference_worker import color_inference_worker
+from services.owner_profile_service import owner_fields, resolve_owner_profiles
+from services.public_feed_index import InvalidCursorError, PublicFeedIndex
+from services.wardrobe_cache import invalidate_user_wardrobe
+from supabase import Client
 from pydantic import ValidationError
-import os
 
 router = APIRouter()
 
@@ -101,6 +105,15 @@ def is_missing_metadata_column_error(error):
     ) and any(column in text for column in ("'color'", "'style'", "'occasion'"))
 
 
+def reset_inferred_color(admin_supabase, item_id):
+    """Forget the image-inferred color so it is recomputed for the new image."""
+    color_inference_worker.forget(item_id)
+    try:
+        admin_supabase.table("clothes").update({"inferred_color": None}).eq("id", item_id).execute()
+    except Exception as e:
+        print(f"[items.py] Could not reset inferred color for {item_id}: {e}")
+
+
 def log_supabase_payload(action, payload):
     safe_payload = sanitize_payload_for_log(payload)
     print(f"[items.py] Supabase {action} payload: {safe_payload}")
@@ -158,23 +171,28 @@ def frontend_item_from_db(db_item, fallback_item: ClothingItem = None):
     }
 
 
-# --- Helper para criar o "Super Cliente" (Admin) ---
-def get_admin_client():
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_KEY")
-
-    if not key:
-        print("❌ ERRO: SUPABASE_SERVICE_KEY não encontrada no .env")
-        raise HTTPException(status_code=500, detail="Erro de configuração no servidor")
-
-    return create_client(url, key)
+# Índice em memória do feed público (atualizado a cada escrita de item)
+public_feed_index = PublicFeedIndex(normalize_color=normalize_optional_color)
 
 
 # --- Endpoint para Itens Públicos (Visitantes) ---
 @router.get("/public-items")
-def get_public_items(authorization: str = Header(None)):
-    admin_supabase = get_admin_client()
-    
+def get_public_items(
+    authorization: str = Header(None),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    item_type: Optional[str] = Query(None, alias="type"),
+    color: Optional[str] = None,
+    season: Optional[str] = None,
+    owner: Optional[str] = None,
+    admin_supabase: Client = Depends(get_admin_client),
+):
+    """
+    Public feed, newest first, served from the in-memory feed index.
+
+    Without limit/cursor every matching item is returned (legacy clients);
+    with them the response carries nextCursor for the following page.
+    """
     # Check if user is logged in to fetch likes
     liked_item_ids = set()
     if authorization:
@@ -187,41 +205,31 @@ def get_public_items(authorization: str = Header(None)):
                 pass
 
     try:
-        response = admin_supabase.table("clothes").select("*").eq("is_public", True).execute()
+        public_feed_index.ensure_loaded(admin_supabase)
+        rows, next_cursor = public_feed_index.page(
+            filters={"type": item_type, "color": color, "season": season, "owner": owner},
+            cursor=cursor,
+            limit=limit,
+        )
+
+        owners = resolve_owner_profiles(
+            admin_supabase, (item.get("user_id") for item in rows)
+        )
 
         items = []
-        for item in response.data:
+        for item in rows:
             owner_id = item.get("user_id")
-            owner_name = "Utilizador"
-            owner_avatar = ""
-
-            try:
-                # Buscar dados do dono da peça
-                user_res = admin_supabase.auth.admin.get_user_by_id(owner_id)
-                if user_res and user_res.user:
-                    meta = user_res.user.user_metadata or {}
-                    email = user_res.user.email
-
-                    # LÓGICA MELHORADA:
-                    # 1. Tenta o nome no perfil
-                    # 2. Se não houver, usa o email antes do @
-                    # 3. Se tudo falhar, usa "Utilizador"
-                    email_name = email.split("@")[0] if email else "Utilizador"
-                    owner_name = meta.get("name") or email_name
-                    owner_avatar = meta.get("avatar_url", "")
-            except Exception as e:
-                print(f"Erro a ler user {owner_id}: {e}")
-
             frontend_item = frontend_item_from_db(item)
             frontend_item.update({
                 "isPublic": item.get("is_public", False),
-                "ownerName": owner_name,
-                "ownerAvatar": owner_avatar,
+                **owner_fields(owners.get(str(owner_id))),
                 "ownerId": owner_id,
                 "isLikedByMe": item.get("id") in liked_item_ids
             })
             items.append(frontend_item)
-        return {"items": items}
+        return {"items": items, "nextCursor": next_cursor}
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Erro ao buscar itens públicos: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -229,13 +237,11 @@ def get_public_items(authorization: str = Header(None)):
 
 # 1. GET ITEMS (Privado - Os teus itens)
 @router.get("/items")
-def get_items(authorization: str = Header(None)):
+def get_items(authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
-
     response = admin_supabase.table("clothes").select("*").eq("user_id", user.user.id).execute()
 
     items = []
@@ -248,12 +254,11 @@ def get_items(authorization: str = Header(None)):
 
 
 @router.get("/items/debug/wardrobe")
-def debug_user_wardrobe(authorization: str = Header(None)):
+def debug_user_wardrobe(authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
     response = (
         admin_supabase.table("clothes")
         .select("*")
@@ -285,12 +290,11 @@ def debug_user_wardrobe(authorization: str = Header(None)):
 
 # 2. CREATE ITEM
 @router.post("/items")
-def create_item(item: ClothingItem, authorization: str = Header(None)):
+def create_item(item: ClothingItem, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
     print(f"[items.py] Received create payload: {sanitize_payload_for_log(item.model_dump(by_alias=True))}")
 
     data_to_insert = {
@@ -336,6 +340,8 @@ def create_item(item: ClothingItem, authorization: str = Header(None)):
             print("[items.py] Supabase insert returned no rows")
             raise HTTPException(status_code=500, detail="Item created but no row was returned")
         new_item_db = response.data[0]
+        invalidate_user_wardrobe(user.user.id)
+        public_feed_index.apply_row(new_item_db)
         print(f"[items.py] Supabase inserted row: {sanitize_payload_for_log(new_item_db)}")
         loaded_item = frontend_item_from_db(new_item_db, item)
         print(f"[items.py] Item loaded from Supabase: {sanitize_payload_for_log(loaded_item)}")
@@ -353,12 +359,11 @@ def create_item(item: ClothingItem, authorization: str = Header(None)):
 
 # 3. UPDATE ITEM
 @router.put("/items/{item_id}")
-def update_item(item_id: str, item: ClothingItem, authorization: str = Header(None)):
+def update_item(item_id: str, item: ClothingItem, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
     print(f"[items.py] Received update payload for {item_id}: {sanitize_payload_for_log(item.model_dump(by_alias=True))}")
 
     data_to_update = {
@@ -404,11 +409,15 @@ def update_item(item_id: str, item: ClothingItem, authorization: str = Header(No
                 ),
             )
 
+        if not data_to_update["color"]:
+            reset_inferred_color(admin_supabase, item_id)
+        invalidate_user_wardrobe(user.user.id)
         updated_item_db = response.data[0] if response.data else {
             **data_to_update,
             "id": item_id,
             "user_id": user.user.id,
         }
+        public_feed_index.apply_row(updated_item_db)
         print(f"[items.py] Supabase updated row: {sanitize_payload_for_log(updated_item_db)}")
         loaded_item = frontend_item_from_db(updated_item_db, item)
         print(f"[items.py] Item loaded from Supabase: {sanitize_payload_for_log(loaded_item)}")
@@ -426,15 +435,15 @@ def update_item(item_id: str, item: ClothingItem, authorization: str = Header(No
 
 # 4. DELETE ITEM
 @router.delete("/items/{item_id}")
-def delete_item(item_id: str, authorization: str = Header(None)):
+def delete_item(item_id: str, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
-
     try:
         admin_supabase.table("clothes").delete().eq("id", item_id).execute()
+        invalidate_user_wardrobe(user.user.id)
+        public_feed_index.remove(item_id)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
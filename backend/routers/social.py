@@ -1,9 +1,9 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from fastapi import APIRouter, Header, HTTPException, Body
-import os
-from database import get_user_from_token
-from supabase import create_client
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+from database import get_admin_client, get_user_from_token
+from services.owner_profile_service import owner_fields, resolve_owner_profiles
+from supabase import Client
 
 router = APIRouter()
 
@@ -69,15 +69,6 @@ def normalize_optional_color(value):
     return COLOR_ALIASES.get(normalized, normalized)
 
 
-# --- HELPER: Admin Client ---
-def get_admin_client():
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_KEY")
-    if not key:
-        print("❌ ERRO: SUPABASE_SERVICE_KEY não encontrada no .env")
-        raise HTTPException(status_code=500, detail="Erro de configuração no servidor")
-    return create_client(url, key)
-
 # --- SCHEMAS ---
 class CommentCreate(BaseModel):
     text: str
@@ -94,12 +85,11 @@ class CommentResponse(BaseModel):
 # --- ENDPOINTS: LIKES ---
 
 @router.post("/social/like/{item_id}")
-def like_item(item_id: str, authorization: str = Header(None)):
+def like_item(item_id: str, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
     try:
         # Check if already liked to avoid error (though unique constraint handles it)
         # Using insert directly - Supabase will error if unique constraint violated
@@ -113,12 +103,11 @@ def like_item(item_id: str, authorization: str = Header(None)):
         return {"success": False, "detail": str(e)}
 
 @router.delete("/social/like/{item_id}")
-def unlike_item(item_id: str, authorization: str = Header(None)):
+def unlike_item(item_id: str, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
     try:
         res = admin_supabase.table("likes").delete().match({
             "user_id": user.user.id, 
@@ -129,8 +118,7 @@ def unlike_item(item_id: str, authorization: str = Header(None)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/social/likes/{item_id}")
-def get_item_likes(item_id: str, authorization: str = Header(None)):
-    admin_supabase = get_admin_client()
+def get_item_likes(item_id: str, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user_id = None
     
     # Try get user if token provided, but don't fail if not
@@ -164,12 +152,11 @@ def get_item_likes(item_id: str, authorization: str = Header(None)):
 
 
 @router.get("/social/likes")
-def get_liked_items(authorization: str = Header(None)):
+def get_liked_items(authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    admin_supabase = get_admin_client()
     try:
         # Get item IDs
         res = admin_supabase.table("likes").select("item_id").eq("user_id", user.user.id).execute()
@@ -184,22 +171,13 @@ def get_liked_items(authorization: str = Header(None)):
         items_res = admin_supabase.table("clothes").select("*").in_("id", item_ids).execute()
         print(f"[DEBUG] Found {len(items_res.data)} items in clothes table matching likes.") # DEBUG
         
+        owners = resolve_owner_profiles(
+            admin_supabase, (item["user_id"] for item in items_res.data)
+        )
+
         items = []
         for item in items_res.data:
             owner_id = item["user_id"]
-            owner_name = "Utilizador"
-            owner_avatar = ""
-            
-            try:
-                user_res = admin_supabase.auth.admin.get_user_by_id(owner_id)
-                if user_res and user_res.user:
-                    meta = user_res.user.user_metadata
-                    email = user_res.user.email
-                    email_name = email.split("@")[0] if email else "Utilizador"
-                    owner_name = meta.get("name") or email_name
-                    owner_avatar = meta.get("avatar_url", "")
-            except Exception:
-                pass
 
             items.append({
                 "id": item["id"],
@@ -217,8 +195,7 @@ def get_liked_items(authorization: str = Header(None)):
                 "status": item["status"],
                 "favorite": item["favorite"],
                 "ownerId": owner_id,
-                "ownerName": owner_name,
-                "ownerAvatar": owner_avatar,
+                **owner_fields(owners.get(str(owner_id))),
                 "isLikedByMe": True
             })
             
@@ -231,8 +208,7 @@ def get_liked_items(authorization: str = Header(None)):
 # --- ENDPOINTS: COMMENTS ---
 
 @router.get("/social/comments/{item_id}")
-def get_comments(item_id: str):
-    admin_supabase = get_admin_client()
+def get_comments(item_id: str, admin_supabase: Client = Depends(get_admin_client)):
     try:
         res = admin_supabase.table("comments") \
             .select("*") \
@@ -245,13 +221,11 @@ def get_comments(item_id: str):
         return {"comments": []}
 
 @router.post("/social/comment/{item_id}")
-def add_comment(item_id: str, comment: CommentCreate, authorization: str = Header(None)):
+def add_comment(item_id: str, comment: CommentCreate, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    admin_supabase = get_admin_client()
-    
     # Get user details for cache
     user_name = user.user.user_metadata.get("name", "Utilizador")
     user_avatar = user.user.user_metadata.get("avatar_url", "")
@@ -272,12 +246,11 @@ def add_comment(item_id: str, comment: CommentCreate, authorization: str = Heade
 # --- ENDPOINTS: WISHLIST ---
 
 @router.post("/social/wishlist/{item_id}")
-def add_to_wishlist(item_id: str, authorization: str = Header(None)):
+def add_to_wishlist(item_id: str, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    admin_supabase = get_admin_client()
     try:
         admin_supabase.table("wishlist").insert({
             "user_id": user.user.id, 
@@ -288,12 +261,11 @@ def add_to_wishlist(item_id: str, authorization: str = Header(None)):
         return {"success": False} # Likely already in wishlist
 
 @router.delete("/social/wishlist/{item_id}")
-def remove_from_wishlist(item_id: str, authorization: str = Header(None)):
+def remove_from_wishlist(item_id: str, authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    admin_supabase = get_admin_client()
     try:
         admin_supabase.table("wishlist").delete().match({
             "user_id": user.user.id, 
@@ -304,12 +276,11 @@ def remove_from_wishlist(item_id: str, authorization: str = Header(None)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/social/wishlist")
-def get_wishlist(authorization: str = Header(None)):
+def get_wishlist(authorization: str = Header(None), admin_supabase: Client = Depends(get_admin_client)):
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    admin_supabase = get_admin_client()
     try:
         # Get item IDs
         res = admin_supabase.table("wishlist").select("item_id").eq("user_id", user.user.id).execute()
@@ -321,6 +292,10 @@ def get_wishlist(authorization: str = Header(None)):
         # Get actual items
         items_res = admin_supabase.table("clothes").select("*").in_("id", item_ids).execute()
         
+        owners = resolve_owner_profiles(
+            admin_supabase, (item.get("user_id") for item in items_res.data)
+        )
+
         # Format items (reuse logic from items.py if possible, but keep simple here)
         items = []
         for item in items_res.data:
@@ -331,6 +306,8 @@ def get_wishlist(authorization: str = Header(None)):
                 "brand": item.get("brand", ""),
                 "size": item.get("size", ""),
                 # Minimal fields for list
+                "ownerId": item.get("user_id"),
+                **owner_fields(owners.get(str(item.get("user_id")))),
             })
             
         return {"items": items}
@@ -1,30 +1,27 @@
-from fastapi import APIRouter, Header, HTTPException, UploadFile, File
-from database import get_user_from_token
-from supabase import create_client
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File
+from database import get_admin_client, get_user_from_token
+from services.db_executor import db_executor
+from supabase import Client
 import uuid
-import os
 
 router = APIRouter()
 
 
 @router.post("/upload-image")
-async def upload_image(file: UploadFile = File(...), authorization: str = Header(None)):
+async def upload_image(
+    file: UploadFile = File(...),
+    authorization: str = Header(None),
+    admin_supabase: Client = Depends(get_admin_client),
+):
     # 1. Validar Utilizador
     user = get_user_from_token(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # 2. Configurar Admin
-    service_key = os.environ.get("SUPABASE_SERVICE_KEY")
-    url = os.environ.get("SUPABASE_URL")
+    # 2. Bucket (cliente admin partilhado, injetado pela dependência)
     bucket_name = "make-1d4585bc-closet-images"
 
-    if not service_key:
-        raise HTTPException(status_code=500, detail="Erro de Configuração: SUPABASE_SERVICE_KEY em falta.")
-
     try:
-        admin_supabase = create_client(url, service_key)
-
         # 3. Preparar Ficheiro
         file_ext = file.filename.split(".")[-1]
         file_path = f"{user.user.id}/{uuid.uuid4()}.{file_ext}"
@@ -33,7 +30,8 @@ async def upload_image(file: UploadFile = File(...), authorization: str = Header
         file_content = await file.read()
 
         # 4. Upload (como Admin)
-        admin_supabase.storage.from_(bucket_name).upload(
+        await db_executor.run(
+            admin_supabase.storage.from_(bucket_name).upload,
             path=file_path,
             file=file_content,
             file_options={"content-type": file.content_type}
@@ -41,7 +39,9 @@ async def upload_image(file: UploadFile = File(...), authorization: str = Header
 
         # 5. Gerar URL (Signed URL para garantir acesso mesmo se o bucket for privado)
         # 10 anos de validade
-        response_signed = admin_supabase.storage.from_(bucket_name).create_signed_url(file_path, 315360000)
+        response_signed = await db_executor.run(
+            admin_supabase.storage.from_(bucket_name).create_signed_url, file_path, 315360000
+        )
         
         # O método create_signed_url retorna um dict ou string dependendo da versão, 
         # mas normalmente é um dict com 'signedURL' ou 'signedUrl'.
@@ -13,6 +13,8 @@ from uuid import UUID, uuid4
 from database import get_user_from_token, supabase
 from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
+from services.db_executor import db_executor
+from services.recommendation_cache import invalidate_user_recommendations
 from services.wardrobe_service import WardrobeService
 
 router = APIRouter(prefix="/usage", tags=["usage"])
@@ -533,7 +535,7 @@ async def _save_outfit_usage(
         if str(item.get("id")) in set(item_ids)
     ]
     used_day = used_at[:10]
-    existing = _find_existing_usage_for_day(user_id, item_ids, used_day)
+    existing = await db_executor.run(_find_existing_usage_for_day, user_id, item_ids, used_day)
     if existing:
         print("[OutfitHistory] duplicate_outfit_today")
         print(f"[OutfitHistory] duplicate_details={existing}")
@@ -541,7 +543,7 @@ async def _save_outfit_usage(
         usage_history_id = existing.get("usage_history_id")
         duplicate = True
     else:
-        saved_outfit_id = _create_outfit(user_id, source, used_at)
+        saved_outfit_id = await db_executor.run(_create_outfit, user_id, source, used_at)
         if not saved_outfit_id:
             _raise_history_error(
                 500,
@@ -550,16 +552,20 @@ async def _save_outfit_usage(
                 {"user_id": user_id, "source": source, "used_at": used_at},
             )
         print(f"[OutfitHistory] created outfit_id={saved_outfit_id}")
-        if not _save_outfit_items(saved_outfit_id, item_ids):
+        if not await db_executor.run(_save_outfit_items, saved_outfit_id, item_ids):
             _raise_history_error(
                 500,
                 "supabase_outfit_items_insert_failed",
                 "Could not save outfit items.",
                 {"outfit_id": saved_outfit_id, "item_ids": item_ids},
             )
-        usage_rows = _insert_usage_rows(user_id, saved_outfit_id, item_ids, source, used_at)
+        usage_rows = await db_executor.run(
+            _insert_usage_rows, user_id, saved_outfit_id, item_ids, source, used_at
+        )
         usage_history_id = (usage_rows[0] or {}).get("id") if usage_rows else None
         duplicate = False
+        # Usage feeds rotation scoring, so cached /today results are stale now.
+        invalidate_user_recommendations(user_id)
 
     ordered_items = sorted(user_items, key=_item_sort_key)
     print(f"[OutfitHistory] accepted_outfit_item_ids={item_ids}")
@@ -652,26 +658,24 @@ async def get_wear_history(
 
     try:
         try:
-            usage_resp = (
+            usage_resp = await db_executor.execute(
                 _history_db().table("usage_history")
                 .select("*")
                 .eq("user_id", user_id)
                 .gte("worn_date", cutoff)
                 .order("worn_date", desc=True)
-                .execute()
             )
             rows = usage_resp.data or []
         except Exception:
             rows = []
         if not rows:
             try:
-                usage_resp = (
+                usage_resp = await db_executor.execute(
                     _history_db().table("usage_history")
                     .select("*")
                     .eq("user_id", user_id)
                     .gte("used_at", cutoff)
                     .order("used_at", desc=True)
-                    .execute()
                 )
                 rows = usage_resp.data or []
             except Exception:
@@ -682,7 +686,7 @@ async def get_wear_history(
             for row in rows
             if row.get("outfit_id")
         ]
-        outfit_items_by_id = _fetch_outfit_item_ids(outfit_ids)
+        outfit_items_by_id = await db_executor.run(_fetch_outfit_item_ids, outfit_ids)
 
         by_date: Dict[str, Dict[str, Any]] = {}
         for row in rows:
@@ -715,12 +719,11 @@ async def get_wear_history(
         })
         items_map = {}
         if all_item_ids:
-            items_resp = (
+            items_resp = await db_executor.execute(
                 _history_db().table("clothes")
                 .select("id, name, type, color, style, occasion, status, image, layer")
                 .eq("user_id", user_id)
                 .in_("id", all_item_ids)
-                .execute()
             )
             for item in (items_resp.data or []):
                 items_map[item["id"]] = item
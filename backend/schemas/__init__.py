@@ -15,6 +15,8 @@ from schemas.ai_outfit import (
     AIOutfitAlternativeResponse,
     AIOutfitDailyRequest,
     AIOutfitDailyResponse,
+    AIOutfitJobResponse,
+    AIOutfitRefinementResponse,
     AIOutfitTravelRequest,
     AIOutfitTravelResponse,
     ClothingItemInfo,
@@ -37,6 +39,8 @@ __all__ = [
     # AI outfit
     "AIOutfitDailyRequest",
     "AIOutfitDailyResponse",
+    "AIOutfitRefinementResponse",
+    "AIOutfitJobResponse",
     "AIOutfitTravelRequest",
     "AIOutfitTravelResponse",
     "AIOutfitAlternativeRequest",
@@ -91,6 +91,11 @@ class AIOutfitDailyRequest(BaseModel):
         default=None,
         description="Alias for user_request sent by the chat UI.",
     )
+    latency_budget_seconds: Optional[float] = Field(
+        default=None,
+        ge=0,
+        description="Longest wait for the LLaVA pick; past it the top-scored outfit is returned with a refinement token (0 = wait for LLaVA)",
+    )
 
     class Config:
         populate_by_name = True
@@ -230,6 +235,10 @@ class AIOutfitDailyResponse(BaseModel):
     debug: Optional[dict] = Field(
         default=None, description="Temporary debug information for VLM inspection"
     )
+    refinement: Optional[dict] = Field(
+        default=None,
+        description="Pending LLaVA refinement (token, status, poll and events URLs) when the top-scored outfit was returned early",
+    )
     generated_at: datetime
     model_used: str = Field(description="'vlm' or 'rule_based' (if fallback was used)")
 
@@ -237,6 +246,40 @@ class AIOutfitDailyResponse(BaseModel):
         populate_by_name = True
 
 
+class AIOutfitRefinementResponse(BaseModel):
+    """
+    Response schema for the LLaVA refinement of a speculative daily outfit.
+    """
+
+    token: str
+    status: str = Field(description="'pending', 'ready' or 'failed'")
+    changed: Optional[bool] = Field(
+        default=None,
+        description="Whether LLaVA picked a different outfit than the one returned early",
+    )
+    result: Optional[AIOutfitDailyResponse] = Field(
+        default=None, description="Refined daily outfit once ready"
+    )
+    error: Optional[str] = None
+
+
+class AIOutfitJobResponse(BaseModel):
+    """
+    Response schema for asynchronous recommendation jobs.
+    """
+
+    job_id: str
+    kind: str = Field(description="'today', 'travel' or 'travel_plan'")
+    status: str = Field(description="'queued', 'running', 'succeeded' or 'failed'")
+    result: Optional[dict] = Field(
+        default=None, description="Response of the matching synchronous endpoint once succeeded"
+    )
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    events_url: str = Field(description="Server-sent events stream of the job's progress")
+
+
 class AIOutfitTravelResponse(BaseModel):
     """
     Response schema for travel outfit recommendations.
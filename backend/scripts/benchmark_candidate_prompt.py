@@ -0,0 +1,138 @@
+"""
+Benchmark for the candidate-selection prompt size.
+
+Builds random candidate sets shaped like CandidateOutfitService output
+(3 candidates sharing items, UUID item IDs, score explanations) and
+compares the estimated token count of the previous verbose prompt, which
+repeated every item per candidate with its UUID, against
+CandidatePromptEncoder at each detail level and under the default budget.
+
+Usage:
+    cd backend && python scripts/benchmark_candidate_prompt.py [sets] [budget]
+"""
+
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from services.candidate_prompt_encoder import (
+    MAX_DETAIL_LEVEL,
+    CandidatePromptEncoder,
+    estimate_tokens,
+)
+
+
+SECTIONS = {
+    "base_layer": ["White Oxford Shirt", "Navy Crew Tee", "Striped Linen Shirt", "Black Turtleneck"],
+    "mid_layer": ["Grey Wool Sweater", "Beige Cardigan", "Olive Overshirt"],
+    "outer_layer": ["Camel Trench Coat", "Blue Denim Jacket", "Black Work Jacket"],
+    "pants": ["Dark Slim Jeans", "Beige Chinos", "Charcoal Wool Trousers"],
+    "shoes": ["White Leather Sneakers", "Brown Chelsea Boots", "Black Derby Shoes"],
+}
+COLORS = ["white", "navy", "black", "grey", "beige", "olive", "camel", "brown"]
+STYLES = ["casual", "formal", "smart casual", "streetwear"]
+WEATHER = {"temperature": 14.5, "condition": "cloudy", "humidity": 72, "wind_speed": 5.1}
+
+
+def build_candidates(rng):
+    pool = {
+        section: [
+            {
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "section": section,
+                "name": name,
+                "type": section.split("_")[0],
+                "color": rng.choice(COLORS),
+                "style": rng.choice(STYLES),
+                "occasion": rng.choice(["work", "weekend", "dinner"]),
+            }
+            for name in rng.sample(names, 2)
+        ]
+        for section, names in SECTIONS.items()
+    }
+    candidates = []
+    for index in range(3):
+        items = [rng.choice(pool[section]) for section in SECTIONS if section != "mid_layer" or rng.random() < 0.5]
+        candidates.append({
+            "candidate_id": chr(ord("A") + index),
+            "score": round(rng.uniform(70, 95), 1),
+            "item_ids": [item["id"] for item in items],
+            "items": items,
+            "metadata": {
+                "score_explanation": "weather fit 0.82, request match 0.91, color harmony 0.74, recent usage penalty -0.05",
+                "strengths": ["matches requested style", "good for cloudy weather"],
+                "weaknesses": ["worn recently"] if index else [],
+                "diversity_reason": "different shoes and outer layer from candidate A",
+            },
+        })
+    return candidates
+
+
+def verbose_prompt(candidates, user_request):
+    # Previous _build_candidate_selection_prompt layout; its instructions are
+    # left out, so the reduction reported below is a lower bound.
+    lines = []
+    for candidate in candidates:
+        metadata = candidate["metadata"]
+        lines.append(f"Candidate {candidate['candidate_id']}:")
+        lines.append(f"Total score: {candidate['score']}")
+        lines.append(f"Score explanation: {metadata['score_explanation']}")
+        lines.append(f"Strengths: {', '.join(metadata['strengths']) or 'valid candidate'}")
+        lines.append(f"Weaknesses: {', '.join(metadata['weaknesses']) or 'none'}")
+        lines.append(f"Diversity reason: {metadata['diversity_reason']}")
+        for item in candidate["items"]:
+            lines.append(
+                f"- Section: {item['section']} | ID: {item['id']} | Name: {item['name']} | "
+                f"Type: {item['type']} | Color: {item['color']} | Style: {item['style']} | "
+                f"Occasion: {item['occasion']}"
+            )
+        lines.append("")
+    return (
+        "You are a stylist choosing the best outfit candidate. (instructions)\n"
+        f"User request:\n{user_request}\n\nWeather:\n{json.dumps(WEATHER)}\n\n"
+        f"Candidate list:\n{chr(10).join(lines)}"
+    )
+
+
+def main():
+    sets = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else CandidatePromptEncoder.DEFAULT_TOKEN_BUDGET
+    rng = random.Random(7)
+    corpus = [build_candidates(rng) for _ in range(sets)]
+    request = "quero um look smart casual para o trabalho"
+
+    verbose = [estimate_tokens(verbose_prompt(candidates, request)) for candidates in corpus]
+    print(f"Candidate sets: {sets}")
+    print(f"verbose prompt          median={statistics.median(verbose):7.1f} tokens")
+
+    for level in range(MAX_DETAIL_LEVEL + 1):
+        encoder = CandidatePromptEncoder(token_budget=0)
+        tokens = [
+            encoder.encode(candidates, request, WEATHER, detail_level=level).token_count
+            for candidates in corpus
+        ]
+        print(f"compact level {level}         median={statistics.median(tokens):7.1f} tokens")
+
+    encoder = CandidatePromptEncoder(token_budget=budget)
+    started = time.perf_counter()
+    encoded = [encoder.encode(candidates, request, WEATHER) for candidates in corpus]
+    elapsed = time.perf_counter() - started
+    tokens = [prompt.token_count for prompt in encoded]
+    print(
+        f"budget {budget:<4}             median={statistics.median(tokens):7.1f} tokens "
+        f"(-{1 - statistics.median(tokens) / statistics.median(verbose):.0%}) "
+        f"encode={elapsed / sets * 1e6:.0f}us/prompt"
+    )
+    print(f"stats: {encoder.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
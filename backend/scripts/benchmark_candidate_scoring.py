@@ -0,0 +1,170 @@
+"""
+Benchmark for candidate outfit scoring on a synthetic 500-item wardrobe.
+
+Times _score_candidate on every raw combination with features compiled on
+the fly (one normalization pass per item per call) against precompiled
+ItemFeatures records, the vectorized BatchCandidateScorer on a full
+base x pants x shoes x outer cross product, and the full
+generate_candidate_outfits call.
+
+Usage:
+    cd backend && python scripts/benchmark_candidate_scoring.py [items] [iterations]
+"""
+
+import contextlib
+import io
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from services.candidate_batch_scorer import BatchCandidateScorer
+from services.candidate_outfit_service import SECTION_ORDER, CandidateOutfitService
+
+
+TYPES = [
+    ("t-shirt", "T-shirt"), ("shirt", "Camisa"), ("blouse", "Blusa"), ("hoodie", "Hoodie"),
+    ("sweater", "Camisola"), ("jeans", "Jeans"), ("pants", "Calças"), ("trousers", "Trousers"),
+    ("shorts", "Calções"), ("sneakers", "Sapatilhas"), ("shoes", "Sapato"), ("boots", "Botas"),
+    ("jacket", "Casaco"), ("blazer", "Blazer"), ("coat", "Coat"), ("dress", "Vestido"),
+    ("skirt", "Saia"), ("jumpsuit", "Macacão"), ("bag", "Mala"), ("cap", "Boné"),
+]
+COLORS = ["preto", "branco", "azul", "vermelho", "verde", "bege", "cinzento", "amarelo", "rosa", ""]
+STYLES = ["casual", "formal", "sporty", "streetwear", "classic", "smart casual", "elegant", ""]
+OCCASIONS = ["work", "daily", "dinner", "sport", "night", ""]
+INTENTS = [
+    {},
+    {"requested_style": "formal", "requested_occasion": "work"},
+    {"requested_style": "casual", "requested_colors": ["azul"]},
+    {"requested_types": ["saia"], "requested_occasion": "jantar"},
+]
+WEATHER = {"temperature": 9, "condition": "chuva"}
+
+
+def make_wardrobe(count, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for index in range(count):
+        item_type, label = rng.choice(TYPES)
+        color = rng.choice(COLORS)
+        temp_min = rng.choice([-10, 0, 5, 10, 15])
+        items.append({
+            "id": f"item-{index}",
+            "name": f"{label} {color} {rng.choice(['waterproof', 'oversized', 'classica', ''])}".strip(),
+            "type": item_type,
+            "color": color,
+            "style": rng.choice(STYLES),
+            "occasion": rng.choice(OCCASIONS),
+            "status": "clean",
+            "layer": rng.choice([1, 2, 3]),
+            "temp_min": temp_min,
+            "temp_max": temp_min + rng.choice([10, 20, 30]),
+            "usage_metrics": {"usage_frequency_last_7_days": rng.choice([0, 1, 2, 5, 9])},
+        })
+    return items
+
+
+def scoring_items(service, wardrobe, count, seed=11):
+    """Random complete standard outfits drawn from the wardrobe."""
+    rng = random.Random(seed)
+    grouped = service._group_by_section(wardrobe)
+    sections = [section for section in ("base_layer", "pants", "shoes", "outer_layer") if grouped[section]]
+    combinations = []
+    for _ in range(count):
+        items = []
+        for section in SECTION_ORDER:
+            if section in sections:
+                source = rng.choice(grouped[section])
+                items.append({**service._candidate_item(source, section), "source": source})
+        combinations.append(items)
+    return combinations
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    service = CandidateOutfitService()
+    wardrobe = make_wardrobe(size)
+    combinations = scoring_items(service, wardrobe, 2000)
+    intent = INTENTS[1]
+
+    start = time.perf_counter()
+    uncompiled = [
+        service._score_candidate(items, intent, {}, WEATHER)[0] for items in combinations
+    ]
+    uncompiled_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    features = service.compile_item_features(wardrobe)
+    context = service._scoring_context(intent, WEATHER)
+    compile_ms = (time.perf_counter() - start) * 1000
+    compiled_combinations = [
+        [{**item, "features": features[id(item["source"])]} for item in items]
+        for items in combinations
+    ]
+    start = time.perf_counter()
+    compiled = [
+        service._score_candidate(items, intent, {}, WEATHER, context)[0]
+        for items in compiled_combinations
+    ]
+    compiled_ms = (time.perf_counter() - start) * 1000
+    assert compiled == uncompiled
+
+    print(f"wardrobe items          : {size}")
+    print(f"compile features        : {compile_ms:8.2f} ms")
+    print(f"score 2000 (uncompiled) : {uncompiled_ms:8.2f} ms")
+    print(f"score 2000 (compiled)   : {compiled_ms:8.2f} ms")
+    print(f"scoring speedup         : {uncompiled_ms / compiled_ms:8.1f}x")
+
+    grouped = service._group_by_section(wardrobe)
+    options = {section: grouped[section][:20] for section in ("base_layer", "pants", "shoes")}
+    options["outer_layer"] = grouped["outer_layer"][:10]
+    scorer = BatchCandidateScorer(service, options, features, context, {})
+    columns = {section: SECTION_ORDER.index(section) for section in options}
+    rows = []
+    for indices in itertools.product(*(range(-1, len(options["outer_layer"])) if section == "outer_layer"
+                                       else range(len(options[section])) for section in options)):
+        row = [-1] * len(SECTION_ORDER)
+        for section, index in zip(options, indices):
+            row[columns[section]] = index
+        rows.append(row)
+    start = time.perf_counter()
+    batch_totals = scorer.score(rows)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    sample = rows[:: max(len(rows) // 2000, 1)]
+    start = time.perf_counter()
+    single_totals = [
+        service._score_candidate(
+            [
+                {**service._candidate_item(item, section), "source": item, "features": features[id(item)]}
+                for section, item in scorer.decode(row).items()
+            ],
+            intent, {}, WEATHER, context,
+        )[0]
+        for row in sample
+    ]
+    single_ms = (time.perf_counter() - start) * 1000 / len(sample) * len(rows)
+    assert batch_totals[:: max(len(rows) // 2000, 1)].tolist() == single_totals
+
+    print(f"cross product           : {len(rows)} combinations")
+    print(f"batch scoring           : {batch_ms:8.2f} ms")
+    print(f"per-candidate (est.)    : {single_ms:8.2f} ms")
+    print(f"batch speedup           : {single_ms / batch_ms:8.1f}x")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for parsed_intent in INTENTS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                service.generate_candidate_outfits("bench", wardrobe, WEATHER, dict(parsed_intent))
+    per_call = (time.perf_counter() - start) / (iterations * len(INTENTS)) * 1000
+    print(f"generate_candidate_outfits: {per_call:8.2f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark for dominant color extraction.
+
+Compares the original per-pixel loop with the NumPy bucketing engine on
+96x96 thumbnails, and a warm persistent-cache hit against a full decode.
+
+Usage:
+    cd backend && python scripts/benchmark_color_inference.py [iterations]
+"""
+
+import base64
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import numpy as np
+from PIL import Image
+
+from services import color_inference_service
+from services.color_cache import PersistentColorCache
+
+
+def make_images(count):
+    rng = np.random.default_rng(42)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(640, 480, 4), dtype=np.uint8)
+        pixels[..., 3] = 255
+        image = Image.fromarray(pixels, "RGBA")
+        image.thumbnail(color_inference_service.THUMBNAIL_SIZE)
+        images.append(image)
+    return images
+
+
+def time_per_call(function, images, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for image in images:
+            function(image)
+    return (time.perf_counter() - start) / (iterations * len(images)) * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    images = make_images(10)
+
+    for image in images:
+        python_bucket = color_inference_service._dominant_bucket_python(image)
+        numpy_bucket = color_inference_service._dominant_bucket_numpy(image)
+        assert python_bucket == numpy_bucket, (python_bucket, numpy_bucket)
+
+    python_ms = time_per_call(color_inference_service._dominant_bucket_python, images, iterations)
+    numpy_ms = time_per_call(color_inference_service._dominant_bucket_numpy, images, iterations)
+    print(f"per-pixel loop : {python_ms:8.3f} ms/image")
+    print(f"numpy          : {numpy_ms:8.3f} ms/image")
+    print(f"speedup        : {python_ms / numpy_ms:8.1f}x")
+
+    buffer = io.BytesIO()
+    Image.fromarray(
+        np.full((1024, 1024, 3), (200, 30, 30), dtype=np.uint8), "RGB"
+    ).save(buffer, format="PNG")
+    data_uri = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    with tempfile.TemporaryDirectory() as directory:
+        color_inference_service._COLOR_CACHE = PersistentColorCache(
+            os.path.join(directory, "color_cache.sqlite3")
+        )
+        start = time.perf_counter()
+        color_inference_service.infer_dominant_color(data_uri)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            color_inference_service.infer_dominant_color(data_uri)
+        warm_ms = (time.perf_counter() - start) / iterations * 1000
+
+    print(f"cold inference : {cold_ms:8.3f} ms (1024x1024 data URI)")
+    print(f"cache hit      : {warm_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark for offloading blocking Supabase calls to the database executor.
+
+Simulates concurrent async requests that each make a few PostgREST queries
+(a time.sleep stands in for the HTTP round-trip of `.execute()`), plus a
+latency probe that measures how long the event loop is blocked. "inline"
+calls `.execute()` directly from the coroutine, as the services used to;
+"executor" awaits db_executor.execute().
+
+Usage:
+    cd backend && python scripts/benchmark_db_executor.py [requests] [query_ms]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from services.db_executor import DatabaseExecutor
+
+
+QUERIES_PER_REQUEST = 3
+
+
+class FakeQuery:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def execute(self):
+        time.sleep(self.seconds)
+        return SimpleNamespace(data=[])
+
+
+async def inline_request(query_seconds, _executor):
+    for _ in range(QUERIES_PER_REQUEST):
+        FakeQuery(query_seconds).execute()
+
+
+async def executor_request(query_seconds, executor):
+    for _ in range(QUERIES_PER_REQUEST):
+        await executor.execute(FakeQuery(query_seconds))
+
+
+async def probe(stop, delays):
+    # A well-behaved loop wakes this coroutine every ~5 ms.
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        delays.append((time.perf_counter() - start - 0.005) * 1000)
+
+
+async def run_mode(handler, requests, query_seconds, executor):
+    stop = asyncio.Event()
+    delays = []
+    probe_task = asyncio.create_task(probe(stop, delays))
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(query_seconds, executor) for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return elapsed, max(delays) if delays else 0.0
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    query_seconds = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+
+    print(
+        f"{requests} concurrent requests x {QUERIES_PER_REQUEST} queries "
+        f"of {query_seconds * 1000:.0f} ms"
+    )
+    for label, handler, workers in (
+        ("inline", inline_request, 1),
+        ("executor x4", executor_request, 4),
+        ("executor x16", executor_request, 16),
+        ("executor x32", executor_request, 32),
+    ):
+        executor = DatabaseExecutor(max_workers=workers)
+        try:
+            elapsed, worst_stall = asyncio.run(
+                run_mode(handler, requests, query_seconds, executor)
+            )
+        finally:
+            executor.shutdown()
+        print(
+            f"{label:>13}: {elapsed * 1000:8.1f} ms total | "
+            f"{requests / elapsed:7.1f} req/s | worst loop stall {worst_stall:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark for diverse candidate selection on large candidate pools.
+
+Times _select_diverse_candidates (lazy incremental selection) against the
+original rescan, which recomputes every remaining candidate's diversity
+bonus against every selected candidate on each pick, and checks both pick
+the same candidates.
+
+Usage:
+    cd backend && python scripts/benchmark_diversity_selection.py [pool] [picks]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from services.candidate_outfit_service import CandidateOutfit, CandidateOutfitService
+
+
+SECTIONS = {
+    "base_layer": 0.9,
+    "insulation_layer": 0.3,
+    "pants": 0.8,
+    "outer_layer": 0.5,
+    "shoes": 1.0,
+    "dress": 0.1,
+    "bag": 0.2,
+    "accessories": 0.2,
+}
+
+
+def make_pool(count, seed=11):
+    rng = random.Random(seed)
+    pool = []
+    for index in range(count):
+        items = [
+            {"section": section, "id": f"{section}-{rng.randrange(40)}"}
+            for section, probability in SECTIONS.items()
+            if rng.random() < probability
+        ]
+        pool.append(CandidateOutfit(
+            candidate_id=str(index),
+            items=items,
+            item_ids=[item["id"] for item in items],
+            score=round(rng.uniform(60, 140), 1),
+        ))
+    return pool
+
+
+def rescan_selection(service, candidate_pool, max_candidates):
+    remaining = sorted(candidate_pool, key=lambda candidate: candidate.score, reverse=True)
+    selected = []
+    seen_signatures = set()
+    while remaining and len(selected) < max_candidates:
+        best_index = 0
+        best_value = None
+        for index, candidate in enumerate(remaining):
+            if tuple(sorted(candidate.item_ids)) in seen_signatures:
+                continue
+            value = candidate.score + service._diversity_bonus(candidate, selected)
+            if best_value is None or value > best_value:
+                best_value = value
+                best_index = index
+        candidate = remaining.pop(best_index)
+        signature = tuple(sorted(candidate.item_ids))
+        if signature in seen_signatures:
+            continue
+        selected.append(candidate)
+        seen_signatures.add(signature)
+    return selected
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    pool_size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    picks = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    service = CandidateOutfitService()
+    pool = make_pool(pool_size)
+
+    incremental, incremental_ms = timed(service._select_diverse_candidates, pool, picks)
+    rescan, rescan_ms = timed(rescan_selection, service, pool, picks)
+    assert [id(candidate) for candidate in incremental] == [id(candidate) for candidate in rescan]
+
+    print(f"pool size      : {pool_size} candidates, {picks} picks")
+    print(f"rescan         : {rescan_ms:10.2f} ms")
+    print(f"incremental    : {incremental_ms:10.2f} ms")
+    print(f"speedup        : {rescan_ms / incremental_ms:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark for public feed pages served from the in-memory feed index.
+
+Loads synthetic catalogs of growing size and times page requests (first
+page, deep cursor pages, single and combined filters). Page latency should
+stay flat as the catalog grows.
+
+Usage:
+    cd backend && python scripts/benchmark_public_feed.py [page_size] [requests]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from services.public_feed_index import PublicFeedIndex
+
+
+TYPES = ["shirt", "t-shirt", "pants", "jeans", "shoes", "sneakers", "jacket", "dress", "skirt", "bag"]
+COLORS = ["black", "white", "blue", "red", "green", "beige", "gray", "yellow", "pink", "brown"]
+SEASONS = ["spring", "summer", "autumn", "winter"]
+FILTERS = [
+    {},
+    {"type": "jeans"},
+    {"color": "red", "season": "winter"},
+    {"type": "dress", "color": "black", "season": "summer"},
+]
+
+
+def make_rows(count, seed=5):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"item-{index}",
+            "user_id": f"user-{rng.randrange(max(1, count // 20))}",
+            "type": rng.choice(TYPES),
+            "color": rng.choice(COLORS),
+            "seasons": rng.sample(SEASONS, rng.randint(1, 3)),
+            "is_public": True,
+            "created_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T"
+                          f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}+00:00",
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    rng = random.Random(1)
+
+    for size in (1000, 10000, 100000):
+        index = PublicFeedIndex(refresh_seconds=3600)
+        start = time.perf_counter()
+        index.load(make_rows(size))
+        load_ms = (time.perf_counter() - start) * 1000
+
+        cursors = [None]
+        rows, cursor = index.page(limit=page_size)
+        while cursor and len(cursors) < 50:
+            cursors.append(cursor)
+            rows, cursor = index.page(cursor=cursor, limit=page_size)
+
+        timings = []
+        for _ in range(requests):
+            filters = rng.choice(FILTERS)
+            cursor = rng.choice(cursors) if not filters else None
+            start = time.perf_counter()
+            index.page(filters=filters, cursor=cursor, limit=page_size)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(
+            f"{size:>7} items: load {load_ms:8.1f} ms | page p50 "
+            f"{statistics.median(timings):6.3f} ms  p99 {p99:6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
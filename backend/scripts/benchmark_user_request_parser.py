@@ -0,0 +1,107 @@
+"""
+Benchmark for UserRequestParser.parse_request throughput.
+
+The corpus starts from the requests used by the parser tests and expands
+them with PT/EN templates over the color, type and style vocabularies
+(accents, plurals, avoid/replace/keep phrasing, quoted item names).
+"cold" parses every request (empty parse cache each round); "warm" repeats
+the corpus against a filled cache, as repeated /today requests do.
+
+Usage:
+    cd backend && python scripts/benchmark_user_request_parser.py [requests] [rounds]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from services.user_request_parser import ParsedRequestCache, UserRequestParser
+
+
+SEED_REQUESTS = [
+    "TÉNIS amarelos",
+    "outfit formal",
+    "look desportivo",
+    "não quero Air Jordan",
+    "quero usar a Work Jacket com ténis brancos",
+    "dá-me um look com casaco azul",
+    "quero um outfit mais formal",
+    "troca só as sapatilhas",
+    "mantém as calças e muda o resto",
+    "não quero peças pretas",
+    "outfit com sapatilhas amarelas",
+    "quero usar a Work Jacket",
+    "outfit mais formal",
+    "yellow sneakers outfit",
+    "outfit for work meeting",
+    "quero um look com um casaco verde",
+    "da me um look com um casaco verde",
+    "sapatilhas amarelas",
+]
+
+TEMPLATES = [
+    "quero um look {style} com {type} {color}",
+    "outfit com {color} {type} para {style}",
+    "dá-me algo {style}, sem {type}",
+    "troca os {type} por uns {color}",
+    "mantém a {type} {color} e muda o resto",
+    "I want a {style} outfit with {color} {type}",
+    "wear the \"Blue Blazer\" with {type}",
+    "não quero nada {color} hoje, prefiro {type} {style}",
+    "look para {style} com {type}",
+    "swap the {type} for something {color}",
+]
+
+
+def build_corpus(size, seed=11):
+    rng = random.Random(seed)
+    colors = list(UserRequestParser.COLOR_MAPPINGS)
+    types = list(UserRequestParser.TYPE_MAPPINGS)
+    styles = list(UserRequestParser.STYLE_MAPPINGS)
+    corpus = list(SEED_REQUESTS)
+    while len(corpus) < size:
+        text = rng.choice(TEMPLATES).format(
+            color=rng.choice(colors),
+            type=rng.choice(types),
+            style=rng.choice(styles),
+        )
+        if rng.random() < 0.3:
+            text = text.upper() if rng.random() < 0.5 else text.capitalize()
+        corpus.append(text)
+    return corpus
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    corpus = build_corpus(size)
+
+    for label, warm in (("cold", False), ("warm", True)):
+        cache = ParsedRequestCache(max_entries=len(corpus))
+        parser = UserRequestParser(cache=cache)
+        if warm:
+            for text in corpus:
+                parser.parse_request(text)
+        throughputs = []
+        for _ in range(rounds):
+            if not warm:
+                cache.clear()
+            start = time.perf_counter()
+            for text in corpus:
+                parser.parse_request(text)
+            throughputs.append(len(corpus) / (time.perf_counter() - start))
+        median = statistics.median(throughputs)
+        print(
+            f"{label}: {len(corpus)} requests x {rounds} rounds: "
+            f"median {median:,.0f} req/s ({1e6 / median:.1f} us/request)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Tests for local JWT verification and the token -> user cache.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.auth_token_verifier import AuthTokenVerifier
+
+
+SECRET = "test-secret-with-at-least-32-bytes!!"
+
+
+def make_token(key=SECRET, algorithm="HS256", expires_in=3600, headers=None, **claims):
+    payload = {
+        "sub": "user-1",
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": "ana@example.com",
+        "user_metadata": {"name": "Ana"},
+        "iat": int(time.time()),
+        "exp": int(time.time()) + expires_in,
+        **claims,
+    }
+    return jwt.encode(payload, key, algorithm=algorithm, headers=headers)
+
+
+class RemoteAuth:
+    def __init__(self, response=None):
+        self.calls = []
+        self.response = response
+
+    def __call__(self, token):
+        self.calls.append(token)
+        return self.response
+
+
+def test_hs256_token_is_verified_locally_and_cached():
+    verifier = AuthTokenVerifier(jwt_secret=SECRET, local_verification=True)
+    remote = RemoteAuth()
+    token = make_token()
+
+    first = verifier.verify(token, remote)
+    second = verifier.verify(token, remote)
+
+    assert first.user.id == "user-1"
+    assert first.user.email == "ana@example.com"
+    assert first.user.user_metadata == {"name": "Ana"}
+    assert second is first
+    assert remote.calls == []
+    assert verifier.get_stats()["hits"] == 1
+
+
+def test_invalid_or_expired_tokens_are_rejected_without_remote_call():
+    verifier = AuthTokenVerifier(jwt_secret=SECRET, local_verification=True)
+    remote = RemoteAuth()
+
+    assert verifier.verify(make_token(key="another-secret-with-at-least-32-bytes"), remote) is None
+    assert verifier.verify(make_token(expires_in=-60), remote) is None
+    assert verifier.verify(make_token(aud="anon"), remote) is None
+    assert remote.calls == []
+    assert verifier.get_stats()["rejected"] == 3
+
+
+def test_unverifiable_token_falls_back_to_remote_once():
+    user_response = SimpleNamespace(user=SimpleNamespace(id="user-1", user_metadata={}))
+    verifier = AuthTokenVerifier(jwt_secret=None, jwks_url=None, local_verification=True)
+    remote = RemoteAuth(user_response)
+    token = make_token()
+
+    assert verifier.verify(token, remote) is user_response
+    assert verifier.verify(token, remote) is user_response
+    assert len(remote.calls) == 1
+
+
+def test_remote_rejections_are_not_cached():
+    verifier = AuthTokenVerifier(local_verification=False)
+    remote = RemoteAuth(None)
+
+    assert verifier.verify("opaque", remote) is None
+    assert verifier.verify("opaque", remote) is None
+    assert len(remote.calls) == 2
+
+
+def test_rs256_token_is_verified_with_jwks_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    verifier = AuthTokenVerifier(jwks_url="http://localhost/jwks", local_verification=True)
+    verifier._jwks_client = SimpleNamespace(
+        get_signing_key_from_jwt=lambda _token: SimpleNamespace(key=private_key.public_key())
+    )
+    remote = RemoteAuth()
+
+    response = verifier.verify(make_token(key=private_key, algorithm="RS256", headers={"kid": "k1"}), remote)
+
+    assert response.user.id == "user-1"
+    assert remote.calls == []
+
+
+def test_cache_is_bounded():
+    verifier = AuthTokenVerifier(jwt_secret=SECRET, local_verification=True, cache_max=2)
+    remote = RemoteAuth()
+
+    for index in range(4):
+        verifier.verify(make_token(sub=f"user-{index}"), remote)
+
+    assert verifier.get_stats()["cached_tokens"] == 2
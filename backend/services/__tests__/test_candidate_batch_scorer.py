@@ -0,0 +1,137 @@
+import os
+import random
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.candidate_batch_scorer import BatchCandidateScorer, _round3
+from services.candidate_outfit_service import SECTION_ORDER, CandidateOutfitService
+
+
+NAMES = {
+    "dress": ["Vestido Preto Formal", "Summer Dress"],
+    "jumpsuit": ["Macacão Azul"],
+    "base_layer": ["Camisa Branca", "T-shirt Oversized", "Hoodie Sport"],
+    "insulation_layer": ["Camisola Cinzenta"],
+    "skirt": ["Saia Clássica"],
+    "pants": ["Calças Clássicas", "Jeans", "Calções Running"],
+    "outer_layer": ["Casaco Impermeável", "Blazer"],
+    "shoes": ["Botas Vermelhas", "Sapatilhas Jordan", "Sapato Oxford"],
+    "bag": ["Mala Vermelha"],
+    "accessories": ["Boné Vermelho"],
+}
+TYPES = {
+    "dress": "dress", "jumpsuit": "jumpsuit", "base_layer": "shirt", "insulation_layer": "sweater",
+    "skirt": "skirt", "pants": "pants", "outer_layer": "jacket", "shoes": "shoes", "bag": "bag",
+    "accessories": "cap",
+}
+COLORS = ["vermelho", "preto", "azul", "amarelo", "", None, "teal"]
+
+
+def make_options(rng):
+    options = {}
+    for section, names in NAMES.items():
+        options[section] = [
+            {
+                "id": f"{section}-{index}",
+                "name": name,
+                "type": TYPES[section],
+                "color": rng.choice(COLORS),
+                "style": rng.choice(["formal", "casual", "streetwear", "smart casual", ""]),
+                "temp_min": rng.choice([0, 10, "x"]),
+                "temp_max": 25,
+                "usage_metrics": {"times_used": rng.choice([0, 1, 3, 7, 14])},
+            }
+            for index, name in enumerate(names)
+        ]
+    # A misfiled item exercises section_correctness.
+    options["pants"].append({"id": "misfiled", "name": "Blusa", "type": "blouse", "color": "rosa"})
+    return options
+
+
+def random_rows(rng, options, count):
+    rows = []
+    for _ in range(count):
+        rows.append(tuple(
+            rng.randrange(-1, len(options[section])) if rng.random() < 0.7 else -1
+            for section in SECTION_ORDER
+        ))
+    return rows
+
+
+def scoring_items(service, scorer, row):
+    return [
+        {**service._candidate_item(item, section), "source": item}
+        for section, item in scorer.decode(row).items()
+    ]
+
+
+def test_batch_totals_match_per_candidate_scoring():
+    rng = random.Random(3)
+    service = CandidateOutfitService()
+    options = make_options(rng)
+    cases = [
+        ({}, {}),
+        ({"requested_style": "formal", "requested_occasion": "jantar"}, {"temperature": 8, "condition": "chuva"}),
+        ({"requested_colors": ["vermelho"], "requested_types": ["saia"], "style": ["casual"]}, {"temp": 27}),
+        ({"requested_style": "streetwear", "raw_text": "sair à noite"}, {"temperature": "warm"}),
+    ]
+    for parsed_intent, weather in cases:
+        for must in ({}, {"shoes": options["shoes"][0]}):
+            features = service.compile_item_features(
+                item for items in options.values() for item in items
+            )
+            context = service._scoring_context(parsed_intent, weather)
+            scorer = BatchCandidateScorer(service, options, features, context, must)
+            rows = random_rows(rng, options, 400)
+
+            totals = scorer.score(rows)
+
+            expected = [
+                service._score_candidate(scoring_items(service, scorer, row), parsed_intent, must, weather)[0]
+                for row in rows
+            ]
+            assert totals.tolist() == expected
+
+
+def test_encode_decode_round_trip():
+    rng = random.Random(5)
+    service = CandidateOutfitService()
+    options = make_options(rng)
+    scorer = BatchCandidateScorer(
+        service, options, {}, service._scoring_context({}, {}), {}
+    )
+    raw = {"base_layer": options["base_layer"][2], "pants": options["pants"][1], "shoes": options["shoes"][0]}
+
+    row = scorer.encode({**raw, "dress": None, "_template_used": "standard_outfit"})
+
+    assert row == (-1, -1, 2, -1, -1, 1, -1, 0, -1, -1)
+    assert scorer.decode(row) == raw
+
+
+def test_round3_matches_python_round_on_ties():
+    values = [0.0005, 1.0015, 2.6745, 5.2495, 0.1235, 7.0, -0.0005]
+    assert _round3(values).tolist() == [round(value, 3) for value in values]
+
+
+def test_service_output_is_identical_with_and_without_batch_scoring():
+    rng = random.Random(9)
+    wardrobe = [
+        {**item, "status": "clean"}
+        for items in make_options(rng).values()
+        for item in items
+    ]
+    kwargs = dict(
+        user_id="u1",
+        wardrobe_items=wardrobe,
+        weather={"temperature": 12, "condition": "rain"},
+        parsed_intent={"requested_style": "formal"},
+    )
+
+    batch = CandidateOutfitService(batch_scoring=True).generate_candidate_outfits(**kwargs)
+    single = CandidateOutfitService(batch_scoring=False).generate_candidate_outfits(**kwargs)
+
+    assert batch["candidates"] == single["candidates"]
@@ -0,0 +1,50 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.candidate_outfit_service import COLOR_IDS, STYLE_IDS, CandidateOutfitService
+
+
+ITEMS = [
+    {"id": "shirt", "name": "Camisa Branca", "type": "shirt", "color": "branca", "temp_min": 5, "temp_max": 25},
+    {"id": "pants", "name": "Calças Clássicas", "type": "pants", "color": "preto", "temp_min": "cold"},
+    {"id": "boots", "name": "Botas Impermeáveis", "type": "boots", "color": "castanho",
+     "usage_metrics": {"usage_frequency_last_7_days": 4}},
+    {"id": "coat", "name": "Casaco Vermelho", "type": "coat", "color": "vermelho", "style": "formal"},
+]
+
+
+def test_compiled_features_capture_item_attributes():
+    service = CandidateOutfitService()
+    features = service.compile_item_features(ITEMS)
+    shirt, pants, boots, coat = (features[id(item)] for item in ITEMS)
+
+    assert (shirt.section, shirt.color, shirt.color_id) == ("base_layer", "white", COLOR_IDS["white"])
+    assert (shirt.style, shirt.style_id, shirt.formality) == ("formal", STYLE_IDS["formal"], 5)
+    assert shirt.temperature_match(20) and not shirt.temperature_match(30)
+    assert pants.temp_min is None and pants.temperature_match(-40)
+    assert pants.style == "classic"
+    assert boots.section == "shoes" and boots.weatherproof and boots.usage == 4.0
+    assert coat.section == "outer_layer" and coat.is_strong
+
+
+def test_precompiled_scores_match_on_the_fly_scoring():
+    service = CandidateOutfitService()
+    features = service.compile_item_features(ITEMS)
+    sections = ["base_layer", "pants", "shoes", "outer_layer"]
+    plain = [
+        {**service._candidate_item(item, section), "source": item}
+        for item, section in zip(ITEMS, sections)
+    ]
+    compiled = [{**item, "features": features[id(item["source"])]} for item in plain]
+
+    for parsed_intent in ({}, {"requested_style": "formal", "requested_occasion": "trabalho"}):
+        for weather in ({}, {"temperature": 10, "condition": "chuva"}, {"temp": "n/a"}):
+            context = service._scoring_context(parsed_intent, weather)
+            assert service._score_candidate(plain, parsed_intent, {}, weather) == (
+                service._score_candidate(compiled, parsed_intent, {}, weather, context)
+            )
@@ -0,0 +1,136 @@
+"""
+Tests for the compact candidate-selection prompt encoder.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.candidate_prompt_encoder import CandidatePromptEncoder, estimate_tokens
+from services.recommendation_service import RecommendationService
+from services.vlm_service import MockVLMService, VLMResponse
+
+
+SHIRT = {"id": "7f0c2b1e-1111-4c7e-9a51-0d5c3e1f2a01", "section": "base_layer", "name": "White Shirt", "type": "shirt", "color": "white", "style": "formal"}
+TEE = {"id": "7f0c2b1e-2222-4c7e-9a51-0d5c3e1f2a02", "section": "base_layer", "name": "Navy Tee", "type": "t-shirt", "color": "navy"}
+CHINOS = {"id": "7f0c2b1e-3333-4c7e-9a51-0d5c3e1f2a03", "section": "pants", "name": "Beige Chinos", "type": "pants", "color": "beige"}
+
+CANDIDATES = [
+    {
+        "candidate_id": "A",
+        "score": 88.5,
+        "items": [SHIRT, CHINOS],
+        "metadata": {
+            "score_explanation": "request match 0.9, weather fit 0.8, color harmony 0.7",
+            "strengths": ["formal request"],
+            "weaknesses": [],
+            "diversity_reason": "top candidate",
+        },
+    },
+    {
+        "candidate_id": "B",
+        "score": 81.0,
+        "items": [TEE, CHINOS],
+        "metadata": {"score_explanation": "casual fit", "strengths": ["comfortable"], "weaknesses": ["less formal"]},
+    },
+]
+WEATHER = {"temperature": 16, "condition": "cloudy", "humidity": None}
+
+
+def test_items_are_listed_once_under_aliases():
+    encoded = CandidatePromptEncoder(token_budget=0).encode(CANDIDATES, "look formal", WEATHER)
+
+    assert encoded.item_aliases == {"I1": SHIRT["id"], "I2": CHINOS["id"], "I3": TEE["id"]}
+    assert encoded.candidate_aliases == {"A": ["I1", "I2"], "B": ["I3", "I2"]}
+    assert SHIRT["id"] not in encoded.text
+    assert encoded.text.count("Beige Chinos") == 1
+    assert "A (score 88.5): I1 I2" in encoded.text
+    assert "request match 0.9" in encoded.text
+    assert '"humidity"' not in encoded.text
+    assert encoded.detail_level == 0
+    assert encoded.token_count == estimate_tokens(encoded.text)
+
+
+def test_budget_drops_detail_until_prompt_fits():
+    full = CandidatePromptEncoder(token_budget=0).encode(CANDIDATES, "", WEATHER)
+    encoder = CandidatePromptEncoder(token_budget=full.token_count - 1)
+
+    trimmed = encoder.encode(CANDIDATES, "", WEATHER)
+    tiny = CandidatePromptEncoder(token_budget=10).encode(CANDIDATES, "", WEATHER)
+
+    assert trimmed.detail_level >= 1 and trimmed.within_budget
+    assert "request match 0.9" not in trimmed.text
+    assert trimmed.token_count < full.token_count
+    assert tiny.detail_level == 3 and not tiny.within_budget
+    assert "formal" not in tiny.text.split("Items")[1]
+    assert encoder.get_stats()["prompts"] == 1
+
+
+def test_item_answers_map_back_to_candidates_and_names():
+    encoded = CandidatePromptEncoder(token_budget=0).encode(CANDIDATES, "", WEATHER)
+
+    assert encoded.candidate_for_alias("I1") == "A"
+    assert encoded.candidate_for_alias(TEE["id"]) == "B"
+    assert encoded.candidate_for_alias("I2") is None
+    assert encoded.candidate_for_alias("I9") is None
+    assert encoded.expand_aliases("I1 com I2, não I9") == "White Shirt com Beige Chinos, não I9"
+
+
+def test_selection_resolves_item_alias_answer():
+    class AliasVLM(MockVLMService):
+        async def recommend_outfit(self, wardrobe_items, weather_context, user_context=None, prompt_template=None):
+            self.prompt = prompt_template
+            return VLMResponse(
+                success=True,
+                metadata={"raw_response": '{"selected_candidate": "I3", "reasoning": "I3 é mais leve.", "confidence": 0.8}'},
+            )
+
+    vlm = AliasVLM()
+    service = RecommendationService(vlm_service=vlm, prompt_encoder=CandidatePromptEncoder(token_budget=0))
+    candidates = [{**candidate, "item_ids": [item["id"] for item in candidate["items"]]} for candidate in CANDIDATES]
+
+    result = asyncio.run(service.select_best_candidate_with_llava(candidates, [], "look leve", WEATHER))
+
+    assert "I1: base_layer | White Shirt" in vlm.prompt
+    assert result["selected_candidate_id"] == "B"
+    assert result["reasoning"] == "Navy Tee é mais leve."
+
+
+def test_server_token_counts_check_the_estimate():
+    class CountingVLM(MockVLMService):
+        def __init__(self, replies):
+            super().__init__()
+            self.replies = replies
+
+        async def recommend_outfit(self, wardrobe_items, weather_context, user_context=None, prompt_template=None):
+            prompt_tokens, image_count = self.replies.pop(0)
+            return VLMResponse(
+                success=True,
+                metadata={
+                    "raw_response": '{"selected_candidate": "A", "confidence": 0.8}',
+                    "prompt_tokens": prompt_tokens,
+                    "image_count": image_count,
+                },
+            )
+
+    encoder = CandidatePromptEncoder(token_budget=0)
+    service = RecommendationService(
+        vlm_service=CountingVLM([(None, 0), (900, 2), (330, 0)]),
+        prompt_encoder=encoder,
+    )
+    candidates = [{**candidate, "item_ids": [item["id"] for item in candidate["items"]]} for candidate in CANDIDATES]
+    estimated = encoder.encode(CANDIDATES, "", WEATHER).token_count
+
+    for _ in range(3):
+        asyncio.run(service.select_best_candidate_with_llava(candidates, [], "", WEATHER))
+
+    measured = encoder.get_stats()["measured"]
+    assert measured["prompts"] == 2
+    assert measured["avg_tokens"] == 615.0
+    assert measured["text_only_prompts"] == 1
+    assert measured["estimate_ratio"] == round(330 / estimated, 3)
@@ -0,0 +1,76 @@
+"""
+Tests for vectorized dominant color extraction and the persistent color cache.
+"""
+
+import base64
+import io
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services import color_inference_service
+from services.color_cache import PersistentColorCache, content_key
+
+
+def data_uri(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def test_numpy_buckets_match_per_pixel_loop():
+    rng = np.random.default_rng(7)
+    for index in range(200):
+        size = int(rng.integers(1, 32))
+        if index % 2:
+            pixels = rng.integers(0, 256, size=(size, size, 4), dtype=np.uint8)
+        else:
+            # Few distinct colors so bucket ties are exercised.
+            palette = rng.integers(0, 256, size=(int(rng.integers(1, 5)), 4), dtype=np.uint8)
+            pixels = palette[rng.integers(0, len(palette), size=(size, size))]
+        image = Image.fromarray(pixels, "RGBA")
+
+        assert color_inference_service._dominant_bucket_numpy(image) == (
+            color_inference_service._dominant_bucket_python(image)
+        )
+
+
+def test_background_and_gray_pixels_are_ignored():
+    pixels = np.full((20, 20, 3), 250, dtype=np.uint8)
+    pixels[5:10, 5:10] = (30, 60, 200)
+    image = Image.fromarray(pixels, "RGB").convert("RGBA")
+
+    assert color_inference_service._dominant_bucket_numpy(image) == (0, 1, 6)
+    gray = Image.new("RGBA", (8, 8), (90, 90, 90, 255))
+    assert color_inference_service._dominant_bucket_numpy(gray) is None
+
+
+def test_cache_is_keyed_by_hash_and_reused():
+    cache = PersistentColorCache(":memory:", max_entries=10)
+    color_inference_service._COLOR_CACHE = cache
+    image_ref = data_uri(Image.new("RGB", (32, 32), (20, 160, 40)))
+
+    assert color_inference_service.infer_dominant_color(image_ref) == "green"
+    assert cache.lookup(content_key(image_ref)) == (True, "green")
+
+    cache.store(content_key(image_ref), "blue")
+    assert color_inference_service.infer_dominant_color(image_ref) == "blue"
+
+
+def test_cache_caches_no_color_and_evicts_lru():
+    cache = PersistentColorCache(":memory:", max_entries=2)
+    cache.store("a", None)
+    cache.store("b", "red")
+    assert cache.lookup("a") == (True, None)
+    cache.store("c", "blue")
+
+    assert len(cache) == 2
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, None)
@@ -0,0 +1,121 @@
+"""
+Tests for background color inference in WardrobeService._format_item.
+"""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+from PIL import Image
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services import color_inference_service
+from services.color_cache import PersistentColorCache
+from services.color_inference_worker import ColorInferenceWorker
+from services.wardrobe_cache import WardrobeSnapshotCache
+from services.wardrobe_service import WardrobeService
+
+color_inference_service._COLOR_CACHE = PersistentColorCache(":memory:")
+
+
+class InlineColorWorker(ColorInferenceWorker):
+    """Runs jobs in a thread pool so tests do not spawn processes."""
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.payload = None
+
+    def update(self, payload):
+        self.payload = payload
+        return self
+
+    def eq(self, *_args, **_kwargs):
+        return self
+
+    def execute(self):
+        self.client.updates.append(self.payload)
+        return SimpleNamespace(data=[])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.updates = []
+
+    def table(self, _name):
+        return FakeQuery(self)
+
+
+def red_data_uri():
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), (220, 20, 20)).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def make_service(worker):
+    service = WardrobeService(
+        snapshot_cache=WardrobeSnapshotCache(ttl_seconds=60, max_users=4),
+        color_worker=worker,
+    )
+    service.supabase = FakeSupabase()
+    return service
+
+
+ROW = {"id": "item-1", "user_id": "u1", "name": "Tee", "type": "t-shirt", "image": red_data_uri()}
+
+
+def test_uncolored_item_is_pending_then_persisted():
+    worker = InlineColorWorker(max_workers=1)
+    service = make_service(worker)
+
+    async def scenario():
+        first = service._format_item(dict(ROW))
+        await worker.drain()
+        second = service._format_item(dict(ROW))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    worker.shutdown()
+
+    assert first["color_source"] == "pending"
+    assert first["color"] == ""
+    assert second["color_source"] == "image_inferred"
+    assert second["color"] == "red"
+    assert service.supabase.updates == [{"inferred_color": "red"}]
+
+
+def test_persisted_inferred_color_skips_inference():
+    worker = InlineColorWorker(max_workers=1)
+    service = make_service(worker)
+
+    async def scenario():
+        return service._format_item({**ROW, "inferred_color": "green"})
+
+    item = asyncio.run(scenario())
+
+    assert item["color"] == "green"
+    assert item["color_source"] == "image_inferred"
+    assert worker.get_stats()["pending"] == 0
+
+
+def test_without_event_loop_falls_back_to_synchronous_inference():
+    service = make_service(InlineColorWorker(max_workers=1))
+
+    item = service._format_item(dict(ROW))
+
+    assert item["color"] == "red"
+    assert item["color_source"] == "image_inferred"
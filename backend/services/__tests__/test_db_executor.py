@@ -0,0 +1,102 @@
+"""
+Tests for the bounded database executor.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.db_executor import DatabaseExecutor
+
+
+class SlowQuery:
+    def __init__(self, seconds, data=None):
+        self.seconds = seconds
+        self.data = data
+        self.thread = None
+
+    def execute(self):
+        self.thread = threading.current_thread().name
+        time.sleep(self.seconds)
+        return SimpleNamespace(data=self.data)
+
+
+def test_execute_runs_query_off_the_event_loop():
+    executor = DatabaseExecutor(max_workers=2)
+    query = SlowQuery(0.2, data=[{"id": "a"}])
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def scenario():
+        response, _ = await asyncio.gather(executor.execute(query), ticker())
+        return response
+
+    try:
+        response = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert response.data == [{"id": "a"}]
+    assert query.thread.startswith("supabase-db")
+    # The loop kept ticking while the query slept on the worker thread.
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.2
+
+
+def test_concurrency_is_bounded_by_max_workers():
+    executor = DatabaseExecutor(max_workers=3)
+
+    async def scenario():
+        return await asyncio.gather(*(executor.execute(SlowQuery(0.03)) for _ in range(12)))
+
+    try:
+        responses = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    stats = executor.get_stats()
+    assert len(responses) == 12
+    assert stats["calls"] == 12
+    assert stats["max_in_flight"] == 3
+    assert stats["in_flight"] == 0
+
+
+def test_run_propagates_exceptions_and_arguments():
+    executor = DatabaseExecutor(max_workers=1)
+
+    def fail(message, suffix=""):
+        raise RuntimeError(message + suffix)
+
+    async def scenario():
+        added = await executor.run(lambda left, right=0: left + right, 2, right=3)
+        try:
+            await executor.run(fail, "boom", suffix="!")
+        except RuntimeError as exc:
+            return added, str(exc)
+        return added, None
+
+    try:
+        assert asyncio.run(scenario()) == (5, "boom!")
+    finally:
+        executor.shutdown()
+    assert executor.get_stats()["in_flight"] == 0
+
+
+def test_pool_is_recreated_after_shutdown():
+    executor = DatabaseExecutor(max_workers=1)
+    executor.shutdown()
+    response = asyncio.run(executor.execute(SlowQuery(0, data=[1])))
+    executor.shutdown()
+    assert response.data == [1]
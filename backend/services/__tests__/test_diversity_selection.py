@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.candidate_outfit_service import CandidateOutfit, CandidateOutfitService
+
+
+SECTIONS = ["dress", "base_layer", "insulation_layer", "pants", "outer_layer", "bag", "shoes"]
+
+
+def make_candidate(items, score):
+    return CandidateOutfit(
+        candidate_id="",
+        items=[{"section": section, "id": item_id} for section, item_id in items],
+        item_ids=[item_id for _section, item_id in items],
+        score=score,
+    )
+
+
+def rescan_selection(service, candidate_pool, max_candidates):
+    """Original selection: recompute every bonus against the whole selection on each pick."""
+    remaining = sorted(candidate_pool, key=lambda candidate: candidate.score, reverse=True)
+    selected = []
+    seen_signatures = set()
+    while remaining and len(selected) < max_candidates:
+        best_index = 0
+        best_value = None
+        for index, candidate in enumerate(remaining):
+            if tuple(sorted(candidate.item_ids)) in seen_signatures:
+                continue
+            value = candidate.score + service._diversity_bonus(candidate, selected)
+            if best_value is None or value > best_value:
+                best_value = value
+                best_index = index
+        candidate = remaining.pop(best_index)
+        signature = tuple(sorted(candidate.item_ids))
+        if signature in seen_signatures:
+            continue
+        selected.append(candidate)
+        seen_signatures.add(signature)
+    return selected
+
+
+def test_incremental_selection_matches_rescan_on_random_pools():
+    service = CandidateOutfitService()
+    rng = random.Random(3)
+    for _ in range(500):
+        pool = [
+            make_candidate(
+                [
+                    (section, f"{section}-{rng.randrange(4)}")
+                    for section in SECTIONS
+                    if rng.random() < 0.6
+                ],
+                rng.choice([float(rng.randrange(90, 100)), rng.uniform(40, 140)]),
+            )
+            for _ in range(rng.randrange(1, 40))
+        ]
+        max_candidates = rng.randrange(0, 8)
+
+        expected = rescan_selection(service, pool, max_candidates)
+        actual = service._select_diverse_candidates(pool, max_candidates)
+
+        assert [id(candidate) for candidate in actual] == [id(candidate) for candidate in expected]
+
+
+def test_diversity_outweighs_small_score_gap():
+    service = CandidateOutfitService()
+    best = make_candidate([("base_layer", "shirt-a"), ("pants", "jeans-a"), ("shoes", "shoes-a")], 100.0)
+    near_copy = make_candidate([("base_layer", "shirt-a"), ("pants", "jeans-a"), ("shoes", "shoes-b")], 99.0)
+    different = make_candidate([("base_layer", "shirt-b"), ("pants", "jeans-b"), ("shoes", "shoes-a")], 80.0)
+
+    selected = service._select_diverse_candidates([near_copy, different, best], 2)
+
+    assert selected == [best, different]
+
+
+def test_duplicate_signatures_are_selected_once():
+    service = CandidateOutfitService()
+    first = make_candidate([("base_layer", "shirt"), ("pants", "jeans")], 90.0)
+    duplicate = make_candidate([("pants", "jeans"), ("base_layer", "shirt")], 90.0)
+
+    assert service._select_diverse_candidates([first, duplicate], 5) == [first]
+    assert service._select_diverse_candidates([], 5) == []
@@ -0,0 +1,122 @@
+"""
+Tests for the shared httpx.AsyncClient registry.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.http_client_registry import HTTPClientRegistry
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+def test_requests_reuse_one_keepalive_connection():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/image.jpg"
+    registry = HTTPClientRegistry(max_connections=4, max_keepalive_connections=2, http2=False)
+
+    async def scenario():
+        await registry.startup()
+        client = registry.get_client("images")
+        assert registry.get_client("images") is client
+        for _ in range(3):
+            response = await client.get(url, timeout=5)
+            assert response.text == "ok"
+        stats = registry.get_stats()
+        await registry.aclose()
+        return stats, client
+
+    try:
+        stats, client = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    images = stats["clients"]["images"]
+    assert images["requests_total"] == 3
+    assert images["connections_open"] == 1
+    assert images["connections_idle"] == 1
+    assert images["pool_utilization"] == 0
+    assert "vlm" in stats["clients"]
+    assert client.is_closed
+
+
+def test_new_event_loop_gets_a_new_client():
+    registry = HTTPClientRegistry(http2=False)
+
+    async def get_client():
+        return registry.get_client("vlm")
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+
+    assert first is not second
+
+
+def test_client_is_closed_with_its_event_loop():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/image.jpg"
+    registry = HTTPClientRegistry(http2=False)
+
+    async def fetch():
+        client = registry.get_client("images")
+        await client.get(url, timeout=5)
+        return client
+
+    try:
+        first = asyncio.run(fetch())
+        assert first.is_closed
+        second = asyncio.run(fetch())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert second is not first and second.is_closed
+    assert registry._shutdown_guards == {}
+
+
+def test_client_replaced_while_its_loop_runs_is_closed_there():
+    registry = HTTPClientRegistry(http2=False)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def get_client():
+        return registry.get_client("vlm")
+
+    try:
+        first = asyncio.run_coroutine_threadsafe(get_client(), loop).result(timeout=5)
+        second = asyncio.run(get_client())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), loop).result(timeout=5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    assert first.is_closed
+    assert second is not first
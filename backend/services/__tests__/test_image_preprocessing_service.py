@@ -0,0 +1,119 @@
+"""
+Tests for concurrent image preprocessing.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.image_preprocessing_service import ImagePreprocessingService
+
+
+class SlowPreprocessingService(ImagePreprocessingService):
+    """Replaces the network fetch with per-URL delays and tracks parallelism."""
+
+    def __init__(self, delays, **config):
+        super().__init__(config)
+        self.delays = delays
+        self.active = 0
+        self.peak = 0
+        self.active_by_host = {}
+        self.peak_by_host = {}
+
+    async def _process_single_image(self, url, return_format):
+        host = self._host_key(url)
+        self.active += 1
+        self.active_by_host[host] = self.active_by_host.get(host, 0) + 1
+        self.peak = max(self.peak, self.active)
+        self.peak_by_host[host] = max(self.peak_by_host.get(host, 0), self.active_by_host[host])
+        try:
+            await asyncio.sleep(self.delays.get(url, 0.01))
+            if url.endswith("broken.jpg"):
+                return None
+            return f"data:image/jpeg;base64,{url[-5:]}"
+        finally:
+            self.active -= 1
+            self.active_by_host[host] -= 1
+
+
+def test_results_keep_input_order():
+    urls = [f"https://cdn{i}.example/{i}.jpg" for i in range(4)]
+    delays = {url: 0.05 - i * 0.01 for i, url in enumerate(urls)}
+    service = SlowPreprocessingService(delays, concurrency=4)
+
+    results = asyncio.run(service.preprocess_images(urls, return_format="data_uri"))
+    payloads = asyncio.run(service.preprocess_image_payloads(urls, return_format="data_uri"))
+
+    assert results == [f"data:image/jpeg;base64,{url[-5:]}" for url in urls]
+    assert [payload.data_uri for payload in payloads] == results
+    assert all(payload.is_valid and payload.elapsed_ms > 0 for payload in payloads)
+
+
+def test_concurrency_limits_are_respected():
+    urls = [f"https://a.example/{i}.jpg" for i in range(4)]
+    urls += [f"https://b.example/{i}.jpg" for i in range(4)]
+    service = SlowPreprocessingService({}, max_images=8, concurrency=3, per_host_concurrency=2)
+
+    results = asyncio.run(service.preprocess_images(urls, return_format="data_uri"))
+
+    assert len(results) == 8
+    assert 1 < service.peak <= 3
+    assert max(service.peak_by_host.values()) <= 2
+
+
+def test_failed_and_late_images_are_dropped():
+    urls = [
+        "https://a.example/ok.jpg",
+        "https://a.example/broken.jpg",
+        "https://b.example/slow.jpg",
+    ]
+    service = SlowPreprocessingService({urls[2]: 5.0}, deadline=0.2)
+
+    payloads = asyncio.run(service.preprocess_image_payloads(urls, return_format="data_uri"))
+
+    assert [payload.url for payload in payloads] == urls
+    assert payloads[0].is_valid
+    assert payloads[1].error == "could not process image"
+    assert "deadline" in payloads[2].error
+    assert service.active == 0
+
+
+def test_sequential_mode_matches_concurrent_output():
+    urls = [f"https://cdn.example/{i}.jpg" for i in range(3)]
+    service = SlowPreprocessingService({}, concurrent=False)
+
+    sequential = asyncio.run(service.preprocess_images(urls, return_format="data_uri"))
+    assert service.peak == 1
+    concurrent = asyncio.run(
+        service.preprocess_images(urls, return_format="data_uri", concurrent=True)
+    )
+
+    assert sequential == concurrent
+
+
+def test_deadline_applies_to_both_modes_and_late_fetches_are_unwound():
+    urls = [
+        "https://a.example/ok.jpg",
+        "https://b.example/slow.jpg",
+        "https://a.example/never.jpg",
+    ]
+
+    async def scenario(concurrent):
+        service = SlowPreprocessingService({urls[1]: 5.0, urls[2]: 5.0}, deadline=0.2)
+        payloads = await service.preprocess_image_payloads(
+            urls, return_format="data_uri", concurrent=concurrent
+        )
+        return payloads, service.active
+
+    for concurrent in (False, True):
+        payloads, active = asyncio.run(scenario(concurrent))
+
+        assert [payload.url for payload in payloads] == urls
+        assert payloads[0].is_valid
+        assert all("deadline" in payload.error for payload in payloads[1:])
+        assert active == 0
@@ -0,0 +1,214 @@
+"""
+Tests for the streamed LLaVA candidate selection.
+
+The streaming tests run LLaVAService against a local fake server that sends
+the completion token by token and records how much it wrote before the
+client disconnected.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.http_client_registry import http_client_registry
+from services.llava_stream import SelectionStreamParser, stream_line_text
+from services.vlm_scheduler import VLMAdmissionScheduler
+from services.vlm_service import LLaVAService
+
+
+ANSWER = (
+    '```json\n{"selected_candidate": "c2", "confidence": 0.82, '
+    '"reasoning": "Camisa branca com chinos bege, adequado ao tempo ameno e ao pedido formal."}\n```'
+    "\nEspero que goste deste outfit! Outras opções seriam igualmente possíveis." * 3
+)
+
+
+def tokens(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def openai_lines(text):
+    for token in tokens(text):
+        yield "data: " + json.dumps({"choices": [{"delta": {"content": token}}]}) + "\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def ollama_lines(text):
+    for token in tokens(text):
+        yield json.dumps({"message": {"role": "assistant", "content": token}, "done": False}) + "\n"
+    yield json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+
+class FakeStreamingServer:
+    def __init__(self, lines, delay=0.005):
+        self.lines = list(lines)
+        self.delay = delay
+        self.sent = 0
+        self.disconnected = asyncio.Event()
+        self.payloads = []
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1/chat/completions"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = next(
+            int(line.split(b":", 1)[1])
+            for line in headers.split(b"\r\n")
+            if line.lower().startswith(b"content-length:")
+        )
+        self.payloads.append(json.loads(await reader.readexactly(length)))
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        try:
+            for line in self.lines:
+                data = line.encode()
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+                self.sent += 1
+                await asyncio.sleep(self.delay)
+                if reader.at_eof():
+                    break
+            else:
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.disconnected.set()
+            writer.close()
+
+
+def make_service(url, **overrides):
+    service = LLaVAService()
+    service.api_endpoint = url
+    service.scheduler = VLMAdmissionScheduler(max_in_flight=1, max_queue=4, queue_timeout=5)
+    for name, value in overrides.items():
+        setattr(service, name, value)
+    return service
+
+
+async def select(lines, **overrides):
+    async with FakeStreamingServer(lines) as server:
+        service = make_service(server.url, **overrides)
+        started = time.perf_counter()
+        text = await service._call_llava_selection("prompt", [])
+        elapsed = time.perf_counter() - started
+        await asyncio.wait_for(server.disconnected.wait(), timeout=2)
+        await http_client_registry.aclose()
+        return text, elapsed, server
+
+
+def test_parser_stops_once_selection_is_complete():
+    parser = SelectionStreamParser(reasoning_max_chars=280)
+    done = [parser.feed(token) for token in tokens(ANSWER)]
+
+    assert any(done)
+    assert done.index(True) < len(done) - 100
+    assert json.loads(parser.result_text()) == {
+        "selected_candidate": "c2",
+        "confidence": 0.82,
+        "reasoning": "Camisa branca com chinos bege, adequado ao tempo ameno e ao pedido formal.",
+    }
+
+
+def test_parser_caps_reasoning_and_handles_escapes_and_nesting():
+    parser = SelectionStreamParser(reasoning_max_chars=20)
+    text = (
+        '{"scores": {"c1": [1, 2], "note": "a \\"}\\" b"}, "confidence": 0.5, '
+        '"selected_candidate": "c1", "reasoning": "Linha \\u00e9 muito longa e continua sem parar'
+    )
+    done = [parser.feed(token) for token in tokens(text, size=3)]
+
+    assert done[-1] is True
+    result = json.loads(parser.result_text())
+    assert result["scores"] == {"c1": [1, 2], "note": 'a "}" b'}
+    assert result["selected_candidate"] == "c1"
+    assert result["reasoning"].startswith("Linha é muito longa")
+    assert len(result["reasoning"]) <= 23
+
+
+def test_parser_returns_raw_text_without_json():
+    parser = SelectionStreamParser()
+    assert parser.feed("Escolho o candidato c1 porque") is False
+    assert parser.result_text() == "Escolho o candidato c1 porque"
+
+
+def test_stream_line_text_formats():
+    assert stream_line_text('data: {"choices": [{"delta": {"content": "ab"}}]}') == "ab"
+    assert stream_line_text("data: [DONE]") is None
+    assert stream_line_text(": keep-alive") == ""
+    assert stream_line_text('{"message": {"content": "cd"}, "done": false}') == "cd"
+    assert stream_line_text('{"response": "ef", "done": false}') == "ef"
+    assert stream_line_text('{"choices": [{"message": {"content": "full"}}]}') == "full"
+
+
+def test_openai_stream_is_cancelled_after_selection():
+    lines = list(openai_lines(ANSWER))
+    text, elapsed, server = asyncio.run(select(lines))
+
+    assert json.loads(text)["selected_candidate"] == "c2"
+    assert server.payloads[0]["stream"] is True
+    assert server.payloads[0]["max_tokens"] == 256
+    assert server.sent < len(lines) // 2
+    assert elapsed < len(lines) * server.delay / 2
+
+
+def test_ollama_ndjson_stream_is_cancelled_after_selection():
+    lines = list(ollama_lines(ANSWER))
+    text, _elapsed, server = asyncio.run(select(lines))
+
+    assert json.loads(text)["confidence"] == 0.82
+    assert server.sent < len(lines) // 2
+
+
+def test_unparseable_stream_is_read_to_the_end():
+    lines = list(openai_lines("Escolho o c1, fica bem com o tempo."))
+    text, _elapsed, server = asyncio.run(select(lines))
+
+    assert text == "Escolho o c1, fica bem com o tempo."
+    assert server.sent == len(lines)
+
+
+async def select_with_usage(lines, **overrides):
+    usage = {}
+    async with FakeStreamingServer(lines, delay=0) as server:
+        service = make_service(server.url, **overrides)
+        text = await service._call_llava_selection("prompt", [], usage=usage)
+        await asyncio.wait_for(server.disconnected.wait(), timeout=2)
+        await http_client_registry.aclose()
+        return text, usage, server
+
+
+def test_server_prompt_token_count_is_reported():
+    usage_chunk = "data: " + json.dumps({"choices": [], "usage": {"prompt_tokens": 412, "completion_tokens": 9}}) + "\n\n"
+    lines = list(openai_lines("Escolho o c1."))
+    lines.insert(-1, usage_chunk)
+
+    _text, streamed, server = asyncio.run(select_with_usage(lines))
+    _text, cut_off, _server = asyncio.run(select_with_usage(list(openai_lines(ANSWER)) + [usage_chunk]))
+    text, posted, _server = asyncio.run(select_with_usage(
+        [json.dumps({"response": "Escolho o c2.", "prompt_eval_count": 388})],
+        stream_selection=False,
+    ))
+
+    assert server.payloads[0]["stream_options"] == {"include_usage": True}
+    assert streamed == {"prompt_tokens": 412}
+    assert cut_off == {}
+    assert text == "Escolho o c2." and posted == {"prompt_tokens": 388}
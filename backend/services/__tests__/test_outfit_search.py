@@ -0,0 +1,136 @@
+import itertools
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.candidate_outfit_service import CandidateOutfitService
+from services.outfit_search import OutfitSearch
+
+
+SECTIONS = ["base_layer", "pants", "outer_layer", "shoes"]
+TEMPLATES = {
+    "standard": [
+        ("base_layer", True),
+        ("pants", True),
+        ("shoes", True),
+        ("outer_layer", False),
+    ]
+}
+WEIGHTS = {
+    "base_layer": [3, 9, 1, 4, 7],
+    "pants": [2, 8, 5, 6],
+    "outer_layer": [4, 1, 6],
+    "shoes": [5, 3, 9, 2],
+}
+
+
+def make_options():
+    return {
+        section: [{"id": f"{section}-{index}"} for index in range(len(weights))]
+        for section, weights in WEIGHTS.items()
+    }
+
+
+def additive_score(rows):
+    return [
+        sum(
+            WEIGHTS[section][index]
+            for section, index in zip(SECTIONS, row)
+            if index >= 0
+        )
+        for row in rows
+    ]
+
+
+def brute_force_best():
+    best = 0
+    for base, pants, shoes in itertools.product(
+        range(5), range(4), range(4)
+    ):
+        for outer in list(range(3)) + [-1]:
+            best = max(best, additive_score([(base, pants, outer, shoes)])[0])
+    return best
+
+
+def test_exhaustive_search_returns_exact_best_row_first():
+    search = OutfitSearch(SECTIONS, make_options(), additive_score, pool_size=10)
+
+    results = search.search(TEMPLATES)
+
+    assert search.get_stats()["strategies"]["standard"] == "exhaustive:320"
+    assert results[0] == (brute_force_best(), "standard", (1, 1, 2, 2))
+    scores = [score for score, _template, _row in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_beam_search_finds_best_row_of_additive_score():
+    search = OutfitSearch(
+        SECTIONS, make_options(), additive_score, exhaustive_limit=10, beam_width=4, pool_size=5
+    )
+
+    results = search.search(TEMPLATES)
+
+    assert search.get_stats()["strategies"]["standard"] == "beam:4"
+    assert search.get_stats()["rows_scored"] < 320
+    assert results[0][0] == brute_force_best()
+
+
+def test_variants_per_skeleton_caps_optional_slot_variants():
+    search = OutfitSearch(
+        SECTIONS, make_options(), additive_score, pool_size=10, variants_per_skeleton=1
+    )
+
+    results = search.search(TEMPLATES)
+
+    skeletons = [(row[0], row[1], row[3]) for _score, _template, row in results]
+    assert len(skeletons) == len(set(skeletons)) == 10
+
+
+def test_template_with_empty_required_slot_is_skipped():
+    options = make_options()
+    options["pants"] = []
+    search = OutfitSearch(SECTIONS, options, additive_score)
+
+    assert search.search(TEMPLATES) == []
+
+
+def test_equal_scores_prefer_filled_optional_slot():
+    options = {"base_layer": [{"id": "top"}], "outer_layer": [{"id": "coat"}]}
+    search = OutfitSearch(
+        ["base_layer", "outer_layer"], options, lambda rows: [0.0] * len(rows)
+    )
+
+    results = search.search({"t": [("base_layer", True), ("outer_layer", False)]})
+
+    assert [row for _score, _template, row in results] == [(0, 0), (0, -1)]
+
+
+def test_service_keeps_must_item_in_every_candidate():
+    service = CandidateOutfitService(batch_scoring=True)
+    wardrobe = [
+        {"id": f"shirt-{index}", "name": f"Camisa {index}", "type": "shirt", "color": "branco"}
+        for index in range(6)
+    ] + [
+        {"id": f"pants-{index}", "name": f"Calças {index}", "type": "pants", "color": "preto"}
+        for index in range(6)
+    ] + [
+        {"id": f"shoes-{index}", "name": f"Sapatilhas {index}", "type": "shoes", "color": "branco"}
+        for index in range(4)
+    ]
+    wardrobe[-1]["color"] = "vermelho"
+
+    result = service.generate_candidate_outfits(
+        "user",
+        wardrobe,
+        {"temperature": 20, "condition": "clear"},
+        {"must_include_items": [{"type": "shoes", "color": "vermelho"}]},
+        max_candidates=4,
+    )
+
+    assert result["candidates"]
+    for candidate in result["candidates"]:
+        assert "shoes-3" in [item["id"] for item in candidate["items"]]
@@ -0,0 +1,130 @@
+"""
+Tests for the batched owner profile resolver.
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.owner_profile_service import OwnerProfileResolver, owner_fields
+
+
+class FakeProfilesQuery:
+    def __init__(self, client):
+        self.client = client
+        self.user_ids = []
+
+    def select(self, *_args, **_kwargs):
+        return self
+
+    def in_(self, column, values):
+        assert column == "user_id"
+        self.user_ids = list(values)
+        return self
+
+    def execute(self):
+        self.client.profile_queries.append(self.user_ids)
+        return SimpleNamespace(data=[
+            {"user_id": user_id, **self.client.profiles[user_id]}
+            for user_id in self.user_ids
+            if user_id in self.client.profiles
+        ])
+
+
+class FakeAdmin:
+    def __init__(self, client):
+        self.client = client
+
+    def get_user_by_id(self, user_id):
+        with self.client.lock:
+            self.client.auth_calls.append(user_id)
+        if user_id == "broken":
+            raise RuntimeError("auth down")
+        user = self.client.users.get(user_id)
+        return SimpleNamespace(user=user)
+
+
+class FakeSupabase:
+    def __init__(self, profiles=None, users=None):
+        self.profiles = profiles or {}
+        self.users = users or {}
+        self.profile_queries = []
+        self.auth_calls = []
+        self.lock = threading.Lock()
+        self.auth = SimpleNamespace(admin=FakeAdmin(self))
+
+    def table(self, name):
+        assert name == "profiles"
+        return FakeProfilesQuery(self)
+
+
+def auth_user(email, name=None, avatar=None):
+    meta = {}
+    if name:
+        meta["name"] = name
+    if avatar:
+        meta["avatar_url"] = avatar
+    return SimpleNamespace(email=email, user_metadata=meta)
+
+
+def test_resolves_distinct_owners_with_one_profiles_query():
+    client = FakeSupabase(
+        profiles={
+            "u1": {"name": "Ana", "avatar_url": "a.png"},
+            "u2": {"name": None, "avatar_url": None},
+        },
+        users={"u2": auth_user("bruno@example.com"), "u3": auth_user("carla@example.com", "Carla", "c.png")},
+    )
+    resolver = OwnerProfileResolver(ttl_seconds=60)
+
+    profiles = resolver.resolve(client, ["u1", "u2", "u1", None, "u3", "u2"])
+
+    assert client.profile_queries == [["u1", "u2", "u3"]]
+    assert sorted(client.auth_calls) == ["u2", "u3"]
+    assert profiles == {
+        "u1": {"name": "Ana", "avatar": "a.png"},
+        "u2": {"name": "bruno", "avatar": ""},
+        "u3": {"name": "Carla", "avatar": "c.png"},
+    }
+
+
+def test_cached_owners_skip_every_round_trip_until_invalidated():
+    client = FakeSupabase(profiles={"u1": {"name": "Ana", "avatar_url": ""}})
+    resolver = OwnerProfileResolver(ttl_seconds=60)
+
+    resolver.resolve(client, ["u1"])
+    resolver.resolve(client, ["u1", "u1"])
+    assert len(client.profile_queries) == 1
+
+    client.profiles["u1"]["name"] = "Ana Maria"
+    resolver.invalidate("u1")
+    assert resolver.resolve(client, ["u1"])["u1"]["name"] == "Ana Maria"
+    assert len(client.profile_queries) == 2
+
+
+def test_failed_lookups_fall_back_to_default_and_are_not_cached():
+    client = FakeSupabase()
+    resolver = OwnerProfileResolver(ttl_seconds=60)
+
+    profiles = resolver.resolve(client, ["broken", "ghost"])
+    resolver.resolve(client, ["broken"])
+
+    assert owner_fields(profiles["broken"]) == {"ownerName": "Utilizador", "ownerAvatar": ""}
+    assert owner_fields(profiles["ghost"]) == {"ownerName": "Utilizador", "ownerAvatar": ""}
+    assert client.auth_calls.count("broken") == 2
+
+
+def test_zero_ttl_disables_caching():
+    client = FakeSupabase(profiles={"u1": {"name": "Ana", "avatar_url": ""}})
+    resolver = OwnerProfileResolver(ttl_seconds=0)
+
+    resolver.resolve(client, ["u1"])
+    resolver.resolve(client, ["u1"])
+
+    assert len(client.profile_queries) == 2
@@ -0,0 +1,151 @@
+"""
+Tests for the in-memory public feed index.
+"""
+
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.public_feed_index import InvalidCursorError, PublicFeedIndex
+
+
+def make_row(index, **overrides):
+    row = {
+        "id": f"item-{index:03d}",
+        "user_id": f"user-{index % 3}",
+        "type": ["shirt", "pants", "shoes"][index % 3],
+        "color": ["Preto", "azul", "black"][index % 3],
+        "seasons": ["summer"] if index % 2 else ["winter", "autumn"],
+        "is_public": True,
+        "created_at": f"2024-01-01T10:{index // 60:02d}:{index % 60:02d}+00:00",
+    }
+    row.update(overrides)
+    return row
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def collect_pages(index, limit, **filters):
+    pages = []
+    cursor = None
+    while True:
+        rows, cursor = index.page(filters=filters, cursor=cursor, limit=limit)
+        pages.append(ids(rows))
+        if cursor is None:
+            return pages
+
+
+def test_pages_walk_the_feed_newest_first_without_gaps():
+    index = PublicFeedIndex(refresh_seconds=60)
+    index.load([make_row(i) for i in range(25)])
+
+    pages = collect_pages(index, 10)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    flat = [item_id for page in pages for item_id in page]
+    assert flat == [f"item-{i:03d}" for i in range(24, -1, -1)]
+
+
+def test_filters_combine_and_use_normalized_values():
+    colors = {"preto": "black", "black": "black"}
+    index = PublicFeedIndex(normalize_color=lambda value: colors.get(str(value).lower(), str(value).lower()))
+    index.load([make_row(i) for i in range(30)])
+
+    rows, cursor = index.page(filters={"color": "PRETO", "season": "Winter"})
+
+    assert cursor is None
+    assert ids(rows) == [
+        f"item-{i:03d}" for i in range(29, -1, -1)
+        if i % 3 in (0, 2) and i % 2 == 0
+    ]
+    assert ids(index.page(filters={"owner": "user-1", "type": "pants"}, limit=2)[0]) == ["item-028", "item-025"]
+    assert index.page(filters={"type": "dress"})[0] == []
+
+
+def test_writes_update_the_index_incrementally():
+    index = PublicFeedIndex()
+    index.load([make_row(i) for i in range(5)])
+
+    index.apply_row(make_row(10, type="dress"))
+    index.apply_row({"id": "item-002", "is_public": False})
+    index.remove("item-004")
+    index.apply_row({"id": "item-001", "type": "jacket", "is_public": True})
+
+    assert ids(index.page()[0]) == ["item-010", "item-003", "item-001", "item-000"]
+    assert ids(index.page(filters={"type": "jacket"})[0]) == ["item-001"]
+    assert index.page(filters={"type": "pants"})[0] == []
+
+
+def test_cursor_is_stable_when_newer_items_are_published():
+    index = PublicFeedIndex()
+    index.load([make_row(i) for i in range(6)])
+
+    first, cursor = index.page(limit=3)
+    index.apply_row(make_row(50))
+    second, _ = index.page(cursor=cursor, limit=3)
+
+    assert ids(first) == ["item-005", "item-004", "item-003"]
+    assert ids(second) == ["item-002", "item-001", "item-000"]
+
+
+def test_invalid_cursor_is_rejected():
+    index = PublicFeedIndex()
+    index.load([])
+
+    with pytest.raises(InvalidCursorError):
+        index.page(cursor="not-a-cursor")
+
+
+def test_ensure_loaded_queries_once_until_refresh_is_due():
+    calls = []
+
+    class Query:
+        def select(self, *_args):
+            return self
+
+        def eq(self, *_args):
+            return self
+
+        def execute(self):
+            calls.append(1)
+            return SimpleNamespace(data=[make_row(1)])
+
+    client = SimpleNamespace(table=lambda _name: Query())
+    index = PublicFeedIndex(refresh_seconds=60)
+
+    index.ensure_loaded(client)
+    index.ensure_loaded(client)
+    index.invalidate()
+    index.ensure_loaded(client)
+
+    assert len(calls) == 2
+
+
+def test_writes_during_a_reload_survive_the_swap():
+    index = PublicFeedIndex(refresh_seconds=60)
+    index.load([make_row(1)])
+
+    class Query:
+        def select(self, *_args):
+            return self
+
+        def eq(self, *_args):
+            return self
+
+        def execute(self):
+            # Published while the reload query is in flight: not in its snapshot.
+            index.apply_row(make_row(7))
+            return SimpleNamespace(data=[make_row(1), make_row(2)])
+
+    index._reload(SimpleNamespace(table=lambda _name: Query()))
+
+    assert ids(index.page()[0]) == ["item-007", "item-002", "item-001"]
@@ -0,0 +1,147 @@
+"""
+Tests for the daily recommendation result cache.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.recommendation_cache import RecommendationResultCache
+from services.recommendation_service import RecommendationService
+from services.vlm_service import MockVLMService
+from services.wardrobe_cache import wardrobe_snapshot_cache
+
+
+def make_key(cache, **overrides):
+    fields = {
+        "user_id": "u1",
+        "wardrobe_version": 0,
+        "temperature": 18.4,
+        "weather_condition": "Sunny",
+        "humidity": 55,
+        "wind_speed": 7,
+        "intent_signature": "",
+    }
+    fields.update(overrides)
+    return cache.build_key(**fields)
+
+
+SUCCESS = {"success": True, "outfit": {"items": [{"id": "tee"}]}, "model_used": "llava"}
+
+
+def test_weather_is_quantized_into_buckets():
+    cache = RecommendationResultCache(ttl_seconds=60, max_entries=8, temp_step=2)
+
+    assert make_key(cache) == make_key(cache, temperature=19.9, humidity=51, wind_speed=9)
+    assert make_key(cache, weather_condition=" sunny ") == make_key(cache)
+    assert make_key(cache) != make_key(cache, temperature=20.1)
+    assert make_key(cache) != make_key(cache, wind_speed=11)
+    assert make_key(cache, exclude_items=["b", "a"]) == make_key(cache, exclude_items=["a", "b", "a"])
+    assert make_key(cache) != make_key(cache, wardrobe_version=1)
+    assert make_key(cache) != make_key(cache, intent_signature="abc")
+
+
+def test_hit_miss_ttl_and_copies():
+    cache = RecommendationResultCache(ttl_seconds=0.05, max_entries=8)
+    key = make_key(cache)
+
+    assert cache.get(key) is None
+    assert cache.put(key, SUCCESS, cache.generation("u1"))
+    hit = cache.get(key)
+    assert hit == SUCCESS
+    hit["outfit"]["items"].clear()
+    assert cache.get(key) == SUCCESS
+
+    time.sleep(0.06)
+    assert cache.get(key) is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 0)
+
+
+def test_failures_and_llava_fallbacks_are_not_stored():
+    cache = RecommendationResultCache(ttl_seconds=60, max_entries=8)
+    key = make_key(cache)
+
+    assert not cache.put(key, {"success": False, "error": "boom"}, 0)
+    assert not cache.put(key, {**SUCCESS, "model_used": "llava_candidate_fallback"}, 0)
+    assert cache.get(key) is None
+
+
+def test_invalidate_drops_entries_and_rejects_racing_puts():
+    cache = RecommendationResultCache(ttl_seconds=60, max_entries=8)
+    key = make_key(cache)
+    other_key = make_key(cache, user_id="u2")
+    cache.put(key, SUCCESS, cache.generation("u1"))
+    cache.put(other_key, SUCCESS, cache.generation("u2"))
+
+    started_at = cache.generation("u1")
+    cache.invalidate("u1")
+
+    assert cache.get(key) is None
+    assert cache.get(other_key) == SUCCESS
+    assert not cache.put(key, SUCCESS, started_at)
+    assert cache.put(key, SUCCESS, cache.generation("u1"))
+
+
+def test_lru_eviction():
+    cache = RecommendationResultCache(ttl_seconds=60, max_entries=2)
+    keys = [make_key(cache, user_id=f"u{index}") for index in range(3)]
+    for key in keys:
+        cache.put(key, SUCCESS, 0)
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == SUCCESS
+
+
+def make_service(cache):
+    service = RecommendationService(vlm_service=MockVLMService(), result_cache=cache)
+    calls = []
+
+    async def generate(**kwargs):
+        calls.append(kwargs)
+        return {**SUCCESS, "call": len(calls)}
+
+    service._generate_daily_outfit = generate
+    return service, calls
+
+
+def test_service_serves_repeated_requests_from_cache():
+    cache = RecommendationResultCache(ttl_seconds=60, max_entries=8)
+    service, calls = make_service(cache)
+    request = {
+        "user_id": "cache-user",
+        "temperature": 18.2,
+        "weather_condition": "sunny",
+        "user_request": "TÉNIS amarelos",
+    }
+
+    first = asyncio.run(service.recommend_daily_outfit(**request))
+    second = asyncio.run(service.recommend_daily_outfit(**{**request, "temperature": 19.0}))
+    assert first == second
+    assert len(calls) == 1
+
+    asyncio.run(service.recommend_daily_outfit(**{**request, "user_request": "outfit formal"}))
+    assert len(calls) == 2
+
+    wardrobe_snapshot_cache.invalidate("cache-user")
+    asyncio.run(service.recommend_daily_outfit(**request))
+    assert len(calls) == 3
+
+    cache.invalidate("cache-user")
+    asyncio.run(service.recommend_daily_outfit(**request))
+    assert len(calls) == 4
+
+
+def test_service_skips_cache_when_disabled():
+    service, calls = make_service(RecommendationResultCache(ttl_seconds=0, max_entries=8))
+    request = {"user_id": "u1", "temperature": 18, "weather_condition": "sunny"}
+
+    asyncio.run(service.recommend_daily_outfit(**request))
+    asyncio.run(service.recommend_daily_outfit(**request))
+    assert len(calls) == 2
@@ -0,0 +1,152 @@
+"""
+Tests for the SQLite-backed recommendation job store and manager.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.recommendation_jobs import (
+    STATUS_FAILED,
+    STATUS_SUCCEEDED,
+    JobFailed,
+    RecommendationJobManager,
+    RecommendationJobStore,
+)
+
+
+def make_manager(path=":memory:"):
+    return RecommendationJobManager(store=RecommendationJobStore(path), retention_seconds=60)
+
+
+async def collect(manager, job_id, after_seq=0):
+    return [
+        event
+        async for event in manager.stream(job_id, after_seq=after_seq, keepalive_seconds=1)
+        if event is not None
+    ]
+
+
+def test_job_streams_progress_and_stores_result():
+    manager = make_manager()
+
+    async def runner(report):
+        report("intent_parsed", {"style": ["formal"]})
+        await asyncio.sleep(0.01)
+        report("llava_selected", {"candidate_id": "c1"})
+        return {"outfit": ["tee"]}
+
+    async def scenario():
+        job = manager.submit("u1", "today", {"user_request": "formal"}, runner)
+        return job, await collect(manager, job["job_id"])
+
+    job, events = asyncio.run(scenario())
+
+    assert [event["event"] for event in events] == ["accepted", "intent_parsed", "llava_selected", "result"]
+    assert [event["seq"] for event in events] == [1, 2, 3, 4]
+    stored = manager.get(job["job_id"], "u1")
+    assert stored["status"] == STATUS_SUCCEEDED
+    assert stored["result"] == {"outfit": ["tee"]}
+    assert manager.get(job["job_id"], "u2") is None
+
+
+def test_reconnect_replays_after_last_event_without_rerunning(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    manager = make_manager(path)
+    runs = []
+
+    async def runner(report):
+        runs.append(1)
+        report("candidates_generated", {"count": 3})
+        return {"ok": True}
+
+    async def scenario():
+        job = manager.submit("u1", "today", {}, runner, idempotency_key="tap-1")
+        await collect(manager, job["job_id"])
+        again = manager.submit("u1", "today", {}, runner, idempotency_key="tap-1")
+        return job, again
+
+    job, again = asyncio.run(scenario())
+    assert again["job_id"] == job["job_id"]
+    assert len(runs) == 1
+
+    restarted = make_manager(path)
+    replay = asyncio.run(collect(restarted, job["job_id"], after_seq=2))
+    assert [event["event"] for event in replay] == ["result"]
+    assert restarted.get(job["job_id"], "u1")["result"] == {"ok": True}
+
+
+def test_failures_are_recorded_with_status_code():
+    manager = make_manager()
+
+    async def rejected(_report):
+        raise JobFailed("Destination is required.", status_code=400)
+
+    async def crashed(_report):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        first = manager.submit("u1", "travel_plan", {}, rejected)
+        second = manager.submit("u1", "travel", {}, crashed)
+        return await collect(manager, first["job_id"]), await collect(manager, second["job_id"]), first, second
+
+    first_events, second_events, first, second = asyncio.run(scenario())
+
+    assert first_events[-1] == {"seq": 2, "event": "failed", "data": {"error": "Destination is required.", "status_code": 400}}
+    assert second_events[-1]["data"]["status_code"] == 500
+    assert manager.get(first["job_id"], "u1")["status"] == STATUS_FAILED
+    assert manager.get(second["job_id"], "u1")["error"] == "boom"
+
+
+def test_startup_fails_interrupted_jobs_and_prunes_old_ones():
+    store = RecommendationJobStore(":memory:")
+    interrupted = store.create("u1", "today", {})
+    old = store.create("u1", "today", {})
+    store.set_status(old["job_id"], STATUS_SUCCEEDED, result={"ok": True})
+    store._connect().execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 120, old["job_id"]))
+
+    RecommendationJobManager(store=store, retention_seconds=60).startup()
+
+    assert store.get(interrupted["job_id"])["status"] == STATUS_FAILED
+    assert store.get(old["job_id"]) is None
+
+
+def test_travel_plan_job_streams_its_stages(monkeypatch):
+    import routers.ai_outfit as ai_outfit
+
+    wardrobe = [
+        {"id": "top-1", "name": "White Tee", "type": "t-shirt", "category": "top", "color": "white", "is_clean": True},
+        {"id": "top-2", "name": "Navy Shirt", "type": "shirt", "category": "top", "color": "navy", "is_clean": True},
+        {"id": "pants-1", "name": "Blue Jeans", "type": "jeans", "category": "bottom", "color": "blue", "is_clean": True},
+        {"id": "shoes-1", "name": "White Sneakers", "type": "sneakers", "category": "shoes", "color": "white", "is_clean": True},
+    ]
+
+    async def get_user_wardrobe(**_kwargs):
+        return wardrobe
+
+    monkeypatch.setattr(ai_outfit.recommendation_service.wardrobe_service, "get_user_wardrobe", get_user_wardrobe)
+    manager = make_manager()
+    payload = {"destination": "Porto", "days": 2, "weather_by_day": [{"temp": 20, "condition": "sunny"}] * 2}
+
+    async def scenario():
+        job = manager.submit(
+            "u1",
+            "travel_plan",
+            payload,
+            ai_outfit._http_job(lambda report: ai_outfit.run_travel_plan("u1", payload, on_progress=report)),
+        )
+        return await collect(manager, job["job_id"])
+
+    events = asyncio.run(scenario())
+
+    assert [event["event"] for event in events] == [
+        "accepted", "forecast_fetched", "wardrobe_loaded", "day_selected", "day_selected", "result",
+    ]
+    assert events[1]["data"] == {"days": 2, "source": "request"}
+    assert [event["data"]["day"] for event in events[3:5]] == [1, 2]
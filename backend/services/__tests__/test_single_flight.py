@@ -0,0 +1,224 @@
+"""
+Tests for single-flight coalescing of concurrent identical calls.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.recommendation_cache import RecommendationResultCache
+from services.recommendation_service import RecommendationService
+from services.single_flight import SingleFlight
+from services.vlm_service import MockVLMService
+
+
+class SlowCall:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.started = 0
+        self.finished = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.finished += 1
+        return {"outfit": {"items": ["tee"]}}
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("k", call) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert call.started == 1
+    assert all(result == {"outfit": {"items": ["tee"]}} for result in results)
+    results[0]["outfit"]["items"].clear()
+    assert results[1]["outfit"]["items"] == ["tee"]
+    assert flight.get_stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4, "cancelled": 0}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+    call = SlowCall(delay=0.01)
+
+    async def scenario():
+        await asyncio.gather(flight.run("a", call), flight.run("b", call))
+        await flight.run("a", call)
+
+    asyncio.run(scenario())
+    assert call.started == 3
+
+
+def test_cancelled_waiter_keeps_shared_work_alive():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.run("k", call))
+        second = asyncio.ensure_future(flight.run("k", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result
+
+    assert asyncio.run(scenario()) == {"outfit": {"items": ["tee"]}}
+    assert (call.finished, call.cancelled) == (1, 0)
+
+
+def test_last_waiter_leaving_cancels_shared_work():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def scenario():
+        waiters = [asyncio.ensure_future(flight.run("k", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert (call.finished, call.cancelled) == (0, 1)
+    assert flight.get_stats()["cancelled"] == 1
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_retry_after_last_waiter_cancels_starts_fresh_run():
+    flight = SingleFlight()
+
+    async def slow_cleanup():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            # Cancellation cleanup that awaits keeps the task alive a while
+            await asyncio.sleep(0.02)
+            raise
+
+    async def quick():
+        return {"fresh": True}
+
+    async def scenario():
+        waiter = asyncio.ensure_future(flight.run("k", slow_cleanup))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return await flight.run("k", quick)
+
+    assert asyncio.run(scenario()) == {"fresh": True}
+    assert flight.get_stats()["leaders"] == 2
+    assert flight.get_stats()["coalesced"] == 0
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("ollama down")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flight.run("k", failing) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.leaders == 1
+
+
+def test_service_coalesces_concurrent_daily_requests():
+    service = RecommendationService(
+        vlm_service=MockVLMService(),
+        result_cache=RecommendationResultCache(ttl_seconds=0, max_entries=8),
+    )
+    calls = []
+
+    async def generate(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.02)
+        return {"success": True, "outfit": {"items": []}}
+
+    service._generate_daily_outfit = generate
+    request = {"user_id": "u1", "temperature": 18, "weather_condition": "sunny", "user_request": "look desportivo"}
+
+    async def scenario():
+        await asyncio.gather(
+            service.recommend_daily_outfit(**request),
+            service.recommend_daily_outfit(**request),
+            service.recommend_daily_outfit(**{**request, "user_request": "outfit formal"}),
+        )
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_progress_reaches_every_waiter_including_late_joiners():
+    flight = SingleFlight()
+
+    async def work(emit):
+        emit("intent_parsed", {"n": 1})
+        await asyncio.sleep(0.02)
+        emit("llava_selected", {"n": 2})
+        return {"ok": True}
+
+    leader_events, joiner_events = [], []
+
+    async def scenario():
+        leader = asyncio.ensure_future(
+            flight.run_with_progress("k", work, lambda event, _data: leader_events.append(event))
+        )
+        await asyncio.sleep(0.01)
+        joiner = flight.run_with_progress("k", work, lambda event, _data: joiner_events.append(event))
+        return await asyncio.gather(leader, joiner)
+
+    assert asyncio.run(scenario()) == [{"ok": True}, {"ok": True}]
+    assert leader_events == joiner_events == ["intent_parsed", "llava_selected"]
+    assert flight.get_stats()["leaders"] == 1
+
+
+def test_service_fans_out_progress_and_keys_on_latency_budget():
+    service = RecommendationService(
+        vlm_service=MockVLMService(),
+        result_cache=RecommendationResultCache(ttl_seconds=0, max_entries=8),
+    )
+    calls = []
+
+    async def generate(**kwargs):
+        calls.append(kwargs["latency_budget_seconds"])
+        kwargs["on_progress"]("intent_parsed", {})
+        await asyncio.sleep(0.02)
+        kwargs["on_progress"]("llava_selected", {})
+        return {"success": True, "outfit": {"items": []}}
+
+    service._generate_daily_outfit = generate
+    request = {"user_id": "u1", "temperature": 18, "weather_condition": "sunny"}
+    events = {"first": [], "second": []}
+
+    async def scenario():
+        await asyncio.gather(
+            service.recommend_daily_outfit(**request, on_progress=lambda e, _d: events["first"].append(e)),
+            service.recommend_daily_outfit(**request, on_progress=lambda e, _d: events["second"].append(e)),
+            service.recommend_daily_outfit(**request, latency_budget_seconds=0.5),
+        )
+
+    asyncio.run(scenario())
+    assert sorted(calls, key=str) == [0.5, None]
+    assert events["first"] == events["second"] == ["intent_parsed", "llava_selected"]
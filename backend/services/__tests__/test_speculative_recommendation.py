@@ -0,0 +1,176 @@
+"""
+Tests for speculative daily recommendations and the refinement registry.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.recommendation_cache import SPECULATIVE_MODEL, RecommendationResultCache
+from services.recommendation_service import RecommendationService
+from services.refinement_registry import (
+    STATUS_FAILED,
+    STATUS_PENDING,
+    STATUS_READY,
+    RefinementRegistry,
+)
+from services.vlm_service import MockVLMService
+
+
+WARDROBE = [
+    {"id": "tee", "name": "Blue Tee", "type": "t-shirt"},
+    {"id": "jeans", "name": "Black Jeans", "type": "jeans"},
+    {"id": "shirt", "name": "White Shirt", "type": "shirt"},
+    {"id": "chinos", "name": "Beige Chinos", "type": "pants"},
+]
+
+CANDIDATES = [
+    {
+        "candidate_id": "c1",
+        "score": 0.9,
+        "item_ids": ["tee", "jeans"],
+        "items": [{"id": "tee", "name": "Blue Tee", "section": "base_layer"}, {"id": "jeans", "name": "Black Jeans", "section": "pants"}],
+    },
+    {
+        "candidate_id": "c2",
+        "score": 0.7,
+        "item_ids": ["shirt", "chinos"],
+        "items": [{"id": "shirt", "name": "White Shirt", "section": "base_layer"}, {"id": "chinos", "name": "Beige Chinos", "section": "pants"}],
+    },
+]
+
+
+def make_service(llava_delay, registry=None, latency_budget_seconds=0.0):
+    service = RecommendationService(
+        vlm_service=MockVLMService(),
+        result_cache=RecommendationResultCache(ttl_seconds=60, max_entries=8),
+        refinements=registry or RefinementRegistry(ttl_seconds=60, max_entries=8),
+        latency_budget_seconds=latency_budget_seconds,
+    )
+
+    async def get_user_wardrobe(**_kwargs):
+        return [dict(item) for item in WARDROBE]
+
+    async def select_best_candidate_with_llava(candidates, **_kwargs):
+        await asyncio.sleep(llava_delay)
+        chosen = candidates[1]
+        return {
+            "candidate": chosen,
+            "selected_candidate_id": chosen["candidate_id"],
+            "reasoning": "LLaVA pick",
+            "model_used": "llava_candidate_selection",
+            "selection_reason": "llava_selected",
+        }
+
+    service.wardrobe_service.get_user_wardrobe = get_user_wardrobe
+    service.candidate_outfit_service.generate_candidate_outfits = lambda **_kwargs: {
+        "success": True,
+        "candidates": CANDIDATES,
+    }
+    service._prepare_candidates_for_llava = lambda candidates, **_kwargs: candidates
+    service.select_best_candidate_with_llava = select_best_candidate_with_llava
+    return service
+
+
+REQUEST = {"user_id": "u1", "temperature": 18, "weather_condition": "sunny"}
+
+
+def test_without_budget_waits_for_llava():
+    service = make_service(llava_delay=0.01)
+
+    result = asyncio.run(service.recommend_daily_outfit(**REQUEST))
+
+    assert result["model_used"] == "llava_candidate_selection"
+    assert "refinement" not in result
+    assert [item["id"] for item in result["outfit"]["items"]] == ["shirt", "chinos"]
+
+
+def test_budget_returns_top_scored_candidate_and_refines_in_background():
+    registry = RefinementRegistry(ttl_seconds=60, max_entries=8)
+    service = make_service(llava_delay=0.05, registry=registry)
+
+    async def scenario():
+        result = await service.recommend_daily_outfit(**REQUEST, latency_budget_seconds=0.005)
+        token = result["refinement"]["token"]
+        pending = registry.status(token, "u1")
+        final = await registry.wait(token, "u1", timeout=1)
+        return result, pending, final
+
+    result, pending, final = asyncio.run(scenario())
+
+    assert result["model_used"] == SPECULATIVE_MODEL
+    assert result["refinement"]["status"] == STATUS_PENDING
+    assert [item["id"] for item in result["outfit"]["items"]] == ["tee", "jeans"]
+    assert pending["status"] == STATUS_PENDING
+    assert final["status"] == STATUS_READY
+    assert final["result"]["model_used"] == "llava_candidate_selection"
+    assert final["context"]["speculative_item_ids"] == ["tee", "jeans"]
+    assert registry.status(result["refinement"]["token"], "someone-else") is None
+
+
+def test_speculative_results_are_not_cached():
+    service = make_service(llava_delay=0.05, latency_budget_seconds=0.005)
+
+    async def scenario():
+        first = await service.recommend_daily_outfit(**REQUEST)
+        second = await service.recommend_daily_outfit(**REQUEST)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["refinement"]["token"] != second["refinement"]["token"]
+    assert service.result_cache.get_stats()["stores"] == 0
+
+
+def test_completed_refinement_is_cached_for_identical_requests():
+    registry = RefinementRegistry(ttl_seconds=60, max_entries=8)
+    service = make_service(llava_delay=0.05, registry=registry, latency_budget_seconds=0.005)
+
+    async def scenario():
+        first = await service.recommend_daily_outfit(**REQUEST)
+        await registry.wait(first["refinement"]["token"], "u1", timeout=1)
+        second = await service.recommend_daily_outfit(**REQUEST)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["model_used"] == SPECULATIVE_MODEL
+    assert second["model_used"] == "llava_candidate_selection"
+    assert "refinement" not in second
+    assert [item["id"] for item in second["outfit"]["items"]] == ["shirt", "chinos"]
+    assert service.result_cache.get_stats()["hits"] == 1
+    assert registry.get_stats()["registered"] == 1
+
+
+def test_registry_reports_failures_and_expires_tokens():
+    registry = RefinementRegistry(ttl_seconds=0.02, max_entries=8)
+
+    async def failing():
+        raise RuntimeError("ollama down")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def scenario():
+        failed = asyncio.ensure_future(failing())
+        failed_token = registry.register("u1", failed)
+        await asyncio.wait({failed})
+        failed_status = registry.status(failed_token, "u1")
+
+        pending = asyncio.ensure_future(slow())
+        pending_token = registry.register("u1", pending)
+        await asyncio.sleep(0.03)
+        expired_status = registry.status(pending_token, "u1")
+        await asyncio.sleep(0)
+        return failed_status, expired_status, pending
+
+    failed_status, expired_status, pending = asyncio.run(scenario())
+    assert failed_status["status"] == STATUS_FAILED
+    assert "ollama down" in failed_status["error"]
+    assert expired_status is None
+    assert pending.cancelled()
+    assert registry.get_stats()["expired"] == 2
@@ -0,0 +1,66 @@
+"""
+Tests for the application-scoped Supabase client registry.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from fastapi import HTTPException
+
+import database
+from database import SupabaseClientRegistry
+
+
+def test_clients_are_built_once_and_share_a_pooled_session():
+    registry = SupabaseClientRegistry("http://localhost", "anon-key", "service-key")
+    admin = registry.admin()
+
+    assert registry.admin() is admin
+    assert registry.anon() is not admin
+    session = registry._http_clients["admin"]
+    assert admin.postgrest.session is session
+    assert admin.storage._client is session
+    assert registry._http_clients["anon"] is not session
+    registry.close()
+    assert session.is_closed
+
+
+def test_admin_requires_service_key():
+    registry = SupabaseClientRegistry("http://localhost", "anon-key")
+    assert not registry.has_admin
+    with pytest.raises(RuntimeError):
+        registry.admin()
+    registry.startup()
+    assert registry.get_stats()["clients"] == ["anon"]
+    registry.close()
+
+
+def test_admin_dependency_returns_shared_client(monkeypatch):
+    registry = SupabaseClientRegistry("http://localhost", "anon-key", "service-key")
+    monkeypatch.setattr(database, "supabase_clients", registry)
+    assert database.get_admin_client() is database.get_admin_client()
+    registry.close()
+
+    monkeypatch.setattr(database, "supabase_clients", SupabaseClientRegistry("http://localhost", "anon-key"))
+    with pytest.raises(HTTPException) as excinfo:
+        database.get_admin_client()
+    assert excinfo.value.status_code == 500
+
+
+def test_older_supabase_without_httpx_client_option_still_builds_clients(monkeypatch):
+    monkeypatch.setattr(database, "SHARED_HTTP_CLIENT_SUPPORTED", False)
+    registry = SupabaseClientRegistry("http://localhost", "anon-key", "service-key")
+
+    admin = registry.admin()
+
+    assert registry.admin() is admin
+    assert registry._http_clients == {}
+    assert registry.get_stats()["shared_http_client"] is False
+    registry.close()
@@ -0,0 +1,130 @@
+"""
+Tests for the content-addressed VLM thumbnail cache.
+"""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from PIL import Image
+
+from services.image_preprocessing_service import ImagePreprocessingService
+from services.thumbnail_cache import ThumbnailCache, decode_data_uri
+
+
+def png_bytes(size=(1600, 1200), color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def decoded_size(data_uri):
+    with Image.open(io.BytesIO(decode_data_uri(data_uri))) as image:
+        return image.format, image.size
+
+
+def test_put_resizes_and_indexes_remote_refs(tmp_path):
+    cache = ThumbnailCache(directory=str(tmp_path), max_side=256, quality=80, enabled=True)
+    source = png_bytes()
+
+    data_uri = cache.put("https://cdn.example/shirt.png", source)
+
+    assert data_uri.startswith("data:image/jpeg;base64,")
+    assert decoded_size(data_uri) == ("JPEG", (256, 192))
+    assert len(decode_data_uri(data_uri)) < len(source)
+    assert cache.lookup("https://cdn.example/shirt.png") == data_uri
+    assert cache.lookup("https://cdn.example/other.png") is None
+
+    # A fresh instance (e.g. after a restart) reads the index from disk.
+    reopened = ThumbnailCache(directory=str(tmp_path), max_side=256, quality=80, enabled=True)
+    assert reopened.lookup("https://cdn.example/shirt.png") == data_uri
+
+
+def test_same_content_is_stored_once(tmp_path):
+    cache = ThumbnailCache(directory=str(tmp_path), max_side=256, enabled=True)
+    source = png_bytes()
+
+    cache.put("https://a.example/1.png", source)
+    cache.put("https://b.example/2.png", source)
+    cache.put(None, source)
+
+    assert len(cache._thumbnail_files()) == 1
+    assert cache.get_stats()["thumbnail_bytes_written"] > 0
+
+
+def test_eviction_keeps_disk_usage_bounded(tmp_path):
+    cache = ThumbnailCache(directory=str(tmp_path), max_side=128, enabled=True)
+    single = len(decode_data_uri(cache.put(None, png_bytes(color=(0, 0, 0)))))
+    cache.clear()
+    cache.max_bytes = single * 3
+
+    for shade in range(8):
+        cache.put(f"https://cdn.example/{shade}.png", png_bytes(color=(shade * 30, 10, 10)))
+
+    assert cache._scan_disk_bytes() <= cache.max_bytes
+    assert cache.get_stats()["evictions"] > 0
+    assert cache.lookup("https://cdn.example/7.png") is not None
+
+
+def test_undecodable_and_disabled(tmp_path):
+    cache = ThumbnailCache(directory=str(tmp_path), enabled=True)
+    assert cache.put("https://cdn.example/x.png", b"not an image") is None
+
+    disabled = ThumbnailCache(directory=str(tmp_path), enabled=False)
+    assert disabled.put("https://cdn.example/y.png", png_bytes()) is None
+    assert disabled.lookup("https://cdn.example/y.png") is None
+
+
+def test_preprocessing_serves_resized_local_and_data_uri_images(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "jacket.png").write_bytes(png_bytes())
+    data_uri = "data:image/png;base64," + base64.b64encode(png_bytes(color=(1, 2, 3))).decode("ascii")
+
+    cache = ThumbnailCache(directory=str(tmp_path / "thumbs"), max_side=200, enabled=True)
+    service = ImagePreprocessingService({"thumbnail_cache": cache})
+
+    results = asyncio.run(
+        service.preprocess_images(["/uploads/jacket.png", data_uri], return_format="data_uri")
+    )
+
+    assert [decoded_size(result) for result in results] == [("JPEG", (200, 150))] * 2
+
+
+def test_references_are_counted_and_removed_with_their_thumbnail(tmp_path):
+    cache = ThumbnailCache(directory=str(tmp_path), max_side=128, enabled=True)
+    single = len(decode_data_uri(cache.put(None, png_bytes(color=(0, 0, 0)))))
+    cache.clear()
+    cache.max_bytes = single * 3
+
+    for shade in range(8):
+        source = png_bytes(color=(shade * 30, 10, 10))
+        for mirror in range(3):
+            cache.put(f"https://cdn{mirror}.example/{shade}.png", source)
+
+    thumbnail_keys = {os.path.basename(path)[:-4] for path in cache._thumbnail_files()}
+    ref_keys = [cache._read_ref(path) for path in cache._ref_files()]
+    assert set(ref_keys) == thumbnail_keys
+    assert len(ref_keys) == 3 * len(thumbnail_keys)
+    assert cache.get_stats()["disk_bytes"] == cache._scan_disk_bytes() <= cache.max_bytes
+
+
+def test_reference_to_missing_thumbnail_is_dropped(tmp_path):
+    cache = ThumbnailCache(directory=str(tmp_path), max_side=128, enabled=True)
+    url = "https://cdn.example/shirt.png"
+    cache.put(url, png_bytes())
+    for path in cache._thumbnail_files():
+        os.remove(path)
+
+    # Served from memory until the file check, then from disk
+    assert cache.lookup(url) is None
+    assert cache.lookup(url) is None
+    assert cache._ref_files() == []
+    assert cache.get_stats()["misses"] == 2
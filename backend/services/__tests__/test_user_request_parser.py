@@ -1,4 +1,6 @@
 import os
+import random
+import re
 import sys
 from pathlib import Path
 
@@ -6,7 +8,16 @@ os.environ.setdefault("SUPABASE_URL", "http://localhost")
 os.environ.setdefault("SUPABASE_KEY", "test")
 sys.path.insert(0, str(Path(__file__).parents[2]))
 
-from services.user_request_parser import UserRequestParser, parse_user_intent
+import pytest
+
+from services.user_request_parser import (
+    ParsedRequestCache,
+    UserRequestParser,
+    VocabularyMatcher,
+    intent_signature,
+    normalize_text,
+    parse_user_intent,
+)
 
 
 def test_parse_user_intent_detects_yellow_sneakers_with_accents():
@@ -89,6 +100,79 @@ def test_generic_intent_parser_examples():
     assert avoid_black["mode"] == "avoid_piece"
 
 
+def _regex_values(text, mapping):
+    """Reference: one word-boundary regex per alias, longest alias first."""
+    found = []
+    for alias in sorted(mapping, key=len, reverse=True):
+        if re.search(r"\b" + re.escape(normalize_text(alias)) + r"\b", text):
+            if mapping[alias] not in found:
+                found.append(mapping[alias])
+    return found
+
+
+def test_vocabulary_matcher_finds_overlapping_whole_words():
+    matcher = VocabularyMatcher({"type": ["t-shirt", "shirt", "calça", "calças"]})
+
+    assert matcher.scan("uma t-shirt e calcas")["type"] == {"t-shirt", "shirt", "calças"}
+    assert matcher.scan("tshirts calcado")["type"] == set()
+
+
+def test_compiled_matcher_matches_per_alias_regex():
+    parser = UserRequestParser()
+    rng = random.Random(4)
+    words = (
+        list(UserRequestParser.COLOR_MAPPINGS)
+        + list(UserRequestParser.TYPE_MAPPINGS)
+        + ["com", "sem", "e", "-", "t-shirt", "para", "x"]
+    )
+    for _ in range(300):
+        text = normalize_text(" ".join(rng.choice(words) for _ in range(rng.randint(1, 6))))
+        matches = parser._compiled.matcher.scan(text)
+        assert parser._mapped_values(matches, "color") == _regex_values(
+            text, UserRequestParser.COLOR_MAPPINGS
+        )
+        assert parser._mapped_values(matches, "type") == _regex_values(
+            text, UserRequestParser.TYPE_MAPPINGS
+        )
+
+
+def test_parse_request_is_memoized_and_returns_independent_copies():
+    cache = ParsedRequestCache(max_entries=2)
+    parser = UserRequestParser(cache=cache)
+
+    first = parser.parse_request("outfit com sapatilhas amarelas")
+    first["style"] = ["formal"]
+    first["must_include_items"].append({"type": "bag"})
+    second = parser.parse_request("outfit com sapatilhas amarelas")
+
+    assert cache.get_stats()["hits"] == 1
+    assert "style" not in second
+    assert second["must_include_items"] == [{"type": "sneakers", "color": "yellow"}]
+
+    frozen = parser.parse_request_frozen("outfit com sapatilhas amarelas")
+    with pytest.raises(TypeError):
+        frozen["mode"] = "keep_piece"
+    assert isinstance(frozen["must_include_items"], tuple)
+
+    parser.parse_request("outfit formal")
+    parser.parse_request("look desportivo")
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_intent_signature_ignores_wording_but_not_meaning():
+    parser = UserRequestParser(cache=ParsedRequestCache())
+    work_yellow = parser.request_signature("outfit para o trabalho com sapatilhas amarelas")
+
+    assert parser.request_signature("Look para TRABALHO:   sapatilhas amarelas") == work_yellow
+    assert parser.request_signature("outfit para o trabalho com sapatilhas pretas") != work_yellow
+    assert parser.request_signature("não quero sapatilhas amarelas para o trabalho") != work_yellow
+
+    adjusted = parser.parse_request("outfit para o trabalho com sapatilhas amarelas")
+    assert intent_signature(adjusted) == work_yellow
+    adjusted["style"] = ["formal"]
+    assert intent_signature(adjusted) != work_yellow
+
+
 if __name__ == "__main__":
     test_parse_user_intent_detects_yellow_sneakers_with_accents()
     test_parse_user_intent_detects_style()
@@ -0,0 +1,132 @@
+"""
+Tests for the VLM admission scheduler.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.vlm_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    VLMAdmissionScheduler,
+    VLMQueueFullError,
+    VLMQueueTimeoutError,
+    vlm_priority,
+)
+from services.vlm_service import LLaVAService
+
+
+async def hold(scheduler, label, order, delay=0.02, priority=None):
+    async with scheduler.slot(priority):
+        order.append(label)
+        await asyncio.sleep(delay)
+
+
+def test_limits_concurrency():
+    scheduler = VLMAdmissionScheduler(max_in_flight=2, max_queue=10, queue_timeout=5)
+    active = []
+    peak = []
+
+    async def call():
+        async with scheduler.slot():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert max(peak) == 2
+    stats = scheduler.get_stats()
+    assert (stats["admitted"], stats["queued"], stats["in_flight"], stats["queue_depth"]) == (6, 4, 0, 0)
+
+
+def test_interactive_requests_are_admitted_before_batch():
+    scheduler = VLMAdmissionScheduler(max_in_flight=1, max_queue=10, queue_timeout=5)
+    order = []
+
+    async def scenario():
+        first = asyncio.ensure_future(hold(scheduler, "first", order))
+        await asyncio.sleep(0)
+        with vlm_priority(PRIORITY_BATCH):
+            batch = asyncio.ensure_future(hold(scheduler, "travel", order))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(hold(scheduler, "today", order))
+        await asyncio.gather(first, batch, interactive)
+
+    asyncio.run(scenario())
+    assert order == ["first", "today", "travel"]
+
+
+def test_full_queue_rejects_immediately():
+    scheduler = VLMAdmissionScheduler(max_in_flight=1, max_queue=1, queue_timeout=5)
+    order = []
+
+    async def scenario():
+        running = asyncio.ensure_future(hold(scheduler, "a", order, delay=0.05))
+        queued = asyncio.ensure_future(hold(scheduler, "b", order))
+        await asyncio.sleep(0)
+        with pytest.raises(VLMQueueFullError):
+            await hold(scheduler, "c", order, priority=PRIORITY_INTERACTIVE)
+        await asyncio.gather(running, queued)
+
+    asyncio.run(scenario())
+    assert order == ["a", "b"]
+    assert scheduler.get_stats()["rejected_full"] == 1
+
+
+def test_queue_deadline_and_cancelled_waiters_free_their_place():
+    scheduler = VLMAdmissionScheduler(max_in_flight=1, max_queue=4, queue_timeout=0.02)
+    order = []
+
+    async def scenario():
+        running = asyncio.ensure_future(hold(scheduler, "a", order, delay=0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(VLMQueueTimeoutError):
+            await hold(scheduler, "late", order)
+        cancelled = asyncio.ensure_future(hold(scheduler, "gone", order))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        await running
+        await hold(scheduler, "next", order)
+
+    asyncio.run(scenario())
+    assert order == ["a", "next"]
+    stats = scheduler.get_stats()
+    assert (stats["timed_out"], stats["in_flight"], stats["queue_depth"]) == (1, 0, 0)
+
+
+def test_llava_call_is_rejected_without_reaching_backend():
+    service = LLaVAService()
+    service.scheduler = VLMAdmissionScheduler(max_in_flight=1, max_queue=0, queue_timeout=1)
+    posted = []
+
+    async def post(payload, headers, usage=None):
+        posted.append(payload)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    service._post_llava_request = post
+
+    async def scenario():
+        return await asyncio.gather(
+            service._call_llava_api("prompt", []),
+            service._call_llava_api("prompt", []),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert results[0] == "ok"
+    assert isinstance(results[1], VLMQueueFullError)
+    assert len(posted) == 1
@@ -0,0 +1,172 @@
+"""
+Tests for schema-constrained LLaVA calls (candidate selection and travel).
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.recommendation_service import RecommendationService
+from services.vlm_service import LLaVAService, MockVLMService, VLMResponse
+from services.vlm_structured import (
+    CandidateSelectionOutput,
+    TravelCapsuleOutput,
+    StructuredOutputStats,
+    apply_response_schema,
+    parse_structured,
+    response_schema,
+)
+import services.vlm_service as vlm_module
+
+
+def fake_llava(replies):
+    service = LLaVAService()
+    calls = []
+
+    async def call(prompt, image_urls, schema=None, usage=None):
+        calls.append(schema)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    service._call_llava_api = call
+    service._call_llava_selection = call
+    return service, calls
+
+
+def test_schema_restricts_ids_and_matches_endpoint_dialect():
+    schema = response_schema(CandidateSelectionOutput, ["c1", "c2"])
+    assert schema["properties"]["selected_candidate"]["enum"] == ["c1", "c2"]
+    assert set(schema["required"]) == {"selected_candidate", "confidence"}
+
+    travel = response_schema(TravelCapsuleOutput, ["ITEM_1"])
+    assert travel["properties"]["items"]["items"] == {"type": "string", "enum": ["ITEM_1"]}
+
+    native = apply_response_schema({}, "http://localhost:11434/api/chat", "outfit_response", schema)
+    assert native == {"format": schema}
+    openai = apply_response_schema({}, "http://localhost:11434/v1/chat/completions", "outfit_response", schema)
+    assert openai["response_format"]["type"] == "json_schema"
+    assert openai["response_format"]["json_schema"]["schema"] == schema
+
+
+def test_parse_structured_validates_types_and_ids():
+    ok = parse_structured(CandidateSelectionOutput, '{"selected_candidate": "c2", "confidence": 0.8}', ["c1", "c2"])
+    assert ok == CandidateSelectionOutput(selected_candidate="c2", confidence=0.8)
+
+    assert parse_structured(CandidateSelectionOutput, '{"selected_candidate": "c9", "confidence": 0.8}', ["c1"]) is None
+    assert parse_structured(CandidateSelectionOutput, '{"selected_candidate": "c1", "confidence": 3}') is None
+    assert parse_structured(CandidateSelectionOutput, "Escolho o c1.") is None
+    assert parse_structured(TravelCapsuleOutput, '{"items": []}') is None
+
+
+def test_candidate_selection_reply_is_validated_into_typed_result(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vlm_module, "structured_output_stats", StructuredOutputStats())
+    service, calls = fake_llava([
+        '{"selected_candidate": "c2", "reasoning": "Mais formal.", "confidence": 0.9}',
+        "Escolho o candidato c2.",
+    ])
+    context = {"mode": "candidate_selection", "candidate_ids": ["c1", "c2"]}
+
+    first = asyncio.run(service.recommend_outfit([], {}, user_context=context, prompt_template="p"))
+    second = asyncio.run(service.recommend_outfit([], {}, user_context=context, prompt_template="p"))
+
+    assert calls[0]["properties"]["selected_candidate"]["enum"] == ["c1", "c2"]
+    assert first.structured.selected_candidate == "c2"
+    assert second.structured is None
+    assert vlm_module.structured_output_stats.get_stats() == {
+        "candidate_selection": {"requests": 2, "validated": 1, "invalid": 1}
+    }
+
+
+def test_rejected_schema_is_retried_without_it(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service, calls = fake_llava([
+        Exception("HTTP 400: unknown field response_format"),
+        '{"selected_candidate": "c1", "confidence": 0.7}',
+    ])
+    context = {"mode": "candidate_selection", "candidate_ids": ["c1"]}
+
+    response = asyncio.run(service.recommend_outfit([], {}, user_context=context, prompt_template="p"))
+
+    assert calls[0] is not None and calls[1] is None
+    assert response.success is True
+    assert response.structured is None
+
+
+def test_travel_capsule_uses_structured_item_aliases():
+    service, calls = fake_llava(['{"items": ["ITEM_3", "ITEM_1", "ITEM_3"], "reasoning": "Leve e versátil."}'])
+
+    async def no_images(_urls):
+        return []
+
+    service._images_to_data_uris = no_images
+    wardrobe = [{"id": f"id-{n}", "name": f"Peça {n}", "type": "shirt", "image_url": f"http://img/{n}"} for n in range(1, 5)]
+
+    responses = asyncio.run(service.recommend_travel_outfits(wardrobe, [{"temperature": 15}], num_days=2))
+
+    assert calls[0]["properties"]["items"]["items"]["enum"] == ["ITEM_1", "ITEM_2", "ITEM_3", "ITEM_4"]
+    assert [response.outfit_items for response in responses] == [["id-3", "id-1"], ["id-3", "id-1"]]
+    assert responses[0].reasoning == "Leve e versátil."
+
+
+def test_recommendation_service_uses_structured_selection_without_text_parsing():
+    class StructuredVLM(MockVLMService):
+        async def recommend_outfit(self, wardrobe_items, weather_context, user_context=None, prompt_template=None):
+            self.user_context = user_context
+            return VLMResponse(
+                success=True,
+                metadata={"raw_response": "not json"},
+                structured=CandidateSelectionOutput(selected_candidate="c2", reasoning="Pedido formal.", confidence=0.9),
+            )
+
+    def parse_text(_text):
+        raise AssertionError("free-text parsing should be skipped")
+
+    vlm = StructuredVLM()
+    service = RecommendationService(vlm_service=vlm)
+    service._parse_candidate_selection_json = parse_text
+    candidates = [
+        {"candidate_id": "c1", "score": 80, "items": [{"id": "a"}]},
+        {"candidate_id": "c2", "score": 75, "items": [{"id": "b"}]},
+    ]
+
+    result = asyncio.run(service.select_best_candidate_with_llava(candidates, [], "formal", {}))
+
+    assert vlm.user_context["candidate_ids"] == ["c1", "c2"]
+    assert result["selection_reason"] == "llava_selected"
+    assert result["selected_candidate_id"] == "c2"
+    assert result["reasoning"] == "Pedido formal."
+    assert result["confidence"] == 0.9
+
+
+def test_only_sent_images_are_fetched_in_one_concurrent_batch():
+    class RecordingPreprocessor:
+        def __init__(self):
+            self.batches = []
+
+        async def preprocess_images(self, image_urls, return_format="url"):
+            self.batches.append(list(image_urls))
+            return [f"data:image/jpeg;base64,{url[-1]}" for url in image_urls]
+
+    preprocessor = RecordingPreprocessor()
+    service = LLaVAService({"image_preprocessor": preprocessor})
+    sent = []
+
+    async def call(prompt, image_urls, schema=None, usage=None):
+        sent.append(image_urls)
+        return '{"items": ["ITEM_1"], "reasoning": "ok"}'
+
+    service._call_llava_api = call
+    wardrobe = [{"id": f"id-{n}", "name": f"Peça {n}", "type": "shirt", "image_url": f"http://img/{n}"} for n in range(1, 10)]
+
+    asyncio.run(service.recommend_travel_outfits(wardrobe, [{"temperature": 15}], num_days=1))
+
+    assert preprocessor.batches == [[f"http://img/{n}" for n in range(1, 5)]]
+    assert sent[0] == [f"data:image/jpeg;base64,{n}" for n in range(1, 5)]
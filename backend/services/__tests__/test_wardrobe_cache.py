@@ -0,0 +1,117 @@
+"""
+Tests for the per-user wardrobe snapshot cache.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from services.wardrobe_cache import WardrobeSnapshotCache
+from services.wardrobe_service import WardrobeService
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def select(self, *_args, **_kwargs):
+        return self
+
+    def eq(self, *_args, **_kwargs):
+        return self
+
+    def execute(self):
+        self.client.executions += 1
+        return SimpleNamespace(data=[dict(row) for row in self.client.rows])
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executions = 0
+
+    def table(self, _name):
+        return FakeQuery(self)
+
+
+def make_service(rows, cache=None):
+    service = WardrobeService(snapshot_cache=cache or WardrobeSnapshotCache(ttl_seconds=60, max_users=8))
+    service.supabase = FakeSupabase(rows)
+    return service
+
+
+ROWS = [
+    {"id": "tee", "user_id": "u1", "name": "Blue Tee", "type": "t-shirt", "color": "blue", "status": "clean"},
+    {"id": "jeans", "user_id": "u1", "name": "Black Jeans", "type": "jeans", "color": "black", "status": "dirty"},
+    {"id": "shoes", "user_id": "u1", "name": "White Sneakers", "type": "sneakers", "color": "white", "status": "clean"},
+]
+
+
+def test_views_are_derived_from_one_fetch():
+    service = make_service(ROWS)
+
+    all_items = asyncio.run(service.get_user_wardrobe("u1", only_clean=False))
+    clean_items = asyncio.run(service.get_user_wardrobe("u1", only_clean=True))
+    clean_without_shoes = asyncio.run(
+        service.get_user_wardrobe("u1", only_clean=True, exclude_item_ids=["shoes"])
+    )
+
+    assert service.supabase.executions == 1
+    assert [item["id"] for item in all_items] == ["tee", "jeans", "shoes"]
+    assert [item["id"] for item in clean_items] == ["tee", "shoes"]
+    assert [item["id"] for item in clean_without_shoes] == ["tee"]
+
+
+def test_returned_items_do_not_mutate_snapshot():
+    service = make_service(ROWS)
+
+    first = asyncio.run(service.get_user_wardrobe("u1", only_clean=False))
+    first[0]["score"] = 99
+    second = asyncio.run(service.get_user_wardrobe("u1", only_clean=False))
+
+    assert "score" not in second[0]
+
+
+def test_invalidation_forces_refetch():
+    cache = WardrobeSnapshotCache(ttl_seconds=60, max_users=8)
+    service = make_service(ROWS, cache)
+
+    asyncio.run(service.get_user_wardrobe("u1", only_clean=False))
+    cache.invalidate("u1")
+    service.supabase.rows = ROWS[:1]
+    items = asyncio.run(service.get_user_wardrobe("u1", only_clean=False))
+
+    assert service.supabase.executions == 2
+    assert [item["id"] for item in items] == ["tee"]
+
+
+def test_snapshot_fetched_before_invalidation_is_not_stored():
+    cache = WardrobeSnapshotCache(ttl_seconds=60, max_users=8)
+    version = cache.version("u1")
+    cache.invalidate("u1")
+
+    assert cache.put("u1", [], version) is None
+    assert cache.get("u1") is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = WardrobeSnapshotCache(ttl_seconds=60, max_users=2)
+    cache.put("a", [], 0)
+    cache.put("b", [], 0)
+    assert cache.get("a") is not None
+    cache.put("c", [], 0)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+    expired = WardrobeSnapshotCache(ttl_seconds=0.0001, max_users=2)
+    snapshot = expired.put("a", [], 0)
+    snapshot.fetched_at -= 1
+    assert expired.get("a") is None
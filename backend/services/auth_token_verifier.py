@@ -0,0 +1,297 @@
+"""
+Auth Token Verifier
+
+Local verification of Supabase access tokens with a token -> user cache.
+
+get_user_from_token used to call Supabase Auth (supabase.auth.get_user) on
+every authenticated request, and some handlers resolve the user more than
+once. Supabase access tokens are JWTs, so most requests can be verified on
+this process instead:
+
+1. The SHA-256 of the token is looked up in a bounded LRU cache; entries
+   live until the token's own `exp`.
+2. On a miss the JWT is verified locally: HS256 with SUPABASE_JWT_SECRET,
+   or RS256/ES256 with the project's JWKS (fetched once and cached by
+   PyJWT). Signature, expiry and audience are checked.
+3. Only when the token cannot be checked locally (no secret configured,
+   unknown key id, JWKS unreachable, PyJWT missing) does it fall back to
+   the remote get_user call, whose result is cached the same way.
+
+Locally verified users are returned as a UserResponse built from the token
+claims (id, email, user_metadata, app_metadata, role), the same `.user`
+shape the routers read; user_metadata is the copy embedded in the token
+when it was issued. A revoked session stays valid here until its token
+expires (tokens are short lived; set AUTH_LOCAL_VERIFICATION=false to
+always ask Supabase).
+
+Environment Variables:
+- AUTH_LOCAL_VERIFICATION: Verify JWTs locally (default true)
+- SUPABASE_JWT_SECRET: HS256 secret of the project (legacy JWT secret)
+- AUTH_JWKS_URL: JWKS endpoint (default <SUPABASE_URL>/auth/v1/.well-known/jwks.json)
+- AUTH_JWT_AUDIENCE: Expected `aud` claim (default authenticated)
+- AUTH_TOKEN_CACHE_MAX: Maximum cached tokens (default 2048)
+- AUTH_REMOTE_CACHE_SECONDS: Max lifetime of a remotely resolved user (default 300)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import jwt
+except ImportError:  # pragma: no cover - PyJWT ships with supabase-auth
+    jwt = None
+
+try:
+    from supabase_auth.types import User, UserResponse
+except ImportError:  # pragma: no cover - older supabase-py releases
+    try:
+        from gotrue.types import User, UserResponse
+    except ImportError:
+        User = UserResponse = None
+
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class TokenNotVerifiable(Exception):
+    """The token cannot be checked locally; ask Supabase Auth instead."""
+
+
+class AuthTokenVerifier:
+    """
+    Resolves bearer tokens to users: cache, then local JWT check, then remote.
+    """
+
+    DEFAULT_CACHE_MAX = 2048
+    DEFAULT_REMOTE_CACHE_SECONDS = 300.0
+    DEFAULT_AUDIENCE = "authenticated"
+    LEEWAY_SECONDS = 5
+    JWKS_TIMEOUT_SECONDS = 5
+    JWKS_RETRY_SECONDS = 60.0
+
+    def __init__(
+        self,
+        jwt_secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: Optional[str] = None,
+        local_verification: Optional[bool] = None,
+        cache_max: Optional[int] = None,
+        remote_cache_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the verifier.
+
+        Args:
+            jwt_secret: HS256 secret (SUPABASE_JWT_SECRET)
+            jwks_url: JWKS endpoint for asymmetric keys (AUTH_JWKS_URL)
+            audience: Expected audience (AUTH_JWT_AUDIENCE)
+            local_verification: Verify JWTs locally (AUTH_LOCAL_VERIFICATION)
+            cache_max: Maximum cached tokens (AUTH_TOKEN_CACHE_MAX)
+            remote_cache_seconds: Max lifetime of remotely resolved users
+                (AUTH_REMOTE_CACHE_SECONDS)
+        """
+        self.jwt_secret = jwt_secret or os.getenv("SUPABASE_JWT_SECRET") or None
+        supabase_url = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+        self.jwks_url = jwks_url or os.getenv("AUTH_JWKS_URL") or (
+            f"{supabase_url}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        )
+        self.audience = audience or os.getenv("AUTH_JWT_AUDIENCE", self.DEFAULT_AUDIENCE)
+        requested_local = (
+            local_verification
+            if local_verification is not None
+            else os.getenv("AUTH_LOCAL_VERIFICATION", "true").lower() in ("true", "1", "yes", "on")
+        )
+        self.local_verification = requested_local and jwt is not None
+        if requested_local and jwt is None:
+            print("[AuthTokenVerifier] PyJWT is not installed; using remote verification only")
+        self.cache_max = cache_max or int(
+            os.getenv("AUTH_TOKEN_CACHE_MAX", self.DEFAULT_CACHE_MAX)
+        )
+        self.remote_cache_seconds = (
+            remote_cache_seconds
+            if remote_cache_seconds is not None
+            else float(os.getenv("AUTH_REMOTE_CACHE_SECONDS", self.DEFAULT_REMOTE_CACHE_SECONDS))
+        )
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._jwks_client = None
+        self._jwks_retry_at = 0.0
+        self.hits = 0
+        self.local_verifications = 0
+        self.remote_calls = 0
+        self.rejected = 0
+
+    def verify(self, token: str, remote: Callable[[str], Any]) -> Optional[Any]:
+        """
+        Resolve a bearer token to a user response.
+
+        Args:
+            token: Raw JWT (without the "Bearer " prefix)
+            remote: Fallback that asks Supabase Auth (supabase.auth.get_user)
+
+        Returns:
+            Object with a `.user` attribute, or None if the token is invalid
+        """
+        if not token:
+            return None
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+
+        if self.local_verification:
+            try:
+                claims = self._decode(token)
+            except TokenNotVerifiable:
+                pass
+            except jwt.PyJWTError as exc:
+                with self._lock:
+                    self.rejected += 1
+                print(f"[AuthTokenVerifier] Rejected token: {exc}")
+                return None
+            else:
+                user_response = user_response_from_claims(claims)
+                with self._lock:
+                    self.local_verifications += 1
+                self._store(cache_key, user_response, float(claims["exp"]))
+                return user_response
+
+        with self._lock:
+            self.remote_calls += 1
+        user_response = remote(token)
+        if user_response is None or getattr(user_response, "user", None) is None:
+            return None
+        expires_at = min(
+            _unverified_expiry(token) or float("inf"),
+            time.time() + self.remote_cache_seconds,
+        )
+        self._store(cache_key, user_response, expires_at)
+        return user_response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "local_verification": self.local_verification,
+                "hs256_secret": bool(self.jwt_secret),
+                "jwks_url": self.jwks_url,
+                "cached_tokens": len(self._cache),
+                "hits": self.hits,
+                "local_verifications": self.local_verifications,
+                "remote_calls": self.remote_calls,
+                "rejected": self.rejected,
+            }
+
+    # -------------------------------------------------------------- internals
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as exc:
+            raise TokenNotVerifiable(str(exc)) from exc
+
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise TokenNotVerifiable("no HS256 secret configured")
+            key: Any = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks_url:
+            if time.monotonic() < self._jwks_retry_at:
+                raise TokenNotVerifiable("JWKS unavailable")
+            try:
+                key = self._jwks().get_signing_key_from_jwt(token).key
+            except jwt.PyJWKClientConnectionError as exc:
+                # Do not hold every request on an unreachable JWKS endpoint.
+                self._jwks_retry_at = time.monotonic() + self.JWKS_RETRY_SECONDS
+                print(f"[AuthTokenVerifier] JWKS fetch failed: {exc}")
+                raise TokenNotVerifiable(str(exc)) from exc
+            except jwt.PyJWKClientError as exc:
+                raise TokenNotVerifiable(str(exc)) from exc
+        else:
+            raise TokenNotVerifiable(f"unsupported algorithm {algorithm}")
+
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            leeway=self.LEEWAY_SECONDS,
+            options={"require": ["exp", "sub"]},
+        )
+
+    def _jwks(self):
+        with self._lock:
+            if self._jwks_client is None:
+                self._jwks_client = jwt.PyJWKClient(
+                    self.jwks_url,
+                    cache_keys=True,
+                    lifespan=600,
+                    timeout=self.JWKS_TIMEOUT_SECONDS,
+                )
+            return self._jwks_client
+
+    def _cached(self, cache_key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, user_response = entry
+            if expires_at <= now:
+                del self._cache[cache_key]
+                return None
+            self._cache.move_to_end(cache_key)
+            self.hits += 1
+            return user_response
+
+    def _store(self, cache_key: str, user_response: Any, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._cache[cache_key] = (expires_at, user_response)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_max:
+                self._cache.popitem(last=False)
+
+
+def _unverified_expiry(token: str) -> Optional[float]:
+    if jwt is None:
+        return None
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+    exp = claims.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def user_response_from_claims(claims: Dict[str, Any]) -> Any:
+    """UserResponse (`.user.id`, `.user.email`, `.user.user_metadata`, ...) from JWT claims."""
+    issued_at = claims.get("iat")
+    fields = {
+        "id": claims["sub"],
+        "aud": claims.get("aud") if isinstance(claims.get("aud"), str) else "authenticated",
+        "role": claims.get("role"),
+        "email": claims.get("email") or None,
+        "phone": claims.get("phone") or None,
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+        "is_anonymous": bool(claims.get("is_anonymous", False)),
+        "created_at": datetime.fromtimestamp(issued_at or 0, tz=timezone.utc),
+    }
+    if User is None:
+        return SimpleNamespace(user=SimpleNamespace(**fields))
+    return UserResponse(user=User(**fields))
+
+
+auth_token_verifier = AuthTokenVerifier()
@@ -0,0 +1,461 @@
+"""
+Candidate Batch Scorer
+
+Vectorized scoring of many candidate outfits at once.
+
+A combination is a row of integer indices, one column per section in
+SECTION_ORDER, pointing into that section's option list (-1 = section
+absent). Every ItemFeatures field the scorers read is laid out as a NumPy
+column per section, with one extra sentinel entry at the end so index -1
+reads "absent" values. The ten score components are then computed over all
+rows with array operations, reproducing CandidateOutfitService._score_candidate
+exactly: components are accumulated in the same order, sums run section by
+section (not pairwise), and rounding falls back to Python's round() for the
+rare values that sit on a .0005 tie.
+
+NumPy is optional. `available()` is False without it and callers keep the
+per-candidate path.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    np = None
+
+from services.candidate_outfit_service import (
+    SECTION_ORDER,
+    STYLE_IDS,
+    CandidateOutfitService,
+    ItemFeatures,
+    ScoringContext,
+)
+
+
+INCOMPATIBLE_STYLE_PAIRS = [
+    ("formal", "sporty"),
+    ("formal", "streetwear"),
+    ("classic", "sporty"),
+    ("elegant", "streetwear"),
+]
+SECTION_COLUMNS = {section: index for index, section in enumerate(SECTION_ORDER)}
+
+
+def available() -> bool:
+    return np is not None
+
+
+class BatchCandidateScorer:
+    """
+    Scores index-encoded combinations drawn from fixed per-section option lists.
+    """
+
+    def __init__(
+        self,
+        service: CandidateOutfitService,
+        section_options: Dict[str, Sequence[Dict[str, Any]]],
+        features: Dict[int, ItemFeatures],
+        context: ScoringContext,
+        must_by_section: Dict[str, Dict[str, Any]],
+    ):
+        """
+        Lay out per-section feature columns.
+
+        Args:
+            service: Service whose feature compiler fills gaps in `features`
+            section_options: Items selectable per section (None entries ignored)
+            features: Compiled features keyed by id() of each item dict
+            context: Request-level scoring context
+            must_by_section: Required items by section, as in _score_candidate
+        """
+        if np is None:
+            raise RuntimeError("BatchCandidateScorer requires numpy")
+
+        self.service = service
+        self.context = context
+        self.options: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, Dict[int, int]] = {}
+        self.required_ids = sorted(
+            {str(item.get("id")) for item in must_by_section.values()}
+        )
+        self.has_must = bool(must_by_section)
+        self.columns: List[Dict[str, Any]] = []
+
+        for section in SECTION_ORDER:
+            options = []
+            positions = {}
+            for item in section_options.get(section) or []:
+                if item is None or id(item) in positions:
+                    continue
+                positions[id(item)] = len(options)
+                options.append(item)
+            self.options[section] = options
+            self._positions[section] = positions
+            self.columns.append(
+                self._section_columns(service, section, options, features)
+            )
+
+    # ---------------------------------------------------------------- encoding
+
+    def encode(self, raw_items: Dict[str, Optional[Dict[str, Any]]]) -> Tuple[int, ...]:
+        """Encode a raw template dict (section -> item) as an index tuple."""
+        row = []
+        for section in SECTION_ORDER:
+            item = raw_items.get(section)
+            row.append(-1 if item is None else self._positions[section][id(item)])
+        return tuple(row)
+
+    def decode(self, row: Sequence[int]) -> Dict[str, Dict[str, Any]]:
+        """Index tuple back to section -> item (absent sections omitted)."""
+        return {
+            section: self.options[section][index]
+            for section, index in zip(SECTION_ORDER, row)
+            if index >= 0
+        }
+
+    # ----------------------------------------------------------------- scoring
+
+    def score(self, combinations: Any) -> Any:
+        """
+        Total score of every combination.
+
+        Args:
+            combinations: Integer array-like of shape (n, len(SECTION_ORDER))
+
+        Returns:
+            float64 array of shape (n,), equal to _score_candidate totals
+        """
+        matrix = np.asarray(combinations, dtype=np.int64).reshape(-1, len(SECTION_ORDER))
+        gathered = [
+            {name: values[matrix[:, column]] for name, values in self.columns[column].items()}
+            for column in range(len(SECTION_ORDER))
+        ]
+        components = self._components(gathered, matrix.shape[0])
+        total = np.zeros(matrix.shape[0])
+        for component in components:
+            total = total + component
+        return _round3(total)
+
+    def _components(self, gathered: List[Dict[str, Any]], rows: int) -> List[Any]:
+        present = [column["present"] for column in gathered]
+        has = {section: present[SECTION_COLUMNS[section]] for section in SECTION_ORDER}
+        item_count = _sequential_sum(present, rows)
+        safe_count = np.maximum(item_count, 1)
+
+        return [
+            self._request_match(gathered, rows),
+            self._style_consistency(gathered, has, rows),
+            self._formality(gathered, item_count, safe_count, rows),
+            self._color_harmony(gathered, has, rows),
+            self._occasion_fit(gathered, rows),
+            self._weather(gathered, has, item_count, safe_count, rows),
+            self._completeness(has, rows),
+            self._usage_rotation(gathered, item_count, safe_count, rows),
+            self._section_correctness(gathered, item_count, safe_count, rows),
+            self._template_fit(has, rows),
+        ]
+
+    def _request_match(self, gathered, rows):
+        context = self.context
+        score = np.full(rows, 12.0)
+        if self.has_must:
+            has_all = np.ones(rows, dtype=bool)
+            for required_id in self.required_ids:
+                found = np.zeros(rows, dtype=bool)
+                for column in gathered:
+                    found |= column["required:" + required_id]
+                has_all &= found
+            score = score + np.where(has_all, 18.0, -30.0)
+        if context.requested_colors:
+            hit = _any(gathered, "color_requested", rows)
+            score = score + np.where(hit, 5.0, -8.0)
+        if context.requested_types:
+            hit = np.zeros(rows, dtype=bool)
+            for section, column in zip(SECTION_ORDER, gathered):
+                if section in context.requested_types:
+                    hit |= column["present"]
+            score = score + np.where(hit, 5.0, -8.0)
+        if context.requested_style:
+            hits = _sequential_sum([column["style_hit"] for column in gathered], rows)
+            score = score + np.minimum(hits * 4.0, 8.0)
+        if context.requested_occasion:
+            hits = _sequential_sum([column["occasion_text_hit"] for column in gathered], rows)
+            score = score + np.minimum(hits * 3.0, 6.0)
+        return _clamp(score, 0.0, 30.0)
+
+    def _style_consistency(self, gathered, has, rows):
+        styles = {
+            label: np.zeros(rows, dtype=bool) for label in STYLE_IDS
+        }
+        for column in gathered:
+            for label, style_id in STYLE_IDS.items():
+                styles[label] |= column["present"] & (column["style_id"] == style_id)
+
+        score = np.full(rows, 15.0)
+        for left, right in INCOMPATIBLE_STYLE_PAIRS:
+            score = score - np.where(styles[left] & styles[right], 5.0, 0.0)
+        score = score + np.where(
+            styles["smart casual"] & (styles["formal"] | styles["casual"]), 2.0, 0.0
+        )
+        score = score - np.where(has["dress"] & has["pants"], 12.0, 0.0)
+        score = score - np.where(
+            has["jumpsuit"] & (has["pants"] | has["base_layer"]), 12.0, 0.0
+        )
+        score = score - np.where(has["skirt"] & ~has["base_layer"], 12.0, 0.0)
+        return _clamp(score, 0.0, 15.0)
+
+    def _formality(self, gathered, item_count, safe_count, rows):
+        total = _sequential_sum([column["formality"] for column in gathered], rows)
+        average = total / safe_count
+        highest = np.full(rows, -np.inf)
+        lowest = np.full(rows, np.inf)
+        for column in gathered:
+            highest = np.where(column["present"], np.maximum(highest, column["formality"]), highest)
+            lowest = np.where(column["present"], np.minimum(lowest, column["formality"]), lowest)
+        formality_range = np.where(item_count > 0, highest - lowest, 0.0)
+        score = 15.0 - (formality_range * 2.0)
+
+        requested_style = self.context.requested_style
+        if requested_style in {"formal", "elegant", "classic"}:
+            score = score + np.where(average >= 4.0, 4.0, -6.0)
+        elif requested_style == "casual":
+            score = score + np.where((average >= 2.0) & (average <= 3.2), 4.0, -4.0)
+        elif requested_style in {"streetwear", "sporty"}:
+            score = score + np.where((average >= 1.0) & (average <= 2.3), 4.0, -5.0)
+        return np.where(item_count > 0, _clamp(score, 0.0, 15.0), 0.0)
+
+    def _color_harmony(self, gathered, has, rows):
+        colored = [column["present"] & column["has_color"] for column in gathered]
+        colored_count = _sequential_sum(colored, rows)
+        neutral_count = _sequential_sum(
+            [mask & column["is_neutral"] for mask, column in zip(colored, gathered)], rows
+        )
+
+        strong_ids = sorted({
+            int(color_id)
+            for column in self.columns
+            for color_id, strong in zip(column["color_id"], column["is_strong"])
+            if strong
+        })
+        strong_present = {}
+        for color_id in strong_ids:
+            found = np.zeros(rows, dtype=bool)
+            for mask, column in zip(colored, gathered):
+                found |= mask & column["is_strong"] & (column["color_id"] == color_id)
+            strong_present[color_id] = found
+        unique_strong = _sequential_sum(list(strong_present.values()), rows)
+
+        score = 6.0 + np.minimum(neutral_count * 1.2, 4.0)
+        score = np.where(unique_strong <= 1, score + 2.0, score - (unique_strong - 1) * 3.0)
+
+        shoes = gathered[SECTION_COLUMNS["shoes"]]
+        shoes_color = shoes["color_id"]
+        shoes_strong = np.zeros(rows, dtype=bool)
+        for color_id, found in strong_present.items():
+            shoes_strong |= found & (shoes_color == color_id)
+        shoes_strong &= has["shoes"] & shoes["is_strong"]
+
+        accessories = gathered[SECTION_COLUMNS["accessories"]]
+        bag = gathered[SECTION_COLUMNS["bag"]]
+        matching = (
+            (has["accessories"] & (accessories["color_id"] == shoes_color))
+            | (has["bag"] & (bag["color_id"] == shoes_color))
+        )
+        score = score + np.where(shoes_strong & matching, 1.0, 0.0)
+        return np.where(colored_count > 0, _clamp(score, 0.0, 12.0), 7.0)
+
+    def _occasion_fit(self, gathered, rows):
+        if not self.context.requested_occasion:
+            return np.full(rows, 7.0)
+        hits = _sequential_sum([column["occasion_fit_hit"] for column in gathered], rows)
+        return _clamp(4.0 + hits * 2.0, 0.0, 10.0)
+
+    def _weather(self, gathered, has, item_count, safe_count, rows):
+        context = self.context
+        score = np.full(rows, 8.0)
+        temp_value = context.temp_value
+        if temp_value is not None:
+            compatible = _sequential_sum([column["temp_ok"] for column in gathered], rows)
+            score = 5.0 + (compatible / safe_count) * 5.0
+            if temp_value <= 15:
+                score = score + np.where(has["insulation_layer"], 1.5, 0.0)
+                score = score + np.where(has["outer_layer"], 1.5, 0.0)
+            elif temp_value >= 24:
+                score = score - np.where(has["outer_layer"], 2.0, 0.0)
+                score = score - np.where(has["insulation_layer"], 1.5, 0.0)
+        if context.rainy:
+            weatherproof = _sequential_sum(
+                [
+                    gathered[SECTION_COLUMNS[section]]["weatherproof"]
+                    for section in ("outer_layer", "shoes")
+                ],
+                rows,
+            )
+            score = score + np.minimum(weatherproof, 2) * 1.0
+        return _clamp(score, 0.0, 12.0)
+
+    def _completeness(self, has, rows):
+        score = np.zeros(rows)
+        template_masks = {
+            "dress_outfit": has["dress"],
+            "skirt_outfit": ~has["dress"] & has["skirt"],
+            "jumpsuit_outfit": ~has["dress"] & ~has["skirt"] & has["jumpsuit"],
+        }
+        template_masks["standard_outfit"] = ~(
+            has["dress"] | has["skirt"] | has["jumpsuit"]
+        )
+        for template, mask in template_masks.items():
+            template_score = np.zeros(rows)
+            for section in self.service._required_sections_for_template(template):
+                template_score = template_score + np.where(has[section], 4.0, -8.0)
+            if template != "standard_outfit":
+                template_score = template_score + 4.0
+            score = np.where(mask, template_score, score)
+
+        score = score + np.where(has["bag"], 1.0, 0.0)
+        score = score + np.where(has["accessories"], 1.0, 0.0)
+        temp_value = self.context.temp_value
+        if temp_value is not None and temp_value <= 15:
+            score = score + np.where(has["insulation_layer"], 1.0, 0.0)
+            score = score + np.where(has["outer_layer"], 1.0, 0.0)
+        if temp_value is not None and temp_value >= 24:
+            score = score - np.where(has["outer_layer"], 2.0, 0.0)
+        return _clamp(score, 0.0, 14.0)
+
+    def _usage_rotation(self, gathered, item_count, safe_count, rows):
+        total = _sequential_sum([column["usage"] for column in gathered], rows)
+        average = total / safe_count
+        score = 6.0 - np.minimum(average, 10.0) * 0.45
+        unused = _sequential_sum([column["unused"] for column in gathered], rows)
+        score = score + unused * 0.2
+        return np.where(item_count > 0, _clamp(score, 0.0, 6.0), 0.0)
+
+    def _section_correctness(self, gathered, item_count, safe_count, rows):
+        correct = _sequential_sum([column["section_ok"] for column in gathered], rows)
+        score = (correct / safe_count) * 10.0
+        return np.where(item_count > 0, _clamp(score, 0.0, 10.0), 0.0)
+
+    def _template_fit(self, has, rows):
+        context = self.context
+        score = np.full(rows, 8.0)
+        score = score - np.where(has["dress"] & has["pants"], 12.0, 0.0)
+        score = score - np.where(has["jumpsuit"] & has["pants"], 12.0, 0.0)
+        score = score - np.where(has["skirt"] & ~has["base_layer"], 12.0, 0.0)
+        score = score - np.where(has["bag"] & ~has["shoes"], 8.0, 0.0)
+
+        if context.requested_style in {"formal", "elegant", "classic"}:
+            score = score + np.where(has["dress"] | has["bag"], 3.0, 0.0)
+            score = score + np.where(has["outer_layer"], 2.0, 0.0)
+        elif context.requested_style == "casual":
+            score = score + np.where(has["skirt"] | has["jumpsuit"] | has["dress"], 2.0, 0.0)
+
+        if context.requested_occasion in {"dinner", "night"}:
+            score = score + np.where(has["dress"] | has["skirt"], 3.0, 0.0)
+            score = score + np.where(has["bag"], 2.0, 0.0)
+            score = score + np.where(has["outer_layer"], 1.0, 0.0)
+        return _clamp(score, 0.0, 14.0)
+
+    # -------------------------------------------------------------- internals
+
+    def _section_columns(
+        self,
+        service: CandidateOutfitService,
+        section: str,
+        options: List[Dict[str, Any]],
+        features: Dict[int, ItemFeatures],
+    ) -> Dict[str, Any]:
+        context = self.context
+        compiled = [
+            features.get(id(item)) or service._compile_features(item) for item in options
+        ]
+        weather_section = section in {"outer_layer", "shoes"}
+
+        def column(values, dtype):
+            # Trailing sentinel entry is what index -1 (section absent) reads.
+            return np.array(list(values) + [dtype(0)], dtype=dtype)
+
+        columns = {
+            "present": column([True] * len(options), bool),
+            "formality": column([item.formality for item in compiled], float),
+            "has_color": column([item.has_color for item in compiled], bool),
+            "is_neutral": column([item.is_neutral for item in compiled], bool),
+            "is_strong": column([item.is_strong for item in compiled], bool),
+            "color_id": column([item.color_id for item in compiled], int),
+            "color_requested": column(
+                [item.color in context.requested_colors for item in compiled], bool
+            ),
+            "style_id": column([item.style_id for item in compiled], int),
+            "style_hit": column(
+                [
+                    bool(context.requested_style)
+                    and service._features_style_matches(item, context.requested_style)
+                    for item in compiled
+                ],
+                bool,
+            ),
+            "occasion_text_hit": column(
+                [
+                    bool(context.requested_occasion)
+                    and context.requested_occasion in item.text
+                    for item in compiled
+                ],
+                bool,
+            ),
+            "occasion_fit_hit": column(
+                [
+                    item.style in context.occasion_styles
+                    or context.requested_occasion in item.text
+                    for item in compiled
+                ],
+                bool,
+            ),
+            "temp_ok": column(
+                [
+                    context.temp_value is not None and item.temperature_match(context.temp_value)
+                    for item in compiled
+                ],
+                bool,
+            ),
+            "usage": column([item.usage for item in compiled], float),
+            "unused": column([item.usage <= 1 for item in compiled], bool),
+            "section_ok": column([item.section == section for item in compiled], bool),
+            "weatherproof": column(
+                [weather_section and item.weatherproof for item in compiled], bool
+            ),
+        }
+        for required_id in self.required_ids:
+            columns["required:" + required_id] = column(
+                [item.id == required_id for item in compiled], bool
+            )
+        return columns
+
+
+def _any(gathered: List[Dict[str, Any]], name: str, rows: int) -> Any:
+    result = np.zeros(rows, dtype=bool)
+    for column in gathered:
+        result |= column[name]
+    return result
+
+
+def _sequential_sum(values: List[Any], rows: int) -> Any:
+    """Left-to-right sum per row, matching Python's sum() over the same items."""
+    total = np.zeros(rows)
+    for value in values:
+        total = total + value
+    return total
+
+
+def _clamp(values: Any, minimum: float, maximum: float) -> Any:
+    return _round3(np.maximum(minimum, np.minimum(maximum, values)))
+
+
+def _round3(values: Any) -> Any:
+    """np.round(values, 3) with Python round() semantics on near-ties."""
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, 3)
+    scaled = values * 1000.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_tie):
+        rounded.flat[index] = round(float(values.flat[index]), 3)
+    return rounded
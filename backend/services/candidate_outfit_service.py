@@ -5,12 +5,21 @@ Builds deterministic complete outfit candidates before any visual AI selection.
 This service does not call LLaVA. It only groups wardrobe items, enforces hard
 user constraints, and returns valid candidate outfit combinations for debugging
 or later visual ranking.
+
+Scoring reads from ItemFeatures records compiled once per wardrobe item
+(section, canonical color, style, formality, temperature range, usage) and a
+ScoringContext compiled once per request, instead of re-normalizing item text
+inside every sub-scorer for every combination.
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import heapq
+import os
 import unicodedata
 
+from services.outfit_search import OutfitSearch
+
 
 COLOR_ALIASES = {
     "amarelo": "yellow",
@@ -177,6 +186,36 @@ SECTION_ORDER = [
     "accessories",
 ]
 REQUIRED_SECTIONS = ["base_layer", "pants", "shoes"]
+# Slots (section, required) searched for each outfit template.
+TEMPLATE_SLOTS = {
+    "standard_outfit": [
+        ("base_layer", True),
+        ("insulation_layer", False),
+        ("pants", True),
+        ("shoes", True),
+        ("outer_layer", False),
+        ("accessories", False),
+    ],
+    "dress_outfit": [
+        ("dress", True),
+        ("shoes", True),
+        ("outer_layer", False),
+        ("bag", False),
+    ],
+    "skirt_outfit": [
+        ("skirt", True),
+        ("base_layer", True),
+        ("shoes", True),
+        ("outer_layer", False),
+        ("bag", False),
+    ],
+    "jumpsuit_outfit": [
+        ("jumpsuit", True),
+        ("shoes", True),
+        ("outer_layer", False),
+        ("bag", False),
+    ],
+}
 FEMALE_TEMPLATE_SECTIONS = ["dress", "skirt", "jumpsuit", "bag"]
 
 NEUTRAL_COLORS = {"black", "white", "gray", "grey", "beige", "brown", "navy", "blue"}
@@ -215,6 +254,76 @@ OCCASION_STYLE_FIT = {
 }
 
 
+STYLE_LABELS = ["casual", "formal", "classic", "smart casual", "sporty", "streetwear", "elegant"]
+STYLE_IDS = {label: index for index, label in enumerate(STYLE_LABELS)}
+CANONICAL_COLORS = sorted(set(COLOR_ALIASES.values()) | NEUTRAL_COLORS | STRONG_COLORS)
+COLOR_IDS = {color: index + 1 for index, color in enumerate(CANONICAL_COLORS)}
+WEATHERPROOF_TOKENS = ["waterproof", "impermeavel", "rain", "chuva", "boot", "bota"]
+FORMAL_MATCH_TOKENS = ["formal", "work", "elegant", "classico", "classica", "camisa", "blazer", "vestido", "dress", "mala", "bag"]
+# Bonus for a section item no selected candidate has used yet (diversity).
+DIVERSITY_WEIGHTS = {
+    "dress": 16,
+    "jumpsuit": 16,
+    "base_layer": 14,
+    "insulation_layer": 6,
+    "skirt": 14,
+    "pants": 14,
+    "outer_layer": 8,
+    "bag": 4,
+    "accessories": 4,
+    "shoes": 2,
+}
+FIRST_PICK_DIVERSITY_BONUS = 20.0
+OUTER_STATE_DIVERSITY_BONUS = 5
+
+
+class ItemFeatures:
+    """
+    Precomputed scoring features of one wardrobe item.
+
+    color_id is 0 for missing or unrecognized colors; temp_min/temp_max are
+    None when the item range is not numeric (such items match any temperature).
+    """
+
+    __slots__ = (
+        "id",
+        "section",
+        "color",
+        "color_id",
+        "has_color",
+        "is_neutral",
+        "is_strong",
+        "style",
+        "style_id",
+        "formality",
+        "temp_min",
+        "temp_max",
+        "usage",
+        "text",
+        "match_text",
+        "weatherproof",
+    )
+
+    def temperature_match(self, temp: float) -> bool:
+        if self.temp_min is None:
+            return True
+        return self.temp_min <= temp <= self.temp_max
+
+
+class ScoringContext:
+    """Request-level values shared by every combination scored in one call."""
+
+    __slots__ = (
+        "requested_colors",
+        "requested_types",
+        "requested_style",
+        "requested_occasion",
+        "occasion_styles",
+        "temp_value",
+        "rainy",
+    )
+
+
 @dataclass
 class CandidateOutfit:
     candidate_id: str
@@ -236,6 +345,29 @@ class CandidateOutfit:
 class CandidateOutfitService:
     """Generate deterministic candidate outfits from wardrobe items."""
 
+    DEFAULT_SEARCH_OPTIONS = 8
+
+    def __init__(
+        self,
+        batch_scoring: Optional[bool] = None,
+        search_options_per_section: Optional[int] = None,
+    ):
+        """
+        Args:
+            batch_scoring: Score combinations with the vectorized NumPy engine
+                (CANDIDATE_BATCH_SCORING, default true; ignored without numpy)
+            search_options_per_section: Best-ranked items per section offered
+                to the outfit search (CANDIDATE_SEARCH_OPTIONS, default 8)
+        """
+        self.search_options_per_section = search_options_per_section or int(
+            os.getenv("CANDIDATE_SEARCH_OPTIONS", self.DEFAULT_SEARCH_OPTIONS)
+        )
+        self.batch_scoring = (
+            batch_scoring
+            if batch_scoring is not None
+            else os.getenv("CANDIDATE_BATCH_SCORING", "true").lower() in ("true", "1", "yes", "on")
+        )
+
     def generate_candidate_outfits(
         self,
         user_id: str,
@@ -491,105 +623,57 @@ class CandidateOutfitService:
             item["section"]: item for item in must_include_items
         }
         sorted_groups = {
-            section: self._sort_items(items, parsed_intent)[:8]
+            section: self._sort_items(items, parsed_intent)[: self.search_options_per_section]
             for section, items in grouped_items.items()
         }
-
-        base_options = self._forced_or_options("base_layer", sorted_groups, must_by_section)
-        pants_options = self._forced_or_options("pants", sorted_groups, must_by_section)
-        dress_options = self._forced_or_options("dress", sorted_groups, must_by_section)
-        skirt_options = self._forced_or_options("skirt", sorted_groups, must_by_section)
-        jumpsuit_options = self._forced_or_options("jumpsuit", sorted_groups, must_by_section)
-        shoes_options = self._forced_or_options("shoes", sorted_groups, must_by_section)
-        insulation_options = self._forced_or_optional_options("insulation_layer", sorted_groups, must_by_section)
-        outer_options = self._forced_or_optional_options("outer_layer", sorted_groups, must_by_section)
-        bag_options = self._forced_or_optional_options("bag", sorted_groups, must_by_section)
-        accessories_options = [None] + sorted_groups.get("accessories", [])[:3]
-
-        raw_combinations = []
-        max_seed = max(
-            len(base_options),
-            len(pants_options),
-            len(dress_options),
-            len(skirt_options),
-            len(jumpsuit_options),
-            len(shoes_options),
-            len(insulation_options),
-            len(outer_options),
-            len(bag_options),
-            len(accessories_options),
-            max_candidates,
+        section_options = {
+            section: self._section_options(section, grouped_items, sorted_groups, must_by_section)
+            for section in SECTION_ORDER
+        }
+        features = self.compile_item_features(
+            item for items in section_options.values() for item in items
         )
+        context = self._scoring_context(parsed_intent, weather)
 
-        # First pass deliberately rotates the main sections together. This gives
-        # visible variety before scoring gets a chance to cluster around one look.
-        for index in range(max_seed * 2):
-            raw_combinations.append(
-                self._raw_template_items(
-                    "standard_outfit",
-                    base=self._cyclic_pick(base_options, index),
-                    insulation=self._cyclic_pick(insulation_options, index),
-                    pants=self._cyclic_pick(pants_options, index),
-                    shoes=self._cyclic_pick(shoes_options, index),
-                    outer=self._cyclic_pick(outer_options, index),
-                    accessory=self._cyclic_pick(accessories_options, index),
-                )
-            )
-            if sorted_groups.get("dress") or "dress" in must_by_section:
-                raw_combinations.append(
-                    self._raw_template_items(
-                        "dress_outfit",
-                        dress=self._cyclic_pick(dress_options, index),
-                        shoes=self._cyclic_pick(shoes_options, index),
-                        outer=self._cyclic_pick(outer_options, index),
-                        bag=self._cyclic_pick(bag_options, index),
-                    )
-                )
-            if sorted_groups.get("skirt") or "skirt" in must_by_section:
-                raw_combinations.append(
-                    self._raw_template_items(
-                        "skirt_outfit",
-                        skirt=self._cyclic_pick(skirt_options, index),
-                        base=self._cyclic_pick(base_options, index),
-                        shoes=self._cyclic_pick(shoes_options, index),
-                        outer=self._cyclic_pick(outer_options, index),
-                        bag=self._cyclic_pick(bag_options, index),
-                    )
-                )
-            if sorted_groups.get("jumpsuit") or "jumpsuit" in must_by_section:
-                raw_combinations.append(
-                    self._raw_template_items(
-                        "jumpsuit_outfit",
-                        jumpsuit=self._cyclic_pick(jumpsuit_options, index),
-                        shoes=self._cyclic_pick(shoes_options, index),
-                        outer=self._cyclic_pick(outer_options, index),
-                        bag=self._cyclic_pick(bag_options, index),
-                    )
-                )
+        templates = {}
+        for template_used, slots in TEMPLATE_SLOTS.items():
+            template_sections = {section for section, _required in slots}
+            missing_must = [
+                section for section in must_by_section if section not in template_sections
+            ]
+            if missing_must:
+                rejected_candidates.append({
+                    "item_ids": [],
+                    "template_used": template_used,
+                    "reason": f"missing_must_include:{missing_must[0]}",
+                })
+                continue
+            templates[template_used] = [
+                (section, required or section in must_by_section)
+                for section, required in slots
+            ]
 
-        # Second pass explores cross-pairs so small wardrobes can still produce
-        # 3-5 candidates without duplicating the first few section choices.
-        for base_index, base in enumerate(base_options):
-            for pants_index, pants in enumerate(pants_options):
-                outer_index = base_index + pants_index
-                accessory_index = base_index + (pants_index * 2)
-                raw_combinations.append(
-                    self._raw_template_items(
-                        "standard_outfit",
-                        base=base,
-                        insulation=self._cyclic_pick(insulation_options, base_index + pants_index),
-                        pants=pants,
-                        shoes=self._cyclic_pick(shoes_options, base_index + pants_index),
-                        outer=self._cyclic_pick(outer_options, outer_index),
-                        accessory=self._cyclic_pick(accessories_options, accessory_index),
-                    )
-                )
+        score_rows, batched = self._row_scorer(
+            section_options, features, context, must_by_section, parsed_intent, weather
+        )
+        search = OutfitSearch(
+            SECTION_ORDER,
+            section_options,
+            score_rows,
+            exhaustive_limit=None if batched else OutfitSearch.UNBATCHED_EXHAUSTIVE_LIMIT,
+        )
+        scored_rows = search.search(templates)
+        print(f"[CandidateOutfit] search={search.get_stats()}")
 
         candidate_pool: List[CandidateOutfit] = []
+        raw_by_candidate: Dict[int, Dict[str, Any]] = {}
         seen_signatures = set()
-
-        for raw_items in raw_combinations:
-            is_valid, reason = self.validate_candidate(raw_items, must_by_section)
+        for score, template_used, row in scored_rows:
+            raw_items = {
+                "_template_used": template_used,
+                **self._row_items(row, section_options),
+            }
+            is_valid, reason = self.validate_candidate(raw_items, must_by_section, features)
             if not is_valid:
                 rejected_candidates.append({
                     "item_ids": [
@@ -615,49 +699,118 @@ class CandidateOutfitService:
                 continue
             seen_signatures.add(signature)
 
-            scoring_items = [
-                {
-                    **self._candidate_item(raw_items[section], section),
-                    "source": raw_items[section],
-                }
-                for section in SECTION_ORDER
-                if raw_items.get(section)
-            ]
-            item_ids = [item["id"] for item in candidate_items]
-            score, metadata = self._score_candidate(
-                scoring_items,
-                parsed_intent,
-                must_by_section,
-                weather,
-            )
-            metadata["template_used"] = raw_items.get("_template_used", "standard_outfit")
-            metadata["diversity_reason"] = self._diversity_reason(
-                candidate_items,
-                candidate_pool,
-            )
-            candidate_pool.append(
-                CandidateOutfit(
-                    candidate_id="",
-                    items=candidate_items,
-                    item_ids=item_ids,
-                    score=score,
-                    metadata=metadata,
-                )
+            # Breakdown is only computed for the candidates finally selected.
+            candidate = CandidateOutfit(
+                candidate_id="",
+                items=candidate_items,
+                item_ids=[item["id"] for item in candidate_items],
+                score=score,
+                metadata={"template_used": template_used},
             )
+            candidate_pool.append(candidate)
+            raw_by_candidate[id(candidate)] = raw_items
 
         candidates = self._select_diverse_candidates(candidate_pool, max_candidates)
         for index, candidate in enumerate(candidates):
             candidate.candidate_id = chr(ord("A") + index)
-            candidate.metadata["diversity_reason"] = self._diversity_reason(
+            _, metadata = self._score_candidate(
+                self._scoring_items(raw_by_candidate[id(candidate)], candidate.items, features),
+                parsed_intent,
+                must_by_section,
+                weather,
+                context,
+            )
+            metadata["template_used"] = candidate.metadata["template_used"]
+            metadata["diversity_reason"] = self._diversity_reason(
                 candidate.items,
                 candidates[:index],
             )
+            candidate.metadata = metadata
         return candidates
 
+    def _section_options(
+        self,
+        section: str,
+        grouped_items: Dict[str, List[Dict[str, Any]]],
+        sorted_groups: Dict[str, List[Dict[str, Any]]],
+        must_by_section: Dict[str, Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        if section in must_by_section:
+            item = self._find_group_item(grouped_items, section, must_by_section[section]["id"])
+            return [item] if item else []
+        return sorted_groups.get(section, [])
+
+    def _row_items(
+        self,
+        row: Tuple[int, ...],
+        section_options: Dict[str, List[Dict[str, Any]]],
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Decode a search row into the section -> item layout validate_candidate expects."""
+        return {
+            section: section_options[section][index] if index >= 0 else None
+            for section, index in zip(SECTION_ORDER, row)
+        }
+
+    def _scoring_items(
+        self,
+        raw_items: Dict[str, Any],
+        candidate_items: List[Dict[str, Any]],
+        features: Dict[int, ItemFeatures],
+    ) -> List[Dict[str, Any]]:
+        return [
+            {
+                **candidate_item,
+                "source": raw_items[candidate_item["section"]],
+                "features": features[id(raw_items[candidate_item["section"]])],
+            }
+            for candidate_item in candidate_items
+        ]
+
+    def _row_scorer(
+        self,
+        section_options: Dict[str, List[Dict[str, Any]]],
+        features: Dict[int, ItemFeatures],
+        context: "ScoringContext",
+        must_by_section: Dict[str, Dict[str, Any]],
+        parsed_intent: Dict[str, Any],
+        weather: Dict[str, Any],
+    ) -> Tuple[Callable[[List[Tuple[int, ...]]], Any], bool]:
+        """Score function for search rows, and whether it is the batched engine."""
+        from services import candidate_batch_scorer
+
+        if self.batch_scoring and candidate_batch_scorer.available():
+            scorer = candidate_batch_scorer.BatchCandidateScorer(
+                self, section_options, features, context, must_by_section
+            )
+            return scorer.score, True
+
+        def score_rows(rows: List[Tuple[int, ...]]) -> List[float]:
+            totals = []
+            for row in rows:
+                raw_items = self._row_items(row, section_options)
+                scoring_items = [
+                    {
+                        **self._candidate_item(item, section),
+                        "source": item,
+                        "features": features[id(item)],
+                    }
+                    for section, item in raw_items.items()
+                    if item
+                ]
+                totals.append(
+                    self._score_candidate(
+                        scoring_items, parsed_intent, must_by_section, weather, context
+                    )[0]
+                )
+            return totals
+
+        return score_rows, False
+
     def validate_candidate(
         self,
         raw_items: Dict[str, Optional[Dict[str, Any]]],
         must_by_section: Dict[str, Dict[str, Any]],
+        features: Optional[Dict[int, ItemFeatures]] = None,
     ) -> Tuple[bool, str]:
         template_used = str(raw_items.get("_template_used") or "standard_outfit")
         required_sections = self._required_sections_for_template(template_used)
@@ -695,40 +848,13 @@ class CandidateOutfitService:
                 continue
             if not item:
                 continue
-            actual_section = self.get_section(item)
+            compiled = features.get(id(item)) if features else None
+            actual_section = compiled.section if compiled else self.get_section(item)
             if actual_section != section:
                 return False, f"section_mismatch:{section}:{actual_section}"
 
         return True, ""
 
-    def _raw_template_items(
-        self,
-        template_used: str,
-        base: Optional[Dict[str, Any]] = None,
-        insulation: Optional[Dict[str, Any]] = None,
-        pants: Optional[Dict[str, Any]] = None,
-        dress: Optional[Dict[str, Any]] = None,
-        skirt: Optional[Dict[str, Any]] = None,
-        jumpsuit: Optional[Dict[str, Any]] = None,
-        outer: Optional[Dict[str, Any]] = None,
-        shoes: Optional[Dict[str, Any]] = None,
-        bag: Optional[Dict[str, Any]] = None,
-        accessory: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Optional[Dict[str, Any]]]:
-        return {
-            "_template_used": template_used,
-            "dress": dress,
-            "jumpsuit": jumpsuit,
-            "base_layer": base,
-            "insulation_layer": insulation,
-            "skirt": skirt,
-            "pants": pants,
-            "outer_layer": outer,
-            "shoes": shoes,
-            "bag": bag,
-            "accessories": accessory,
-        }
-
     def _template_for_items(self, items: List[Dict[str, Any]]) -> str:
         sections = {item.get("section") for item in items}
         if "dress" in sections:
@@ -809,33 +935,75 @@ class CandidateOutfitService:
         candidate_pool: List[CandidateOutfit],
         max_candidates: int,
     ) -> List[CandidateOutfit]:
+        """
+        Greedy pick of score + diversity bonus, one candidate at a time.
+
+        After the first pick, bonuses only shrink as items get selected, so a
+        max-heap keyed by the last known value (initially the largest possible
+        bonus) holds upper bounds: the top entry is re-evaluated
+        against the per-section seen sets and accepted once its value is
+        current (lazy MMR). Selections are identical to rescanning the pool
+        on every pick, ties going to the earlier candidate in score order.
+
+        Args:
+            candidate_pool: Valid candidates
+            max_candidates: Number of candidates to select
+
+        Returns:
+            Selected candidates in pick order
+        """
         remaining = sorted(
             candidate_pool,
             key=lambda candidate: candidate.score,
             reverse=True,
         )
-        selected: List[CandidateOutfit] = []
+        if not remaining or max_candidates <= 0:
+            return []
+
+        seen_by_section: Dict[str, set] = {section: set() for section in DIVERSITY_WEIGHTS}
+        seen_outer_states = set()
         seen_signatures = set()
+        by_section = [self._candidate_by_section(candidate.items) for candidate in remaining]
+        selected: List[CandidateOutfit] = []
 
-        while remaining and len(selected) < max_candidates:
-            best_index = 0
-            best_value = None
-            for index, candidate in enumerate(remaining):
-                signature = tuple(sorted(candidate.item_ids))
-                if signature in seen_signatures:
-                    continue
-                diversity_bonus = self._diversity_bonus(candidate, selected)
-                value = candidate.score + diversity_bonus
-                if best_value is None or value > best_value:
-                    best_value = value
-                    best_index = index
-
-            candidate = remaining.pop(best_index)
-            signature = tuple(sorted(candidate.item_ids))
-            if signature in seen_signatures:
+        def select(index: int) -> None:
+            selected.append(remaining[index])
+            seen_signatures.add(tuple(sorted(remaining[index].item_ids)))
+            for section, item_id in by_section[index].items():
+                if section in seen_by_section:
+                    seen_by_section[section].add(item_id)
+            seen_outer_states.add(bool(by_section[index].get("outer_layer")))
+
+        def bonus(index: int) -> float:
+            candidate_by_section = by_section[index]
+            value = 0.0
+            for section, weight in DIVERSITY_WEIGHTS.items():
+                item_id = candidate_by_section.get(section)
+                if item_id and item_id not in seen_by_section[section]:
+                    value += weight
+            if bool(candidate_by_section.get("outer_layer")) not in seen_outer_states:
+                value += OUTER_STATE_DIVERSITY_BONUS
+            return value
+
+        # Every candidate gets the same bonus on the first pick: the best score wins.
+        select(0)
+        max_bonus = sum(DIVERSITY_WEIGHTS.values()) + OUTER_STATE_DIVERSITY_BONUS
+        heap = [
+            (-(candidate.score + max_bonus), index)
+            for index, candidate in enumerate(remaining)
+            if index
+        ]
+        heapq.heapify(heap)
+        while heap and len(selected) < max_candidates:
+            negative_value, index = heapq.heappop(heap)
+            candidate = remaining[index]
+            if tuple(sorted(candidate.item_ids)) in seen_signatures:
                 continue
-            selected.append(candidate)
-            seen_signatures.add(signature)
+            value = candidate.score + bonus(index)
+            if value < -negative_value:
+                heapq.heappush(heap, (-value, index))
+                continue
+            select(index)
 
         return selected
 
@@ -844,15 +1012,16 @@ class CandidateOutfitService:
         candidate: CandidateOutfit,
         selected: List[CandidateOutfit],
     ) -> float:
+        """Diversity bonus of one candidate against a selection (non-incremental)."""
         if not selected:
-            return 20.0
+            return FIRST_PICK_DIVERSITY_BONUS
 
         candidate_by_section = self._candidate_by_section(candidate.items)
         selected_by_section = [
             self._candidate_by_section(existing.items) for existing in selected
         ]
         bonus = 0.0
-        for section in ["dress", "jumpsuit", "base_layer", "insulation_layer", "skirt", "pants", "outer_layer", "bag", "accessories", "shoes"]:
+        for section, weight in DIVERSITY_WEIGHTS.items():
             candidate_id = candidate_by_section.get(section)
             if not candidate_id:
                 continue
@@ -861,29 +1030,14 @@ class CandidateOutfitService:
                 if existing.get(section)
             }
             if candidate_id not in seen_ids:
-                if section in {"dress", "jumpsuit"}:
-                    bonus += 16
-                elif section == "base_layer":
-                    bonus += 14
-                elif section == "skirt":
-                    bonus += 14
-                elif section == "insulation_layer":
-                    bonus += 6
-                elif section == "pants":
-                    bonus += 14
-                elif section == "outer_layer":
-                    bonus += 8
-                elif section in {"bag", "accessories"}:
-                    bonus += 4
-                elif section == "shoes":
-                    bonus += 2
+                bonus += weight
 
         has_outer = bool(candidate_by_section.get("outer_layer"))
         selected_outer_states = {
             bool(existing.get("outer_layer")) for existing in selected_by_section
         }
         if has_outer not in selected_outer_states:
-            bonus += 5
+            bonus += OUTER_STATE_DIVERSITY_BONUS
 
         return bonus
 
@@ -927,31 +1081,6 @@ class CandidateOutfitService:
             if item.get("section") and item.get("id")
         }
 
-    def _cyclic_pick(self, options: List[Any], index: int) -> Any:
-        if not options:
-            return None
-        return options[index % len(options)]
-
-    def _forced_or_options(
-        self,
-        section: str,
-        grouped_items: Dict[str, List[Dict[str, Any]]],
-        must_by_section: Dict[str, Dict[str, Any]],
-    ) -> List[Optional[Dict[str, Any]]]:
-        if section in must_by_section:
-            return [self._find_group_item(grouped_items, section, must_by_section[section]["id"])]
-        return grouped_items.get(section, [])[:6]
-
-    def _forced_or_optional_options(
-        self,
-        section: str,
-        grouped_items: Dict[str, List[Dict[str, Any]]],
-        must_by_section: Dict[str, Dict[str, Any]],
-    ) -> List[Optional[Dict[str, Any]]]:
-        if section in must_by_section:
-            return [self._find_group_item(grouped_items, section, must_by_section[section]["id"])]
-        return [None] + grouped_items.get(section, [])[:5]
-
     def _find_group_item(
         self,
         grouped_items: Dict[str, List[Dict[str, Any]]],
@@ -969,18 +1098,22 @@ class CandidateOutfitService:
         parsed_intent: Dict[str, Any],
         must_by_section: Dict[str, Dict[str, Any]],
         weather: Dict[str, Any],
+        context: Optional[ScoringContext] = None,
     ) -> Tuple[float, Dict[str, Any]]:
+        context = context or self._scoring_context(parsed_intent, weather)
+        features = [self._item_features(item) for item in items]
+        sections = {item.get("section") for item in items}
         score_breakdown = {
-            "request_match": self._request_match_score(items, parsed_intent, must_by_section),
-            "style_consistency": self._style_consistency_score(items),
-            "formality": self._formality_score(items, parsed_intent),
-            "color_harmony": self._color_harmony_score(items),
-            "occasion_fit": self._occasion_fit_score(items, parsed_intent),
-            "weather": self._weather_score(items, weather),
-            "completeness": self._completeness_score(items, weather),
-            "usage_rotation": self._usage_rotation_score(items),
-            "section_correctness": self._section_correctness_score(items),
-            "template_fit": self._template_fit_score(items, parsed_intent),
+            "request_match": self._request_match_score(items, features, context, must_by_section),
+            "style_consistency": self._style_consistency_score(features, sections),
+            "formality": self._formality_score(features, context),
+            "color_harmony": self._color_harmony_score(items, features),
+            "occasion_fit": self._occasion_fit_score(features, context),
+            "weather": self._weather_score(items, features, sections, context),
+            "completeness": self._completeness_score(items, context),
+            "usage_rotation": self._usage_rotation_score(features),
+            "section_correctness": self._section_correctness_score(items, features),
+            "template_fit": self._template_fit_score(sections, context),
         }
         total = round(sum(score_breakdown.values()), 3)
         score_breakdown["total"] = total
@@ -1000,54 +1133,123 @@ class CandidateOutfitService:
             "score_explanation": self._score_explanation(score_breakdown),
         }
 
-    def _request_match_score(
+    def compile_item_features(
         self,
-        items: List[Dict[str, Any]],
-        parsed_intent: Dict[str, Any],
-        must_by_section: Dict[str, Dict[str, Any]],
-    ) -> float:
-        score = 12.0
-        item_ids = {str(item.get("id")) for item in items}
-        if must_by_section:
-            required_ids = {str(item.get("id")) for item in must_by_section.values()}
-            score += 18.0 if required_ids.issubset(item_ids) else -30.0
+        items: Iterable[Dict[str, Any]],
+    ) -> Dict[int, ItemFeatures]:
+        """Compile feature records for wardrobe items, keyed by id() of each item dict."""
+        compiled: Dict[int, ItemFeatures] = {}
+        for item in items:
+            if id(item) not in compiled:
+                compiled[id(item)] = self._compile_features(item)
+        return compiled
+
+    def _compile_features(self, item: Dict[str, Any]) -> ItemFeatures:
+        features = ItemFeatures()
+        features.id = str(item.get("id"))
+        features.section = self.get_section(item)
+        features.has_color = bool(item.get("color"))
+        features.color = self.normalize_color(item.get("color"))
+        features.color_id = COLOR_IDS.get(features.color, 0)
+        features.is_neutral = features.color in NEUTRAL_COLORS
+        features.is_strong = features.color in STRONG_COLORS
+        features.text = self._item_text(item)
+        features.match_text = self._normalize_text(
+            f"{item.get('style', '')} {item.get('occasion', '')} {item.get('name', '')} {item.get('type', '')}"
+        )
+        features.style = self._style_label_from_text(features.text)
+        features.style_id = STYLE_IDS[features.style]
+        features.formality = self._formality_from_label(features.style)
+        features.weatherproof = any(token in features.text for token in WEATHERPROOF_TOKENS)
+        features.usage = self._usage_frequency(item)
+        try:
+            features.temp_min = float(item.get("temp_min", item.get("temperature_range", {}).get("min", -10)))
+            features.temp_max = float(item.get("temp_max", item.get("temperature_range", {}).get("max", 30)))
+        except (TypeError, ValueError):
+            features.temp_min = None
+            features.temp_max = None
+        return features
+
+    def _item_features(self, item: Dict[str, Any]) -> ItemFeatures:
+        """Features of a scoring item, compiled on the fly if the caller did not."""
+        return item.get("features") or self._compile_features(item.get("source", {}))
 
-        requested_colors = {
+    def _scoring_context(
+        self,
+        parsed_intent: Dict[str, Any],
+        weather: Dict[str, Any],
+    ) -> ScoringContext:
+        context = ScoringContext()
+        context.requested_colors = {
             self.normalize_color(color)
             for color in (parsed_intent.get("requested_colors") or [])
             if color
         }
-        requested_types = {
+        context.requested_types = {
             self.normalize_type(item_type)
             for item_type in (parsed_intent.get("requested_types") or [])
             if item_type
         }
-        requested_style = self._requested_style(parsed_intent)
-        requested_occasion = self._requested_occasion(parsed_intent)
+        context.requested_style = self._requested_style(parsed_intent)
+        context.requested_occasion = self._requested_occasion(parsed_intent)
+        context.occasion_styles = OCCASION_STYLE_FIT.get(
+            context.requested_occasion, {context.requested_occasion}
+        )
+        temp = weather.get("temp", weather.get("temperature"))
+        try:
+            context.temp_value = float(temp) if temp is not None else None
+        except (TypeError, ValueError):
+            context.temp_value = None
+        condition = self._normalize_text(weather.get("condition"))
+        context.rainy = any(token in condition for token in ["rain", "chuva", "cloudy", "nublado"])
+        return context
+
+    def _features_style_matches(self, features: ItemFeatures, requested: str) -> bool:
+        """_item_style_matches for an already normalized requested style."""
+        if requested == "formal":
+            return any(token in features.match_text for token in FORMAL_MATCH_TOKENS)
+        return requested in features.match_text
+
+    def _request_match_score(
+        self,
+        items: List[Dict[str, Any]],
+        features: List[ItemFeatures],
+        context: ScoringContext,
+        must_by_section: Dict[str, Dict[str, Any]],
+    ) -> float:
+        score = 12.0
+        item_ids = {str(item.get("id")) for item in items}
+        if must_by_section:
+            required_ids = {str(item.get("id")) for item in must_by_section.values()}
+            score += 18.0 if required_ids.issubset(item_ids) else -30.0
 
-        if requested_colors:
-            colors = {self.normalize_color(item.get("source", {}).get("color")) for item in items}
-            score += 5.0 if requested_colors & colors else -8.0
-        if requested_types:
+        if context.requested_colors:
+            colors = {item_features.color for item_features in features}
+            score += 5.0 if context.requested_colors & colors else -8.0
+        if context.requested_types:
             sections = {item.get("section") for item in items}
-            score += 5.0 if requested_types & sections else -8.0
-        if requested_style:
+            score += 5.0 if context.requested_types & sections else -8.0
+        if context.requested_style:
             style_hits = sum(
-                1 for item in items
-                if self._item_style_matches(item.get("source", {}), requested_style)
+                1 for item_features in features
+                if self._features_style_matches(item_features, context.requested_style)
             )
             score += min(style_hits * 4.0, 8.0)
-        if requested_occasion:
+        if context.requested_occasion:
             occasion_hits = sum(
-                1 for item in items
-                if requested_occasion in self._item_text(item.get("source", {}))
+                1 for item_features in features
+                if context.requested_occasion in item_features.text
             )
             score += min(occasion_hits * 3.0, 6.0)
 
         return self._clamp(score, 0.0, 30.0)
 
-    def _style_consistency_score(self, items: List[Dict[str, Any]]) -> float:
-        styles = {self._item_style_label(item.get("source", {})) for item in items}
+    def _style_consistency_score(
+        self,
+        features: List[ItemFeatures],
+        sections: set,
+    ) -> float:
+        styles = {item_features.style for item_features in features}
         score = 15.0
         incompatible_pairs = [
             ("formal", "sporty"),
@@ -1060,7 +1262,6 @@ class CandidateOutfitService:
                 score -= 5.0
         if "smart casual" in styles and ({"formal", "casual"} & styles):
             score += 2.0
-        sections = {item.get("section") for item in items}
         if "dress" in sections and "pants" in sections:
             score -= 12.0
         if "jumpsuit" in sections and ("pants" in sections or "base_layer" in sections):
@@ -1071,16 +1272,16 @@ class CandidateOutfitService:
 
     def _formality_score(
         self,
-        items: List[Dict[str, Any]],
-        parsed_intent: Dict[str, Any],
+        features: List[ItemFeatures],
+        context: ScoringContext,
     ) -> float:
-        values = [self._item_formality(item.get("source", {})) for item in items]
+        values = [item_features.formality for item_features in features]
         if not values:
             return 0.0
         average = sum(values) / len(values)
         formality_range = max(values) - min(values)
         score = 15.0 - (formality_range * 2.0)
-        requested_style = self._requested_style(parsed_intent)
+        requested_style = context.requested_style
         if requested_style in {"formal", "elegant", "classic"}:
             score += 4.0 if average >= 4.0 else -6.0
         elif requested_style == "casual":
@@ -1089,25 +1290,26 @@ class CandidateOutfitService:
             score += 4.0 if 1.0 <= average <= 2.3 else -5.0
         return self._clamp(score, 0.0, 15.0)
 
-    def _color_harmony_score(self, items: List[Dict[str, Any]]) -> float:
-        colors = [
-            self.normalize_color(item.get("source", {}).get("color"))
-            for item in items
-            if item.get("source", {}).get("color")
-        ]
-        if not colors:
+    def _color_harmony_score(
+        self,
+        items: List[Dict[str, Any]],
+        features: List[ItemFeatures],
+    ) -> float:
+        colored = [item_features for item_features in features if item_features.has_color]
+        if not colored:
             return 7.0
-        neutral_count = sum(1 for color in colors if color in NEUTRAL_COLORS)
-        strong_colors = [color for color in colors if color in STRONG_COLORS]
-        unique_strong = set(strong_colors)
+        neutral_count = sum(1 for item_features in colored if item_features.is_neutral)
+        unique_strong = {
+            item_features.color for item_features in colored if item_features.is_strong
+        }
         score = 6.0 + min(neutral_count * 1.2, 4.0)
         if len(unique_strong) <= 1:
             score += 2.0
         else:
             score -= (len(unique_strong) - 1) * 3.0
         section_by_color = {
-            item.get("section"): self.normalize_color(item.get("source", {}).get("color"))
-            for item in items
+            item.get("section"): item_features.color
+            for item, item_features in zip(items, features)
         }
         if section_by_color.get("shoes") in unique_strong and (
             section_by_color.get("accessories") == section_by_color.get("shoes")
@@ -1118,57 +1320,58 @@ class CandidateOutfitService:
 
     def _occasion_fit_score(
         self,
-        items: List[Dict[str, Any]],
-        parsed_intent: Dict[str, Any],
+        features: List[ItemFeatures],
+        context: ScoringContext,
     ) -> float:
-        requested = self._requested_occasion(parsed_intent)
+        requested = context.requested_occasion
         if not requested:
             return 7.0
-        accepted_styles = OCCASION_STYLE_FIT.get(requested, {requested})
+        accepted_styles = context.occasion_styles
         hits = 0
-        for item in items:
-            source = item.get("source", {})
-            style = self._item_style_label(source)
-            text = self._item_text(source)
-            if style in accepted_styles or requested in text:
+        for item_features in features:
+            if item_features.style in accepted_styles or requested in item_features.text:
                 hits += 1
         return self._clamp(4.0 + hits * 2.0, 0.0, 10.0)
 
-    def _weather_score(self, items: List[Dict[str, Any]], weather: Dict[str, Any]) -> float:
-        temp = weather.get("temp", weather.get("temperature"))
-        condition = self._normalize_text(weather.get("condition"))
-        has_sections = {item.get("section") for item in items}
+    def _weather_score(
+        self,
+        items: List[Dict[str, Any]],
+        features: List[ItemFeatures],
+        has_sections: set,
+        context: ScoringContext,
+    ) -> float:
         score = 8.0
-        if temp is not None:
-            try:
-                temp_value = float(temp)
-                compatible = sum(
-                    1 for item in items
-                    if self._item_temperature_match(item.get("source", {}), temp_value)
-                )
-                score = 5.0 + (compatible / max(len(items), 1)) * 5.0
-                if temp_value <= 15:
-                    if "insulation_layer" in has_sections:
-                        score += 1.5
-                    if "outer_layer" in has_sections:
-                        score += 1.5
-                elif temp_value >= 24:
-                    if "outer_layer" in has_sections:
-                        score -= 2.0
-                    if "insulation_layer" in has_sections:
-                        score -= 1.5
-            except (TypeError, ValueError):
-                pass
-        if any(token in condition for token in ["rain", "chuva", "cloudy", "nublado"]):
+        temp_value = context.temp_value
+        if temp_value is not None:
+            compatible = sum(
+                1 for item_features in features
+                if item_features.temperature_match(temp_value)
+            )
+            score = 5.0 + (compatible / max(len(items), 1)) * 5.0
+            if temp_value <= 15:
+                if "insulation_layer" in has_sections:
+                    score += 1.5
+                if "outer_layer" in has_sections:
+                    score += 1.5
+            elif temp_value >= 24:
+                if "outer_layer" in has_sections:
+                    score -= 2.0
+                if "insulation_layer" in has_sections:
+                    score -= 1.5
+        if context.rainy:
             weatherproof = sum(
-                1 for item in items
+                1 for item, item_features in zip(items, features)
                 if item.get("section") in {"outer_layer", "shoes"}
-                and any(token in self._item_text(item.get("source", {})) for token in ["waterproof", "impermeavel", "rain", "chuva", "boot", "bota"])
+                and item_features.weatherproof
             )
             score += min(weatherproof, 2) * 1.0
         return self._clamp(score, 0.0, 12.0)
 
-    def _completeness_score(self, items: List[Dict[str, Any]], weather: Dict[str, Any]) -> float:
+    def _completeness_score(
+        self,
+        items: List[Dict[str, Any]],
+        context: ScoringContext,
+    ) -> float:
         section_counts: Dict[str, int] = {}
         for item in items:
             section = item.get("section")
@@ -1183,11 +1386,7 @@ class CandidateOutfitService:
             score += 1.0
         if section_counts.get("accessories"):
             score += 1.0
-        temp = weather.get("temp", weather.get("temperature"))
-        try:
-            temp_value = float(temp) if temp is not None else None
-        except (TypeError, ValueError):
-            temp_value = None
+        temp_value = context.temp_value
         if temp_value is not None and temp_value <= 15:
             if section_counts.get("insulation_layer"):
                 score += 1.0
@@ -1205,13 +1404,12 @@ class CandidateOutfitService:
 
     def _template_fit_score(
         self,
-        items: List[Dict[str, Any]],
-        parsed_intent: Dict[str, Any],
+        sections: set,
+        context: ScoringContext,
     ) -> float:
-        sections = {item.get("section") for item in items}
         score = 8.0
-        requested_style = self._requested_style(parsed_intent)
-        requested_occasion = self._requested_occasion(parsed_intent)
+        requested_style = context.requested_style
+        requested_occasion = context.requested_occasion
 
         if "dress" in sections and "pants" in sections:
             score -= 12.0
@@ -1241,21 +1439,25 @@ class CandidateOutfitService:
 
         return self._clamp(score, 0.0, 14.0)
 
-    def _usage_rotation_score(self, items: List[Dict[str, Any]]) -> float:
-        if not items:
+    def _usage_rotation_score(self, features: List[ItemFeatures]) -> float:
+        if not features:
             return 0.0
-        usages = [self._usage_frequency(item.get("source", {})) for item in items]
+        usages = [item_features.usage for item_features in features]
         average_usage = sum(usages) / len(usages)
         score = 6.0 - min(average_usage, 10.0) * 0.45
         unused_bonus = sum(1 for usage in usages if usage <= 1) * 0.2
         return self._clamp(score + unused_bonus, 0.0, 6.0)
 
-    def _section_correctness_score(self, items: List[Dict[str, Any]]) -> float:
+    def _section_correctness_score(
+        self,
+        items: List[Dict[str, Any]],
+        features: List[ItemFeatures],
+    ) -> float:
         if not items:
             return 0.0
         correct = sum(
-            1 for item in items
-            if item.get("section") == self.get_section(item.get("source", {}))
+            1 for item, item_features in zip(items, features)
+            if item.get("section") == item_features.section
         )
         return self._clamp((correct / len(items)) * 10.0, 0.0, 10.0)
 
@@ -1305,7 +1507,9 @@ class CandidateOutfitService:
         return text
 
     def _item_style_label(self, item: Dict[str, Any]) -> str:
-        text = self._item_text(item)
+        return self._style_label_from_text(self._item_text(item))
+
+    def _style_label_from_text(self, text: str) -> str:
         if any(token in text for token in ["formal", "work", "office", "camisa", "shirt", "blazer", "elegant", "elegante", "vestido formal", "dress formal", "mala formal"]):
             return "formal"
         if any(token in text for token in ["classic", "classico", "classica", "classicas", "trousers", "calcas classicas", "saia classica"]):
@@ -1321,7 +1525,9 @@ class CandidateOutfitService:
         return "casual"
 
     def _item_formality(self, item: Dict[str, Any]) -> int:
-        label = self._item_style_label(item)
+        return self._formality_from_label(self._item_style_label(item))
+
+    def _formality_from_label(self, label: str) -> int:
         if label in {"sporty", "streetwear"}:
             return 1
         if label == "casual":
@@ -0,0 +1,320 @@
+"""
+Candidate Prompt Encoder
+
+Compact LLaVA prompt for candidate selection.
+
+Prefill dominates candidate selection on a CPU-bound local LLaVA, and the
+verbose prompt repeated every item of every candidate with its full UUID
+("Section: ... | ID: <uuid> | Name: ...") plus the score explanation of each
+candidate. The encoder instead:
+
+1. lists every item once in a table under a short alias (I1, I2, ...), the
+   way recommend_travel_outfits uses ITEM_n; candidates reference aliases;
+2. measures the prompt with estimate_tokens() and drops detail until it fits
+   CANDIDATE_PROMPT_TOKEN_BUDGET:
+     level 0: score explanation, diversity reason, strengths, weaknesses
+     level 1: strengths and weaknesses only
+     level 2: scores only
+     level 3: item table reduced to section, name and color
+3. keeps the alias -> item UUID mapping so the response can be mapped back
+   (EncodedCandidatePrompt.candidate_for_alias / expand_aliases).
+
+The budget relies on the estimate, so record_measured() compares it with the
+prompt token count reported by the server (Ollama prompt_eval_count, OpenAI
+usage.prompt_tokens, passed in VLMResponse.metadata["prompt_tokens"]). Only
+text-only prompts enter the estimate ratio: image tokens are counted by the
+server but not by estimate_tokens(). Streams stopped early carry no count.
+
+Environment Variables:
+- CANDIDATE_PROMPT_TOKEN_BUDGET: Target prompt size in tokens (default 700,
+  0 = always use the most detailed level)
+"""
+
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+MAX_DETAIL_LEVEL = 3
+
+# LLaMA-style tokenizers split digits individually and long words into
+# ~4-character pieces; punctuation is usually its own token.
+_TOKEN_PIECE = re.compile(r"[^\W\d_]+|\d|_|[^\w\s]")
+_ITEM_ALIAS = re.compile(r"\bI(\d+)\b")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLaMA token count of `text`."""
+    count = 0
+    for piece in _TOKEN_PIECE.findall(text or ""):
+        count += max(1, math.ceil(len(piece) / 4)) if piece[0].isalpha() else 1
+    return count
+
+
+@dataclass
+class EncodedCandidatePrompt:
+    """
+    Encoded prompt plus what is needed to read the answer back.
+
+    Attributes:
+        text: Prompt sent to LLaVA
+        item_aliases: Alias (I1, ...) -> wardrobe item ID
+        item_names: Alias -> item name
+        candidate_aliases: Candidate ID -> aliases of its items
+        token_count: estimate_tokens(text)
+        detail_level: 0 (full) .. MAX_DETAIL_LEVEL (most compact)
+        within_budget: Whether token_count fits the budget
+    """
+
+    text: str
+    item_aliases: Dict[str, str]
+    item_names: Dict[str, str]
+    candidate_aliases: Dict[str, List[str]]
+    token_count: int
+    detail_level: int
+    within_budget: bool
+
+    def candidate_for_alias(self, value: str) -> Optional[str]:
+        """
+        Candidate ID for an answer that names an item instead of a candidate.
+
+        Accepts an alias (I3) or an item UUID; returns the candidate only
+        when exactly one candidate contains that item.
+        """
+        value = (value or "").strip()
+        alias = value if value in self.item_aliases else next(
+            (alias for alias, item_id in self.item_aliases.items() if item_id == value),
+            None,
+        )
+        if alias is None:
+            return None
+        matches = [
+            candidate_id
+            for candidate_id, aliases in self.candidate_aliases.items()
+            if alias in aliases
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    def expand_aliases(self, text: str) -> str:
+        """Replace item aliases in LLaVA's reasoning with item names."""
+        return _ITEM_ALIAS.sub(
+            lambda match: self.item_names.get(match.group(0), match.group(0)),
+            text or "",
+        )
+
+
+class CandidatePromptEncoder:
+    """
+    Builds compact candidate-selection prompts within a token budget.
+    """
+
+    DEFAULT_TOKEN_BUDGET = 700
+
+    def __init__(self, token_budget: Optional[int] = None):
+        """
+        Initialize the encoder.
+
+        Args:
+            token_budget: Target prompt tokens (CANDIDATE_PROMPT_TOKEN_BUDGET,
+                0 = no trimming)
+        """
+        self.token_budget = (
+            token_budget
+            if token_budget is not None
+            else int(os.getenv("CANDIDATE_PROMPT_TOKEN_BUDGET", self.DEFAULT_TOKEN_BUDGET))
+        )
+        self.prompts = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.over_budget = 0
+        self.levels = [0] * (MAX_DETAIL_LEVEL + 1)
+        self.measured = 0
+        self.total_measured_tokens = 0
+        self.text_only_measured = 0
+        self.text_only_estimated_tokens = 0
+        self.text_only_measured_tokens = 0
+
+    def encode(
+        self,
+        candidates: List[Dict[str, Any]],
+        user_request: str,
+        weather_data: Dict[str, Any],
+        detail_level: Optional[int] = None,
+    ) -> EncodedCandidatePrompt:
+        """
+        Encode the candidate-selection prompt.
+
+        Args:
+            candidates: Candidates from CandidateOutfitService (already ranked)
+            user_request: Original user request text
+            weather_data: Weather used for the recommendation
+            detail_level: Force a detail level instead of fitting the budget
+
+        Returns:
+            EncodedCandidatePrompt at the most detailed level within budget
+        """
+        item_aliases: Dict[str, str] = {}
+        items_by_alias: Dict[str, Dict[str, Any]] = {}
+        alias_by_item: Dict[str, str] = {}
+        candidate_aliases: Dict[str, List[str]] = {}
+        for candidate in candidates:
+            aliases = []
+            for item in candidate.get("items", []):
+                item_id = str(item.get("id") or "")
+                key = item_id or f"unnamed-{id(item)}"
+                alias = alias_by_item.get(key)
+                if alias is None:
+                    alias = f"I{len(alias_by_item) + 1}"
+                    alias_by_item[key] = alias
+                    item_aliases[alias] = item_id
+                    items_by_alias[alias] = item
+                aliases.append(alias)
+            candidate_aliases[str(candidate.get("candidate_id"))] = aliases
+
+        weather = json.dumps(
+            {key: value for key, value in (weather_data or {}).items() if value is not None},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+        levels = range(MAX_DETAIL_LEVEL + 1) if detail_level is None else [detail_level]
+        for level in levels:
+            text = self._render(level, candidates, candidate_aliases, items_by_alias, user_request, weather)
+            token_count = estimate_tokens(text)
+            within_budget = not self.token_budget or token_count <= self.token_budget
+            if within_budget:
+                break
+
+        self.prompts += 1
+        self.total_tokens += token_count
+        self.max_tokens = max(self.max_tokens, token_count)
+        self.over_budget += int(not within_budget)
+        self.levels[level] += 1
+        return EncodedCandidatePrompt(
+            text=text,
+            item_aliases=item_aliases,
+            item_names={alias: str(item.get("name") or alias) for alias, item in items_by_alias.items()},
+            candidate_aliases=candidate_aliases,
+            token_count=token_count,
+            detail_level=level,
+            within_budget=within_budget,
+        )
+
+    def record_measured(
+        self,
+        encoded: EncodedCandidatePrompt,
+        prompt_tokens: Optional[int],
+        image_count: int = 0,
+    ) -> None:
+        """
+        Record the server-reported prompt size of an encoded prompt.
+
+        Args:
+            encoded: Prompt that was sent
+            prompt_tokens: Server prompt token count (None if not reported)
+            image_count: Images sent with the prompt
+        """
+        if not isinstance(prompt_tokens, int) or prompt_tokens <= 0:
+            return
+        self.measured += 1
+        self.total_measured_tokens += prompt_tokens
+        if not image_count:
+            self.text_only_measured += 1
+            self.text_only_estimated_tokens += encoded.token_count
+            self.text_only_measured_tokens += prompt_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "prompts": self.prompts,
+            "avg_tokens": round(self.total_tokens / self.prompts, 1) if self.prompts else 0,
+            "max_tokens": self.max_tokens,
+            "over_budget": self.over_budget,
+            "detail_levels": list(self.levels),
+            "measured": {
+                "prompts": self.measured,
+                "avg_tokens": (
+                    round(self.total_measured_tokens / self.measured, 1) if self.measured else 0
+                ),
+                "text_only_prompts": self.text_only_measured,
+                # measured / estimated; > 1 means the estimate undercounts
+                "estimate_ratio": (
+                    round(self.text_only_measured_tokens / self.text_only_estimated_tokens, 3)
+                    if self.text_only_estimated_tokens else None
+                ),
+            },
+        }
+
+    # -------------------------------------------------------------- internals
+
+    def _render(
+        self,
+        level: int,
+        candidates: List[Dict[str, Any]],
+        candidate_aliases: Dict[str, List[str]],
+        items_by_alias: Dict[str, Dict[str, Any]],
+        user_request: str,
+        weather: str,
+    ) -> str:
+        fields = ("section", "name", "color") if level >= 3 else (
+            "section", "name", "type", "color", "style", "occasion"
+        )
+        item_lines = []
+        for alias, item in items_by_alias.items():
+            values = [_field_text(item.get(name)) for name in fields]
+            item_lines.append(f"{alias}: " + " | ".join(value for value in values if value))
+
+        candidate_lines = []
+        for candidate in candidates:
+            candidate_id = str(candidate.get("candidate_id"))
+            metadata = candidate.get("metadata", {}) or {}
+            candidate_lines.append(
+                f"{candidate_id} (score {candidate.get('score')}): "
+                + " ".join(candidate_aliases.get(candidate_id, []))
+            )
+            if level == 0:
+                for label, value in (
+                    ("why", metadata.get("score_explanation")),
+                    ("diversity", metadata.get("diversity_reason")),
+                ):
+                    if value:
+                        candidate_lines.append(f"  {label}: {value}")
+            if level <= 1:
+                strengths = ", ".join(metadata.get("strengths") or [])
+                weaknesses = ", ".join(metadata.get("weaknesses") or [])
+                if strengths:
+                    candidate_lines.append(f"  +: {strengths}")
+                if weaknesses:
+                    candidate_lines.append(f"  -: {weaknesses}")
+
+        return f"""You are a stylist choosing the best outfit candidate.
+
+Choose ONLY one candidate ID (the letter) from the candidate list. Candidates are already validated outfits.
+Do not invent, change, remove or select individual items.
+Prefer higher scores unless there is a clear visual/style reason, and never ignore hard request matches.
+Return JSON only. No markdown. No extra text.
+
+User request: {user_request or "No specific request"}
+Weather: {weather}
+
+Items (alias: {" | ".join(fields)}):
+{chr(10).join(item_lines)}
+
+Candidates (ID (score): item aliases):
+{chr(10).join(candidate_lines)}
+
+Required response:
+{{"selected_candidate": "A", "reasoning": "short explanation", "confidence": 0.0}}
+"""
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return "/".join(str(part) for part in value if part)
+    return str(value) if value not in (None, "") else ""
+
+
+candidate_prompt_encoder = CandidatePromptEncoder()
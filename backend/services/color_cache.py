@@ -0,0 +1,150 @@
+"""
+Persistent Color Cache
+
+Bounded on-disk cache for image color inference results.
+
+Entries are keyed by a SHA-256 digest instead of the raw image reference, so a
+multi-MB data URI costs 64 bytes of key. The cache is stored in SQLite so it
+survives restarts and is shared by the color inference worker processes.
+Eviction is least-recently-used once max_entries is exceeded.
+
+A cached value of None means "the image was decoded but has no clear color",
+which is a valid result and is cached like any other.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+
+def content_key(value: Union[str, bytes]) -> str:
+    """Return the SHA-256 hex digest used as cache key."""
+    data = value.encode("utf-8") if isinstance(value, str) else value
+    return hashlib.sha256(data).hexdigest()
+
+
+class PersistentColorCache:
+    """
+    SQLite-backed LRU cache mapping content hashes to color names.
+
+    One connection is opened lazily per process (the worker pool uses spawned
+    processes) and guarded by a lock for the threads of that process.
+    """
+
+    DEFAULT_PATH = os.path.join(".cache", "color_cache.sqlite3")
+    DEFAULT_MAX_ENTRIES = 5000
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file path (COLOR_CACHE_PATH); ":memory:" for tests
+            max_entries: Maximum cached results (COLOR_CACHE_MAX_ENTRIES)
+        """
+        self.path = path or os.getenv("COLOR_CACHE_PATH", self.DEFAULT_PATH)
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("COLOR_CACHE_MAX_ENTRIES", self.DEFAULT_MAX_ENTRIES))
+        )
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self._disabled = False
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._disabled:
+            return None
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ":memory:":
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=2.0, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS color_cache ("
+                "key TEXT PRIMARY KEY, color TEXT, last_used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS color_cache_last_used ON color_cache(last_used)"
+            )
+            connection.commit()
+        except sqlite3.Error as exc:
+            print(f"[ColorCache] Disabled, could not open {self.path}: {exc}")
+            self._disabled = True
+            return None
+
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+    def lookup(self, key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Look up a cached result.
+
+        Returns:
+            (found, color) - color may be None for a cached "no clear color"
+        """
+        with self._lock:
+            connection = self._connect()
+            if connection is None:
+                return False, None
+            try:
+                row = connection.execute(
+                    "SELECT color FROM color_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return False, None
+                connection.execute(
+                    "UPDATE color_cache SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                connection.commit()
+                return True, row[0] or None
+            except sqlite3.Error as exc:
+                print(f"[ColorCache] Lookup failed: {exc}")
+                return False, None
+
+    def store(self, key: str, color: Optional[str]) -> None:
+        """Store a result and evict the least recently used overflow."""
+        with self._lock:
+            connection = self._connect()
+            if connection is None:
+                return
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO color_cache (key, color, last_used) VALUES (?, ?, ?)",
+                    (key, color or "", time.time()),
+                )
+                connection.execute(
+                    "DELETE FROM color_cache WHERE key IN ("
+                    "SELECT key FROM color_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                connection.commit()
+            except sqlite3.Error as exc:
+                print(f"[ColorCache] Store failed: {exc}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            connection = self._connect()
+            if connection is None:
+                return 0
+            return connection.execute("SELECT COUNT(*) FROM color_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            connection = self._connect()
+            if connection is not None:
+                connection.execute("DELETE FROM color_cache")
+                connection.commit()
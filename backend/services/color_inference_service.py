@@ -5,6 +5,11 @@ This is intentionally conservative: explicit metadata should be authoritative,
 and image inference should only return a color when there is clear chromatic
 evidence. Dark or low-saturation images are left unknown instead of being
 treated as black.
+
+Results are cached on disk (see services/color_cache.py) keyed by a hash of
+the image reference and of the decoded image bytes. Pixel bucketing runs
+vectorized with NumPy when it is installed and falls back to the original
+per-pixel loop otherwise; both produce the same dominant bucket.
 """
 
 import base64
@@ -16,10 +21,18 @@ from typing import Any, Optional, Tuple
 import httpx
 from PIL import Image
 
+from services.color_cache import PersistentColorCache, content_key
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    np = None
+
 
 MAX_IMAGE_BYTES = 5 * 1024 * 1024
 TIMEOUT_SECONDS = 2.5
-_COLOR_CACHE = {}
+THUMBNAIL_SIZE = (96, 96)
+_COLOR_CACHE = PersistentColorCache()
 
 
 def infer_dominant_color(image_value: Any) -> Optional[str]:
@@ -28,23 +41,30 @@ def infer_dominant_color(image_value: Any) -> Optional[str]:
     if not image_ref:
         return None
 
-    if image_ref in _COLOR_CACHE:
-        return _COLOR_CACHE[image_ref]
+    ref_key = content_key(image_ref)
+    found, color = _COLOR_CACHE.lookup(ref_key)
+    if found:
+        return color
 
     try:
         image_bytes = _read_image_bytes(image_ref)
         if not image_bytes:
-            _COLOR_CACHE[image_ref] = None
             return None
 
-        with Image.open(io.BytesIO(image_bytes)) as image:
-            rgb = _dominant_rgb(image)
-            color = _rgb_to_color_name(rgb) if rgb else None
-            _COLOR_CACHE[image_ref] = color
-            return color
+        # Same picture behind a different URL/path: reuse the decoded result.
+        bytes_key = content_key(image_bytes)
+        found, color = _COLOR_CACHE.lookup(bytes_key)
+        if not found:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                rgb = _dominant_rgb(image)
+                color = _rgb_to_color_name(rgb) if rgb else None
+            _COLOR_CACHE.store(bytes_key, color)
+
+        _COLOR_CACHE.store(ref_key, color)
+        return color
     except Exception as exc:
+        # Fetch/decode failures are not cached: they are often transient.
         print(f"[ColorInference] Could not infer color for image: {exc}")
-        _COLOR_CACHE[image_ref] = None
         return None
 
 
@@ -97,10 +117,69 @@ def _find_local_image(path: str) -> Optional[str]:
 
 def _dominant_rgb(image: Image.Image) -> Optional[Tuple[int, int, int]]:
     image = image.convert("RGBA")
-    image.thumbnail((96, 96))
+    image.thumbnail(THUMBNAIL_SIZE)
+
+    if np is None:
+        dominant_bucket = _dominant_bucket_python(image)
+    else:
+        dominant_bucket = _dominant_bucket_numpy(image)
+
+    if dominant_bucket is None:
+        return None
+
+    return tuple(min(channel * 32 + 16, 255) for channel in dominant_bucket)
+
+
+def _dominant_bucket_numpy(image: Image.Image) -> Optional[Tuple[int, int, int]]:
+    """
+    Vectorized equivalent of _dominant_bucket_python.
 
+    HSV saturation/value are computed exactly like colorsys.rgb_to_hsv on
+    float64 channels, and ties between buckets are broken by first pixel
+    occurrence, matching max() over an insertion-ordered dict.
+    """
+    pixels = np.asarray(image, dtype=np.uint8).reshape(-1, 4)
+    pixels = pixels[pixels[:, 3] >= 128]
+    if not len(pixels):
+        return None
+
+    rgb = pixels[:, :3]
+    channels = rgb.astype(np.float64) / 255
+    value = channels.max(axis=1)
+    spread = value - channels.min(axis=1)
+    saturation = np.divide(
+        spread,
+        value,
+        out=np.zeros_like(value),
+        where=spread != 0,
+    )
+
+    # Ignore common white/light-gray product-photo backgrounds, then
+    # ambiguous low-saturation pixels (see _dominant_bucket_python).
+    keep = ~((value > 0.78) & (saturation < 0.25)) & (saturation >= 0.18)
+    if not keep.any():
+        return None
+
+    buckets = rgb[keep].astype(np.int32) // 32
+    bucket_ids = buckets[:, 0] * 64 + buckets[:, 1] * 8 + buckets[:, 2]
+    unique_ids, first_index, counts = np.unique(
+        bucket_ids, return_index=True, return_counts=True
+    )
+    tied = counts == counts.max()
+    dominant_id = int(unique_ids[tied][np.argmin(first_index[tied])])
+    return dominant_id // 64, (dominant_id // 8) % 8, dominant_id % 8
+
+
+def _pixels(image: Image.Image):
+    # Image.getdata() is deprecated since Pillow 12.1 in favour of
+    # get_flattened_data(); older Pillow only has getdata().
+    get_flattened_data = getattr(image, "get_flattened_data", None)
+    return get_flattened_data() if get_flattened_data else image.getdata()
+
+
+def _dominant_bucket_python(image: Image.Image) -> Optional[Tuple[int, int, int]]:
     buckets = {}
-    for red, green, blue, alpha in image.getdata():
+    for red, green, blue, alpha in _pixels(image):
         if alpha < 128:
             continue
 
@@ -121,8 +200,7 @@ def _dominant_rgb(image: Image.Image) -> Optional[Tuple[int, int, int]]:
     if not buckets:
         return None
 
-    dominant_bucket = max(buckets, key=buckets.get)
-    return tuple(min(channel * 32 + 16, 255) for channel in dominant_bucket)
+    return max(buckets, key=buckets.get)
 
 
 def _rgb_to_color_name(rgb: Tuple[int, int, int]) -> str:
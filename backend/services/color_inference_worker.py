@@ -0,0 +1,205 @@
+"""
+Background Color Inference Worker
+
+Moves image-based color inference out of the request path.
+
+WardrobeService used to call infer_dominant_color() synchronously while
+formatting every item without color metadata, which downloaded the image and
+ran the pixel loop inside the async request handler. Now _format_item only
+submits a job here and reports the item with color_source="pending". Jobs run
+in a process pool (image decoding is CPU bound), and each result is handed to
+a completion callback which persists it on the `clothes` row so later loads
+never recompute it.
+
+Design notes:
+- Jobs are deduplicated by item ID while pending.
+- The in-memory result map is bounded (LRU) and only bridges the gap until
+  the persisted value is read back from the database.
+- When no event loop is running (scripts, tests) submit() returns False and
+  the caller falls back to synchronous inference.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.color_inference_service import infer_dominant_color
+
+
+UNKNOWN_COLOR = "unknown"
+
+CompletionCallback = Callable[[str, str], Optional[Awaitable[None]]]
+
+
+def _infer_color_job(image_ref: str) -> str:
+    """Process-pool entry point. Always returns a string so it can be persisted."""
+    color = infer_dominant_color(image_ref)
+    return color or UNKNOWN_COLOR
+
+
+class ColorInferenceWorker:
+    """
+    Async job queue for dominant-color inference backed by a process pool.
+    """
+
+    DEFAULT_MAX_WORKERS = 2
+    DEFAULT_MAX_PENDING = 256
+    DEFAULT_MAX_RESULTS = 10000
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_results: int = DEFAULT_MAX_RESULTS,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            max_workers: Process pool size (COLOR_INFERENCE_WORKERS, default 2)
+            max_pending: Maximum queued/in-flight jobs (COLOR_INFERENCE_MAX_PENDING)
+            max_results: Maximum completed results kept in memory
+        """
+        self.max_workers = (
+            max_workers
+            if max_workers is not None
+            else int(os.getenv("COLOR_INFERENCE_WORKERS", self.DEFAULT_MAX_WORKERS))
+        )
+        self.max_pending = (
+            max_pending
+            if max_pending is not None
+            else int(os.getenv("COLOR_INFERENCE_MAX_PENDING", self.DEFAULT_MAX_PENDING))
+        )
+        self.max_results = max_results
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._results: "OrderedDict[str, str]" = OrderedDict()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def lookup(self, item_id: Any) -> Optional[str]:
+        """Return a completed inference result ("unknown" if none was found)."""
+        return self._results.get(str(item_id))
+
+    def forget(self, item_id: Any) -> None:
+        """Drop a completed result (e.g. after the item image changed)."""
+        self._results.pop(str(item_id), None)
+
+    def is_pending(self, item_id: Any) -> bool:
+        return str(item_id) in self._pending
+
+    def submit(
+        self,
+        item_id: Any,
+        image_ref: str,
+        on_complete: Optional[CompletionCallback] = None,
+    ) -> bool:
+        """
+        Queue color inference for an item.
+
+        Args:
+            item_id: Wardrobe item ID (deduplication key)
+            image_ref: Image URL, local path, or data URI
+            on_complete: Called with (item_id, color) once the job finishes;
+                may be a coroutine function
+
+        Returns:
+            True if the job is queued or already pending, False if the caller
+            must infer synchronously (no running loop or worker disabled)
+        """
+        key = str(item_id or "")
+        if not key or not image_ref or not self.enabled:
+            return False
+        if key in self._pending:
+            return True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        if len(self._pending) >= self.max_pending:
+            # Queue is saturated: leave the item pending and retry on a later load.
+            self.rejected += 1
+            return True
+
+        self._pending[key] = loop.create_task(
+            self._run(key, image_ref, on_complete)
+        )
+        return True
+
+    async def _run(
+        self,
+        item_id: str,
+        image_ref: str,
+        on_complete: Optional[CompletionCallback],
+    ) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            color = await loop.run_in_executor(
+                self._get_executor(), _infer_color_job, image_ref
+            )
+            self._store_result(item_id, color)
+            self.completed += 1
+            print(f"[ColorInferenceWorker] Inferred item={item_id} color={color}")
+
+            if on_complete:
+                outcome = on_complete(item_id, color)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+        except Exception as exc:
+            self.failed += 1
+            print(f"[ColorInferenceWorker] Job failed for item={item_id}: {exc}")
+        finally:
+            self._pending.pop(item_id, None)
+
+    def _store_result(self, item_id: str, color: str) -> None:
+        self._results[item_id] = color
+        self._results.move_to_end(item_id)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def drain(self) -> None:
+        """Wait for every pending job (used by tests and graceful shutdown)."""
+        while self._pending:
+            await asyncio.gather(*list(self._pending.values()), return_exceptions=True)
+
+    def shutdown(self) -> None:
+        """Cancel pending jobs and stop the process pool."""
+        for task in list(self._pending.values()):
+            task.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker statistics."""
+        return {
+            "max_workers": self.max_workers,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cached_results": len(self._results),
+        }
+
+
+color_inference_worker = ColorInferenceWorker()
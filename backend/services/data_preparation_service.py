@@ -20,6 +20,7 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from database import supabase
+from services.db_executor import db_executor
 from services.item_scoring_service import ItemScoringService
 
 
@@ -650,23 +651,24 @@ class DataPreparationService:
         """
         import asyncio
 
-        def fetch_db_data():
-            # Get clothes
-            clothes_query = self.supabase.table("clothes").select("*").eq("user_id", user_id)
-            if only_clean:
-                clothes_query = clothes_query.eq("status", "clean")
-            clothes_resp = clothes_query.execute()
-            # Get usage history
-            usage_resp = (
-                self.supabase.table("usage_history")
-                .select("worn_date, clothing_id")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            return clothes_resp.data or [], usage_resp.data or []
+        # Get clothes
+        clothes_query = self.supabase.table("clothes").select("*").eq("user_id", user_id)
+        if only_clean:
+            clothes_query = clothes_query.eq("status", "clean")
+        # Get usage history
+        usage_query = (
+            self.supabase.table("usage_history")
+            .select("worn_date, clothing_id")
+            .eq("user_id", user_id)
+        )
 
         try:
-            items, all_usage_records = await asyncio.to_thread(fetch_db_data)
+            # Both queries run concurrently on the database executor.
+            clothes_resp, usage_resp = await asyncio.gather(
+                db_executor.execute(clothes_query),
+                db_executor.execute(usage_query),
+            )
+            items, all_usage_records = clothes_resp.data or [], usage_resp.data or []
 
             # Filter excluded items
             if exclude_items and apply_exclude_filter:
@@ -0,0 +1,124 @@
+"""
+Database Executor
+
+Runs blocking Supabase (PostgREST) calls off the event loop.
+
+supabase-py's sync client blocks for the whole HTTP round-trip on
+`.execute()`. WardrobeService, UsageService and the /usage routes called it
+directly from `async def` code, so one slow query stalled every concurrent
+request served by the same event loop (including /ai-outfit/today). Only
+DataPreparationService used asyncio.to_thread, which shares the default
+executor with every other to_thread caller.
+
+DatabaseExecutor owns a dedicated, bounded thread pool:
+
+    rows = (await db_executor.execute(
+        supabase.table("clothes").select("*").eq("user_id", user_id)
+    )).data
+
+Query builders are cheap to create on the loop; only `.execute()` (or any
+blocking callable passed to run()) happens on a worker thread. The pool size
+caps how many PostgREST requests one process keeps in flight, so a burst of
+requests queues here instead of opening unbounded connections.
+
+Environment Variables:
+- DB_EXECUTOR_MAX_WORKERS: Concurrent blocking database calls (default 16)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class DatabaseExecutor:
+    """
+    Bounded thread pool for blocking database calls, awaitable from async code.
+    """
+
+    DEFAULT_MAX_WORKERS = 16
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialize the executor. The thread pool is created on first use.
+
+        Args:
+            max_workers: Concurrent blocking calls (DB_EXECUTOR_MAX_WORKERS)
+        """
+        self.max_workers = max_workers or int(
+            os.getenv("DB_EXECUTOR_MAX_WORKERS", self.DEFAULT_MAX_WORKERS)
+        )
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    async def run(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking callable on the database pool and await its result.
+
+        Exceptions raised by the callable propagate to the caller.
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        return await loop.run_in_executor(
+            self._get_pool(),
+            functools.partial(self._timed, function, submitted_at, args, kwargs),
+        )
+
+    async def execute(self, query: Any) -> Any:
+        """Await `query.execute()` of a Supabase query builder."""
+        return await self.run(query.execute)
+
+    def shutdown(self) -> None:
+        """Stop the pool (FastAPI shutdown); a new one is created if used again."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "calls": self.calls,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "avg_queue_wait_ms": round(self.total_wait_ms / self.calls, 2) if self.calls else 0.0,
+                "avg_run_ms": round(self.total_run_ms / self.calls, 2) if self.calls else 0.0,
+            }
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="supabase-db",
+                )
+            return self._pool
+
+    def _timed(self, function: Callable[..., T], submitted_at: float, args, kwargs) -> T:
+        started_at = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.total_wait_ms += (started_at - submitted_at) * 1000
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.total_run_ms += (time.perf_counter() - started_at) * 1000
+
+
+db_executor = DatabaseExecutor()
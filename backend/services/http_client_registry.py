@@ -0,0 +1,237 @@
+"""
+HTTP Client Registry
+
+Application-lifetime pool of httpx.AsyncClient instances.
+
+LLaVAService and ImagePreprocessingService used to open a new AsyncClient
+(and therefore a new TCP/TLS connection) for every VLM call and every image
+fetch. The registry keeps one named client per purpose ("vlm", "images"),
+with connection limits and keep-alive, created at FastAPI startup and closed
+at shutdown (see main.py). Timeouts stay per request, so one client can serve
+callers with different deadlines.
+
+A client belongs to the event loop it was created on. It is also closed when
+that loop shuts down (asyncio.run and uvicorn finalize async generators
+before closing the loop), since its connections cannot be closed from
+another loop afterwards. A client replaced for a new loop is kept until it
+is closed.
+
+Environment Variables:
+- HTTP_CLIENT_MAX_CONNECTIONS: Max open connections per client (default 20)
+- HTTP_CLIENT_MAX_KEEPALIVE: Max idle keep-alive connections (default 10)
+- HTTP_CLIENT_KEEPALIVE_EXPIRY: Idle connection lifetime in seconds (default 30)
+- HTTP_CLIENT_HTTP2: Enable HTTP/2 when the `h2` package is available (default false)
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+
+
+DEFAULT_CLIENT = "default"
+VLM_CLIENT = "vlm"
+IMAGES_CLIENT = "images"
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPClientRegistry:
+    """
+    Named, lazily created, shared httpx.AsyncClient instances.
+    """
+
+    DEFAULT_MAX_CONNECTIONS = 20
+    DEFAULT_MAX_KEEPALIVE = 10
+    DEFAULT_KEEPALIVE_EXPIRY = 30.0
+    DEFAULT_TIMEOUT = 30.0
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        """
+        Initialize the registry. Clients are created on first use.
+
+        Args:
+            max_connections: Max open connections per client
+            max_keepalive_connections: Max idle keep-alive connections per client
+            keepalive_expiry: Seconds an idle connection is kept open
+            http2: Request HTTP/2 (ignored if `h2` is not installed)
+        """
+        self.max_connections = max_connections or int(
+            os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", self.DEFAULT_MAX_CONNECTIONS)
+        )
+        self.max_keepalive_connections = max_keepalive_connections or int(
+            os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", self.DEFAULT_MAX_KEEPALIVE)
+        )
+        self.keepalive_expiry = keepalive_expiry or float(
+            os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", self.DEFAULT_KEEPALIVE_EXPIRY)
+        )
+        requested_http2 = (
+            http2
+            if http2 is not None
+            else os.getenv("HTTP_CLIENT_HTTP2", "false").lower() in ("true", "1", "yes", "on")
+        )
+        self.http2 = requested_http2 and _h2_available()
+        if requested_http2 and not self.http2:
+            print("[HTTPClientRegistry] HTTP/2 requested but `h2` is not installed; using HTTP/1.1")
+
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._client_loops: Dict[str, asyncio.AbstractEventLoop] = {}
+        self._retired: List[Tuple[str, httpx.AsyncClient]] = []
+        self._shutdown_guards: Dict[int, AsyncGenerator[None, None]] = {}
+        self._requests: Dict[str, int] = {}
+
+    def get_client(self, name: str = DEFAULT_CLIENT) -> httpx.AsyncClient:
+        """
+        Return the shared client for a purpose, creating it if needed.
+
+        A client is bound to the event loop it was created on; if called from
+        a different loop (e.g. a script using several asyncio.run calls) a new
+        client is created for the current loop and the old one is closed.
+        """
+        loop = _running_loop()
+        client = self._clients.get(name)
+        if client is not None and not client.is_closed:
+            if self._client_loops.get(name) is loop:
+                return client
+            self._retire(name, client, self._client_loops.get(name))
+
+        client = httpx.AsyncClient(
+            timeout=self.DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            http2=self.http2,
+            event_hooks={"request": [self._on_request(name)]},
+        )
+        self._clients[name] = client
+        self._client_loops[name] = loop
+        if loop is not None:
+            self._close_at_loop_shutdown(name, client)
+        print(f"[HTTPClientRegistry] Created client name={name} http2={self.http2}")
+        return client
+
+    def _close_at_loop_shutdown(self, name: str, client: httpx.AsyncClient) -> None:
+        """Close `client` on its own loop when the loop finalizes async generators."""
+        async def guard():
+            try:
+                yield
+            finally:
+                await self._close_client(name, client)
+
+        agen = guard()
+        self._shutdown_guards[id(client)] = agen
+        # Step to the yield now: the first iteration registers the generator
+        # with the running loop (a task could be cancelled before it starts).
+        try:
+            agen.asend(None).send(None)
+        except StopIteration:
+            pass
+
+    def _retire(
+        self,
+        name: str,
+        client: httpx.AsyncClient,
+        client_loop: Optional[asyncio.AbstractEventLoop],
+    ) -> None:
+        """Close a client replaced for another loop, on its own loop if it still runs."""
+        if client_loop is not None and client_loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._close_client(name, client), client_loop)
+        else:
+            self._retired.append((name, client))
+
+    async def _close_client(self, name: str, client: httpx.AsyncClient) -> None:
+        self._shutdown_guards.pop(id(client), None)
+        try:
+            await client.aclose()
+        except Exception as exc:
+            print(f"[HTTPClientRegistry] Error closing client {name}: {exc}")
+
+    def _on_request(self, name: str):
+        async def hook(_request: httpx.Request) -> None:
+            self._requests[name] = self._requests.get(name, 0) + 1
+
+        return hook
+
+    async def startup(self) -> None:
+        """Create the well-known clients up front (FastAPI startup)."""
+        for name in (VLM_CLIENT, IMAGES_CLIENT):
+            self.get_client(name)
+
+    async def aclose(self) -> None:
+        """Close every client and its pooled connections (FastAPI shutdown)."""
+        clients = list(self._clients.items()) + self._retired
+        self._clients.clear()
+        self._client_loops.clear()
+        self._retired = []
+        for name, client in clients:
+            await self._close_client(name, client)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool utilization metrics per client."""
+        clients = {}
+        for name, client in self._clients.items():
+            pool = _pool_connection_counts(client)
+            clients[name] = {
+                "requests_total": self._requests.get(name, 0),
+                "connections_open": pool.get("open"),
+                "connections_idle": pool.get("idle"),
+                "connections_active": pool.get("active"),
+                "pool_utilization": (
+                    round(pool["active"] / self.max_connections, 3)
+                    if pool.get("active") is not None
+                    else None
+                ),
+                "closed": client.is_closed,
+            }
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "clients": clients,
+        }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _pool_connection_counts(client: httpx.AsyncClient) -> Dict[str, Optional[int]]:
+    """
+    Best-effort read of the httpcore connection pool behind a client.
+
+    httpx does not expose pool state publicly, so this returns None values if
+    the transport internals differ.
+    """
+    try:
+        connections = list(client._transport._pool.connections)
+    except AttributeError:
+        return {"open": None, "idle": None, "active": None}
+
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "open": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+    }
+
+
+http_client_registry = HTTPClientRegistry()
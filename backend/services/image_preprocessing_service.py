@@ -3,20 +3,29 @@ Image Preprocessing Service
 
 Responsible for:
 - Validating image URLs and local paths
-- Converting images to formats suitable for VLM consumption (base64, data URIs)
+- Converting images to formats suitable for VLM consumption (base64, data URIs),
+  resized once and cached on disk by services/thumbnail_cache.py
 - Limiting the number of images sent to the VLM (to prevent OOM)
+- Fetching/encoding images concurrently under global and per-host limits and
+  an overall deadline, preserving input order
 - Returning a clean list of image payloads ready for VLM input
 
 This service is VLM-agnostic and designed to be lightweight with minimal dependencies.
 """
 
+import asyncio
 import base64
 import os
+import time
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
 
 import httpx
 
+from services.http_client_registry import IMAGES_CLIENT, http_client_registry
+from services.thumbnail_cache import decode_data_uri, thumbnail_cache
+
 
 @dataclass
 class ImagePayload:
@@ -27,6 +36,7 @@ class ImagePayload:
     format: str = "url"  # "url" or "data_uri"
     mime_type: str = "image/jpeg"
     error: Optional[str] = None
+    elapsed_ms: float = 0.0  # Time spent fetching/encoding this image
 
     @property
     def is_valid(self) -> bool:
@@ -44,6 +54,7 @@ class ImagePreprocessingService:
     - Image count limiting
     - Graceful error handling
     - Lightweight with minimal dependencies (httpx only)
+    - Remote fetches reuse the shared "images" client from HTTPClientRegistry
     """
 
     # Configuration
@@ -51,6 +62,9 @@ class ImagePreprocessingService:
     MAX_IMAGE_SIZE_MB = 5
     SUPPORTED_FORMATS = {"jpeg", "jpg", "png", "gif", "webp"}
     TIMEOUT_SECONDS = 10
+    CONCURRENCY = 4
+    PER_HOST_CONCURRENCY = 2
+    DEADLINE_SECONDS = 20
 
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """
@@ -62,17 +76,29 @@ class ImagePreprocessingService:
                 - max_size_mb: Maximum image size
                 - timeout: Request timeout in seconds
                 - base_url: Base URL for local paths
+                - concurrent: Process images in parallel (default True)
+                - concurrency: Maximum images processed at once
+                - per_host_concurrency: Maximum parallel fetches per host
+                - deadline: Overall time budget in seconds for one call
         """
         self.config = config or {}
         self.max_images = self.config.get("max_images", self.MAX_IMAGES_PER_REQUEST)
         self.max_size_mb = self.config.get("max_size_mb", self.MAX_IMAGE_SIZE_MB)
         self.timeout = self.config.get("timeout", self.TIMEOUT_SECONDS)
         self.base_url = self.config.get("base_url", "http://127.0.0.1:8000")
+        self.concurrent = self.config.get("concurrent", True)
+        self.concurrency = max(1, self.config.get("concurrency", self.CONCURRENCY))
+        self.per_host_concurrency = max(
+            1, self.config.get("per_host_concurrency", self.PER_HOST_CONCURRENCY)
+        )
+        self.deadline = self.config.get("deadline", self.DEADLINE_SECONDS)
+        self.thumbnail_cache = self.config.get("thumbnail_cache", thumbnail_cache)
 
     async def preprocess_images(
         self,
         image_urls: List[str],
         return_format: str = "url",
+        concurrent: Optional[bool] = None,
     ) -> List[str]:
         """
         Preprocess a list of images for VLM consumption.
@@ -80,28 +106,171 @@ class ImagePreprocessingService:
         Args:
             image_urls: List of image URLs or local paths
             return_format: Format to return images in ("url" or "data_uri")
+            concurrent: Override the configured processing mode
+
+        Returns:
+            List of processed image URLs or data URIs, in input order.
+            Use preprocess_image_payloads for per-image timings and errors.
+        """
+        payloads = await self.preprocess_image_payloads(
+            image_urls, return_format, concurrent
+        )
+        return [
+            payload.data_uri or payload.url
+            for payload in payloads
+            if payload.is_valid
+        ]
+
+    async def preprocess_image_payloads(
+        self,
+        image_urls: List[str],
+        return_format: str = "url",
+        concurrent: Optional[bool] = None,
+    ) -> List[ImagePayload]:
+        """
+        Preprocess images and return one ImagePayload per input image.
+
+        Failed or timed-out images are kept with `error` set so callers can
+        report them; the order always matches image_urls.
+
+        Args:
+            image_urls: List of image URLs or local paths
+            return_format: Format to return images in ("url" or "data_uri")
+            concurrent: Override the configured processing mode
 
         Returns:
-            List of processed image URLs or data URIs
+            List of ImagePayload (including elapsed_ms per image)
         """
         if not image_urls:
             return []
 
         limit = min(self.max_images, len(image_urls))
-        processed = []
+        urls = image_urls[:limit]
+        use_concurrency = self.concurrent if concurrent is None else concurrent
+        started = time.perf_counter()
+
+        print(
+            f"[ImagePreprocessing] Processing {limit} images "
+            f"mode={'concurrent' if use_concurrency else 'sequential'}"
+        )
+
+        if use_concurrency:
+            payloads = await self._process_concurrently(urls, return_format)
+        else:
+            payloads = await self._process_sequentially(urls, return_format)
+
+        for idx, payload in enumerate(payloads):
+            if payload.is_valid:
+                print(f"[ImagePreprocessing] Image {idx + 1}/{limit} OK ({payload.elapsed_ms:.0f}ms)")
+            else:
+                print(f"[ImagePreprocessing] Image {idx + 1} failed: {payload.error}")
+
+        print(
+            "[ImagePreprocessing] Done "
+            f"total_ms={(time.perf_counter() - started) * 1000:.0f} "
+            f"ok={sum(1 for payload in payloads if payload.is_valid)}/{limit}"
+        )
+        return payloads
+
+    async def _process_concurrently(
+        self, urls: List[str], return_format: str
+    ) -> List[ImagePayload]:
+        """
+        Process images in parallel under the global and per-host limits.
 
-        print(f"[ImagePreprocessing] Processing {limit} images")
+        Images not finished when the deadline expires are cancelled and
+        returned with an error.
+        """
+        global_limit = asyncio.Semaphore(self.concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        async def run(url: str) -> ImagePayload:
+            host = self._host_key(url)
+            host_limit = host_limits.setdefault(
+                host, asyncio.Semaphore(self.per_host_concurrency)
+            )
+            async with global_limit, host_limit:
+                return await self._timed_process(url, return_format)
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(run(url)) for url in urls]
+        _done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        # Let cancelled fetches unwind (release semaphores, close responses)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        payloads = []
+        for url, task in zip(urls, tasks):
+            if task in pending:
+                payloads.append(self._deadline_payload(url, started))
+            elif task.exception() is not None:
+                payloads.append(ImagePayload(url=url, error=str(task.exception())))
+            else:
+                payloads.append(task.result())
+        return payloads
+
+    async def _process_sequentially(
+        self, urls: List[str], return_format: str
+    ) -> List[ImagePayload]:
+        """
+        Process images one at a time within the same overall deadline.
 
-        for idx, url in enumerate(image_urls[:limit]):
+        The image in progress when the deadline expires is cancelled; it and
+        the images not started are returned with an error.
+        """
+        started = time.perf_counter()
+        payloads = []
+        for url in urls:
+            remaining = None
+            if self.deadline is not None:
+                remaining = self.deadline - (time.perf_counter() - started)
+                if remaining <= 0:
+                    payloads.append(self._deadline_payload(url, started))
+                    continue
             try:
-                result = await self._process_single_image(url, return_format)
-                if result:
-                    processed.append(result)
-                    print(f"[ImagePreprocessing] Image {idx + 1}/{limit} OK")
-            except Exception as e:
-                print(f"[ImagePreprocessing] Image {idx + 1} failed: {str(e)}")
-
-        return processed
+                payloads.append(
+                    await asyncio.wait_for(self._timed_process(url, return_format), remaining)
+                )
+            except asyncio.TimeoutError:
+                payloads.append(self._deadline_payload(url, started))
+        return payloads
+
+    def _deadline_payload(self, url: str, started: float) -> ImagePayload:
+        return ImagePayload(
+            url=url,
+            error=f"deadline of {self.deadline}s exceeded",
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    async def _timed_process(self, url: str, return_format: str) -> ImagePayload:
+        started = time.perf_counter()
+        try:
+            result = await self._process_single_image(url, return_format)
+            error = None if result else "could not process image"
+        except Exception as e:
+            result = None
+            error = str(e)
+
+        payload = ImagePayload(
+            url=url,
+            error=error,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        if result and result.startswith("data:"):
+            payload.data_uri = result
+            payload.format = "data_uri"
+            payload.mime_type = result[5:].split(";", 1)[0] or payload.mime_type
+        elif result:
+            payload.url = result
+        return payload
+
+    def _host_key(self, url: str) -> str:
+        """Semaphore key for per-host limits (local paths share one key)."""
+        url = (url or "").strip()
+        if url.startswith("http://") or url.startswith("https://"):
+            return urlparse(url).netloc.lower()
+        return "local"
 
     async def _process_single_image(
         self, url: str, return_format: str
@@ -121,8 +290,14 @@ class ImagePreprocessingService:
             if not url:
                 return None
 
-            # Already a data URI?
+            # Already a data URI? Send the resized copy when it can be decoded.
             if url.startswith("data:"):
+                cached = self.thumbnail_cache.lookup(url)
+                if cached:
+                    return cached
+                image_bytes = decode_data_uri(url)
+                if image_bytes:
+                    return await self.thumbnail_cache.aput(url, image_bytes) or url
                 return url
 
             # URL format requested and already a valid HTTP URL?
@@ -154,33 +329,47 @@ class ImagePreprocessingService:
         try:
             # Handle local file paths
             if not url.startswith("http://") and not url.startswith("https://"):
-                return self._local_file_to_data_uri(url)
-
-            # Fetch remote image
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url)
-
-                if response.status_code != 200:
-                    print(f"[ImagePreprocessing] HTTP {response.status_code} for {url}")
-                    return None
-
-                # Check size
-                content_length = len(response.content)
-                if content_length > self.max_size_mb * 1024 * 1024:
-                    print(
-                        f"[ImagePreprocessing] Image too large: {content_length / 1024 / 1024:.1f}MB"
-                    )
-                    return None
-
-                # Get content type
-                content_type = response.headers.get("Content-Type", "image/jpeg")
-                if not content_type.startswith("image/"):
-                    print(f"[ImagePreprocessing] Invalid content type: {content_type}")
-                    return None
-
-                # Encode to base64
-                b64_img = base64.b64encode(response.content).decode("ascii")
-                return f"data:{content_type};base64,{b64_img}"
+                # Disk read off the event loop so concurrent fetches keep going
+                data_uri = await asyncio.to_thread(self._local_file_to_data_uri, url)
+                if data_uri or not self.base_url:
+                    return data_uri
+                # Not on this disk: ask the API that serves /uploads
+                url = f"{self.base_url.rstrip('/')}/{url.lstrip('/')}"
+
+            cached = self.thumbnail_cache.lookup(url)
+            if cached:
+                return cached
+
+            # Fetch remote image over the shared keep-alive pool
+            client = http_client_registry.get_client(IMAGES_CLIENT)
+            response = await client.get(url, timeout=self.timeout)
+
+            if response.status_code != 200:
+                print(f"[ImagePreprocessing] HTTP {response.status_code} for {url}")
+                return None
+
+            # Check size
+            content_length = len(response.content)
+            if content_length > self.max_size_mb * 1024 * 1024:
+                print(
+                    f"[ImagePreprocessing] Image too large: {content_length / 1024 / 1024:.1f}MB"
+                )
+                return None
+
+            # Get content type
+            content_type = response.headers.get("Content-Type", "image/jpeg")
+            if not content_type.startswith("image/"):
+                print(f"[ImagePreprocessing] Invalid content type: {content_type}")
+                return None
+
+            # Resized, cached copy; the original is sent if Pillow cannot decode it
+            thumbnail = await self.thumbnail_cache.aput(url, response.content)
+            if thumbnail:
+                return thumbnail
+
+            # Encode to base64
+            b64_img = base64.b64encode(response.content).decode("ascii")
+            return f"data:{content_type};base64,{b64_img}"
 
         except httpx.TimeoutException:
             print(f"[ImagePreprocessing] Timeout fetching {url}")
@@ -233,6 +422,10 @@ class ImagePreprocessingService:
             with open(file_path, "rb") as f:
                 image_data = f.read()
 
+            thumbnail = self.thumbnail_cache.put(None, image_data)
+            if thumbnail:
+                return thumbnail
+
             # Infer MIME type from extension
             _, ext = os.path.splitext(file_path)
             mime_type = self._get_mime_type(ext)
@@ -262,4 +455,8 @@ class ImagePreprocessingService:
             "max_file_size_mb": self.max_size_mb,
             "supported_formats": list(self.SUPPORTED_FORMATS),
             "http_timeout_seconds": self.timeout,
+            "concurrent": self.concurrent,
+            "concurrency": self.concurrency,
+            "per_host_concurrency": self.per_host_concurrency,
+            "deadline_seconds": self.deadline,
         }
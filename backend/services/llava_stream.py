@@ -0,0 +1,323 @@
+"""
+LLaVA Streaming
+
+Streamed completions with early termination for candidate selection.
+
+Candidate selection only needs {"selected_candidate", "reasoning",
+"confidence"} from LLaVA, but the non-streamed call waits until the model
+stops on its own (max_tokens 1024), often after trailing prose, markdown or
+a long justification. The streaming path:
+
+1. sends the request with "stream": true;
+2. reads the token stream line by line, from either
+   - an OpenAI-compatible endpoint (SSE "data: {...}" with choices[].delta), or
+   - Ollama's native /api/chat or /api/generate (NDJSON with message.content
+     or response);
+3. feeds the text to SelectionStreamParser, an incremental JSON scanner that
+   extracts the top-level fields as soon as each value is complete;
+4. stops reading once selected_candidate and confidence are known and the
+   reasoning is complete or longer than the cap. Closing the response drops
+   the connection, which makes Ollama stop generating.
+
+The parsed fields are returned as compact JSON text, so callers keep using
+the same JSON parsing as for non-streamed responses. If no field can be
+parsed, the raw streamed text is returned unchanged.
+
+The server's prompt token count (prompt_tokens_from) is only sent with the
+final chunks, so a stream stopped early reports none.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+SCALAR_END = set(",}] \t\r\n")
+
+
+class SelectionStreamParser:
+    """
+    Incremental scanner of the first top-level JSON object in a text stream.
+
+    Every character is processed once; string values are kept as raw JSON
+    source until they close, then decoded.
+    """
+
+    REQUIRED_FIELDS = ("selected_candidate", "confidence")
+    REASONING_FIELD = "reasoning"
+
+    def __init__(self, reasoning_max_chars: int = 280):
+        """
+        Initialize the parser.
+
+        Args:
+            reasoning_max_chars: Reasoning length after which the answer is
+                considered complete (once the required fields are known)
+        """
+        self.reasoning_max_chars = reasoning_max_chars
+        self.fields: Dict[str, Any] = {}
+        self.text_parts = []
+        self.chars_received = 0
+        self._state = "outside"
+        self._key: Optional[str] = None
+        self._raw = []
+        self._escape = False
+        self._nested_depth = 0
+        self._nested_in_string = False
+
+    @property
+    def object_closed(self) -> bool:
+        return self._state == "done"
+
+    @property
+    def complete(self) -> bool:
+        """True when the rest of the stream is not needed."""
+        if self.object_closed:
+            return True
+        if not all(field in self.fields for field in self.REQUIRED_FIELDS):
+            return False
+        if self.REASONING_FIELD in self.fields:
+            return True
+        return (
+            self._state == "string"
+            and self._key == self.REASONING_FIELD
+            and len(self._raw) >= self.reasoning_max_chars
+        )
+
+    def feed(self, text: str) -> bool:
+        """
+        Consume a chunk of streamed text.
+
+        Returns:
+            complete (stop reading when True)
+        """
+        self.text_parts.append(text)
+        self.chars_received += len(text)
+        for char in text:
+            if self._state == "done":
+                break
+            self._step(char)
+        return self.complete
+
+    def result_text(self) -> str:
+        """Parsed fields as JSON, or the raw text when nothing was parsed."""
+        if "selected_candidate" not in self.fields:
+            return "".join(self.text_parts)
+        result = dict(self.fields)
+        if self.REASONING_FIELD not in result and self._key == self.REASONING_FIELD and self._raw:
+            result[self.REASONING_FIELD] = _decode_partial_string("".join(self._raw))
+        reasoning = result.get(self.REASONING_FIELD)
+        if isinstance(reasoning, str) and len(reasoning) > self.reasoning_max_chars:
+            result[self.REASONING_FIELD] = reasoning[: self.reasoning_max_chars].rstrip() + "..."
+        return json.dumps(result, ensure_ascii=False)
+
+    # -------------------------------------------------------------- internals
+
+    def _step(self, char: str) -> None:
+        state = self._state
+        if state == "outside":
+            if char == "{":
+                self._state = "expect_key"
+        elif state == "expect_key":
+            if char == '"':
+                self._start_string("key")
+            elif char == "}":
+                self._state = "done"
+        elif state in ("key", "string"):
+            if self._escape:
+                self._escape = False
+                self._raw.append(char)
+            elif char == "\\":
+                self._escape = True
+                self._raw.append(char)
+            elif char == '"':
+                value = _decode_partial_string("".join(self._raw))
+                if state == "key":
+                    self._key = value
+                    self._state = "expect_colon"
+                else:
+                    self._store(value)
+            else:
+                self._raw.append(char)
+        elif state == "expect_colon":
+            if char == ":":
+                self._state = "expect_value"
+        elif state == "expect_value":
+            if char == '"':
+                self._start_string("string")
+            elif char in "{[":
+                self._raw = [char]
+                self._nested_depth = 1
+                self._nested_in_string = False
+                self._escape = False
+                self._state = "nested"
+            elif not char.isspace():
+                self._raw = [char]
+                self._state = "scalar"
+        elif state == "scalar":
+            if char in SCALAR_END:
+                token = "".join(self._raw)
+                try:
+                    self._store(json.loads(token))
+                except ValueError:
+                    self._store(token)
+                if char == "}":
+                    self._state = "done"
+            else:
+                self._raw.append(char)
+        elif state == "nested":
+            self._raw.append(char)
+            if self._nested_in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._nested_in_string = False
+            elif char == '"':
+                self._nested_in_string = True
+            elif char in "{[":
+                self._nested_depth += 1
+            elif char in "}]":
+                self._nested_depth -= 1
+                if self._nested_depth == 0:
+                    try:
+                        self._store(json.loads("".join(self._raw)))
+                    except ValueError:
+                        self._store("".join(self._raw))
+
+    def _start_string(self, state: str) -> None:
+        self._raw = []
+        self._escape = False
+        self._state = state
+
+    def _store(self, value: Any) -> None:
+        if self._key is not None and self._key not in self.fields:
+            self.fields[self._key] = value
+        self._key = None
+        self._raw = []
+        self._state = "expect_key"
+
+
+def _decode_partial_string(raw: str) -> str:
+    # The raw source may end inside an escape sequence when cut early.
+    for end in range(len(raw), max(len(raw) - 6, -1), -1):
+        try:
+            return json.loads(f'"{raw[:end]}"')
+        except ValueError:
+            continue
+    return raw
+
+
+def stream_line_text(line: str) -> Optional[str]:
+    """
+    Text delta carried by one line of a streamed completion.
+
+    Understands OpenAI-compatible SSE ("data: {...}", "data: [DONE]") and
+    Ollama NDJSON ({"message": {"content": ...}} / {"response": ...}). A
+    non-streamed JSON completion (server ignored "stream") is read whole.
+
+    Returns:
+        Text to append, "" for lines without text, None at end of stream
+    """
+    line = line.strip()
+    if not line or line.startswith(":") or line.startswith("event:"):
+        return ""
+    if line.startswith("data:"):
+        line = line[5:].strip()
+        if line == "[DONE]":
+            return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return ""
+    if not isinstance(data, dict):
+        return ""
+    choices = data.get("choices")
+    if choices:
+        choice = choices[0] or {}
+        delta = choice.get("delta") or choice.get("message") or {}
+        return delta.get("content") or choice.get("text") or ""
+    message = data.get("message")
+    if isinstance(message, dict):
+        return message.get("content") or ""
+    return data.get("response") or ""
+
+
+def prompt_tokens_from(data: Any) -> Optional[int]:
+    """
+    Server-reported prompt token count of a completion (or final stream chunk).
+
+    OpenAI-compatible servers report usage.prompt_tokens (in a stream only
+    with stream_options.include_usage), Ollama's native API prompt_eval_count.
+    """
+    if not isinstance(data, dict):
+        return None
+    usage = data.get("usage")
+    if isinstance(usage, dict) and isinstance(usage.get("prompt_tokens"), int):
+        return usage["prompt_tokens"]
+    count = data.get("prompt_eval_count")
+    return count if isinstance(count, int) else None
+
+
+async def read_selection_stream(
+    lines: AsyncIterator[str],
+    parser: SelectionStreamParser,
+    usage: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """
+    Feed streamed completion lines to `parser` until it is complete.
+
+    Args:
+        lines: Response lines
+        parser: Parser receiving the text deltas
+        usage: Filled with "prompt_tokens" if the server reports it; only the
+            final chunks carry it, so streams stopped early have none
+
+    Returns:
+        True if reading stopped early (the rest of the generation is dropped)
+    """
+    async for line in lines:
+        if usage is not None and ("prompt_tokens" in line or "prompt_eval_count" in line):
+            try:
+                count = prompt_tokens_from(json.loads(line.strip().removeprefix("data:")))
+            except ValueError:
+                count = None
+            if count is not None:
+                usage["prompt_tokens"] = count
+        text = stream_line_text(line)
+        if text is None:
+            return False
+        if text and parser.feed(text):
+            return True
+    return False
+
+
+class SelectionStreamStats:
+    """Counters for streamed candidate selections (reported by /ai-outfit/health)."""
+
+    def __init__(self):
+        self.requests = 0
+        self.stopped_early = 0
+        self.unparsed = 0
+        self.chars_received = 0
+        self.total_seconds = 0.0
+
+    def record(self, stopped_early: bool, parsed: bool, chars: int, seconds: float) -> None:
+        self.requests += 1
+        self.stopped_early += int(stopped_early)
+        self.unparsed += int(not parsed)
+        self.chars_received += chars
+        self.total_seconds += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "stopped_early": self.stopped_early,
+            "unparsed": self.unparsed,
+            "avg_chars": round(self.chars_received / requests, 1),
+            "avg_seconds": round(self.total_seconds / requests, 3),
+        }
+
+
+selection_stream_stats = SelectionStreamStats()
@@ -0,0 +1,241 @@
+"""
+Outfit Search
+
+Finds the highest scoring outfits per template for CandidateOutfitService.
+
+Replaces the old generator that rotated section options with a cyclic index
+plus a base x pants cross product: large wardrobes never reached most
+combinations and small ones produced the same outfit many times over.
+
+A template is a list of slots (section, required). Every outfit is a row of
+option indices in SECTION_ORDER (-1 = section not used), the encoding the
+BatchCandidateScorer reads. For each template:
+
+- If the full cross product fits `exhaustive_limit`, every row is scored and
+  the result is the exact top of that template.
+- Otherwise a beam search assigns one slot at a time (required slots first)
+  and keeps the `beam_width` best partial outfits after each step. Partial
+  outfits at the same depth share the same unassigned slots, so their scores
+  are directly comparable.
+
+Optional slots (outer layer, accessories, ...) multiply the number of
+near-identical outfits, so every kept set admits at most
+`variants_per_skeleton` rows with the same required items. This keeps the
+pool spread over distinct skeletons for the diversity selection that follows.
+
+Scores are totals identical to _score_candidate (batched with NumPy when it
+is available, one by one otherwise). validate_candidate and de-duplication
+are applied by the caller on the returned rows, best first.
+"""
+
+import itertools
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with the backend requirements
+    np = None
+
+
+Row = Tuple[int, ...]
+ScoredRow = Tuple[float, str, Row]
+
+
+class OutfitSearch:
+    """
+    Exhaustive-or-beam search over per-section options.
+    """
+
+    DEFAULT_EXHAUSTIVE_LIMIT = 5000
+    DEFAULT_BEAM_WIDTH = 128
+    DEFAULT_POOL_SIZE = 60
+    DEFAULT_VARIANTS_PER_SKELETON = 3
+    UNBATCHED_EXHAUSTIVE_LIMIT = 2000
+
+    def __init__(
+        self,
+        sections: Sequence[str],
+        section_options: Dict[str, List[Dict[str, Any]]],
+        score_rows: Callable[[List[Row]], Sequence[float]],
+        exhaustive_limit: Optional[int] = None,
+        beam_width: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        variants_per_skeleton: Optional[int] = None,
+    ):
+        """
+        Args:
+            sections: Column order of a row (SECTION_ORDER)
+            section_options: Items selectable per section
+            score_rows: Returns the total score of each row
+            exhaustive_limit: Max rows scored exhaustively per template
+                (CANDIDATE_SEARCH_EXHAUSTIVE_LIMIT)
+            beam_width: Partial outfits kept per beam step
+                (CANDIDATE_SEARCH_BEAM_WIDTH)
+            pool_size: Best rows returned per template
+                (CANDIDATE_SEARCH_POOL_SIZE)
+            variants_per_skeleton: Rows kept per set of required items
+                (CANDIDATE_SEARCH_VARIANTS_PER_SKELETON)
+        """
+        self.sections = list(sections)
+        self.columns = {section: index for index, section in enumerate(self.sections)}
+        self.section_options = section_options
+        self.score_rows = score_rows
+        self.exhaustive_limit = exhaustive_limit or int(
+            os.getenv("CANDIDATE_SEARCH_EXHAUSTIVE_LIMIT", self.DEFAULT_EXHAUSTIVE_LIMIT)
+        )
+        self.beam_width = beam_width or int(
+            os.getenv("CANDIDATE_SEARCH_BEAM_WIDTH", self.DEFAULT_BEAM_WIDTH)
+        )
+        self.pool_size = pool_size or int(
+            os.getenv("CANDIDATE_SEARCH_POOL_SIZE", self.DEFAULT_POOL_SIZE)
+        )
+        self.variants_per_skeleton = variants_per_skeleton or int(
+            os.getenv(
+                "CANDIDATE_SEARCH_VARIANTS_PER_SKELETON",
+                self.DEFAULT_VARIANTS_PER_SKELETON,
+            )
+        )
+        self.rows_scored = 0
+        self.strategies: Dict[str, str] = {}
+
+    def search(self, templates: Dict[str, List[Tuple[str, bool]]]) -> List[ScoredRow]:
+        """
+        Best rows of every template, merged and sorted best first.
+
+        Args:
+            templates: template name -> [(section, required), ...]
+
+        Returns:
+            [(score, template, row), ...] in descending score order; ties keep
+            option order (options are pre-sorted by item relevance)
+        """
+        results: List[Tuple[float, int, str, Row]] = []
+        order = 0
+        for template, slots in templates.items():
+            choices = self._slot_choices(slots)
+            if choices is None:
+                continue
+            combinations = 1
+            for _section, options in choices:
+                combinations *= len(options)
+
+            skeleton = [
+                self.columns[section] for section, options in choices if -1 not in options
+            ]
+            if combinations <= self.exhaustive_limit:
+                self.strategies[template] = f"exhaustive:{combinations}"
+                scored = self._exhaustive(choices, skeleton)
+            else:
+                self.strategies[template] = f"beam:{self.beam_width}"
+                scored = self._beam(choices, skeleton)
+
+            for score, row in scored:
+                results.append((score, order, template, row))
+                order += 1
+
+        results.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [(score, template, row) for score, _order, template, row in results]
+
+    def _slot_choices(
+        self,
+        slots: List[Tuple[str, bool]],
+    ) -> Optional[List[Tuple[str, List[int]]]]:
+        """Option indices per slot (-1 = leave empty); None if a required slot has no options."""
+        choices = []
+        for section, required in slots:
+            indices = list(range(len(self.section_options.get(section) or [])))
+            if required and not indices:
+                return None
+            # Empty goes last so equal scores favour the fuller outfit.
+            choices.append((section, indices if required else indices + [-1]))
+        # Required slots first so the beam fixes the outfit skeleton early.
+        choices.sort(key=lambda choice: -1 in choice[1])
+        return choices
+
+    def _exhaustive(
+        self,
+        choices: List[Tuple[str, List[int]]],
+        skeleton: List[int],
+    ) -> List[Tuple[float, Row]]:
+        if np is not None:
+            # Build the cross product as one index matrix instead of Python tuples.
+            grids = np.meshgrid(
+                *(np.asarray(options, dtype=np.int64) for _section, options in choices),
+                indexing="ij",
+            )
+            matrix = np.full((grids[0].size, len(self.sections)), -1, dtype=np.int64)
+            for (section, _options), grid in zip(choices, grids):
+                matrix[:, self.columns[section]] = grid.ravel()
+            return self._top(matrix, self.pool_size, skeleton)
+
+        rows = []
+        for indices in itertools.product(*(options for _section, options in choices)):
+            row = [-1] * len(self.sections)
+            for (section, _options), index in zip(choices, indices):
+                row[self.columns[section]] = index
+            rows.append(tuple(row))
+        return self._top(rows, self.pool_size, skeleton)
+
+    def _beam(
+        self,
+        choices: List[Tuple[str, List[int]]],
+        skeleton: List[int],
+    ) -> List[Tuple[float, Row]]:
+        beam: List[Row] = [tuple([-1] * len(self.sections))]
+        scored: List[Tuple[float, Row]] = []
+        for depth, (section, options) in enumerate(choices):
+            column = self.columns[section]
+            expansions = [
+                row[:column] + (index,) + row[column + 1:]
+                for row in beam
+                for index in options
+            ]
+            last = depth == len(choices) - 1
+            scored = self._top(
+                expansions,
+                self.pool_size if last else self.beam_width,
+                skeleton,
+            )
+            beam = [row for _score, row in scored]
+        return scored
+
+    def _top(
+        self,
+        rows: Any,
+        limit: int,
+        skeleton: List[int],
+    ) -> List[Tuple[float, Row]]:
+        """Best `limit` rows (list of tuples or index matrix), at most variants_per_skeleton per skeleton."""
+        if len(rows) == 0:
+            return []
+        scores = self.score_rows(rows)
+        self.rows_scored += len(rows)
+        if hasattr(scores, "argsort"):
+            # Stable sort keeps the earlier row first on equal scores.
+            ranked = (-scores).argsort(kind="stable").tolist()
+        else:
+            ranked = sorted(range(len(rows)), key=lambda index: (-scores[index], index))
+
+        kept = []
+        per_skeleton: Dict[Row, int] = {}
+        for index in ranked:
+            row = tuple(int(value) for value in rows[index])
+            key = tuple(row[column] for column in skeleton)
+            if per_skeleton.get(key, 0) >= self.variants_per_skeleton:
+                continue
+            per_skeleton[key] = per_skeleton.get(key, 0) + 1
+            kept.append((float(scores[index]), row))
+            if len(kept) >= limit:
+                break
+        return kept
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rows_scored": self.rows_scored,
+            "strategies": dict(self.strategies),
+            "exhaustive_limit": self.exhaustive_limit,
+            "beam_width": self.beam_width,
+            "pool_size": self.pool_size,
+            "variants_per_skeleton": self.variants_per_skeleton,
+        }
@@ -0,0 +1,235 @@
+"""
+Owner Profile Resolver
+
+Batched, cached lookup of the display name and avatar of item owners.
+
+/public-items, /social/likes and /social/wishlist used to call
+auth.admin.get_user_by_id once per item, so a feed of 500 items made 500
+sequential auth round-trips even when a handful of users owned them all.
+The resolver works on the set of distinct owner IDs instead:
+
+1. Owners still in the TTL cache are answered from memory.
+2. The remaining owners are read from the `profiles` table in one
+   `in_("user_id", ...)` query (the table update_profile writes to).
+3. Owners without a profile name fall back to auth.admin.get_user_by_id,
+   run with bounded concurrency on a thread pool.
+
+The display rules are the ones the routers used: profile / auth metadata
+name, else the part of the email before the @, else "Utilizador".
+Failed lookups are not cached, so a transient auth error is retried on the
+next request. update_profile calls invalidate_owner_profile().
+
+Environment Variables:
+- OWNER_PROFILE_CACHE_TTL: Seconds a resolved profile is kept (default 300, 0 disables)
+- OWNER_PROFILE_CACHE_MAX: Maximum cached profiles (default 5000)
+- OWNER_PROFILE_CONCURRENCY: Parallel auth lookups for owners without a profile (default 8)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_OWNER_NAME = "Utilizador"
+
+
+def owner_fields(profile: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """ownerName / ownerAvatar fields of a frontend item."""
+    profile = profile or {}
+    return {
+        "ownerName": profile.get("name") or DEFAULT_OWNER_NAME,
+        "ownerAvatar": profile.get("avatar") or "",
+    }
+
+
+class OwnerProfileResolver:
+    """
+    Resolves many owner IDs at once, with a thread-safe TTL + LRU cache.
+    """
+
+    DEFAULT_TTL_SECONDS = 300.0
+    DEFAULT_MAX_ENTRIES = 5000
+    DEFAULT_CONCURRENCY = 8
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        """
+        Initialize the resolver.
+
+        Args:
+            ttl_seconds: Profile lifetime in seconds (0 disables caching)
+            max_entries: Maximum number of cached profiles
+            concurrency: Parallel auth lookups for owners without a profile row
+        """
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else float(os.getenv("OWNER_PROFILE_CACHE_TTL", self.DEFAULT_TTL_SECONDS))
+        )
+        self.max_entries = max_entries or int(
+            os.getenv("OWNER_PROFILE_CACHE_MAX", self.DEFAULT_MAX_ENTRIES)
+        )
+        self.concurrency = concurrency or int(
+            os.getenv("OWNER_PROFILE_CONCURRENCY", self.DEFAULT_CONCURRENCY)
+        )
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.profile_queries = 0
+        self.auth_lookups = 0
+
+    def resolve(self, client: Any, owner_ids: Iterable[Optional[str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Display profile of every distinct owner.
+
+        Args:
+            client: Supabase admin client
+            owner_ids: Owner IDs, duplicates and None allowed
+
+        Returns:
+            owner_id -> {"name": ..., "avatar": ...}; owners that could not be
+            resolved get the default name and no avatar
+        """
+        unique_ids = list(dict.fromkeys(str(owner_id) for owner_id in owner_ids if owner_id))
+        profiles, missing = self._cached(unique_ids)
+        if not missing:
+            return profiles
+
+        resolved = self._from_profiles_table(client, missing)
+        unresolved = [owner_id for owner_id in missing if owner_id not in resolved]
+        if unresolved:
+            resolved.update(self._from_auth(client, unresolved))
+
+        self._store(resolved)
+        profiles.update(resolved)
+        for owner_id in missing:
+            profiles.setdefault(owner_id, {"name": DEFAULT_OWNER_NAME, "avatar": ""})
+        return profiles
+
+    def invalidate(self, owner_id: str) -> None:
+        """Forget the cached profile of one owner (after a profile update)."""
+        with self._lock:
+            self._entries.pop(str(owner_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "profile_queries": self.profile_queries,
+                "auth_lookups": self.auth_lookups,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    # -------------------------------------------------------------- internals
+
+    def _cached(self, owner_ids: List[str]) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+        profiles: Dict[str, Dict[str, str]] = {}
+        missing: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            for owner_id in owner_ids:
+                entry = self._entries.get(owner_id)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(owner_id)
+                    profiles[owner_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(owner_id)
+            self.misses += len(missing)
+        return profiles, missing
+
+    def _store(self, profiles: Dict[str, Dict[str, str]]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for owner_id, profile in profiles.items():
+                self._entries[owner_id] = (expires_at, profile)
+                self._entries.move_to_end(owner_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _from_profiles_table(self, client: Any, owner_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """Owners whose `profiles` row has a name, in one query."""
+        with self._lock:
+            self.profile_queries += 1
+        try:
+            response = (
+                client.table("profiles")
+                .select("user_id, name, avatar_url")
+                .in_("user_id", owner_ids)
+                .execute()
+            )
+        except Exception as exc:
+            print(f"[OwnerProfile] profiles query failed: {exc}")
+            return {}
+
+        profiles = {}
+        for row in response.data or []:
+            if row.get("name"):
+                profiles[str(row.get("user_id"))] = {
+                    "name": row["name"],
+                    "avatar": row.get("avatar_url") or "",
+                }
+        return profiles
+
+    def _from_auth(self, client: Any, owner_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """auth.admin.get_user_by_id for each owner, `concurrency` at a time."""
+        with self._lock:
+            self.auth_lookups += len(owner_ids)
+
+        def lookup(owner_id: str) -> Optional[Dict[str, str]]:
+            try:
+                user_res = client.auth.admin.get_user_by_id(owner_id)
+            except Exception as exc:
+                print(f"[OwnerProfile] Erro a ler user {owner_id}: {exc}")
+                return None
+            if not user_res or not user_res.user:
+                return None
+            meta = user_res.user.user_metadata or {}
+            email = user_res.user.email
+            email_name = email.split("@")[0] if email else DEFAULT_OWNER_NAME
+            return {
+                "name": meta.get("name") or email_name,
+                "avatar": meta.get("avatar_url", "") or "",
+            }
+
+        workers = max(1, min(self.concurrency, len(owner_ids)))
+        if workers == 1:
+            results = [lookup(owner_id) for owner_id in owner_ids]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="owner-profile") as pool:
+                results = list(pool.map(lookup, owner_ids))
+        return {
+            owner_id: profile
+            for owner_id, profile in zip(owner_ids, results)
+            if profile is not None
+        }
+
+
+owner_profile_resolver = OwnerProfileResolver()
+
+
+def resolve_owner_profiles(client: Any, owner_ids: Iterable[Optional[str]]) -> Dict[str, Dict[str, str]]:
+    """Resolve owner display profiles with the shared resolver."""
+    return owner_profile_resolver.resolve(client, owner_ids)
+
+
+def invalidate_owner_profile(owner_id: str) -> None:
+    """Drop one owner from the shared resolver cache."""
+    owner_profile_resolver.invalidate(owner_id)
@@ -0,0 +1,342 @@
+"""
+Public Feed Index
+
+In-memory index of public clothing items for the cursor-paginated feed.
+
+/public-items used to select every row with is_public=True and enrich all
+of them on every call, so the response (and its latency) grew with the
+catalog. The index loads the public rows once, keeps them ordered by a
+stable sort key (newest first: created_at, then id), and serves pages
+straight from memory:
+
+- Every filter (type, color, season, owner) has a posting list sorted by
+  the same key. A page walks the smallest posting list from the cursor and
+  checks the other filters, so its cost depends on the page size rather
+  than on the catalog size.
+- Item writes on this process update the index incrementally
+  (apply_row / remove); a full reload every PUBLIC_FEED_REFRESH_SECONDS
+  picks up writes made elsewhere. Reloads after the first one run on a
+  background thread while the previous index keeps serving.
+- Cursors are opaque (base64 of the last sort key), so pages do not shift
+  when items are published while a client is scrolling.
+
+Environment Variables:
+- PUBLIC_FEED_REFRESH_SECONDS: Full reload interval in seconds (default 300)
+- PUBLIC_FEED_MAX_LIMIT: Largest page size a client may request (default 200)
+"""
+
+import base64
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+SortKey = Tuple[float, str]
+FILTER_FIELDS = ("type", "color", "season", "owner")
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a feed cursor cannot be decoded."""
+
+
+def encode_cursor(key: SortKey) -> str:
+    payload = json.dumps([key[0], key[1]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(timestamp), str(item_id)
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise InvalidCursorError(f"Invalid feed cursor: {cursor!r}") from exc
+
+
+def _timestamp(value: Any) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _text(value: Any) -> Optional[str]:
+    text = str(value).strip().lower() if value is not None else ""
+    return text or None
+
+
+class PublicFeedIndex:
+    """
+    Thread-safe, incrementally maintained index of public items.
+    """
+
+    DEFAULT_REFRESH_SECONDS = 300.0
+    DEFAULT_MAX_LIMIT = 200
+
+    def __init__(
+        self,
+        normalize_color: Optional[Callable[[Any], Optional[str]]] = None,
+        refresh_seconds: Optional[float] = None,
+        max_limit: Optional[int] = None,
+    ):
+        """
+        Initialize an empty index. Rows are loaded on first use.
+
+        Args:
+            normalize_color: Maps stored and requested colors to one
+                vocabulary (defaults to lower-case text)
+            refresh_seconds: Full reload interval (PUBLIC_FEED_REFRESH_SECONDS)
+            max_limit: Largest page size (PUBLIC_FEED_MAX_LIMIT)
+        """
+        self.normalize_color = normalize_color or _text
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else float(os.getenv("PUBLIC_FEED_REFRESH_SECONDS", self.DEFAULT_REFRESH_SECONDS))
+        )
+        self.max_limit = max_limit or int(
+            os.getenv("PUBLIC_FEED_MAX_LIMIT", self.DEFAULT_MAX_LIMIT)
+        )
+
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._item_keys: Dict[str, SortKey] = {}
+        self._keys: List[SortKey] = []
+        self._postings: Dict[Tuple[str, str], List[SortKey]] = {}
+        self._loaded_at: Optional[float] = None
+        self._pending_writes: Optional[List[Tuple[str, Any]]] = None
+        self.loads = 0
+
+    # ----------------------------------------------------------------- public
+
+    def ensure_loaded(self, client: Any) -> None:
+        """
+        Load every public row on first use; later reloads run in the background.
+
+        Once the index has content, a stale index keeps serving pages while a
+        worker thread reloads it, so a refresh never blocks a feed request.
+        """
+        if self._is_fresh():
+            return
+        if self._loaded_at is None:
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self._reload(client)
+            return
+        if self._load_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._background_reload,
+                args=(client,),
+                name="public-feed-reload",
+                daemon=True,
+            ).start()
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        """Replace the index content with `rows` (built aside, then swapped in)."""
+        row_by_id: Dict[str, Dict[str, Any]] = {}
+        item_keys: Dict[str, SortKey] = {}
+        for row in rows:
+            if row.get("id") is None:
+                continue
+            key = self._sort_key(row)
+            row_by_id[key[1]] = row
+            item_keys[key[1]] = key
+        keys = sorted(item_keys.values())
+        postings: Dict[Tuple[str, str], List[SortKey]] = {}
+        for key in keys:
+            for posting in self._filter_values(row_by_id[key[1]]):
+                postings.setdefault(posting, []).append(key)
+
+        with self._lock:
+            self._rows = row_by_id
+            self._item_keys = item_keys
+            self._keys = keys
+            self._postings = postings
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+            pending, self._pending_writes = self._pending_writes, None
+            for operation, value in pending or []:
+                if operation == "apply":
+                    self._apply_locked(value)
+                else:
+                    self._remove_locked(value)
+        print(f"[PublicFeed] Loaded {len(keys)} public items")
+
+    def apply_row(self, row: Dict[str, Any]) -> None:
+        """Insert, update or drop one item after a write, based on its is_public flag."""
+        if not row or row.get("id") is None:
+            return
+        with self._lock:
+            if self._pending_writes is not None:
+                self._pending_writes.append(("apply", row))
+            self._apply_locked(row)
+
+    def remove(self, item_id: Any) -> None:
+        """Drop one item (deleted or unpublished)."""
+        with self._lock:
+            if self._pending_writes is not None:
+                self._pending_writes.append(("remove", str(item_id)))
+            self._remove_locked(str(item_id))
+
+    def invalidate(self) -> None:
+        """Force a full reload on the next request."""
+        with self._lock:
+            self._loaded_at = None
+
+    def page(
+        self,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of public items, newest first.
+
+        Args:
+            filters: type / color / season / owner values (None = any)
+            cursor: nextCursor of the previous page
+            limit: Page size, capped at max_limit (None = every match)
+
+        Returns:
+            (rows, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            InvalidCursorError: If the cursor cannot be decoded
+        """
+        start_key = decode_cursor(cursor) if cursor else None
+        limit = min(limit, self.max_limit) if limit else None
+        wanted = self._normalized_filters(filters or {})
+
+        with self._lock:
+            postings = [self._postings.get(posting, []) for posting in wanted]
+            keys = min(postings, key=len) if postings else self._keys
+            position = bisect.bisect_left(keys, start_key) if start_key else len(keys)
+
+            rows: List[Dict[str, Any]] = []
+            last_key: Optional[SortKey] = None
+            for index in range(position - 1, -1, -1):
+                key = keys[index]
+                row = self._rows[key[1]]
+                if len(postings) > 1 and not wanted <= self._filter_values(row):
+                    continue
+                if limit is not None and len(rows) == limit:
+                    return rows, encode_cursor(last_key)
+                rows.append(row)
+                last_key = key
+        return rows, None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "items": len(self._keys),
+                "postings": len(self._postings),
+                "loads": self.loads,
+                "age_seconds": (
+                    round(time.monotonic() - self._loaded_at, 1)
+                    if self._loaded_at is not None
+                    else None
+                ),
+            }
+
+    # -------------------------------------------------------------- internals
+
+    def _background_reload(self, client: Any) -> None:
+        try:
+            if not self._is_fresh():
+                self._reload(client)
+        except Exception as exc:
+            print(f"[PublicFeed] Background reload failed: {exc}")
+        finally:
+            self._load_lock.release()
+
+    def _reload(self, client: Any) -> None:
+        # Writes that land while the query runs are replayed on the new index.
+        with self._lock:
+            self._pending_writes = []
+        try:
+            response = client.table("clothes").select("*").eq("is_public", True).execute()
+        except Exception:
+            with self._lock:
+                self._pending_writes = None
+            raise
+        self.load(response.data or [])
+
+    def _is_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.refresh_seconds
+
+    def _sort_key(self, row: Dict[str, Any]) -> SortKey:
+        return _timestamp(row.get("created_at")), str(row.get("id"))
+
+    def _filter_values(self, row: Dict[str, Any]) -> set:
+        values = set()
+        item_type = _text(row.get("type"))
+        if item_type:
+            values.add(("type", item_type))
+        color = self.normalize_color(row.get("color"))
+        if color:
+            values.add(("color", color))
+        for season in row.get("seasons") or []:
+            season_text = _text(season)
+            if season_text:
+                values.add(("season", season_text))
+        owner = row.get("user_id")
+        if owner:
+            values.add(("owner", str(owner)))
+        return values
+
+    def _normalized_filters(self, filters: Dict[str, Optional[str]]) -> set:
+        wanted = set()
+        for field in FILTER_FIELDS:
+            value = filters.get(field)
+            if value is None or value == "":
+                continue
+            if field == "color":
+                normalized = self.normalize_color(value)
+            elif field == "owner":
+                normalized = str(value)
+            else:
+                normalized = _text(value)
+            if normalized:
+                wanted.add((field, normalized))
+        return wanted
+
+    def _apply_locked(self, row: Dict[str, Any]) -> None:
+        item_id = str(row["id"])
+        previous = self._rows.get(item_id)
+        self._remove_locked(item_id)
+        if not row.get("is_public"):
+            return
+        merged = {**(previous or {}), **row}
+        key = self._sort_key(merged)
+        self._rows[item_id] = merged
+        self._item_keys[item_id] = key
+        bisect.insort(self._keys, key)
+        for posting in self._filter_values(merged):
+            bisect.insort(self._postings.setdefault(posting, []), key)
+
+    def _remove_locked(self, item_id: str) -> None:
+        key = self._item_keys.pop(item_id, None)
+        row = self._rows.pop(item_id, None)
+        if key is None:
+            return
+        self._discard(self._keys, key)
+        for posting in self._filter_values(row or {}):
+            keys = self._postings.get(posting)
+            if keys is not None:
+                self._discard(keys, key)
+                if not keys:
+                    del self._postings[posting]
+
+    @staticmethod
+    def _discard(keys: List[SortKey], key: SortKey) -> None:
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
@@ -0,0 +1,225 @@
+"""
+Recommendation Result Cache
+
+Short-lived cache of /ai-outfit/today results.
+
+An app refresh sends the same request again and used to redo the wardrobe
+fetch, candidate generation and a full LLaVA round-trip. Results are cached
+under a key built from everything that shapes the outfit:
+
+- user and wardrobe version (bumped by every item write, see wardrobe_cache)
+- temperature, humidity and wind quantized into buckets, weather condition
+- the parsed request's intent signature, occasion and preferences
+- the exclude and current-outfit item sets
+
+Consistency rules:
+- Wardrobe edits change the wardrobe version, so older entries are never
+  matched again (they age out through the TTL / LRU).
+- Usage writes (use-today / record) call invalidate_user_recommendations(),
+  which drops the user's entries and bumps the user's generation.
+- A result is only stored if the generation did not change while it was
+  being computed, so a write racing with a request never caches stale data.
+- Failed results, LLaVA-failure fallbacks and speculative answers (see
+  refinement_registry) are not cached, so the next request retries.
+
+Environment Variables:
+- RECOMMENDATION_CACHE_TTL_SECONDS: Result lifetime (default 120, 0 disables)
+- RECOMMENDATION_CACHE_MAX_ENTRIES: Maximum cached results (default 512)
+- RECOMMENDATION_CACHE_TEMP_STEP: Temperature bucket in °C (default 2)
+"""
+
+import copy
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+SPECULATIVE_MODEL = "candidate_score_speculative"
+UNCACHEABLE_MODELS = {"llava_candidate_fallback", SPECULATIVE_MODEL}
+HUMIDITY_STEP = 10.0
+WIND_STEP = 5.0
+
+
+def _bucket(value: Any, step: float) -> Optional[int]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number):
+        return None
+    return math.floor(number / step)
+
+
+def _item_set(item_ids: Optional[Iterable[Any]]) -> Tuple[str, ...]:
+    return tuple(sorted({str(item_id) for item_id in item_ids or [] if item_id}))
+
+
+class RecommendationResultCache:
+    """
+    Thread-safe TTL + LRU cache of recommendation results.
+    """
+
+    DEFAULT_TTL_SECONDS = 120.0
+    DEFAULT_MAX_ENTRIES = 512
+    DEFAULT_TEMP_STEP = 2.0
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        temp_step: Optional[float] = None,
+    ):
+        """
+        Initialize the result cache.
+
+        Args:
+            ttl_seconds: Result lifetime in seconds (0 disables caching)
+            max_entries: Maximum number of cached results
+            temp_step: Width of a temperature bucket in °C
+        """
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", self.DEFAULT_TTL_SECONDS))
+        )
+        self.max_entries = max_entries or int(
+            os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", self.DEFAULT_MAX_ENTRIES)
+        )
+        self.temp_step = temp_step or float(
+            os.getenv("RECOMMENDATION_CACHE_TEMP_STEP", self.DEFAULT_TEMP_STEP)
+        )
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped_stores = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def build_key(
+        self,
+        user_id: str,
+        wardrobe_version: int,
+        temperature: Any,
+        weather_condition: Optional[str],
+        humidity: Any = None,
+        wind_speed: Any = None,
+        occasion: Optional[str] = None,
+        preferences: Optional[Dict[str, Any]] = None,
+        intent_signature: str = "",
+        exclude_items: Optional[Iterable[Any]] = None,
+        current_outfit_items: Optional[Iterable[Any]] = None,
+    ) -> Hashable:
+        """
+        Cache key of a daily recommendation request.
+
+        Returns:
+            Hashable key; its first element is the user ID
+        """
+        return (
+            str(user_id),
+            int(wardrobe_version),
+            _bucket(temperature, self.temp_step),
+            str(weather_condition or "").strip().lower(),
+            _bucket(humidity, HUMIDITY_STEP),
+            _bucket(wind_speed, WIND_STEP),
+            str(occasion or "").strip().lower(),
+            json.dumps(preferences or {}, sort_keys=True, default=str),
+            intent_signature or "",
+            _item_set(exclude_items),
+            _item_set(current_outfit_items),
+        )
+
+    def generation(self, user_id: str) -> int:
+        """Current generation of a user; pass it to put() after computing."""
+        with self._lock:
+            return self._generations.get(str(user_id), 0)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Copy of a fresh cached result, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        return copy.deepcopy(result)
+
+    def put(self, key: Hashable, result: Dict[str, Any], generation: int) -> bool:
+        """
+        Store a result computed while the user was at `generation`.
+
+        Returns:
+            True if stored; False if uncacheable or invalidated meanwhile
+        """
+        if not self.enabled or not result.get("success"):
+            return False
+        if result.get("model_used") in UNCACHEABLE_MODELS:
+            with self._lock:
+                self.skipped_stores += 1
+            return False
+
+        stored = copy.deepcopy(result)
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                self.skipped_stores += 1
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, stored)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, user_id: str) -> int:
+        """Drop the user's results and bump the user's generation."""
+        user_key = str(user_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_key]:
+                del self._entries[key]
+            self._generations[user_key] = self._generations.get(user_key, 0) + 1
+            self.invalidations += 1
+            return self._generations[user_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "skipped_stores": self.skipped_stores,
+                "invalidations": self.invalidations,
+            }
+
+
+recommendation_result_cache = RecommendationResultCache()
+
+
+def invalidate_user_recommendations(user_id: Optional[str]) -> None:
+    """Forget cached recommendations of a user after a usage write."""
+    if not user_id:
+        return
+    generation = recommendation_result_cache.invalidate(user_id)
+    print(f"[RecommendationCache] Invalidated user_id={user_id} generation={generation}")
@@ -0,0 +1,393 @@
+"""
+Recommendation Jobs
+
+Asynchronous job API for the long-running /ai-outfit endpoints.
+
+/ai-outfit/today, /travel and /travel-plan hold the HTTP connection for the
+whole VLM round-trip. With jobs the client POSTs to /ai-outfit/jobs/<kind>,
+gets a job ID back at once, and follows the progress over Server-Sent Events
+(GET /ai-outfit/jobs/{job_id}/events):
+
+    /today:        accepted -> intent_parsed -> candidates_generated -> llava_selected -> result
+                   accepted -> intent_parsed -> candidates_generated -> speculative_selected -> result
+                   accepted -> cache_hit -> result   (served from the result cache)
+    /travel:       accepted -> context_prepared -> llava_completed -> result
+    /travel-plan:  accepted -> forecast_fetched -> wardrobe_loaded
+                            -> day_selected (once per day) -> result
+
+"failed" replaces "result" when the work raises. Jobs that join an identical
+in-flight /today run get the events already emitted replayed, then the rest.
+
+Jobs and their events are stored in SQLite, so a client that reconnects
+(optionally with Last-Event-ID) replays what it missed and gets the stored
+result instead of starting the work again. Submitting with the same
+Idempotency-Key returns the existing job. Jobs still running when the
+process stopped are marked failed ("interrupted") on the next startup, and
+jobs older than RECOMMENDATION_JOBS_RETENTION_SECONDS are pruned.
+
+Environment Variables:
+- RECOMMENDATION_JOBS_PATH: SQLite file (default .cache/recommendation_jobs.sqlite3)
+- RECOMMENDATION_JOBS_RETENTION_SECONDS: How long finished jobs are kept (default 86400)
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+TERMINAL_STATUSES = {STATUS_SUCCEEDED, STATUS_FAILED}
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+JobRunner = Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+
+
+class JobFailed(Exception):
+    """Raised by a job runner to fail the job with a client-facing message."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RecommendationJobStore:
+    """
+    SQLite persistence of jobs and their ordered progress events.
+
+    One connection per process, guarded by a lock; every statement is a
+    short local write, so it runs inline on the caller.
+    """
+
+    DEFAULT_PATH = os.path.join(".cache", "recommendation_jobs.sqlite3")
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the store. The database is opened on first use.
+
+        Args:
+            path: SQLite file path (RECOMMENDATION_JOBS_PATH); ":memory:" for tests
+        """
+        self.path = path or os.getenv("RECOMMENDATION_JOBS_PATH", self.DEFAULT_PATH)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def create(
+        self,
+        user_id: str,
+        kind: str,
+        request: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Insert a queued job, or return the user's job with the same idempotency key."""
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            if idempotency_key:
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE user_id = ? AND idempotency_key = ?",
+                    (str(user_id), idempotency_key),
+                ).fetchone()
+                if row is not None:
+                    return self._job(row)
+            job_id = uuid.uuid4().hex
+            connection.execute(
+                "INSERT INTO jobs (id, user_id, kind, status, request, idempotency_key, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    str(user_id),
+                    kind,
+                    STATUS_QUEUED,
+                    json.dumps(request, default=str),
+                    idempotency_key,
+                    now,
+                    now,
+                ),
+            )
+            connection.commit()
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job(row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job(row) if row is not None else None
+
+    def set_status(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+            connection.commit()
+
+    def append_event(self, job_id: str, event: str, data: Dict[str, Any]) -> int:
+        """Append one progress event; returns its sequence number (1, 2, ...)."""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            seq = row[0]
+            connection.execute(
+                "INSERT INTO job_events (job_id, seq, event, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, event, json.dumps(data, default=str), time.time()),
+            )
+            connection.commit()
+            return seq
+
+    def events_after(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+        return [{"seq": seq, "event": event, "data": json.loads(data)} for seq, event, data in rows]
+
+    def fail_unfinished(self, error: str) -> int:
+        """Fail jobs left queued/running by a previous process."""
+        with self._lock:
+            connection = self._connect()
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (STATUS_FAILED, error, time.time(), STATUS_QUEUED, STATUS_RUNNING),
+            )
+            connection.commit()
+            return cursor.rowcount
+
+    def prune(self, older_than: float) -> int:
+        """Delete jobs (and their events) last updated before `older_than`."""
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE updated_at < ?)",
+                (older_than,),
+            )
+            cursor = connection.execute("DELETE FROM jobs WHERE updated_at < ?", (older_than,))
+            connection.commit()
+            return cursor.rowcount
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        try:
+            connection = self._open(self.path)
+        except sqlite3.Error as exc:
+            # Jobs keep working, they just do not survive a restart.
+            print(f"[RecommendationJobs] Could not open {self.path}: {exc}; using memory")
+            connection = self._open(":memory:")
+        self._connection = connection
+        return connection
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path, timeout=2.0, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, kind TEXT NOT NULL, "
+            "status TEXT NOT NULL, request TEXT, result TEXT, error TEXT, "
+            "idempotency_key TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_idempotency "
+            "ON jobs(user_id, idempotency_key) WHERE idempotency_key IS NOT NULL"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs(updated_at)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            "job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, "
+            "data TEXT, created_at REAL NOT NULL, PRIMARY KEY (job_id, seq))"
+        )
+        connection.commit()
+        return connection
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "user_id": row["user_id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+class RecommendationJobManager:
+    """
+    Runs jobs as event-loop tasks and wakes SSE listeners on new events.
+    """
+
+    DEFAULT_RETENTION_SECONDS = 86400.0
+
+    def __init__(
+        self,
+        store: Optional[RecommendationJobStore] = None,
+        retention_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            store: Job store (SQLite at RECOMMENDATION_JOBS_PATH if not provided)
+            retention_seconds: Age at which jobs are pruned
+                (RECOMMENDATION_JOBS_RETENTION_SECONDS)
+        """
+        self.store = store or RecommendationJobStore()
+        self.retention_seconds = retention_seconds or float(
+            os.getenv("RECOMMENDATION_JOBS_RETENTION_SECONDS", self.DEFAULT_RETENTION_SECONDS)
+        )
+        self._signals: Dict[str, asyncio.Event] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def startup(self) -> None:
+        """Fail jobs interrupted by the last shutdown and prune old ones (FastAPI startup)."""
+        interrupted = self.store.fail_unfinished("Job interrupted by a server restart")
+        pruned = self.store.prune(time.time() - self.retention_seconds)
+        if interrupted or pruned:
+            print(f"[RecommendationJobs] interrupted={interrupted} pruned={pruned}")
+
+    def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+
+    def submit(
+        self,
+        user_id: str,
+        kind: str,
+        request: Dict[str, Any],
+        runner: JobRunner,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Create a job and start `runner` in the background.
+
+        Args:
+            user_id: Owner of the job
+            kind: Job kind ("today", "travel", "travel_plan")
+            request: Request payload, stored with the job
+            runner: Coroutine function receiving a progress callback and
+                returning the JSON-serializable result
+            idempotency_key: Returns the existing job when reused by the user
+
+        Returns:
+            The job record
+        """
+        job = self.store.create(user_id, kind, request, idempotency_key)
+        if job["status"] != STATUS_QUEUED or self.store.events_after(job["job_id"]):
+            return job
+        self.submitted += 1
+        self._emit(job["job_id"], "accepted", {"kind": kind})
+        task = asyncio.ensure_future(self._run(job["job_id"], runner))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The job if it exists and belongs to `user_id`."""
+        job = self.store.get(job_id)
+        if job is None or job["user_id"] != str(user_id):
+            return None
+        return job
+
+    async def stream(
+        self,
+        job_id: str,
+        after_seq: int = 0,
+        keepalive_seconds: float = 15.0,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events after `after_seq` until the job finishes.
+
+        Yields None when `keepalive_seconds` pass without a new event.
+        """
+        while True:
+            signal = self._signals.setdefault(job_id, asyncio.Event())
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            for event in self.store.events_after(job_id, after_seq):
+                after_seq = event["seq"]
+                yield event
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            try:
+                await asyncio.wait_for(signal.wait(), keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._tasks),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "path": self.store.path,
+        }
+
+    # -------------------------------------------------------------- internals
+
+    async def _run(self, job_id: str, runner: JobRunner) -> None:
+        self.store.set_status(job_id, STATUS_RUNNING)
+        try:
+            result = await runner(lambda event, data: self._emit(job_id, event, data))
+        except asyncio.CancelledError:
+            self._finish(job_id, error="Job cancelled", status_code=503)
+            raise
+        except JobFailed as exc:
+            self._finish(job_id, error=str(exc), status_code=exc.status_code)
+        except Exception as exc:
+            print(f"[RecommendationJobs] job={job_id} failed: {exc}")
+            self._finish(job_id, error=str(exc), status_code=500)
+        else:
+            self.succeeded += 1
+            self.store.set_status(job_id, STATUS_SUCCEEDED, result=result)
+            self._emit(job_id, "result", result)
+            self._signals.pop(job_id, None)
+
+    def _finish(self, job_id: str, error: str, status_code: int) -> None:
+        self.failed += 1
+        self.store.set_status(job_id, STATUS_FAILED, error=error)
+        self._emit(job_id, "failed", {"error": error, "status_code": status_code})
+        self._signals.pop(job_id, None)
+
+    def _emit(self, job_id: str, event: str, data: Dict[str, Any]) -> None:
+        self.store.append_event(job_id, event, data)
+        signal = self._signals.pop(job_id, None)
+        if signal is not None:
+            signal.set()
+
+
+recommendation_jobs = RecommendationJobManager()
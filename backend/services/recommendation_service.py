@@ -36,12 +36,14 @@ Added user request parsing and mandatory item enforcement.
 - Adds variation to prevent same outfit
 """
 
+import asyncio
 import logging
 import json
+import os
 import random
 import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from services.data_preparation_service import DataPreparationService
 from services.prompt_service import PromptService
@@ -55,6 +57,16 @@ from services.constraint_matching_service import ConstraintMatchingService
 from services.item_scoring_service import ItemScoringService
 from services.outfit_variation_service import OutfitVariationService
 from services.candidate_outfit_service import CandidateOutfitService
+from services.candidate_prompt_encoder import CandidatePromptEncoder, candidate_prompt_encoder
+from services.recommendation_cache import (
+    SPECULATIVE_MODEL,
+    RecommendationResultCache,
+    recommendation_result_cache,
+)
+from services.refinement_registry import STATUS_PENDING, RefinementRegistry, refinement_registry
+from services.single_flight import SingleFlight
+from services.vlm_scheduler import PRIORITY_BATCH, vlm_priority
+from services.wardrobe_cache import wardrobe_snapshot_cache
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -73,6 +85,8 @@ class RecommendationService:
     - Ensures all data is properly enriched and filtered
     """
 
+    DEFAULT_LATENCY_BUDGET_SECONDS = 0.0
+
     def __init__(
         self,
         vlm_service: VLMServiceInterface,
@@ -86,6 +100,11 @@ class RecommendationService:
         item_scoring_service: Optional[ItemScoringService] = None,
         outfit_variation_service: Optional[OutfitVariationService] = None,
         candidate_outfit_service: Optional[CandidateOutfitService] = None,
+        result_cache: Optional[RecommendationResultCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        refinements: Optional[RefinementRegistry] = None,
+        latency_budget_seconds: Optional[float] = None,
+        prompt_encoder: Optional[CandidatePromptEncoder] = None,
     ):
         """
         Initialize the recommendation service.
@@ -101,6 +120,12 @@ class RecommendationService:
             constraint_matching_service: Constraint matching service (created if not provided)
             item_scoring_service: Item scoring service (created if not provided)
             outfit_variation_service: Outfit variation service (created if not provided)
+            result_cache: Daily recommendation cache (shared module cache if not provided)
+            single_flight: Coalesces concurrent identical daily requests (created if not provided)
+            refinements: Registry of background LLaVA refinements (shared module registry if not provided)
+            latency_budget_seconds: Default wait for the LLaVA candidate pick before answering
+                with the top-scored candidate (RECOMMENDATION_LATENCY_BUDGET_SECONDS, 0 = wait)
+            prompt_encoder: Candidate-selection prompt encoder (shared module encoder if not provided)
         """
         self.vlm_service = vlm_service
         self.wardrobe_service = wardrobe_service or WardrobeService()
@@ -113,6 +138,20 @@ class RecommendationService:
         self.item_scoring_service = item_scoring_service or ItemScoringService()
         self.outfit_variation_service = outfit_variation_service or OutfitVariationService()
         self.candidate_outfit_service = candidate_outfit_service or CandidateOutfitService()
+        self.result_cache = result_cache or recommendation_result_cache
+        self.single_flight = single_flight or SingleFlight()
+        self.refinements = refinements or refinement_registry
+        self.prompt_encoder = prompt_encoder or candidate_prompt_encoder
+        self.latency_budget_seconds = (
+            latency_budget_seconds
+            if latency_budget_seconds is not None
+            else float(
+                os.getenv(
+                    "RECOMMENDATION_LATENCY_BUDGET_SECONDS",
+                    self.DEFAULT_LATENCY_BUDGET_SECONDS,
+                )
+            )
+        )
 
         # Phase 2: Data preparation service
         self.data_preparation_service = DataPreparationService(
@@ -133,6 +172,88 @@ class RecommendationService:
         exclude_items: Optional[List[str]] = None,
         current_outfit_items: Optional[List[str]] = None,
         user_request: Optional[str] = None,
+        latency_budget_seconds: Optional[float] = None,
+        on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Daily outfit recommendation, served from the result cache when the
+        wardrobe version, weather buckets and request intent are unchanged.
+
+        Concurrent identical requests (double taps, client retries) with the
+        same latency budget share one in-flight pipeline run instead of each
+        calling the VLM; every caller's on_progress receives its events.
+
+        Takes the same arguments as _generate_daily_outfit.
+
+        Returns:
+            Dictionary with recommended outfit and metadata
+        """
+        cache_key = self.result_cache.build_key(
+            user_id=user_id,
+            wardrobe_version=wardrobe_snapshot_cache.version(user_id),
+            temperature=temperature,
+            weather_condition=weather_condition,
+            humidity=humidity,
+            wind_speed=wind_speed,
+            occasion=occasion,
+            preferences=preferences,
+            intent_signature=(
+                self.user_request_parser.request_signature(user_request)
+                if user_request
+                else ""
+            ),
+            exclude_items=exclude_items,
+            current_outfit_items=current_outfit_items,
+        )
+        if self.result_cache.enabled:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                print(f"[RecommendationCache] Hit user_id={user_id}")
+                if on_progress is not None:
+                    on_progress("cache_hit", {})
+                return cached
+        generation = self.result_cache.generation(user_id)
+        # Requests made after a usage write must not join a run started before
+        # it, and a caller without latency budget must not get a speculative answer.
+        flight_key = (cache_key, generation, self._latency_budget(latency_budget_seconds))
+
+        async def generate(emit: Callable[[str, Dict[str, Any]], None]) -> Dict[str, Any]:
+            result = await self._generate_daily_outfit(
+                user_id=user_id,
+                temperature=temperature,
+                weather_condition=weather_condition,
+                humidity=humidity,
+                wind_speed=wind_speed,
+                occasion=occasion,
+                preferences=preferences,
+                exclude_items=exclude_items,
+                current_outfit_items=current_outfit_items,
+                user_request=user_request,
+                latency_budget_seconds=latency_budget_seconds,
+                on_progress=emit,
+                cache_entry=(cache_key, generation),
+            )
+            self.result_cache.put(cache_key, result, generation)
+            return result
+
+        # Every coalesced caller gets the pipeline events, not only the leader.
+        return await self.single_flight.run_with_progress(flight_key, generate, on_progress)
+
+    async def _generate_daily_outfit(
+        self,
+        user_id: str,
+        temperature: float,
+        weather_condition: str,
+        humidity: Optional[float] = None,
+        wind_speed: Optional[float] = None,
+        occasion: Optional[str] = None,
+        preferences: Optional[Dict[str, Any]] = None,
+        exclude_items: Optional[List[str]] = None,
+        current_outfit_items: Optional[List[str]] = None,
+        user_request: Optional[str] = None,
+        latency_budget_seconds: Optional[float] = None,
+        on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        cache_entry: Optional[Tuple[Any, int]] = None,
     ) -> Dict[str, Any]:
         """
         Generate a daily outfit recommendation.
@@ -156,6 +277,12 @@ class RecommendationService:
             preferences: Optional user style preferences
             exclude_items: Optional list of item IDs to exclude
             user_request: Optional user text request (e.g., "outfit with yellow sneakers")
+            latency_budget_seconds: Longest wait for the LLaVA candidate pick; past it
+                the top-scored candidate is returned with a refinement token
+            on_progress: Optional callback receiving pipeline events (intent_parsed,
+                candidates_generated, llava_selected) for the job API
+            cache_entry: (cache key, generation) under which a background LLaVA
+                refinement stores its result once it completes
 
         Returns:
             Dictionary with recommended outfit and metadata
@@ -186,6 +313,14 @@ class RecommendationService:
                     occasion = parsed_occasions[0]
             else:
                 parsed_constraints = self.user_request_parser.parse_request("")
+            if on_progress is not None:
+                on_progress("intent_parsed", {
+                    "mode": parsed_constraints.get("mode"),
+                    "style": parsed_constraints.get("style", []),
+                    "occasion": parsed_constraints.get("occasion", []),
+                    "colors": parsed_constraints.get("requested_colors", []),
+                    "types": parsed_constraints.get("requested_types", []),
+                })
 
             candidate_weather = {
                 "temp": temperature,
@@ -254,74 +389,64 @@ class RecommendationService:
                 "[CandidateSelection] llava_candidate_ids="
                 f"{[candidate.get('candidate_id') for candidate in llava_candidates]}"
             )
-            selection = await self.select_best_candidate_with_llava(
-                candidates=llava_candidates,
-                wardrobe_items=wardrobe_for_candidates,
-                user_request=user_request_text or "",
-                weather_data=candidate_weather,
-            )
-            selected_candidate = selection["candidate"]
-            selected_candidate_id = selected_candidate.get("candidate_id")
-            final_item_ids = list(selected_candidate.get("item_ids") or [])
-            selected_section_by_id = {
-                item.get("id"): item.get("section")
-                for item in selected_candidate.get("items", [])
-                if item.get("id") and item.get("section")
-            }
-            wardrobe_by_id = {
-                str(item.get("id")): item for item in wardrobe_for_candidates
-                if item.get("id")
-            }
-            final_items = [
-                {
-                    **wardrobe_by_id[item_id],
-                    "section": selected_section_by_id.get(item_id),
-                }
-                for item_id in final_item_ids
-                if item_id in wardrobe_by_id
-            ]
-            reasoning = self._build_candidate_selection_reasoning(
-                selected_candidate=selected_candidate,
-                user_request=user_request_text,
-                weather_data=candidate_weather,
-            )
-            print(f"[CandidateSelection] selected_candidate_id={selected_candidate_id}")
-            print(f"[CandidateSelection] final_item_ids={final_item_ids}")
-
-            return {
-                "success": True,
-                "outfit": {
-                    "items": final_items,
-                    "reasoning": reasoning,
-                },
-                "model_used": selection.get("model_used"),
-                "context_used": "candidate_outfit_selection",
-                "validation": {
-                    "warnings": [],
-                    "errors": [],
-                },
-                "debug": {
-                    "generated_candidate_ids": [
-                        candidate.get("candidate_id") for candidate in candidates
-                    ],
+            if on_progress is not None:
+                on_progress("candidates_generated", {
+                    "count": len(candidates),
                     "llava_candidate_ids": [
                         candidate.get("candidate_id") for candidate in llava_candidates
                     ],
-                    "raw_llava_candidate_response": selection.get("raw_response"),
-                    "selected_candidate_reasoning": selection.get("reasoning"),
-                    "selected_candidate_id": selected_candidate_id,
-                    "final_item_ids": final_item_ids,
-                    "top_candidate_by_score": selection.get("top_candidate_by_score"),
-                    "llava_selected": selection.get("llava_selected"),
-                    "score_gap": selection.get("score_gap"),
-                    "final_selected": selection.get("final_selected"),
+                })
+            selection_task = asyncio.ensure_future(
+                self.select_best_candidate_with_llava(
+                    candidates=llava_candidates,
+                    wardrobe_items=wardrobe_for_candidates,
+                    user_request=user_request_text or "",
+                    weather_data=candidate_weather,
+                )
+            )
+
+            def build_result(selection: Dict[str, Any]) -> Dict[str, Any]:
+                return self._candidate_selection_result(
+                    selection=selection,
+                    candidates=candidates,
+                    llava_candidates=llava_candidates,
+                    wardrobe_items=wardrobe_for_candidates,
+                    user_request_text=user_request_text,
+                    weather_data=candidate_weather,
+                )
+
+            budget = self._latency_budget(latency_budget_seconds)
+            try:
+                if budget is None:
+                    selection = await selection_task
+                else:
+                    done, _ = await asyncio.wait({selection_task}, timeout=budget)
+                    if not done:
+                        result = self._speculative_candidate_result(
+                            user_id=user_id,
+                            selection_task=selection_task,
+                            llava_candidates=llava_candidates,
+                            build_result=build_result,
+                            weather_data=candidate_weather,
+                            cache_entry=cache_entry,
+                        )
+                        if on_progress is not None:
+                            on_progress("speculative_selected", {
+                                "candidate_id": result["debug"]["selected_candidate_id"],
+                                "refinement_token": result["refinement"]["token"],
+                            })
+                        return result
+                    selection = selection_task.result()
+            except asyncio.CancelledError:
+                selection_task.cancel()
+                raise
+            if on_progress is not None:
+                on_progress("llava_selected", {
+                    "candidate_id": selection["candidate"].get("candidate_id"),
+                    "model_used": selection.get("model_used"),
                     "selection_reason": selection.get("selection_reason"),
-                    "llava_confidence": selection.get("confidence"),
-                    "candidates": candidates,
-                    "llava_candidates": llava_candidates,
-                },
-                "timestamp": datetime.now().isoformat(),
-            }
+                })
+            return build_result(selection)
 
             mode = parsed_constraints.get("mode")
             is_followup_command = mode in {"replace_piece", "keep_piece", "avoid_piece"}
@@ -343,10 +468,9 @@ class RecommendationService:
             followup_plan = None
 
             if needs_constraint_wardrobe:
-                debug_wardrobe = await self.wardrobe_service.get_user_wardrobe(
-                    user_id=user_id,
+                debug_wardrobe = self.wardrobe_service.filter_wardrobe_items(
+                    wardrobe_for_candidates,
                     only_clean=False,
-                    exclude_item_ids=None,
                 )
                 self._print_wardrobe_debug(debug_wardrobe)
                 self._print_command_debug(
@@ -364,8 +488,8 @@ class RecommendationService:
                     excluded_ids=set(effective_exclude_items),
                 )
 
-                clean_wardrobe = await self.wardrobe_service.get_user_wardrobe(
-                    user_id=user_id,
+                clean_wardrobe = self.wardrobe_service.filter_wardrobe_items(
+                    wardrobe_for_candidates,
                     only_clean=True,
                     exclude_item_ids=effective_exclude_items,
                 )
@@ -795,6 +919,148 @@ class RecommendationService:
             print(f"Error in daily recommendation: {e}")
             return self._create_error_response(f"Daily recommendation failed: {str(e)}")
 
+    def _candidate_selection_result(
+        self,
+        selection: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+        llava_candidates: List[Dict[str, Any]],
+        wardrobe_items: List[Dict[str, Any]],
+        user_request_text: Optional[str],
+        weather_data: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Daily recommendation result for the candidate chosen in `selection`."""
+        selected_candidate = selection["candidate"]
+        selected_candidate_id = selected_candidate.get("candidate_id")
+        final_item_ids = list(selected_candidate.get("item_ids") or [])
+        selected_section_by_id = {
+            item.get("id"): item.get("section")
+            for item in selected_candidate.get("items", [])
+            if item.get("id") and item.get("section")
+        }
+        wardrobe_by_id = {
+            str(item.get("id")): item for item in wardrobe_items
+            if item.get("id")
+        }
+        final_items = [
+            {
+                **wardrobe_by_id[item_id],
+                "section": selected_section_by_id.get(item_id),
+            }
+            for item_id in final_item_ids
+            if item_id in wardrobe_by_id
+        ]
+        reasoning = self._build_candidate_selection_reasoning(
+            selected_candidate=selected_candidate,
+            user_request=user_request_text,
+            weather_data=weather_data,
+        )
+        print(f"[CandidateSelection] selected_candidate_id={selected_candidate_id}")
+        print(f"[CandidateSelection] final_item_ids={final_item_ids}")
+
+        return {
+            "success": True,
+            "outfit": {
+                "items": final_items,
+                "reasoning": reasoning,
+            },
+            "model_used": selection.get("model_used"),
+            "context_used": "candidate_outfit_selection",
+            "validation": {
+                "warnings": [],
+                "errors": [],
+            },
+            "debug": {
+                "generated_candidate_ids": [
+                    candidate.get("candidate_id") for candidate in candidates
+                ],
+                "llava_candidate_ids": [
+                    candidate.get("candidate_id") for candidate in llava_candidates
+                ],
+                "raw_llava_candidate_response": selection.get("raw_response"),
+                "selected_candidate_reasoning": selection.get("reasoning"),
+                "selected_candidate_id": selected_candidate_id,
+                "final_item_ids": final_item_ids,
+                "top_candidate_by_score": selection.get("top_candidate_by_score"),
+                "llava_selected": selection.get("llava_selected"),
+                "score_gap": selection.get("score_gap"),
+                "final_selected": selection.get("final_selected"),
+                "selection_reason": selection.get("selection_reason"),
+                "llava_confidence": selection.get("confidence"),
+                "candidates": candidates,
+                "llava_candidates": llava_candidates,
+            },
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def _latency_budget(self, requested: Optional[float]) -> Optional[float]:
+        budget = requested if requested is not None else self.latency_budget_seconds
+        return budget if budget and budget > 0 else None
+
+    def _speculative_candidate_result(
+        self,
+        user_id: str,
+        selection_task: "asyncio.Future[Dict[str, Any]]",
+        llava_candidates: List[Dict[str, Any]],
+        build_result: Callable[[Dict[str, Any]], Dict[str, Any]],
+        weather_data: Dict[str, Any],
+        cache_entry: Optional[Tuple[Any, int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Answer with the top-scored candidate while LLaVA keeps choosing.
+
+        The LLaVA selection is registered as a refinement; its token is
+        returned under "refinement" so the client can fetch the final pick.
+        With `cache_entry` the refined result is also cached, so repeating the
+        request serves the LLaVA pick instead of starting another refinement.
+        """
+        result = build_result(self._score_ranked_selection(llava_candidates))
+
+        async def refine() -> Dict[str, Any]:
+            refined = build_result(await selection_task)
+            if cache_entry is not None:
+                cache_key, generation = cache_entry
+                self.result_cache.put(cache_key, refined, generation)
+            return refined
+
+        token = self.refinements.register(
+            user_id,
+            asyncio.ensure_future(refine()),
+            context={
+                "weather": weather_data,
+                "speculative_item_ids": result["debug"]["final_item_ids"],
+            },
+        )
+        result["refinement"] = {"token": token, "status": STATUS_PENDING}
+        print(
+            "[CandidateSelection] latency budget exceeded, "
+            f"returning top-scored candidate refinement_token={token}"
+        )
+        return result
+
+    def _score_ranked_selection(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        top_candidate = self._top_scored_candidate(candidates)
+        top_candidate_id = str(top_candidate.get("candidate_id"))
+        return {
+            "candidate": top_candidate,
+            "selected_candidate_id": top_candidate.get("candidate_id"),
+            "reasoning": "LLaVA is still choosing, selected the highest-scored candidate.",
+            "raw_response": None,
+            "model_used": SPECULATIVE_MODEL,
+            "top_candidate_by_score": top_candidate_id,
+            "llava_selected": None,
+            "score_gap": 0,
+            "final_selected": top_candidate_id,
+            "selection_reason": "latency_budget",
+            "confidence": 0.0,
+        }
+
+    def _top_scored_candidate(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return sorted(
+            candidates,
+            key=lambda candidate: candidate.get("score", 0),
+            reverse=True,
+        )[0]
+
     async def select_best_candidate_with_llava(
         self,
         candidates: List[Dict[str, Any]],
@@ -812,17 +1078,17 @@ class RecommendationService:
             for candidate in candidates
             if candidate.get("candidate_id")
         }
-        fallback_candidate = sorted(
-            candidates,
-            key=lambda candidate: candidate.get("score", 0),
-            reverse=True,
-        )[0]
+        fallback_candidate = self._top_scored_candidate(candidates)
         top_candidate_id = str(fallback_candidate.get("candidate_id"))
-        prompt = self._build_candidate_selection_prompt(
+        encoded_prompt = self.prompt_encoder.encode(
             candidates=candidates,
             user_request=user_request,
             weather_data=weather_data,
         )
+        print(
+            "[CandidateSelection] prompt_tokens="
+            f"{encoded_prompt.token_count} detail_level={encoded_prompt.detail_level}"
+        )
         candidate_item_ids = {
             item.get("id")
             for candidate in candidates
@@ -841,8 +1107,9 @@ class RecommendationService:
                 user_context={
                     "user_request": user_request,
                     "mode": "candidate_selection",
+                    "candidate_ids": list(candidate_by_id),
                 },
-                prompt_template=prompt,
+                prompt_template=encoded_prompt.text,
             )
         except Exception as exc:
             print(f"[CandidateSelection] LLaVA exception={exc}")
@@ -866,6 +1133,11 @@ class RecommendationService:
             or ""
         )
         print(f"[CandidateSelection] raw_llava_candidate_response={raw_response}")
+        self.prompt_encoder.record_measured(
+            encoded_prompt,
+            (vlm_response.metadata or {}).get("prompt_tokens"),
+            (vlm_response.metadata or {}).get("image_count", 0),
+        )
 
         if not vlm_response.success:
             return {
@@ -882,8 +1154,19 @@ class RecommendationService:
                 "confidence": 0.0,
             }
 
-        parsed = self._parse_candidate_selection_json(raw_response)
+        if vlm_response.structured is not None:
+            # Schema-constrained reply, already validated against candidate_ids
+            parsed = vlm_response.structured.model_dump()
+        else:
+            parsed = self._parse_candidate_selection_json(raw_response)
         selected_candidate_id = str(parsed.get("selected_candidate") or "").strip()
+        if selected_candidate_id not in candidate_by_id:
+            # LLaVA named an item (alias or UUID) instead of a candidate
+            selected_candidate_id = (
+                encoded_prompt.candidate_for_alias(selected_candidate_id)
+                or selected_candidate_id
+            )
+        parsed["reasoning"] = encoded_prompt.expand_aliases(str(parsed.get("reasoning") or ""))
         confidence = self._parse_llava_confidence(parsed.get("confidence"))
         if selected_candidate_id not in candidate_by_id:
             print(
@@ -963,71 +1246,6 @@ class RecommendationService:
             "confidence": confidence,
         }
 
-    def _build_candidate_selection_prompt(
-        self,
-        candidates: List[Dict[str, Any]],
-        user_request: str,
-        weather_data: Dict[str, Any],
-    ) -> str:
-        candidate_lines = []
-        for candidate in candidates:
-            metadata = candidate.get("metadata", {}) or {}
-            candidate_lines.append(f"Candidate {candidate.get('candidate_id')}:")
-            candidate_lines.append(f"Total score: {candidate.get('score')}")
-            candidate_lines.append(
-                f"Score explanation: {metadata.get('score_explanation', '')}"
-            )
-            candidate_lines.append(
-                f"Strengths: {', '.join(metadata.get('strengths') or []) or 'valid candidate'}"
-            )
-            candidate_lines.append(
-                f"Weaknesses: {', '.join(metadata.get('weaknesses') or []) or 'none'}"
-            )
-            candidate_lines.append(
-                f"Diversity reason: {metadata.get('diversity_reason', '')}"
-            )
-            for item in candidate.get("items", []):
-                candidate_lines.append(
-                    "- "
-                    f"Section: {item.get('section')} | "
-                    f"ID: {item.get('id')} | "
-                    f"Name: {item.get('name')} | "
-                    f"Type: {item.get('type')} | "
-                    f"Color: {item.get('color')} | "
-                    f"Style: {item.get('style')} | "
-                    f"Occasion: {item.get('occasion')}"
-                )
-            candidate_lines.append("")
-
-        return f"""You are a stylist choosing the best outfit candidate.
-
-You are not choosing freely from the wardrobe. You are choosing the best candidate from already validated outfits.
-You must choose ONLY one candidate ID from the provided list.
-Do not invent items.
-Do not change items.
-Do not remove items.
-Do not select individual item IDs.
-Choose the best candidate visually and stylistically, but do not ignore hard request matches. Prefer candidates with higher score unless there is a clear visual/style reason.
-Do not prioritize visual variety over request accuracy.
-Return JSON only. No markdown. No extra text.
-
-User request:
-{user_request or "No specific request"}
-
-Weather:
-{json.dumps(weather_data, ensure_ascii=False)}
-
-Candidate list:
-{chr(10).join(candidate_lines)}
-
-Required response:
-{{
-  "selected_candidate": "A",
-  "reasoning": "short explanation",
-  "confidence": 0.0
-}}
-"""
-
     def _parse_candidate_selection_json(self, response_text: str) -> Dict[str, Any]:
         if not response_text:
             return {}
@@ -1924,6 +2142,7 @@ Required response:
         luggage_limit: int = 10,
         preferences: Optional[Dict[str, Any]] = None,
         exclude_items: Optional[List[str]] = None,
+        on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
     ) -> Dict[str, Any]:
         """
         Generate travel outfit recommendations.
@@ -1943,6 +2162,8 @@ Required response:
             luggage_limit: Maximum items to pack
             preferences: Optional user preferences
             exclude_items: Optional item IDs to exclude
+            on_progress: Optional callback receiving pipeline events
+                (context_prepared, llava_completed)
 
         Returns:
             Dictionary with recommended outfits and packing list
@@ -1964,17 +2185,28 @@ Required response:
                 return self._create_error_response(
                     "No suitable wardrobe items available for travel planning"
                 )
-
-            # Call VLM
-            vlm_responses = await self.vlm_service.recommend_travel_outfits(
-                wardrobe_items=[item.to_dict() for item in ai_context.get_all_items()],
-                weather_forecast=[w.to_dict() for w in ai_context.weather_forecast],
-                num_days=(end_date - start_date).days + 1,
-                user_context={
-                    "preferences": ai_context.user_constraints.get("preferences", {}),
-                    "destination": destination,
-                },
-            )
+            if on_progress is not None:
+                on_progress("context_prepared", {
+                    "items": len(ai_context.get_all_items()),
+                    "forecast_days": len(ai_context.weather_forecast),
+                })
+
+            # Call VLM (queued behind interactive /today requests)
+            with vlm_priority(PRIORITY_BATCH):
+                vlm_responses = await self.vlm_service.recommend_travel_outfits(
+                    wardrobe_items=[item.to_dict() for item in ai_context.get_all_items()],
+                    weather_forecast=[w.to_dict() for w in ai_context.weather_forecast],
+                    num_days=(end_date - start_date).days + 1,
+                    user_context={
+                        "preferences": ai_context.user_constraints.get("preferences", {}),
+                        "destination": destination,
+                    },
+                )
+            if on_progress is not None:
+                on_progress("llava_completed", {
+                    "days": len(vlm_responses),
+                    "success": any(response.success for response in vlm_responses),
+                })
 
             # Phase 4: Validate VLM responses
             logger.info(
@@ -0,0 +1,173 @@
+"""
+Refinement Registry
+
+Background LLaVA refinements of speculative /ai-outfit/today answers.
+
+With a latency budget, RecommendationService answers with the top-scored
+candidate as soon as the budget runs out, while the LLaVA candidate
+selection keeps running. The still-running work is registered here under an
+opaque token returned to the client, which then polls
+GET /ai-outfit/refinements/{token} or listens on .../events (SSE).
+
+- A token is only visible to the user it was issued to.
+- Entries expire REFINEMENT_TTL_SECONDS after creation; work still pending
+  at that point is cancelled.
+- At most REFINEMENT_MAX_ENTRIES are kept; the oldest are dropped first.
+
+Environment Variables:
+- REFINEMENT_TTL_SECONDS: Lifetime of a refinement token (default 600)
+- REFINEMENT_MAX_ENTRIES: Maximum registered refinements (default 1024)
+"""
+
+import asyncio
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class _Refinement:
+    __slots__ = ("user_id", "task", "context", "expires_at")
+
+    def __init__(self, user_id: str, task: "asyncio.Future[Any]", context: Dict[str, Any], expires_at: float):
+        self.user_id = user_id
+        self.task = task
+        self.context = context
+        self.expires_at = expires_at
+
+
+class RefinementRegistry:
+    """
+    Token -> background refinement task, scoped to the requesting user.
+    """
+
+    DEFAULT_TTL_SECONDS = 600.0
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            ttl_seconds: Token lifetime in seconds (REFINEMENT_TTL_SECONDS)
+            max_entries: Maximum registered refinements (REFINEMENT_MAX_ENTRIES)
+        """
+        self.ttl_seconds = ttl_seconds or float(
+            os.getenv("REFINEMENT_TTL_SECONDS", self.DEFAULT_TTL_SECONDS)
+        )
+        self.max_entries = max_entries or int(
+            os.getenv("REFINEMENT_MAX_ENTRIES", self.DEFAULT_MAX_ENTRIES)
+        )
+        self._entries: "OrderedDict[str, _Refinement]" = OrderedDict()
+        self.registered = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def register(
+        self,
+        user_id: str,
+        task: "asyncio.Future[Any]",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Track a running refinement.
+
+        Args:
+            user_id: Owner of the refinement
+            task: Task resolving to the refined recommendation result
+            context: Extra data returned with the status (e.g. weather used)
+
+        Returns:
+            Opaque refinement token
+        """
+        self._purge()
+        token = secrets.token_urlsafe(16)
+        self._entries[token] = _Refinement(
+            str(user_id), task, dict(context or {}), time.monotonic() + self.ttl_seconds
+        )
+        while len(self._entries) > self.max_entries:
+            _, oldest = self._entries.popitem(last=False)
+            self._expire(oldest)
+        task.add_done_callback(self._on_done)
+        self.registered += 1
+        return token
+
+    def status(self, token: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current state of a refinement.
+
+        Returns:
+            {"token", "status", "result", "error", "context"}, or None if the
+            token is unknown, expired or belongs to another user
+        """
+        self._purge()
+        entry = self._entries.get(token)
+        if entry is None or entry.user_id != str(user_id):
+            return None
+        task = entry.task
+        snapshot: Dict[str, Any] = {
+            "token": token,
+            "status": STATUS_PENDING,
+            "result": None,
+            "error": None,
+            "context": entry.context,
+        }
+        if not task.done():
+            return snapshot
+        if task.cancelled():
+            snapshot.update(status=STATUS_FAILED, error="Refinement was cancelled")
+        elif task.exception() is not None:
+            snapshot.update(status=STATUS_FAILED, error=str(task.exception()))
+        else:
+            snapshot.update(status=STATUS_READY, result=task.result())
+        return snapshot
+
+    async def wait(self, token: str, user_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """status() once the refinement finishes or `timeout` seconds pass."""
+        entry = self._entries.get(token)
+        if entry is not None and entry.user_id == str(user_id) and not entry.task.done():
+            await asyncio.wait({entry.task}, timeout=timeout)
+        return self.status(token, user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        pending = sum(1 for entry in self._entries.values() if not entry.task.done())
+        return {
+            "entries": len(self._entries),
+            "pending": pending,
+            "registered": self.registered,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+        }
+
+    # -------------------------------------------------------------- internals
+
+    def _on_done(self, task: "asyncio.Future[Any]") -> None:
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            del self._entries[token]
+            self._expire(entry)
+
+    def _expire(self, entry: _Refinement) -> None:
+        self.expired += 1
+        if not entry.task.done():
+            entry.task.cancel()
+
+
+refinement_registry = RefinementRegistry()
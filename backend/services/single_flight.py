@@ -0,0 +1,158 @@
+"""
+Single Flight
+
+Coalesces concurrent identical async calls into one shared execution.
+
+Double taps and client retries start several /ai-outfit/today requests for
+the same user and payload at once. Without coalescing each one runs the
+whole pipeline and sends its own LLaVA request to an Ollama server that can
+only serve a few at a time. With SingleFlight the first caller (the leader)
+starts the work as a task and later callers with the same key await that
+task instead:
+
+    result = await single_flight.run(key, lambda: compute(...))
+
+Cancellation rule: a waiter that is cancelled (client disconnected) only
+stops waiting; the shared task keeps running while any waiter remains. When
+the last waiter leaves before the task finishes, the task is cancelled so
+no LLaVA call runs for nobody, and its key is released at once: a retry
+never joins a task that is being cancelled.
+
+Results shared by more than one waiter are deep-copied per waiter, since
+callers post-process the returned dictionaries. Exceptions are raised to
+every waiter. Keys are dropped as soon as the task finishes; results are
+not kept (see recommendation_cache for that).
+
+The shared work only has the leader's arguments, so per-caller progress
+callbacks (job events) go through run_with_progress: the work emits to the
+call's ProgressFanout and every waiter's callback receives the events,
+including the ones emitted before it joined.
+"""
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class _Call:
+    __slots__ = ("task", "progress", "waiters", "shared")
+
+    def __init__(self, task: "asyncio.Task[Any]", progress: "ProgressFanout"):
+        self.task = task
+        self.progress = progress
+        self.waiters = 0
+        self.shared = False
+
+
+class SingleFlight:
+    """
+    Per-key in-flight task registry for one event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the in-flight call for `key`, starting it with `factory` if needed.
+
+        Args:
+            key: Hashable identity of the request
+            factory: Zero-argument callable returning the coroutine to run
+
+        Returns:
+            The call's result (a private copy when it was shared)
+        """
+        return await self.run_with_progress(key, lambda _emit: factory())
+
+    async def run_with_progress(
+        self,
+        key: Hashable,
+        factory: Callable[[ProgressCallback], Awaitable[Any]],
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Any:
+        """
+        run() for work that reports progress to every waiter.
+
+        Args:
+            key: Hashable identity of the request
+            factory: Callable taking the emit callback and returning the coroutine
+            on_progress: This caller's callback; receives the events already
+                emitted by the shared call, then the following ones
+
+        Returns:
+            The call's result (a private copy when it was shared)
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            progress = ProgressFanout()
+            call = _Call(asyncio.ensure_future(factory(progress.emit)), progress)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+            self.leaders += 1
+        else:
+            call.shared = True
+            self.coalesced += 1
+
+        call.waiters += 1
+        if on_progress is not None:
+            call.progress.subscribe(on_progress)
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            if on_progress is not None:
+                call.progress.unsubscribe(on_progress)
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller is gone: stop the shared work, and forget it
+                # now so a retry arriving during cancellation starts afresh.
+                call.task.cancel()
+                self._forget(key, call)
+                self.cancelled += 1
+        return copy.deepcopy(result) if call.shared else result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class ProgressFanout:
+    """
+    Delivers the progress events of one shared run to every waiter.
+    """
+
+    def __init__(self):
+        self._history: List[Tuple[str, Dict[str, Any]]] = []
+        self._listeners: List[ProgressCallback] = []
+
+    def subscribe(self, listener: ProgressCallback) -> None:
+        """Add a listener and replay the events emitted so far to it."""
+        for event, data in self._history:
+            listener(event, data)
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ProgressCallback) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        self._history.append((event, data))
+        for listener in list(self._listeners):
+            try:
+                listener(event, data)
+            except Exception as exc:
+                print(f"[SingleFlight] Progress listener failed for {event}: {exc}")
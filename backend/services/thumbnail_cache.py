@@ -0,0 +1,416 @@
+"""
+VLM Thumbnail Cache
+
+Content-addressed on-disk cache of VLM-ready image payloads.
+
+LLaVAService and ImagePreprocessingService used to download every wardrobe
+image on every call and base64-encode the full-size photo, so a single
+recommendation shipped several MB of pixels the model downsamples anyway.
+Each image is now resized once with Pillow (longest side THUMBNAIL_MAX_SIDE),
+recompressed as JPEG, and stored under the SHA-256 of its source bytes plus
+the encoding parameters. A small reference index maps remote URLs and data
+URIs to that key so warm calls skip the download entirely.
+
+Design notes:
+- The same picture behind different URLs is stored once.
+- Total size on disk (thumbnails and reference files) is bounded; the least
+  recently used thumbnails are evicted first (file mtime is refreshed on
+  every hit, including in-memory ones) together with the references to
+  them. A reference whose thumbnail is gone is deleted when it is read.
+- Images Pillow cannot decode return None and callers send the original.
+- Local paths are not indexed by reference (the file may change in place);
+  they are re-read and hashed, which is cheap compared to a download.
+
+Environment Variables:
+- THUMBNAIL_CACHE_ENABLED: Resize and cache VLM images (default true)
+- THUMBNAIL_CACHE_DIR: Cache directory (default .cache/thumbnails)
+- THUMBNAIL_CACHE_MAX_MB: Maximum size on disk in MB (default 200)
+- THUMBNAIL_MAX_SIDE: Longest side in pixels after resizing (default 512)
+- THUMBNAIL_JPEG_QUALITY: JPEG quality 1-95 (default 80)
+"""
+
+import asyncio
+import base64
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from services.color_cache import content_key
+
+
+def decode_data_uri(data_uri: str) -> Optional[bytes]:
+    """Return the bytes of a base64 data URI, or None if it is not one."""
+    if not data_uri.startswith("data:") or ";base64," not in data_uri:
+        return None
+    try:
+        return base64.b64decode(data_uri.split(",", 1)[1])
+    except (ValueError, TypeError):
+        return None
+
+
+class ThumbnailCache:
+    """
+    Resizes images for VLM input and keeps the results on disk.
+    """
+
+    DEFAULT_DIR = os.path.join(".cache", "thumbnails")
+    DEFAULT_MAX_MB = 200
+    DEFAULT_MAX_SIDE = 512
+    DEFAULT_QUALITY = 80
+    MEMORY_ENTRIES = 64
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_side: Optional[int] = None,
+        quality: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        """
+        Initialize the cache. The directory is created on first write.
+
+        Args:
+            directory: Cache directory (THUMBNAIL_CACHE_DIR)
+            max_bytes: Maximum bytes on disk (THUMBNAIL_CACHE_MAX_MB)
+            max_side: Longest side after resizing (THUMBNAIL_MAX_SIDE)
+            quality: JPEG quality (THUMBNAIL_JPEG_QUALITY)
+            enabled: Turn resizing/caching on or off (THUMBNAIL_CACHE_ENABLED)
+        """
+        self.directory = directory or os.getenv("THUMBNAIL_CACHE_DIR", self.DEFAULT_DIR)
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(float(os.getenv("THUMBNAIL_CACHE_MAX_MB", self.DEFAULT_MAX_MB)) * 1024 * 1024)
+        )
+        self.max_side = max_side or int(os.getenv("THUMBNAIL_MAX_SIDE", self.DEFAULT_MAX_SIDE))
+        self.quality = quality or int(os.getenv("THUMBNAIL_JPEG_QUALITY", self.DEFAULT_QUALITY))
+        self.enabled = (
+            enabled
+            if enabled is not None
+            else os.getenv("THUMBNAIL_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+        )
+
+        self._lock = threading.Lock()
+        # ref path -> (content key, data URI)
+        self._memory: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.source_bytes = 0
+        self.thumbnail_bytes = 0
+
+    # ------------------------------------------------------------------ paths
+
+    @property
+    def _params(self) -> str:
+        return f"{self.max_side}q{self.quality}"
+
+    def _thumbnail_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.jpg")
+
+    def _ref_path(self, ref: str) -> str:
+        return os.path.join(self.directory, "refs", content_key(ref))
+
+    @staticmethod
+    def _indexable(ref: Optional[str]) -> bool:
+        return bool(ref) and ref.startswith(("http://", "https://", "data:"))
+
+    # ----------------------------------------------------------------- public
+
+    def lookup(self, ref: str) -> Optional[str]:
+        """
+        Return the cached data URI for a remote URL or data URI.
+
+        Returns:
+            Data URI, or None on a miss (or for local paths)
+        """
+        if not self.enabled or not self._indexable(ref):
+            return None
+
+        ref_path = self._ref_path(ref)
+        with self._lock:
+            cached = self._memory.get(ref_path)
+            if cached is not None:
+                key, data_uri = cached
+                try:
+                    # Refresh recency; fails if the thumbnail was removed
+                    os.utime(self._thumbnail_path(key))
+                except OSError:
+                    del self._memory[ref_path]
+                else:
+                    self._memory.move_to_end(ref_path)
+                    self.hits += 1
+                    return data_uri
+
+        key = self._read_ref(ref_path)
+        data_uri = self._read_thumbnail(key) if key else None
+
+        with self._lock:
+            if data_uri is None:
+                if key:
+                    # The thumbnail is gone; the reference would never hit again
+                    self._remove_ref(ref_path, key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(ref_path, key, data_uri)
+        return data_uri
+
+    def put(self, ref: Optional[str], image_bytes: bytes) -> Optional[str]:
+        """
+        Resize and store an image, returning its VLM-ready data URI.
+
+        CPU bound: async callers should use aput().
+
+        Args:
+            ref: URL / data URI the bytes came from (indexed when remote),
+                or None for local files
+            image_bytes: Original image bytes
+
+        Returns:
+            JPEG data URI, or None if disabled or the image cannot be decoded
+        """
+        if not self.enabled or not image_bytes:
+            return None
+
+        key = content_key(image_bytes + self._params.encode("ascii"))
+        data_uri = self._read_thumbnail(key)
+        if data_uri is None:
+            thumbnail = self._make_thumbnail(image_bytes)
+            if thumbnail is None:
+                return None
+            self._write_thumbnail(key, thumbnail)
+            with self._lock:
+                self.source_bytes += len(image_bytes)
+                self.thumbnail_bytes += len(thumbnail)
+            data_uri = self._to_data_uri(thumbnail)
+
+        if self._indexable(ref):
+            ref_path = self._ref_path(ref)
+            self._write_ref(ref_path, key)
+            with self._lock:
+                self._remember(ref_path, key, data_uri)
+        return data_uri
+
+    async def aput(self, ref: Optional[str], image_bytes: bytes) -> Optional[str]:
+        """put() on a worker thread so resizing does not block the event loop."""
+        return await asyncio.to_thread(self.put, ref, image_bytes)
+
+    def clear(self) -> None:
+        """Drop every cached thumbnail and reference."""
+        with self._lock:
+            self._memory.clear()
+            for root, _dirs, files in os.walk(self.directory):
+                for name in files:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+            self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics (hit counts and bytes saved by resizing)."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_side": self.max_side,
+                "quality": self.quality,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes,
+                "source_bytes_encoded": self.source_bytes,
+                "thumbnail_bytes_written": self.thumbnail_bytes,
+            }
+
+    # -------------------------------------------------------------- internals
+
+    def _make_thumbnail(self, image_bytes: bytes) -> Optional[bytes]:
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                image.seek(0)
+                image.thumbnail((self.max_side, self.max_side))
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                elif image.mode != "RGB":
+                    image = image.convert("RGB")
+
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+                return buffer.getvalue()
+        except Exception as exc:
+            print(f"[ThumbnailCache] Could not resize image: {exc}")
+            return None
+
+    def _read_thumbnail(self, key: str) -> Optional[str]:
+        path = self._thumbnail_path(key)
+        try:
+            with open(path, "rb") as thumbnail_file:
+                data = thumbnail_file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return self._to_data_uri(data)
+
+    def _read_ref(self, ref_path: str) -> Optional[str]:
+        try:
+            with open(ref_path, "r", encoding="ascii") as ref_file:
+                return ref_file.read().strip() or None
+        except OSError:
+            return None
+
+    def _write_ref(self, ref_path: str, key: str) -> None:
+        try:
+            previous = os.path.getsize(ref_path)
+        except OSError:
+            previous = 0
+        try:
+            os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+            with open(ref_path, "w", encoding="ascii") as ref_file:
+                ref_file.write(key)
+        except OSError as exc:
+            print(f"[ThumbnailCache] Could not index reference: {exc}")
+            return
+        self._add_disk_bytes(len(key) - previous)
+
+    def _remove_ref(self, ref_path: str, key: str) -> None:
+        """Delete a reference file still pointing to `key` (caller holds the lock)."""
+        if self._read_ref(ref_path) != key:
+            return
+        try:
+            size = os.path.getsize(ref_path)
+            os.remove(ref_path)
+        except OSError:
+            return
+        self._memory.pop(ref_path, None)
+        if self._disk_bytes is not None:
+            self._disk_bytes = max(0, self._disk_bytes - size)
+
+    def _write_thumbnail(self, key: str, data: bytes) -> None:
+        path = self._thumbnail_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as thumbnail_file:
+                thumbnail_file.write(data)
+            os.replace(temp_path, path)
+        except OSError as exc:
+            print(f"[ThumbnailCache] Could not write thumbnail: {exc}")
+            return
+        self._add_disk_bytes(len(data))
+
+    def _add_disk_bytes(self, size: int) -> None:
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += size
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for path in self._thumbnail_files() + self._ref_files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _thumbnail_files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        paths = []
+        for root, _dirs, files in os.walk(self.directory):
+            if os.path.basename(root) == "refs":
+                continue
+            paths.extend(os.path.join(root, name) for name in files if name.endswith(".jpg"))
+        return paths
+
+    def _ref_files(self) -> List[str]:
+        refs_dir = os.path.join(self.directory, "refs")
+        try:
+            return [os.path.join(refs_dir, name) for name in os.listdir(refs_dir)]
+        except OSError:
+            return []
+
+    def _evict(self) -> None:
+        """
+        Delete least recently used thumbnails until 90% of max_bytes is free.
+
+        Each thumbnail is charged with the references pointing to it, which
+        are deleted with it; references to missing thumbnails are deleted
+        first.
+        """
+        refs_by_key: Dict[str, List[Tuple[str, int]]] = {}
+        total = 0
+        for ref_path in self._ref_files():
+            key = self._read_ref(ref_path)
+            try:
+                size = os.path.getsize(ref_path)
+            except OSError:
+                continue
+            refs_by_key.setdefault(key or "", []).append((ref_path, size))
+
+        entries = []
+        for path in self._thumbnail_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = os.path.basename(path)[:-len(".jpg")]
+            refs = refs_by_key.pop(key, [])
+            entries.append((stat.st_mtime, stat.st_size + sum(size for _ref, size in refs), path, refs))
+            total += entries[-1][1]
+        entries.sort(key=lambda entry: entry[0])
+
+        # Whatever is left points to no thumbnail
+        for refs in refs_by_key.values():
+            for ref_path, _size in refs:
+                self._delete_file(ref_path)
+
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, path, refs in entries:
+            if total <= target:
+                break
+            if not self._delete_file(path):
+                continue
+            for ref_path, _ref_size in refs:
+                self._delete_file(ref_path)
+            total -= size
+            self.evictions += 1
+
+        # The in-memory copies are dropped so they are not served after eviction.
+        self._memory.clear()
+        self._disk_bytes = total
+
+    @staticmethod
+    def _delete_file(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _remember(self, ref_path: str, key: str, data_uri: str) -> None:
+        self._memory[ref_path] = (key, data_uri)
+        self._memory.move_to_end(ref_path)
+        while len(self._memory) > self.MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _to_data_uri(data: bytes) -> str:
+        return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+
+
+thumbnail_cache = ThumbnailCache()
@@ -12,6 +12,8 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from database import supabase
+from services.db_executor import db_executor
+from services.recommendation_cache import invalidate_user_recommendations
 
 
 class UsageService:
@@ -49,7 +51,7 @@ class UsageService:
                 cutoff_date = (datetime.now() - timedelta(days=days or 30)).isoformat()
                 query = query.gte("worn_date", cutoff_date)
 
-            response = query.execute()
+            response = await db_executor.execute(query)
             return len(response.data) if response.data else 0
 
         except Exception as e:
@@ -74,11 +76,10 @@ class UsageService:
         """
         try:
             # Fetch all items for the user
-            items_response = (
+            items_response = await db_executor.execute(
                 self.supabase.table("clothes")
                 .select("id")
                 .eq("user_id", user_id)
-                .execute()
             )
             item_ids = (
                 [item["id"] for item in items_response.data]
@@ -92,12 +93,11 @@ class UsageService:
             try:
                 # Fetch usage history for all items
                 cutoff_date = (datetime.now() - timedelta(days=days or 30)).isoformat()
-                usage_response = (
+                usage_response = await db_executor.execute(
                     self.supabase.table("usage_history")
                     .select("clothing_id")
                     .eq("user_id", user_id)
                     .gte("worn_date", cutoff_date)
-                    .execute()
                 )
 
                 # Count usage per item
@@ -148,19 +148,22 @@ class UsageService:
             # Record each item as used
             for item_id in item_ids:
                 try:
-                    self.supabase.table("usage_history").insert(
-                        {
-                            "user_id": user_id,
-                            "clothing_id": item_id,
-                            "worn_date": timestamp,
-                            "weather_condition": occasion,
-                        }
-                    ).execute()
+                    await db_executor.execute(
+                        self.supabase.table("usage_history").insert(
+                            {
+                                "user_id": user_id,
+                                "clothing_id": item_id,
+                                "worn_date": timestamp,
+                                "weather_condition": occasion,
+                            }
+                        )
+                    )
                 except Exception as e:
                     # Phase 1: Table doesn't exist, skip
                     print(f"Info: Could not record usage (Phase 1): {e}")
                     continue
 
+            invalidate_user_recommendations(user_id)
             return True
 
         except Exception as e:
@@ -186,12 +189,11 @@ class UsageService:
 
             if not usage_freq:
                 # Phase 1: Return all items as having equal frequency
-                items_response = (
+                items_response = await db_executor.execute(
                     self.supabase.table("clothes")
                     .select("*")
                     .eq("user_id", user_id)
                     .limit(limit)
-                    .execute()
                 )
 
                 result = []
@@ -214,11 +216,10 @@ class UsageService:
             # Fetch item details
             result = []
             for item_id, frequency in sorted_items[:limit]:
-                item_response = (
+                item_response = await db_executor.execute(
                     self.supabase.table("clothes")
                     .select("*")
                     .eq("id", item_id)
-                    .execute()
                 )
                 if item_response.data:
                     item = item_response.data[0]
@@ -257,12 +258,11 @@ class UsageService:
         """
         try:
             # Get all clean items
-            all_items = (
+            all_items = await db_executor.execute(
                 self.supabase.table("clothes")
                 .select("id, name, type")
                 .eq("user_id", user_id)
                 .eq("status", "clean")
-                .execute()
             )
 
             if not all_items.data:
@@ -271,12 +271,11 @@ class UsageService:
             try:
                 # Get recently used items
                 cutoff_date = (datetime.now() - timedelta(days=days or 30)).isoformat()
-                used_recently = (
+                used_recently = await db_executor.execute(
                     self.supabase.table("usage_history")
                     .select("clothing_id")
                     .eq("user_id", user_id)
                     .gte("worn_date", cutoff_date)
-                    .execute()
                 )
 
                 used_item_ids = (
@@ -15,11 +15,274 @@ Examples:
 
 "traje para apresentação" →
   occasion: "presentation"
+
+parse_request results are memoized in a bounded LRU keyed on the request
+text and stored deep-frozen; every caller gets its own mutable copy.
+intent_signature() reduces a parsed intent to a canonical key that
+downstream caches can share across requests with the same meaning.
+
+Environment Variables:
+- USER_REQUEST_PARSE_CACHE_MAX: Parsed requests kept in memory (default 1024)
 """
 
+import hashlib
+import json
+import os
 import re
+import threading
 import unicodedata
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType, SimpleNamespace
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+_BOUNDARY = re.compile(r"\b")
+_TERMINAL = ""
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and remove accents while keeping word boundaries."""
+    decomposed = unicodedata.normalize("NFD", text or "")
+    without_accents = "".join(
+        char for char in decomposed if unicodedata.category(char) != "Mn"
+    )
+    return without_accents.lower().strip()
+
+
+def freeze_intent(value: Any) -> Any:
+    """Deep-frozen copy of a parsed intent (dicts -> read-only mappings, lists -> tuples)."""
+    kind = type(value)
+    if kind is dict or kind is MappingProxyType:
+        return MappingProxyType({key: freeze_intent(item) for key, item in value.items()})
+    if kind is list or kind is tuple:
+        return tuple([freeze_intent(item) for item in value])
+    return value
+
+
+def thaw_intent(value: Any) -> Any:
+    """Mutable copy of a frozen intent, in the shape parse_request returns."""
+    if type(value) is MappingProxyType:
+        return {key: thaw_intent(item) for key, item in value.items()}
+    if type(value) is tuple:
+        return [thaw_intent(item) for item in value]
+    return value
+
+
+def intent_signature(parsed: Mapping[str, Any]) -> str:
+    """
+    Canonical key of what a parsed request asks for.
+
+    Two requests with the same must-include items, colors/types, style,
+    occasion, avoid items, section commands and mode get the same
+    signature, whatever their wording. When no occasion was parsed the
+    normalized text is part of the key, because candidate scoring falls
+    back to matching the raw request text.
+
+    Args:
+        parsed: parse_request result (frozen or mutable), possibly adjusted
+            by the caller (e.g. a forced style)
+
+    Returns:
+        16-character hex digest
+    """
+
+    def canonical_items(items: Any) -> List[str]:
+        return sorted({
+            json.dumps(
+                {key: normalize_text(str(value)) for key, value in dict(item).items() if value},
+                sort_keys=True,
+            )
+            for item in items or []
+            if isinstance(item, Mapping)
+        })
+
+    def canonical_values(values: Any) -> List[str]:
+        if isinstance(values, str):
+            values = [values]
+        return sorted({normalize_text(str(value)) for value in values or [] if value})
+
+    must_include = parsed.get("must_include") or {}
+    occasion = canonical_values(parsed.get("occasion"))
+    canonical = {
+        "must_include_items": canonical_items(parsed.get("must_include_items")),
+        "must_include": {
+            field: canonical_values(must_include.get(field))
+            for field in ("type", "color", "name")
+        },
+        "colors": canonical_values(parsed.get("requested_colors")),
+        "types": canonical_values(parsed.get("requested_types")),
+        "style": canonical_values(parsed.get("style")),
+        "requested_style": normalize_text(str(parsed.get("requested_style") or "")),
+        "occasion": occasion,
+        "avoid": canonical_items(parsed.get("avoid_items")),
+        "replace_sections": canonical_values(parsed.get("replace_sections")),
+        "keep_sections": canonical_values(parsed.get("keep_sections")),
+        "mode": parsed.get("mode") or "new_outfit",
+        "text": "" if occasion else " ".join(normalize_text(parsed.get("raw_text") or "").split()),
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ParsedRequestCache:
+    """
+    Thread-safe LRU of frozen parse_request results and their signatures.
+    """
+
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Parsed requests kept (USER_REQUEST_PARSE_CACHE_MAX)
+        """
+        self.max_entries = max_entries or int(
+            os.getenv("USER_REQUEST_PARSE_CACHE_MAX", self.DEFAULT_MAX_ENTRIES)
+        )
+        self._lock = threading.Lock()
+        # key -> [frozen parse, signature or None until requested]
+        self._entries: "OrderedDict[Tuple[type, str], List[Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[type, str]) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[type, str], entry: List[Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+parsed_request_cache = ParsedRequestCache()
+
+
+class VocabularyMatcher:
+    """
+    Whole-word matcher for several alias vocabularies, compiled once.
+
+    Aliases are normalized and stored in one character trie. scan() walks
+    the trie from every word boundary of the text, so a single pass finds
+    every alias a per-alias word-boundary regex would find, including
+    overlapping ones ("t-shirt" and "shirt").
+    """
+
+    def __init__(self, vocabularies: Dict[str, Iterable[str]]):
+        """
+        Args:
+            vocabularies: vocabulary name -> raw aliases (mapping keys)
+        """
+        self.names = list(vocabularies)
+        self._root: Dict[str, Any] = {}
+        for name, aliases in vocabularies.items():
+            for alias in aliases:
+                normalized = normalize_text(alias)
+                if not normalized:
+                    continue
+                node = self._root
+                for char in normalized:
+                    node = node.setdefault(char, {})
+                node.setdefault(_TERMINAL, []).append((name, alias))
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """
+        Raw aliases found in already normalized text, per vocabulary.
+        """
+        found: Dict[str, Set[str]] = {name: set() for name in self.names}
+        length = len(text)
+        boundaries = {match.start() for match in _BOUNDARY.finditer(text)}
+        for start in boundaries:
+            if start >= length:
+                continue
+            node = self._root.get(text[start])
+            position = start
+            while node is not None:
+                position += 1
+                terminals = node.get(_TERMINAL)
+                if terminals and position in boundaries:
+                    for name, alias in terminals:
+                        found[name].add(alias)
+                if position >= length:
+                    break
+                node = node.get(text[position])
+        return found
+
+
+@lru_cache(maxsize=None)
+def _compiled_vocabularies(parser_class: type) -> SimpleNamespace:
+    """Matcher, alias ranks and regexes of a parser class, built on first use."""
+    mappings = {
+        "color": parser_class.COLOR_MAPPINGS,
+        "type": parser_class.TYPE_MAPPINGS,
+        "style": parser_class.STYLE_MAPPINGS,
+    }
+
+    def alternation(mapping: Dict[str, str]) -> str:
+        aliases = {normalize_text(alias) for alias in mapping if normalize_text(alias)}
+        return r"(?:%s)" % "|".join(
+            re.escape(alias) for alias in sorted(aliases, key=len, reverse=True)
+        )
+
+    color_pattern = alternation(parser_class.COLOR_MAPPINGS)
+    type_pattern = alternation(parser_class.TYPE_MAPPINGS)
+    return SimpleNamespace(
+        mappings=mappings,
+        matcher=VocabularyMatcher(mappings),
+        # Longest alias first, as the per-alias regex loop used to try them.
+        length_rank={
+            name: {
+                alias: rank
+                for rank, alias in enumerate(sorted(mapping, key=len, reverse=True))
+            }
+            for name, mapping in mappings.items()
+        },
+        style_order={alias: rank for rank, alias in enumerate(parser_class.STYLE_MAPPINGS)},
+        type_pattern=type_pattern,
+        first_color_type=[
+            re.compile(rf"\b(?P<type>{type_pattern})(?:\s+\w+){{0,2}}\s+(?P<color>{color_pattern})\b"),
+            re.compile(rf"\b(?P<color>{color_pattern})(?:\s+\w+){{0,2}}\s+(?P<type>{type_pattern})\b"),
+        ],
+        color_type_combos=[
+            re.compile(
+                rf"(?P<color>{color_pattern})(?:\s+\w+){{0,2}}\s+(?P<type>{type_pattern})",
+                re.IGNORECASE,
+            ),
+            re.compile(
+                rf"(?P<type>{type_pattern})(?:\s+\w+){{0,2}}\s+(?P<color>{color_pattern})",
+                re.IGNORECASE,
+            ),
+        ],
+        section_commands={
+            action: re.compile(rf"\b{verbs}\b(?:\s+\w+){{0,4}}\s+(?P<type>{type_pattern})\b")
+            for action, verbs in (
+                ("replace", r"(?:troca|trocar|muda|mudar|substitui|replace|change|swap)"),
+                ("keep", r"(?:mantem|manter|mantém|keep|hold)"),
+            )
+        },
+    )
 
 
 class UserRequestParser:
@@ -284,9 +547,15 @@ class UserRequestParser:
         "belt": "accessories",
     }
 
-    def __init__(self):
-        """Initialize the parser."""
-        pass
+    def __init__(self, cache: Optional[ParsedRequestCache] = None):
+        """
+        Initialize the parser (vocabularies are compiled once per class).
+
+        Args:
+            cache: Parsed request LRU (shared module cache if not provided)
+        """
+        self._compiled = _compiled_vocabularies(type(self))
+        self.cache = cache or parsed_request_cache
 
     def parse_user_intent(self, user_input: str) -> Dict[str, Any]:
         """
@@ -310,8 +579,9 @@ class UserRequestParser:
         normalized_text = self._normalize_text(user_input)
         avoid = self._extract_avoid(normalized_text, user_input)
         searchable_text = self._remove_avoid_segments(normalized_text)
-        requested_colors = self._extract_all_mappings(searchable_text, self.COLOR_MAPPINGS)
-        requested_types = self._extract_all_mappings(searchable_text, self.TYPE_MAPPINGS)
+        vocabulary_matches = self._compiled.matcher.scan(searchable_text)
+        requested_colors = self._mapped_values(vocabulary_matches, "color")
+        requested_types = self._mapped_values(vocabulary_matches, "type")
         replace_sections = self._extract_section_commands(searchable_text, action="replace")
         keep_sections = self._extract_section_commands(searchable_text, action="keep")
         if not replace_sections and not keep_sections and self._has_replace_language(searchable_text):
@@ -348,7 +618,7 @@ class UserRequestParser:
         return {
             "requested_colors": requested_colors,
             "requested_types": requested_types,
-            "requested_style": self._extract_primary_style(searchable_text),
+            "requested_style": self._extract_primary_style(vocabulary_matches),
             "must_include_items": must_include_items,
             "avoid_items": [avoid] if avoid else [],
             "replace_sections": replace_sections,
@@ -360,6 +630,9 @@ class UserRequestParser:
         """
         Parse user request text and extract structured constraints.
 
+        Memoized: repeated texts are served from the parse cache as a fresh
+        mutable copy, so callers may adjust the result.
+
         Args:
             user_text: User's natural language request
 
@@ -377,6 +650,41 @@ class UserRequestParser:
                 "parsed_items": list of parsed items
             }
         """
+        key = self._cache_key(user_text)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return thaw_intent(entry[0])
+        parsed = self._parse_request(user_text)
+        # The cache keeps a frozen copy; the fresh result goes to the caller.
+        self.cache.put(key, [freeze_intent(parsed), None])
+        return parsed
+
+    def parse_request_frozen(self, user_text: str) -> Mapping[str, Any]:
+        """Read-only parse_request result, shared with other callers of the same text."""
+        return self._cached_parse(user_text)[0]
+
+    def request_signature(self, user_text: str) -> str:
+        """intent_signature of the parsed request, without re-parsing repeated texts."""
+        entry = self._cached_parse(user_text)
+        if entry[1] is None:
+            # Computed on first use and kept with the cached parse.
+            entry[1] = intent_signature(entry[0])
+        return entry[1]
+
+    def _cache_key(self, user_text: str) -> Tuple[type, str]:
+        # The exact text: raw_text, quoted/capitalized item names and the raw
+        # match spans are copied from it.
+        return type(self), user_text if isinstance(user_text, str) else ""
+
+    def _cached_parse(self, user_text: str) -> List[Any]:
+        key = self._cache_key(user_text)
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = [freeze_intent(self._parse_request(user_text)), None]
+            self.cache.put(key, entry)
+        return entry
+
+    def _parse_request(self, user_text: str) -> Dict[str, Any]:
         if not user_text or not isinstance(user_text, str):
             return {
                 "must_include": {"type": [], "color": [], "name": []},
@@ -461,50 +769,22 @@ class UserRequestParser:
 
     def _normalize_text(self, text: str) -> str:
         """Lowercase text and remove accents while keeping word boundaries."""
-        decomposed = unicodedata.normalize("NFD", text or "")
-        without_accents = "".join(
-            char for char in decomposed if unicodedata.category(char) != "Mn"
-        )
-        return without_accents.lower().strip()
-
-    def _mapping_pattern(self, mapping: Dict[str, str]) -> str:
-        aliases = {
-            self._normalize_text(alias)
-            for alias in mapping
-            if self._normalize_text(alias)
-        }
-        return r"(?:%s)" % "|".join(
-            re.escape(alias) for alias in sorted(aliases, key=len, reverse=True)
-        )
-
-    def _find_first_mapping(self, text: str, mapping: Dict[str, str]) -> Optional[str]:
-        for alias in sorted(mapping, key=len, reverse=True):
-            normalized_alias = self._normalize_text(alias)
-            if re.search(r"\b" + re.escape(normalized_alias) + r"\b", text):
-                return mapping[alias]
-        return None
-
-    def _extract_all_mappings(self, text: str, mapping: Dict[str, str]) -> List[str]:
-        found = []
-        for alias in sorted(mapping, key=len, reverse=True):
-            normalized_alias = self._normalize_text(alias)
-            if re.search(r"\b" + re.escape(normalized_alias) + r"\b", text):
-                value = mapping[alias]
-                if value not in found:
-                    found.append(value)
+        return normalize_text(text)
+
+    def _mapped_values(self, matches: Dict[str, Set[str]], vocabulary: str) -> List[str]:
+        """Distinct values of the matched aliases, longest alias first."""
+        mapping = self._compiled.mappings[vocabulary]
+        rank = self._compiled.length_rank[vocabulary]
+        found: List[str] = []
+        for alias in sorted(matches[vocabulary], key=rank.__getitem__):
+            value = mapping[alias]
+            if value not in found:
+                found.append(value)
         return found
 
     def _extract_first_color_type(self, text: str) -> Dict[str, str]:
-        color_pattern = self._mapping_pattern(self.COLOR_MAPPINGS)
-        type_pattern = self._mapping_pattern(self.TYPE_MAPPINGS)
-
-        patterns = [
-            rf"\b(?P<type>{type_pattern})(?:\s+\w+){{0,2}}\s+(?P<color>{color_pattern})\b",
-            rf"\b(?P<color>{color_pattern})(?:\s+\w+){{0,2}}\s+(?P<type>{type_pattern})\b",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in self._compiled.first_color_type:
+            match = pattern.search(text)
             if match:
                 raw_type = match.group("type")
                 raw_color = match.group("color")
@@ -515,15 +795,9 @@ class UserRequestParser:
 
         return {}
 
-    def _extract_primary_style(self, text: str) -> Optional[str]:
+    def _extract_primary_style(self, matches: Dict[str, Set[str]]) -> Optional[str]:
         style_priority = ["formal", "casual", "sporty", "streetwear", "elegant", "comfortable"]
-        found_styles = []
-
-        for alias, normalized in self.STYLE_MAPPINGS.items():
-            normalized_alias = self._normalize_text(alias)
-            if re.search(r"\b" + re.escape(normalized_alias) + r"\b", text):
-                if normalized in style_priority and normalized not in found_styles:
-                    found_styles.append(normalized)
+        found_styles = {self.STYLE_MAPPINGS[alias] for alias in matches["style"]}
 
         for style in style_priority:
             if style in found_styles:
@@ -543,8 +817,11 @@ class UserRequestParser:
                 raw_name = original_text[match.start("name"):match.end("name")]
                 name = raw_name.strip(" .,!?")
                 normalized_name = self._normalize_text(name)
-                item_type = self._find_first_mapping(normalized_name, self.TYPE_MAPPINGS)
-                color = self._find_first_mapping(normalized_name, self.COLOR_MAPPINGS)
+                name_matches = self._compiled.matcher.scan(normalized_name)
+                type_values = self._mapped_values(name_matches, "type")
+                color_values = self._mapped_values(name_matches, "color")
+                item_type = type_values[0] if type_values else None
+                color = color_values[0] if color_values else None
                 avoid: Dict[str, str] = {}
                 if item_type:
                     avoid["type"] = item_type
@@ -584,17 +861,13 @@ class UserRequestParser:
         matches = []
         
         # Pattern 1: color before type (e.g., "yellow sneakers")
-        color_pattern = self._mapping_pattern(self.COLOR_MAPPINGS)
-        type_pattern = self._mapping_pattern(self.TYPE_MAPPINGS)
-        pattern1 = rf"(?P<color>{color_pattern})(?:\s+\w+){{0,2}}\s+(?P<type>{type_pattern})"
-        
         # Pattern 2: type before color (e.g., "sapatilhas amarelas")
-        pattern2 = rf"(?P<type>{type_pattern})(?:\s+\w+){{0,2}}\s+(?P<color>{color_pattern})"
+        pattern1, pattern2 = self._compiled.color_type_combos
         
         found_combos = set()
         
         # Try pattern 1 (color first)
-        for match in re.finditer(pattern1, text, re.IGNORECASE):
+        for match in pattern1.finditer(text):
             color_word = match.group("color")
             type_word = match.group("type")
 
@@ -613,7 +886,7 @@ class UserRequestParser:
                     found_combos.add(combo_key)
         
         # Try pattern 2 (type first)
-        for match in re.finditer(pattern2, text, re.IGNORECASE):
+        for match in pattern2.finditer(text):
             type_word = match.group("type")
             color_word = match.group("color")
 
@@ -648,14 +921,8 @@ class UserRequestParser:
         return sections
 
     def _extract_section_commands(self, text: str, action: str) -> List[str]:
-        if action == "replace":
-            verbs = r"(?:troca|trocar|muda|mudar|substitui|replace|change|swap)"
-        else:
-            verbs = r"(?:mantem|manter|mantém|keep|hold)"
-
         sections: List[str] = []
-        type_pattern = self._mapping_pattern(self.TYPE_MAPPINGS)
-        for match in re.finditer(rf"\b{verbs}\b(?:\s+\w+){{0,4}}\s+(?P<type>{type_pattern})\b", text):
+        for match in self._compiled.section_commands[action].finditer(text):
             item_type = self.TYPE_MAPPINGS.get(self._normalize_text(match.group("type")))
             section = self.TYPE_TO_SECTION.get(item_type)
             if section and section not in sections:
@@ -728,31 +995,32 @@ class UserRequestParser:
         found_styles = set()
         found_occasions = set()
 
-        for style_word, normalized in self.STYLE_MAPPINGS.items():
-            normalized_style_word = self._normalize_text(style_word)
-            if re.search(r"\b" + re.escape(normalized_style_word) + r"\b", text):
-                # Determine if it's a style or occasion
-                is_occasion = style_word in [
-                    "trabalho", "escritório", "work", "office",
-                    "reunião", "apresentação", "entrevista", "meeting", "presentation", "interview",
-                    "festa", "party", "noite", "evening",
-                    "praia", "beach",
-                ]
-
-                if is_occasion and normalized not in found_occasions:
-                    matches.append({
-                        "type": "occasion",
-                        "value": normalized,
-                        "raw": style_word,
-                    })
-                    found_occasions.add(normalized)
-                elif not is_occasion and normalized not in found_styles:
-                    matches.append({
-                        "type": "style",
-                        "value": normalized,
-                        "raw": style_word,
-                    })
-                    found_styles.add(normalized)
+        style_order = self._compiled.style_order
+        matched = self._compiled.matcher.scan(text)["style"]
+        for style_word in sorted(matched, key=style_order.__getitem__):
+            normalized = self.STYLE_MAPPINGS[style_word]
+            # Determine if it's a style or occasion
+            is_occasion = style_word in [
+                "trabalho", "escritório", "work", "office",
+                "reunião", "apresentação", "entrevista", "meeting", "presentation", "interview",
+                "festa", "party", "noite", "evening",
+                "praia", "beach",
+            ]
+
+            if is_occasion and normalized not in found_occasions:
+                matches.append({
+                    "type": "occasion",
+                    "value": normalized,
+                    "raw": style_word,
+                })
+                found_occasions.add(normalized)
+            elif not is_occasion and normalized not in found_styles:
+                matches.append({
+                    "type": "style",
+                    "value": normalized,
+                    "raw": style_word,
+                })
+                found_styles.add(normalized)
 
         return matches
 
@@ -56,6 +56,9 @@ class VLMConfig:
     # Image preprocessing defaults
     DEFAULT_MAX_IMAGES = 6
     DEFAULT_MAX_IMAGE_SIZE_MB = 5
+    DEFAULT_IMAGE_CONCURRENCY = 4
+    DEFAULT_IMAGE_PER_HOST_CONCURRENCY = 2
+    DEFAULT_IMAGE_DEADLINE = 20.0
 
     def __init__(self, env_override: Optional[Dict[str, str]] = None):
         """
@@ -98,6 +101,17 @@ class VLMConfig:
         self.max_image_size_mb = self._get_int_env(
             "IMAGE_PREPROCESSING_MAX_SIZE_MB", self.DEFAULT_MAX_IMAGE_SIZE_MB
         )
+        self.image_concurrent = self._get_bool_env("IMAGE_PREPROCESSING_CONCURRENT", True)
+        self.image_concurrency = self._get_int_env(
+            "IMAGE_PREPROCESSING_CONCURRENCY", self.DEFAULT_IMAGE_CONCURRENCY
+        )
+        self.image_per_host_concurrency = self._get_int_env(
+            "IMAGE_PREPROCESSING_PER_HOST_CONCURRENCY",
+            self.DEFAULT_IMAGE_PER_HOST_CONCURRENCY,
+        )
+        self.image_deadline = self._get_float_env(
+            "IMAGE_PREPROCESSING_DEADLINE", self.DEFAULT_IMAGE_DEADLINE
+        )
 
     def _get_env(self, key: str, default: str = "") -> str:
         """Get environment variable as string."""
@@ -148,6 +162,10 @@ class VLMConfig:
             "max_size_mb": self.max_image_size_mb,
             "timeout": 15.0,
             "base_url": "http://127.0.0.1:8000",
+            "concurrent": self.image_concurrent,
+            "concurrency": self.image_concurrency,
+            "per_host_concurrency": self.image_per_host_concurrency,
+            "deadline": self.image_deadline,
         }
 
     def get_provider_config(
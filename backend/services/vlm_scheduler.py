@@ -0,0 +1,204 @@
+"""
+VLM Admission Scheduler
+
+Concurrency limit and bounded priority queue in front of the LLaVA API.
+
+LLaVAService._call_llava_api used to send every request straight to Ollama
+with a 300 s timeout. A local Ollama serves only a few generations at once,
+so under load it thrashed and every request timed out together. Calls now
+go through the scheduler:
+
+- At most VLM_MAX_IN_FLIGHT requests are sent to the backend at once.
+- Further requests wait in a priority queue: interactive requests
+  (/ai-outfit/today, the default) are admitted before batch ones (/travel),
+  FIFO within a priority.
+- The queue holds at most VLM_MAX_QUEUE waiters; beyond that a request is
+  rejected immediately with VLMQueueFullError.
+- A waiter that is not admitted within VLM_QUEUE_TIMEOUT_SECONDS gets
+  VLMQueueTimeoutError instead of holding its client for minutes.
+
+Rejections surface as failed VLM responses, so the recommendation pipeline
+answers with its score-based fallback right away.
+
+The priority of the calling task is set with `vlm_priority(...)`:
+
+    with vlm_priority(PRIORITY_BATCH):
+        await vlm_service.recommend_travel_outfits(...)
+
+Environment Variables:
+- VLM_MAX_IN_FLIGHT: Concurrent requests sent to the VLM backend (default 2)
+- VLM_MAX_QUEUE: Requests allowed to wait for a slot (default 16)
+- VLM_QUEUE_TIMEOUT_SECONDS: Longest wait for a slot (default 30)
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_current_priority: ContextVar[int] = ContextVar("vlm_priority", default=PRIORITY_INTERACTIVE)
+
+
+class VLMAdmissionError(Exception):
+    """A VLM request was not admitted to the backend."""
+
+
+class VLMQueueFullError(VLMAdmissionError):
+    """The admission queue is full."""
+
+
+class VLMQueueTimeoutError(VLMAdmissionError):
+    """The request waited longer than the queue deadline."""
+
+
+@contextmanager
+def vlm_priority(priority: int) -> Iterator[None]:
+    """Run VLM calls of the current task (and tasks it starts) at `priority`."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class VLMAdmissionScheduler:
+    """
+    Admits VLM calls up to a concurrency limit; queues the rest by priority.
+    """
+
+    DEFAULT_MAX_IN_FLIGHT = 2
+    DEFAULT_MAX_QUEUE = 16
+    DEFAULT_QUEUE_TIMEOUT_SECONDS = 30.0
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_in_flight: Concurrent backend requests (VLM_MAX_IN_FLIGHT)
+            max_queue: Maximum waiting requests (VLM_MAX_QUEUE)
+            queue_timeout: Longest wait for a slot in seconds (VLM_QUEUE_TIMEOUT_SECONDS)
+        """
+        self.max_in_flight = max_in_flight or int(
+            os.getenv("VLM_MAX_IN_FLIGHT", self.DEFAULT_MAX_IN_FLIGHT)
+        )
+        self.max_queue = (
+            max_queue
+            if max_queue is not None
+            else int(os.getenv("VLM_MAX_QUEUE", self.DEFAULT_MAX_QUEUE))
+        )
+        self.queue_timeout = queue_timeout or float(
+            os.getenv("VLM_QUEUE_TIMEOUT_SECONDS", self.DEFAULT_QUEUE_TIMEOUT_SECONDS)
+        )
+        self._queue: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._sequence = itertools.count()
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.timed_out = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None) -> AsyncIterator[None]:
+        """
+        Hold one backend slot for the duration of the block.
+
+        Args:
+            priority: Lower is admitted first (defaults to the task's vlm_priority)
+
+        Raises:
+            VLMQueueFullError: If the queue is full
+            VLMQueueTimeoutError: If no slot frees up before the deadline
+        """
+        await self._acquire(_current_priority.get() if priority is None else priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_full": self.rejected_full,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.total_wait_ms / self.admitted, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+    # -------------------------------------------------------------- internals
+
+    async def _acquire(self, priority: int) -> None:
+        if self.in_flight < self.max_in_flight and self.waiting == 0:
+            self.in_flight += 1
+            self._record_admission(0.0)
+            return
+        if self.waiting >= self.max_queue:
+            self.rejected_full += 1
+            print(f"[VLMScheduler] Rejected: queue full ({self.waiting} waiting)")
+            raise VLMQueueFullError(f"VLM queue full ({self.waiting} waiting)")
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future))
+        self.waiting += 1
+        self.queued += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over as the wait ended; give it back.
+                self._release()
+            else:
+                future.cancel()
+                self.waiting -= 1
+            if isinstance(exc, asyncio.TimeoutError):
+                self.timed_out += 1
+                print(f"[VLMScheduler] Timed out after {self.queue_timeout}s in queue")
+                raise VLMQueueTimeoutError(
+                    f"VLM queue wait exceeded {self.queue_timeout}s"
+                ) from None
+            raise
+        self._record_admission((time.perf_counter() - queued_at) * 1000)
+
+    def _release(self) -> None:
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                # Hand the slot straight to the next waiter; in_flight is unchanged.
+                self.waiting -= 1
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _record_admission(self, wait_ms: float) -> None:
+        self.admitted += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+
+vlm_scheduler = VLMAdmissionScheduler()
@@ -16,8 +16,29 @@ from typing import Any, Dict, List, Optional
 import os
 import httpx
 import json
-import base64
 import re
+import time
+
+from services.http_client_registry import VLM_CLIENT, http_client_registry
+from services.llava_stream import (
+    SelectionStreamParser,
+    prompt_tokens_from,
+    read_selection_stream,
+    selection_stream_stats,
+)
+from services.vlm_structured import (
+    KIND_CANDIDATE_SELECTION,
+    KIND_TRAVEL,
+    CandidateSelectionOutput,
+    TravelCapsuleOutput,
+    apply_response_schema,
+    parse_structured,
+    response_schema,
+    structured_output_stats,
+)
+from services.image_preprocessing_service import ImagePreprocessingService
+from services.vlm_config import get_vlm_config
+from services.vlm_scheduler import VLMAdmissionError, vlm_scheduler
 
 
 class VLMProviderEnum(str, Enum):
@@ -41,6 +62,8 @@ class VLMResponse:
         confidence_score: Float 0-1 indicating confidence in the recommendation
         metadata: Additional metadata from the VLM (usage stats, etc.)
         error: Error message if success=False
+        structured: Typed result of a schema-constrained call (see
+            services/vlm_structured.py), None for free-text responses
     """
 
     success: bool
@@ -49,6 +72,7 @@ class VLMResponse:
     confidence_score: float = 0.0
     metadata: Dict[str, Any] = None
     error: Optional[str] = None
+    structured: Optional[Any] = None
 
     def __post_init__(self):
         if self.metadata is None:
@@ -185,6 +209,16 @@ class VLMServiceInterface(ABC):
         """
         pass
 
+    def supports_structured_output(self) -> bool:
+        """
+        Whether candidate selection and travel replies are schema-constrained.
+
+        When True, recommend_outfit (mode "candidate_selection", with
+        user_context["candidate_ids"]) and recommend_travel_outfits fill
+        VLMResponse.structured with the validated result.
+        """
+        return False
+
     @abstractmethod
     def health_check(self) -> bool:
         """
@@ -219,9 +253,16 @@ class LLaVAService(VLMServiceInterface):
     LLaVA (Large Language and Vision Assistant) service implementation using an external API.
     """
 
+    # Images sent per call (more makes Ollama run out of memory)
+    MAX_IMAGES = 4
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """Initialize LLaVA service."""
         super().__init__(VLMProviderEnum.LLAVA, config)
+        self.image_preprocessor = self.config.get("image_preprocessor") or ImagePreprocessingService(
+            get_vlm_config().get_image_preprocessing_config()
+        )
+        self.scheduler = vlm_scheduler
 
     def _validate_config(self):
         """
@@ -232,15 +273,29 @@ class LLaVAService(VLMServiceInterface):
         self.model_name = os.getenv("LLAVA_MODEL_NAME", "llava:latest")
         self.api_key = os.getenv("LLAVA_API_KEY", "")
         self.timeout = float(os.getenv("LLAVA_TIMEOUT", "300.0")) # 5 minutos para local CPU/GPU
+        self.stream_selection = os.getenv("LLAVA_STREAM_CANDIDATE_SELECTION", "true").lower() == "true"
+        self.selection_max_tokens = int(os.getenv("LLAVA_SELECTION_MAX_TOKENS", "256"))
+        self.selection_reasoning_max_chars = int(os.getenv("LLAVA_SELECTION_REASONING_MAX_CHARS", "280"))
+        self.structured_output = os.getenv("LLAVA_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+    def supports_structured_output(self) -> bool:
+        return self.structured_output
 
-    async def _call_llava_api(self, prompt: str, image_urls: List[str]) -> str:
-        """Helper method to execute HTTP request to the external VLM API."""
+    def _llava_headers(self) -> Dict[str, str]:
         headers = {
             "Content-Type": "application/json"
         }
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
 
+    def _llava_payload(
+        self,
+        prompt: str,
+        image_urls: List[str],
+        max_tokens: int = 1024,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         # Setup standard OpenAI-like multi-modal payload
         content_items = []
         for url in image_urls:
@@ -257,65 +312,144 @@ class LLaVAService(VLMServiceInterface):
                     "content": content_items
                 }
             ],
-            "max_tokens": 1024,
+            "max_tokens": max_tokens,
             "temperature": 0.3
         }
+        if schema:
+            apply_response_schema(payload, self.api_endpoint, "outfit_response", schema)
+        return payload
+
+    async def _call_llava_api(
+        self,
+        prompt: str,
+        image_urls: List[str],
+        schema: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Helper method to execute HTTP request to the external VLM API.
 
+        The request waits for a slot of the admission scheduler first and
+        raises VLMAdmissionError when the queue is full or the wait times out.
+        `schema` constrains the reply to JSON matching it; `usage` receives
+        the server-reported "prompt_tokens" when the response carries it.
+        """
+        payload = self._llava_payload(prompt, image_urls, schema=schema)
+        async with self.scheduler.slot():
+            return await self._post_llava_request(payload, self._llava_headers(), usage)
+
+    async def _call_llava_selection(
+        self,
+        prompt: str,
+        image_urls: List[str],
+        schema: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Streamed variant of _call_llava_api for candidate selection.
+
+        Generation is cut off as soon as the selection JSON is complete (see
+        services/llava_stream.py). Falls back to _call_llava_api when
+        LLAVA_STREAM_CANDIDATE_SELECTION is disabled.
+
+        Returns:
+            The selection as JSON text, or the raw streamed text if no JSON
+            object was found
+        """
+        if not self.stream_selection:
+            return await self._call_llava_api(prompt, image_urls, schema, usage)
+        payload = self._llava_payload(
+            prompt, image_urls, max_tokens=self.selection_max_tokens, schema=schema
+        )
+        payload["stream"] = True
+        if "/api/" not in self.api_endpoint:
+            # OpenAI-compatible streams only report usage when asked to
+            payload["stream_options"] = {"include_usage": True}
+        async with self.scheduler.slot():
+            return await self._stream_llava_request(payload, self._llava_headers(), usage)
+
+    async def _post_llava_request(
+        self,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> str:
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    self.api_endpoint,
-                    json=payload,
-                    headers=headers
-                )
-                
-                # Tratar erro de forma limpa para podermos ver
-                if response.status_code >= 400:
-                    raise Exception(f"HTTP {response.status_code}: {response.text}")
-                    
-                data = response.json()
-                
-                # Try to extract the standard assistant text response
-                if "choices" in data and len(data["choices"]) > 0:
-                    return data["choices"][0]["message"]["content"]
-                # Alternative structure (e.g., Ollama generate endpoint)
-                elif "response" in data:
-                    return data["response"]
-                else:
-                    return json.dumps(data)
+            client = http_client_registry.get_client(VLM_CLIENT)
+            response = await client.post(
+                self.api_endpoint,
+                json=payload,
+                headers=headers,
+                timeout=self.timeout,
+            )
+
+            # Tratar erro de forma limpa para podermos ver
+            if response.status_code >= 400:
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
+
+            data = response.json()
+            prompt_tokens = prompt_tokens_from(data)
+            if usage is not None and prompt_tokens is not None:
+                usage["prompt_tokens"] = prompt_tokens
+
+            # Try to extract the standard assistant text response
+            if "choices" in data and len(data["choices"]) > 0:
+                return data["choices"][0]["message"]["content"]
+            # Alternative structure (e.g., Ollama generate endpoint)
+            elif "response" in data:
+                return data["response"]
+            else:
+                return json.dumps(data)
         except Exception as e:
             raise Exception(f"Failed to communicate with external LLaVA API: {str(e)}")
 
-    async def _url_to_base64_data_uri(self, url: str) -> str:
-        """Helper to convert URL to Base64 data URI so local Ollama can read it."""
+    async def _stream_llava_request(
+        self,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        parser = SelectionStreamParser(reasoning_max_chars=self.selection_reasoning_max_chars)
+        started = time.perf_counter()
         try:
-            if url.startswith("data:"):
-                return url
-                
-            if not url.startswith("http"):
-                # É um path local (ex: /uploads/img.jpg)
-                import os
-                rel_path = url.lstrip("/")
-                file_path = os.path.join(os.getcwd(), rel_path)
-                
-                if os.path.exists(file_path):
-                    with open(file_path, "rb") as image_file:
-                        b64_img = base64.b64encode(image_file.read()).decode('ascii')
-                        return f"data:image/jpeg;base64,{b64_img}"
-                
-                # Se não encontrar localmente, tentamos forçar o http local do FastAPI
-                url = f"http://127.0.0.1:8000/{rel_path}"
-
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                r = await client.get(url)
-                r.raise_for_status()
-                content_type = r.headers.get('Content-Type', 'image/jpeg')
-                b64_img = base64.b64encode(r.content).decode('ascii')
-                return f"data:{content_type};base64,{b64_img}"
+            client = http_client_registry.get_client(VLM_CLIENT)
+            # Leaving the block before the body is read closes the connection,
+            # which is how Ollama notices the client is gone and stops decoding.
+            async with client.stream(
+                "POST",
+                self.api_endpoint,
+                json=payload,
+                headers=headers,
+                timeout=self.timeout,
+            ) as response:
+                if response.status_code >= 400:
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    raise Exception(f"HTTP {response.status_code}: {body}")
+                stopped_early = await read_selection_stream(response.aiter_lines(), parser, usage)
         except Exception as e:
-            print(f"Erro ao converter imagem {url}:", str(e))
-            return ""  # Se falhar devolve vazio para não crashar o Ollama
+            raise Exception(f"Failed to communicate with external LLaVA API: {str(e)}")
+
+        selection_stream_stats.record(
+            stopped_early=stopped_early,
+            parsed=parser.complete,
+            chars=parser.chars_received,
+            seconds=time.perf_counter() - started,
+        )
+        return parser.result_text()
 
+    async def _images_to_data_uris(self, image_urls: List[str]) -> List[str]:
+        """
+        Resized data URIs of the images to send so local Ollama can read them.
+
+        Images are fetched concurrently under the preprocessing deadline and
+        served from the thumbnail cache; failed or late images are left out
+        and the order of the rest is kept.
+        """
+        if not image_urls:
+            return []
+        return await self.image_preprocessor.preprocess_images(
+            image_urls, return_format="data_uri"
+        )
 
     def _extract_color(self, item: dict) -> str:
         """
@@ -415,7 +549,7 @@ class LLaVAService(VLMServiceInterface):
                         break
 
             wardrobe_desc = ""
-            image_urls = []
+            image_sources = []
             valid_items = []
             item_mapping = {}
 
@@ -441,10 +575,10 @@ class LLaVAService(VLMServiceInterface):
                 )
                 valid_items.append(short_id)
 
-                if img_url and len(image_urls) < 6:
-                    b64_uri = await self._url_to_base64_data_uri(img_url)
-                    if b64_uri:
-                        image_urls.append(b64_uri)
+                if img_url and len(image_sources) < self.MAX_IMAGES:
+                    image_sources.append(img_url)
+
+            image_urls = await self._images_to_data_uris(image_sources)
 
             formality_rule = ""
             if formality == "FORMAL":
@@ -494,17 +628,36 @@ PECAS_EM_FALTA: [lista categorias em falta separadas por vírgula, ou "Nenhuma"]
             
             # Envia imagens ao LLaVA para análise visual (máx 4 para não causar OOM)
             # Se Ollama ficar sem memória, faz retry só com texto
-            images_to_send = image_urls[:4]
+            images_to_send = image_urls
+            is_selection = (user_context or {}).get("mode") == "candidate_selection"
+            call_llava = self._call_llava_selection if is_selection else self._call_llava_api
+            candidate_ids = (user_context or {}).get("candidate_ids")
+            schema = None
+            if is_selection and self.structured_output:
+                schema = response_schema(CandidateSelectionOutput, candidate_ids)
+            usage: Dict[str, Any] = {}
             try:
-                vlm_text = await self._call_llava_api(req_prompt, images_to_send)
+                vlm_text = await call_llava(req_prompt, images_to_send, schema, usage=usage)
+            except VLMAdmissionError:
+                raise
             except Exception as img_err:
                 err_str = str(img_err).lower()
                 if any(k in err_str for k in ["memory", "oom", "500", "cuda", "out of"]):
                     print(f"[VLM] OOM com imagens, a tentar só texto...")
-                    vlm_text = await self._call_llava_api(req_prompt, [])
+                    images_to_send = []
+                    vlm_text = await call_llava(req_prompt, [], schema, usage=usage)
+                elif schema and "http 400" in err_str:
+                    print(f"[VLM] Response schema rejected, a tentar sem schema...")
+                    schema = None
+                    vlm_text = await call_llava(req_prompt, images_to_send, usage=usage)
                 else:
                     raise img_err
             
+            structured = None
+            if schema:
+                structured = parse_structured(CandidateSelectionOutput, vlm_text, candidate_ids)
+                structured_output_stats.record(KIND_CANDIDATE_SELECTION, structured is not None)
+
             with open("llava_trace.log", "a", encoding="utf-8") as f:
                 f.write(f"\\n--- REQ PROMPT ---\\n{req_prompt}\\n--- VLM TEXT ---\\n{vlm_text}\\n--- VALID ITEMS ---\\n{valid_items}\\n")
             
@@ -538,7 +691,9 @@ PECAS_EM_FALTA: [lista categorias em falta separadas por vírgula, ou "Nenhuma"]
                     "raw_response": vlm_text,
                     "image_count": len(images_to_send),
                     "image_preprocessing": "active",
+                    "prompt_tokens": usage.get("prompt_tokens"),
                 },
+                structured=structured,
             )
             
         except Exception as e:
@@ -563,7 +718,7 @@ PECAS_EM_FALTA: [lista categorias em falta separadas por vírgula, ou "Nenhuma"]
             
             # Just do one call for the capsule
             wardrobe_desc = "Peças de roupa disponíveis:\\n"
-            image_urls = []
+            image_sources = []
             valid_items = []
             item_mapping = {}
             for idx, item in enumerate(wardrobe_items[:15]): # Pass more items to travel planner
@@ -576,13 +731,15 @@ PECAS_EM_FALTA: [lista categorias em falta separadas por vírgula, ou "Nenhuma"]
                     
                 if img_url:
                     wardrobe_desc += f"- ID: {short_id}, Name: {item.get('name')}, Type: {item.get('type')}\\n"
-                    
-                    b64_uri = await self._url_to_base64_data_uri(img_url)
-                    if b64_uri and len(image_urls) < 4:
-                        image_urls.append(b64_uri)
-                    
+
+                    # Only the images that are sent are fetched
+                    if len(image_sources) < self.MAX_IMAGES:
+                        image_sources.append(img_url)
+
                     valid_items.append(short_id)
 
+            image_urls = await self._images_to_data_uris(image_sources)
+
             req_prompt = prompt_template or f"""Vou fazer uma viagem de {num_days} dias. Temperatura média {temp}°C, {condition}, Vento: {wind}m/s. 
 Seleciona um guarda-roupa cápsula versátil a partir dos itens seguintes:
 {wardrobe_desc}
@@ -590,17 +747,48 @@ Seleciona um guarda-roupa cápsula versátil a partir dos itens seguintes:
 Regras: Pensa como um estilista. Avalia peças femininas (vestidos, saias) vs masculinas. Ajusta face a condições agressivas de vento/chuva.
 Justifica as tuas opções de forma muito detalhada em PORTUGUÊS com foco no clima. 
 OBRIGATORIAMENTE lista os IDs (ex: ITEM_1) no texto."""
-            
-            vlm_text = await self._call_llava_api(req_prompt, image_urls)
-            
-            # Provide the same capsule base for each day as a minimal fallback
+
+            schema = None
+            if self.structured_output and valid_items:
+                schema = response_schema(TravelCapsuleOutput, valid_items)
+                if not prompt_template:
+                    req_prompt += '\nResponde APENAS em JSON: {"items": ["ITEM_1", ...], "reasoning": "justificação"}'
+
+            try:
+                vlm_text = await self._call_llava_api(req_prompt, image_urls, schema)
+            except VLMAdmissionError:
+                raise
+            except Exception as schema_err:
+                if not (schema and "http 400" in str(schema_err).lower()):
+                    raise
+                print(f"[VLM] Response schema rejected, a tentar sem schema...")
+                schema = None
+                vlm_text = await self._call_llava_api(req_prompt, image_urls)
+
+            structured = None
+            if schema:
+                structured = parse_structured(TravelCapsuleOutput, vlm_text, valid_items)
+                structured_output_stats.record(KIND_TRAVEL, structured is not None)
+
+            capsule_ids = []
+            if structured is not None:
+                capsule_ids = list(dict.fromkeys(
+                    item_mapping[alias] for alias in structured.items if alias in item_mapping
+                ))
+                reasoning = structured.reasoning or vlm_text
+            if not capsule_ids:
+                # Provide the same capsule base for each day as a minimal fallback
+                capsule_ids = [i["id"] for i in wardrobe_items[:3]]
+                reasoning = vlm_text
+
             for _ in range(num_days):
                 responses.append(
                     VLMResponse(
                         success=True,
-                        outfit_items=[i["id"] for i in wardrobe_items[:3]],
-                        reasoning=vlm_text,
-                        confidence_score=0.85
+                        outfit_items=capsule_ids,
+                        reasoning=reasoning,
+                        confidence_score=0.85,
+                        structured=structured,
                     )
                 )
             return responses
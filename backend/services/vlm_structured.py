@@ -0,0 +1,133 @@
+"""
+VLM Structured Output
+
+Schema-constrained LLaVA generation for the calls whose answer is data.
+
+Free-text answers need lenient parsing (_parse_candidate_selection_json,
+ResponseParser._extract_json_object) and fall back to the top-scored outfit
+when the model picks an ID that does not exist. With structured output the
+request carries a JSON schema and the server constrains decoding to it:
+
+- Ollama native endpoints (/api/chat, /api/generate): "format": <schema>
+- OpenAI-compatible endpoints (/v1/chat/completions, Ollama >= 0.5):
+  "response_format": {"type": "json_schema", "json_schema": {...}}
+
+Schemas are generated from the pydantic models below, with the allowed IDs
+added as an enum, so the reply validates straight into a typed result.
+Validation failures are counted and the caller falls back to the free-text
+path.
+
+Environment Variables:
+- LLAVA_STRUCTURED_OUTPUT: Send response schemas to LLaVA (default true)
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+KIND_CANDIDATE_SELECTION = "candidate_selection"
+KIND_TRAVEL = "travel"
+
+
+class CandidateSelectionOutput(BaseModel):
+    """LLaVA's choice among pre-validated outfit candidates."""
+
+    selected_candidate: str
+    reasoning: str = ""
+    confidence: float = Field(ge=0.0, le=1.0)
+
+
+class TravelCapsuleOutput(BaseModel):
+    """Capsule wardrobe picked by LLaVA, as ITEM_n aliases."""
+
+    items: List[str] = Field(min_length=1)
+    reasoning: str = ""
+
+
+OutputModel = TypeVar("OutputModel", bound=BaseModel)
+
+
+def response_schema(model: Type[BaseModel], allowed_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    JSON schema for `model`, restricting ID fields to `allowed_ids`.
+
+    Args:
+        model: CandidateSelectionOutput or TravelCapsuleOutput
+        allowed_ids: Valid candidate IDs / item aliases (None = unrestricted)
+
+    Returns:
+        JSON schema dict
+    """
+    schema = copy.deepcopy(model.model_json_schema())
+    schema.pop("title", None)
+    if allowed_ids:
+        properties = schema.get("properties", {})
+        enum = [str(value) for value in allowed_ids]
+        if "selected_candidate" in properties:
+            properties["selected_candidate"]["enum"] = enum
+        if "items" in properties:
+            properties["items"]["items"] = {"type": "string", "enum": enum}
+    return schema
+
+
+def apply_response_schema(payload: Dict[str, Any], endpoint: str, name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Add `schema` to a LLaVA request payload in the endpoint's dialect."""
+    if "/api/" in endpoint:
+        payload["format"] = schema
+    else:
+        payload["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": schema, "strict": True},
+        }
+    return payload
+
+
+def parse_structured(
+    model: Type[OutputModel],
+    text: str,
+    allowed_ids: Optional[Sequence[str]] = None,
+) -> Optional[OutputModel]:
+    """
+    Validate a schema-constrained reply.
+
+    Returns:
+        The typed result, or None if the text does not match the schema
+    """
+    try:
+        result = model.model_validate_json((text or "").strip())
+    except ValidationError:
+        return None
+    if allowed_ids is not None:
+        allowed = {str(value) for value in allowed_ids}
+        ids = getattr(result, "items", None)
+        if ids is None:
+            ids = [getattr(result, "selected_candidate", "")]
+        if any(str(value) not in allowed for value in ids):
+            return None
+    return result
+
+
+class StructuredOutputStats:
+    """
+    Per-kind counters for schema-constrained calls.
+
+    validated: the reply was used as-is, so free-text parsing and its
+        fallbacks were skipped
+    invalid: the reply failed validation and the free-text path was used
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, validated: bool) -> None:
+        counts = self._counts.setdefault(kind, {"requests": 0, "validated": 0, "invalid": 0})
+        counts["requests"] += 1
+        counts["validated" if validated else "invalid"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {kind: dict(counts) for kind, counts in self._counts.items()}
+
+
+structured_output_stats = StructuredOutputStats()
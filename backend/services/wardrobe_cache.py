@@ -0,0 +1,168 @@
+"""
+Wardrobe Snapshot Cache
+
+In-process cache of formatted wardrobe snapshots, one per user.
+
+A single recommendation request used to fetch and format the same wardrobe
+several times (candidate wardrobe, debug wardrobe, clean wardrobe). The cache
+keeps the full formatted wardrobe of a user for a short TTL so that every view
+(clean only, excluded items removed, ...) is derived from one fetch.
+
+Consistency rules:
+- Every user has a monotonically increasing wardrobe version.
+- Item writes (create/update/delete) call invalidate_user_wardrobe(), which
+  drops the snapshot and bumps the version.
+- A snapshot is only stored if the version did not change while it was being
+  fetched, so a write that races with a read never leaves stale data behind.
+- Least recently used users are evicted once max_users is reached.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class WardrobeSnapshot:
+    """Formatted wardrobe of one user at a given version."""
+
+    user_id: str
+    version: int
+    items: List[Dict[str, Any]]
+    fetched_at: float = field(default_factory=time.monotonic)
+
+
+class WardrobeSnapshotCache:
+    """
+    Thread-safe TTL + LRU cache of per-user wardrobe snapshots.
+
+    Versions are kept separately from snapshots so that evicting a snapshot
+    never resets the version of a user.
+    """
+
+    DEFAULT_TTL_SECONDS = 60.0
+    DEFAULT_MAX_USERS = 256
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_users: Optional[int] = None,
+    ):
+        """
+        Initialize the snapshot cache.
+
+        Args:
+            ttl_seconds: Snapshot lifetime in seconds (0 disables caching)
+            max_users: Maximum number of user snapshots kept in memory
+        """
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else float(os.getenv("WARDROBE_CACHE_TTL_SECONDS", self.DEFAULT_TTL_SECONDS))
+        )
+        self.max_users = (
+            max_users
+            if max_users is not None
+            else int(os.getenv("WARDROBE_CACHE_MAX_USERS", self.DEFAULT_MAX_USERS))
+        )
+        self._snapshots: "OrderedDict[str, WardrobeSnapshot]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_users > 0
+
+    def version(self, user_id: str) -> int:
+        """Return the current wardrobe version of a user."""
+        with self._lock:
+            return self._versions.get(str(user_id), 0)
+
+    def get(self, user_id: str) -> Optional[WardrobeSnapshot]:
+        """Return a fresh snapshot for the user, or None on a miss."""
+        key = str(user_id)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                self.misses += 1
+                return None
+
+            expired = time.monotonic() - snapshot.fetched_at > self.ttl_seconds
+            if expired or snapshot.version != self._versions.get(key, 0):
+                del self._snapshots[key]
+                self.misses += 1
+                return None
+
+            self._snapshots.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+    def put(
+        self,
+        user_id: str,
+        items: List[Dict[str, Any]],
+        version: int,
+    ) -> Optional[WardrobeSnapshot]:
+        """
+        Store a snapshot fetched at the given version.
+
+        Returns:
+            The stored snapshot, or None if the wardrobe changed during the fetch
+        """
+        if not self.enabled:
+            return None
+
+        key = str(user_id)
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                return None
+
+            snapshot = WardrobeSnapshot(user_id=key, version=version, items=items)
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_users:
+                self._snapshots.popitem(last=False)
+            return snapshot
+
+    def invalidate(self, user_id: str) -> int:
+        """Drop the user's snapshot and bump the wardrobe version."""
+        key = str(user_id)
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self.invalidations += 1
+            return self._versions[key]
+
+    def clear(self) -> None:
+        """Drop every snapshot (versions are kept)."""
+        with self._lock:
+            self._snapshots.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                "snapshots": len(self._snapshots),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+wardrobe_snapshot_cache = WardrobeSnapshotCache()
+
+
+def invalidate_user_wardrobe(user_id: Optional[str]) -> None:
+    """Invalidate the cached wardrobe of a user after an item write."""
+    if not user_id:
+        return
+    version = wardrobe_snapshot_cache.invalidate(user_id)
+    print(f"[WardrobeCache] Invalidated user_id={user_id} version={version}")
@@ -14,11 +14,20 @@ Responsibilities:
 
 from typing import Any, Dict, List, Optional
 
-import os
-
-from database import supabase
-from supabase import create_client
+from database import supabase, supabase_clients
 from services.color_inference_service import infer_dominant_color
+from services.color_inference_worker import (
+    UNKNOWN_COLOR,
+    ColorInferenceWorker,
+    color_inference_worker,
+)
+from services.db_executor import db_executor
+from services.wardrobe_cache import (
+    WardrobeSnapshot,
+    WardrobeSnapshotCache,
+    invalidate_user_wardrobe,
+    wardrobe_snapshot_cache,
+)
 
 
 COLOR_ALIASES = {
@@ -98,14 +107,26 @@ class WardrobeService:
     in the outfit recommendation pipeline.
     """
 
-    def __init__(self):
-        """Initialize the wardrobe service."""
-        service_key = os.environ.get("SUPABASE_SERVICE_KEY")
-        url = os.environ.get("SUPABASE_URL")
-        self.supabase = create_client(url, service_key) if service_key and url else supabase
+    def __init__(
+        self,
+        snapshot_cache: Optional[WardrobeSnapshotCache] = None,
+        color_worker: Optional[ColorInferenceWorker] = None,
+    ):
+        """
+        Initialize the wardrobe service.
+
+        Args:
+            snapshot_cache: Per-user wardrobe snapshot cache (shared module
+                cache if not provided)
+            color_worker: Background color inference worker (shared module
+                worker if not provided)
+        """
+        self.snapshot_cache = snapshot_cache or wardrobe_snapshot_cache
+        self.color_worker = color_worker or color_inference_worker
+        self.supabase = supabase_clients.admin() if supabase_clients.has_admin else supabase
         print(
             "[WardrobeService] Supabase client="
-            f"{'service_role' if service_key and url else 'default'}"
+            f"{'service_role' if supabase_clients.has_admin else 'default'}"
         )
 
     async def get_user_wardrobe(
@@ -117,6 +138,9 @@ class WardrobeService:
         """
         Fetch all wardrobe items for a user.
 
+        Every view is derived from the cached per-user snapshot, so repeated
+        calls within one request only hit the database once.
+
         Args:
             user_id: The user's unique identifier
             only_clean: If True, only return items with status='clean'
@@ -133,43 +157,93 @@ class WardrobeService:
                 "[WardrobeService] Fetch wardrobe "
                 f"user_id={user_id} only_clean={only_clean} exclude_item_ids={exclude_item_ids or []}"
             )
+            snapshot = await self.get_wardrobe_snapshot(user_id)
+            return self.filter_wardrobe_items(
+                snapshot.items,
+                only_clean=only_clean,
+                exclude_item_ids=exclude_item_ids,
+            )
 
-            # Build the query
-            query = self.supabase.table("clothes").select("*").eq("user_id", user_id)
+        except Exception as e:
+            raise WardrobeServiceError(
+                f"Failed to fetch wardrobe for user {user_id}: {str(e)}"
+            )
 
-            # Filter by status if needed
-            if only_clean:
-                query = query.eq("status", "clean")
+    async def get_wardrobe_snapshot(self, user_id: str) -> WardrobeSnapshot:
+        """
+        Return the full formatted wardrobe of a user (clean and dirty items).
 
-            response = query.execute()
-            items = response.data if response.data else []
+        Served from the snapshot cache when fresh; otherwise the `clothes`
+        table is queried once and the formatted result is cached.
+
+        Args:
+            user_id: The user's unique identifier
+
+        Returns:
+            WardrobeSnapshot with every formatted item of the user
+        """
+        snapshot = self.snapshot_cache.get(user_id)
+        if snapshot is not None:
+            print(
+                "[WardrobeService] Wardrobe snapshot hit "
+                f"user_id={user_id} version={snapshot.version} count={len(snapshot.items)}"
+            )
+            return snapshot
+
+        version = self.snapshot_cache.version(user_id)
+        response = await db_executor.execute(
+            self.supabase.table("clothes").select("*").eq("user_id", user_id)
+        )
+        items = response.data if response.data else []
+        print(
+            "[WardrobeService] Raw wardrobe rows fetched "
+            f"count={len(items)} user_id={user_id}"
+        )
+        for item in items:
             print(
-                "[WardrobeService] Raw wardrobe rows fetched "
-                f"count={len(items)} user_id={user_id}"
+                "[WardrobeService] Raw wardrobe item "
+                f"id={item.get('id')} user_id={item.get('user_id')} "
+                f"name={item.get('name')} type={item.get('type')} "
+                f"color={item.get('color')} style={item.get('style')} "
+                f"occasion={item.get('occasion')} status={item.get('status')} "
+                f"layer={item.get('layer')}"
             )
-            for item in items:
-                print(
-                    "[WardrobeService] Raw wardrobe item "
-                    f"id={item.get('id')} user_id={item.get('user_id')} "
-                    f"name={item.get('name')} type={item.get('type')} "
-                    f"color={item.get('color')} style={item.get('style')} "
-                    f"occasion={item.get('occasion')} status={item.get('status')} "
-                    f"layer={item.get('layer')}"
-                )
 
-            # Filter out excluded items
-            if exclude_item_ids:
-                items = [item for item in items if item["id"] not in exclude_item_ids]
+        formatted_items = [self._format_item(item) for item in items]
+        stored = self.snapshot_cache.put(user_id, formatted_items, version)
+        return stored or WardrobeSnapshot(
+            user_id=str(user_id),
+            version=version,
+            items=formatted_items,
+        )
 
-            # Format items for the recommendation pipeline
-            formatted_items = [self._format_item(item) for item in items]
+    @staticmethod
+    def filter_wardrobe_items(
+        items: List[Dict[str, Any]],
+        only_clean: bool = True,
+        exclude_item_ids: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Derive a wardrobe view from formatted items.
 
-            return formatted_items
+        Returns shallow copies so callers can annotate items (score, section)
+        without mutating the cached snapshot.
 
-        except Exception as e:
-            raise WardrobeServiceError(
-                f"Failed to fetch wardrobe for user {user_id}: {str(e)}"
-            )
+        Args:
+            items: Formatted wardrobe items
+            only_clean: If True, only keep items with status='clean'
+            exclude_item_ids: List of item IDs to drop
+
+        Returns:
+            Filtered list of item copies
+        """
+        excluded = set(exclude_item_ids or [])
+        return [
+            dict(item)
+            for item in items
+            if (not only_clean or item.get("status") == "clean")
+            and item.get("id") not in excluded
+        ]
 
     async def get_item_by_id(
         self, item_id: str, user_id: Optional[str] = None
@@ -193,7 +267,7 @@ class WardrobeService:
             if user_id:
                 query = query.eq("user_id", user_id)
 
-            response = query.execute()
+            response = await db_executor.execute(query)
 
             if not response.data:
                 return None
@@ -234,7 +308,7 @@ class WardrobeService:
             if only_clean:
                 query = query.eq("status", "clean")
 
-            response = query.execute()
+            response = await db_executor.execute(query)
             items = response.data if response.data else []
 
             return [self._format_item(item) for item in items]
@@ -273,7 +347,7 @@ class WardrobeService:
                 .eq("status", "clean")
             )
 
-            response = query.execute()
+            response = await db_executor.execute(query)
             items = response.data if response.data else []
 
             if limit:
@@ -316,7 +390,7 @@ class WardrobeService:
             if only_clean:
                 query = query.eq("status", "clean")
 
-            response = query.execute()
+            response = await db_executor.execute(query)
             items = response.data if response.data else []
 
             # Filter by temperature range
@@ -348,9 +422,11 @@ class WardrobeService:
             f"{db_item.get('name', '')} {db_item.get('type', '')} {db_item.get('brand', '')}"
         )
         image_inferred_color = None
+        color_pending = False
         if not explicit_color and not name_inferred_color:
-            candidate = infer_dominant_color(db_item.get("image", ""))
-            image_inferred_color = candidate if candidate and candidate != "unknown" else None
+            candidate = self._image_inferred_color(db_item)
+            color_pending = candidate is None
+            image_inferred_color = candidate if candidate and candidate != UNKNOWN_COLOR else None
         color = explicit_color or name_inferred_color or image_inferred_color or ""
         color_source = (
             "explicit"
@@ -359,6 +435,8 @@ class WardrobeService:
             if name_inferred_color
             else "image_inferred"
             if image_inferred_color
+            else "pending"
+            if color_pending
             else "unknown"
         )
 
@@ -401,6 +479,58 @@ class WardrobeService:
             },
         }
 
+    def _image_inferred_color(self, db_item: Dict[str, Any]) -> Optional[str]:
+        """
+        Resolve the image-inferred color of an item without blocking.
+
+        Order: value persisted on the row, result of a finished background
+        job, then a new background job. Returns None while the job is pending
+        and "unknown" when inference found no clear color.
+        """
+        persisted = normalize_optional_color(db_item.get("inferred_color"))
+        if persisted:
+            return persisted
+
+        image_ref = db_item.get("image") or ""
+        if not image_ref:
+            return UNKNOWN_COLOR
+
+        item_id = db_item.get("id")
+        finished = self.color_worker.lookup(item_id)
+        if finished:
+            return finished
+
+        user_id = db_item.get("user_id")
+
+        async def persist(done_item_id: str, inferred: str) -> None:
+            await self._persist_inferred_color(done_item_id, user_id, inferred)
+
+        if self.color_worker.submit(item_id, image_ref, on_complete=persist):
+            return None
+
+        return infer_dominant_color(image_ref) or UNKNOWN_COLOR
+
+    async def _persist_inferred_color(
+        self,
+        item_id: str,
+        user_id: Optional[str],
+        color: str,
+    ) -> None:
+        """Store an image-inferred color on the `clothes` row."""
+        try:
+            await db_executor.execute(
+                self.supabase.table("clothes")
+                .update({"inferred_color": color})
+                .eq("id", item_id)
+            )
+            print(f"[WardrobeService] Persisted inferred color item={item_id} color={color}")
+        except Exception as e:
+            # Missing column (backend/supabase_add_inferred_color.sql not run) is
+            # not fatal: the in-memory worker result is still used.
+            print(f"[WardrobeService] Could not persist inferred color for {item_id}: {e}")
+        finally:
+            invalidate_user_wardrobe(user_id)
+
     def _is_item_suitable_for_temp(
         self,
         item: Dict[str, Any],
@@ -0,0 +1,4 @@
+alter table public.clothes
+  add column if not exists inferred_color text;
+
+notify pgrst, 'reload schema';